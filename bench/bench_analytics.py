@@ -0,0 +1,81 @@
+# Benchmark: estatísticas sobre partidas gravadas (cli/analytics.py) x geração.
+#
+# Simula --jogos partidas (simulate.py) medindo jogos/s, repete as linhas até
+# um arquivo de --mb MB (com uma linha final cortada, como a de um torneio
+# interrompido) e mede a leitura com cada número de workers. Mostra jogos/s,
+# MB/s e quantas vezes a leitura é mais rápida que a geração, além do pico de
+# memória da leitura com 1x e 4x mais linhas (tracemalloc). Sai com código 1
+# se a leitura for mais lenta que a geração, se as tabelas mudarem com o
+# número de workers ou se a memória crescer com a entrada.
+# Uso: python bench/bench_analytics.py [--jogos 2000] [--mb 200] [--workers 1,4]
+import argparse, io, itertools, os, sys, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+from analytics import analyze, scan
+from simulate import run
+
+
+def gerar(jogos: int, workers: int):
+    out = io.StringIO()
+    elapsed = run(jogos, 0, ["greedy", "random"], workers, 500, out)
+    return out.getvalue().encode().splitlines(keepends=True), elapsed
+
+
+def pico(linhas, vezes: int) -> int:
+    tracemalloc.start()
+    try:
+        scan(itertools.chain.from_iterable(itertools.repeat(linhas, vezes)))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Estatísticas sobre partidas gravadas: leitura x geração")
+    ap.add_argument("--jogos", type=int, default=2000)
+    ap.add_argument("--mb", type=int, default=200, help="tamanho do arquivo lido")
+    ap.add_argument("--workers", default=f"1,{os.cpu_count() or 1}")
+    args = ap.parse_args()
+    workers = sorted({int(w) for w in args.workers.split(",")})
+
+    linhas, t_gerar = gerar(args.jogos, workers[0])
+    gerados = args.jogos / t_gerar
+    por_copia = sum(map(len, linhas))
+    copias = max(1, args.mb * 2 ** 20 // por_copia)
+    falhou = False
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.jsonl")
+        with open(path, "wb") as f:
+            for _ in range(copias):
+                f.writelines(linhas)
+            f.write(linhas[0][:len(linhas[0]) // 2])  # linha cortada no fim
+        mb = os.path.getsize(path) / 2 ** 20
+        print(f"geração: {gerados:.0f} jogos/s ({workers[0]} worker{'s' if workers[0] > 1 else ''}); "
+              f"arquivo: {args.jogos * copias} jogos, {mb:.0f} MB\n")
+        print(f"{'workers':>7} | {'tempo':>7} | {'jogos/s':>9} | {'MB/s':>6} | {'x geração':>9} | tabelas")
+        base = None
+        for w in workers:
+            t0 = time.perf_counter()
+            stats = analyze([path], w)
+            elapsed = time.perf_counter() - t0
+            tabelas = stats.tables()
+            base = base or tabelas
+            ok = tabelas == base and stats.games == args.jogos * copias and stats.bad == 1
+            lidos = stats.games / elapsed
+            # Mesma quantidade de workers que a geração: a leitura tem que ganhar
+            falhou |= not ok or (w == workers[0] and lidos <= gerados)
+            print(f"{w:>7} | {elapsed:>6.2f}s | {lidos:>9.0f} | {mb / elapsed:>6.1f} | {lidos / gerados:>8.1f}x | "
+                  f"{'ok' if ok else 'DIFERENTES'}")
+
+    p1, p4 = pico(linhas, 1), pico(linhas, 4)
+    cresceu = p4 > 1.5 * p1 + 64 * 1024
+    falhou |= cresceu
+    print(f"\npico de memória da leitura: {p1 / 1024:.0f} KB com {len(linhas)} linhas, {p4 / 1024:.0f} KB com "
+          f"{4 * len(linhas)} ({'cresceu' if cresceu else 'constante'})")
+    print(f"leitura mais rápida que a geração, tabelas iguais com qualquer número de workers e memória constante: "
+          f"{'FALHOU' if falhou else 'ok'}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
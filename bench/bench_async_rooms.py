@@ -0,0 +1,159 @@
+# Teste de estresse: cliques concorrentes em várias salas do servidor web.
+#
+# Cada sala tem dois jogadores que disparam compras de carta ao mesmo tempo
+# (inclusive cliques duplos). Três modos de aplicar as ações:
+#   - threads + TravasPorSala (servidor Flask-SocketIO padrão, sem shards)
+#   - asyncio com uma fila só para todas as salas (escritor único global)
+#   - asyncio com FilasPorSala (escritor único por sala, servidor_async.py)
+# O envio para o cliente é simulado com uma latência fixa. No fim confere, em
+# cada sala, que nenhuma compra se perdeu ou duplicou: as mãos cresceram
+# exatamente o número de compras aceitas, nenhuma carta sumiu ou apareceu, e
+# cada cliente recebeu as versões em sequência.
+# Uso: python bench/bench_async_rooms.py [--salas 16] [--cliques 30] [--latencia 0.002]
+import argparse, asyncio, json, os, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web-flask"))
+import app
+from salas import FilasPorSala, GerenciadorSalas, TravasPorSala
+
+TOTAL_CARTAS = 8 * 12 + 14
+
+
+def preparar(salas: GerenciadorSalas, n_salas: int):
+    # Duas pessoas por sala, jogo iniciado e bilhetes iniciais escolhidos
+    jogadores = []
+    for s in range(n_salas):
+        sids = [f"s{s}-a", f"s{s}-b"]
+        for sid in sids:
+            app.processar_evento(salas, 'entrar_no_jogo', sid, {'sala_id': f"sala{s}", 'nome': sid})
+        app.processar_evento(salas, 'iniciar_jogo', sids[0], {})
+        for sid in sids:
+            app.processar_evento(salas, 'escolher_bilhetes', sid, {'manter': [0, 1]})
+        jogadores.append(sids)
+    iniciais = {sala_id: sum(len(j.cartas_vagao) for j in sala.jogo.jogadores.values())
+                for sala_id, sala in salas.salas.items()}
+    return jogadores, iniciais
+
+
+class Entregas:
+    """Patches recebidos por sala (um envio por sala chega a todos os clientes), na ordem de entrega."""
+
+    def __init__(self):
+        self.versoes: dict[str, list[int]] = {}
+
+    def registrar(self, saidas):
+        for evento, dados, destino in saidas:
+            if evento == 'game_patch':
+                self.versoes.setdefault(destino, []).append(json.loads(dados)['versao'])
+
+
+def conferir(salas: GerenciadorSalas, iniciais: dict, aceitas: dict, entregas: Entregas) -> list[str]:
+    problemas = []
+    for sala_id, sala in salas.salas.items():
+        jogo = sala.jogo
+        motor = jogo.baralho_vagao.motor
+        maos = sum(len(j.cartas_vagao) for j in jogo.jogadores.values())
+        if maos - iniciais[sala_id] != aceitas.get(sala_id, 0):
+            problemas.append(f"{sala_id}: {maos - iniciais[sala_id]} cartas nas mãos para "
+                             f"{aceitas.get(sala_id, 0)} compras aceitas")
+        cartas = len(motor.cards) + len(motor.discard) + len(jogo.mercado.colors()) + maos
+        if cartas != TOTAL_CARTAS:
+            problemas.append(f"{sala_id}: {cartas} cartas no jogo (esperado {TOTAL_CARTAS})")
+    for sala_id, versoes in entregas.versoes.items():
+        if any(b != a + 1 for a, b in zip(versoes, versoes[1:])):
+            problemas.append(f"{sala_id}: versões fora de ordem {versoes[:8]}...")
+    return problemas
+
+
+def cliques(jogadores, n: int):
+    # Ordem intercalada entre salas e jogadores; cada clique sai em dobro
+    for k in range(n):
+        for sids in jogadores:
+            for sid in sids:
+                yield sid, 2 if k % 3 == 0 else 1
+
+
+def aceita(saidas) -> bool:
+    return not any(evento == 'erro_acao' for evento, _, _ in saidas)
+
+
+def modo_threads(n_salas: int, n_cliques: int, latencia: float, workers: int):
+    salas = GerenciadorSalas(app.Jogo, tempfile.mkdtemp())
+    jogadores, iniciais = preparar(salas, n_salas)
+    travas, entregas, aceitas = TravasPorSala(), Entregas(), {}
+    contador = threading.Lock()
+
+    def clicar(sid):
+        sala_id = salas._sala_do_sid[sid]
+        with travas(sala_id):  # como app.despachar
+            saidas = app.processar_evento(salas, 'comprar_carta', sid, {'index': -1})
+            time.sleep(latencia)  # envio
+            entregas.registrar(saidas)
+        if aceita(saidas):
+            with contador:
+                aceitas[sala_id] = aceitas.get(sala_id, 0) + 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        total = 0
+        for sid, vezes in cliques(jogadores, n_cliques):
+            for _ in range(vezes):
+                pool.submit(clicar, sid)
+                total += 1
+    return total, time.perf_counter() - t0, conferir(salas, iniciais, aceitas, entregas)
+
+
+async def _modo_async(n_salas: int, n_cliques: int, latencia: float, workers: int, fila_unica: bool):
+    salas = GerenciadorSalas(app.Jogo, tempfile.mkdtemp())
+    jogadores, iniciais = preparar(salas, n_salas)
+    entregas, aceitas = Entregas(), {}
+
+    async def entregar(saidas):
+        await asyncio.sleep(latencia)  # envio
+        entregas.registrar(saidas)
+
+    filas = FilasPorSala(salas, app.processar_evento, entregar, ThreadPoolExecutor(workers))
+    t0 = time.perf_counter()
+    futuros = []
+    for sid, vezes in cliques(jogadores, n_cliques):
+        sala_id = salas._sala_do_sid[sid]
+        for _ in range(vezes):
+            chave = 'todas' if fila_unica else sala_id
+            futuros.append((sala_id, filas.enviar(chave, 'comprar_carta', sid, {'index': -1})))
+    for sala_id, futuro in futuros:
+        if aceita(await futuro):
+            aceitas[sala_id] = aceitas.get(sala_id, 0) + 1
+    dt = time.perf_counter() - t0
+    filas.fechar()
+    return len(futuros), dt, conferir(salas, iniciais, aceitas, entregas)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Estresse de cliques concorrentes por sala")
+    ap.add_argument("--salas", type=int, default=16)
+    ap.add_argument("--cliques", type=int, default=30, help="rodadas de cliques por jogador")
+    ap.add_argument("--latencia", type=float, default=0.002, help="segundos por envio")
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    modos = [
+        ("threads + trava por sala", lambda: modo_threads(args.salas, args.cliques, args.latencia, args.workers)),
+        ("asyncio, fila única", lambda: asyncio.run(
+            _modo_async(args.salas, args.cliques, args.latencia, args.workers, fila_unica=True))),
+        ("asyncio, fila por sala", lambda: asyncio.run(
+            _modo_async(args.salas, args.cliques, args.latencia, args.workers, fila_unica=False))),
+    ]
+    print(f"{args.salas} salas, {args.cliques} rodadas de cliques, envio de {args.latencia * 1e3:.1f} ms")
+    print(f"{'modo':<26} | {'ações':>6} | {'tempo (s)':>9} | {'ações/s':>8} | conferência")
+    falhou = False
+    for nome, rodar in modos:
+        total, dt, problemas = rodar()
+        falhou |= bool(problemas)
+        print(f"{nome:<26} | {total:>6} | {dt:>9.2f} | {total / dt:>8.0f} | "
+              f"{'ok' if not problemas else '; '.join(problemas[:3])}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
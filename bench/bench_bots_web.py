@@ -0,0 +1,102 @@
+# Benchmark: bots da web (web-flask) fora do caminho dos eventos.
+#
+# --salas mesas com uma pessoa e três bots, no transporte com threads (uma
+# trava por sala, como app.despachar). A pessoa joga pelos eventos; a busca
+# dos bots roda no Pensador e a jogada volta como o evento 'jogada_bot'.
+# Mede o tempo dos eventos da pessoa (que antes esperavam a busca de todos os
+# bots) e confere que todas as salas andam. Sai com código 1 se algum evento
+# da pessoa levar mais que uma busca de bot ou se alguma sala parar.
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_bots_web.py [--salas 4] [--rodadas 5] [--tempo-bot 0.1]
+import argparse, os, random, sys, time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.join(AQUI, "..", "web-flask"))
+import app
+from app import Jogo, pensar_bot, processar_evento
+from bench_sync_bytes import _tentar_rota
+from salas import BOT_PENSAR, JOGADA_BOT, GerenciadorSalas, Pensador, TravasPorSala
+
+
+def percentil(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bots da web fora do caminho dos eventos")
+    ap.add_argument("--salas", type=int, default=4)
+    ap.add_argument("--rodadas", type=int, default=5, help="vezes que a vez volta para a pessoa em cada sala")
+    ap.add_argument("--tempo-bot", type=float, default=0.1, help="segundos de busca por jogada de bot")
+    ap.add_argument("--semente", type=int, default=7)
+    args = ap.parse_args()
+    app.BOT.time_budget = args.tempo_bot
+
+    salas = GerenciadorSalas(lambda: Jogo(semente=args.semente))
+    travas = TravasPorSala()
+    jogadas_bot = {}
+
+    def despachar(evento, sid, dados, sala_id):
+        with travas(sala_id):
+            saidas = processar_evento(salas, evento, sid, dados)
+            for nome, pedido, _ in saidas:
+                if nome == BOT_PENSAR:
+                    pensador.pedir(pedido)
+        if evento == JOGADA_BOT:
+            jogadas_bot[sala_id] = jogadas_bot.get(sala_id, 0) + 1
+        return saidas
+
+    pensador = Pensador(pensar_bot, lambda sala_id, jogada: despachar(JOGADA_BOT, None, jogada, sala_id))
+    pessoas = {}
+    for k in range(args.salas):
+        sala_id, sid = f"s{k}", f"s{k}:pessoa"
+        despachar('entrar_no_jogo', sid, {'nome': 'Pessoa', 'sala_id': sala_id}, sala_id)
+        for _ in range(3):
+            despachar('adicionar_bot', sid, {}, sala_id)
+        despachar('iniciar_jogo', sid, {}, sala_id)
+        despachar('escolher_bilhetes', sid, {'manter': [0, 1]}, sala_id)
+        pessoas[sala_id] = sid
+
+    rnd = random.Random(args.semente)
+    tempos, vezes = [], dict.fromkeys(pessoas, 0)
+    limite = time.monotonic() + 30 + args.salas * args.rodadas * 3 * args.tempo_bot * 4
+    while any(n < args.rodadas for n in vezes.values()) and time.monotonic() < limite:
+        andou = False
+        for sala_id, sid in pessoas.items():
+            jogo = salas.get(sala_id).jogo
+            with travas(sala_id):
+                minha_vez = jogo.estado == "EM_ANDAMENTO" and jogo.get_jogador_da_vez().sid == sid
+                rota = _tentar_rota(jogo, sid) if minha_vez and jogo.acao_do_turno['tipo'] is None else None
+                comecando = minha_vez and jogo.acao_do_turno['tipo'] is None
+            if not minha_vez or vezes[sala_id] >= args.rodadas:
+                continue
+            t0 = time.perf_counter()
+            if rota:
+                despachar('reivindicar_rota', sid, rota, sala_id)
+            else:
+                saidas = despachar('comprar_carta', sid, {'index': rnd.choice([-1, 0, 1, 2, 3, 4])}, sala_id)
+                if any(nome == 'erro_acao' for nome, _, _ in saidas):
+                    despachar('comprar_carta', sid, {'index': -1}, sala_id)
+            tempos.append(time.perf_counter() - t0)
+            vezes[sala_id] += comecando
+            andou = True
+        if not andou:
+            time.sleep(0.005)
+    pensador.fechar()
+
+    paradas = [s for s, n in vezes.items() if n < args.rodadas]
+    p50, p99 = percentil(tempos, 0.5) * 1e3, percentil(tempos, 0.99) * 1e3
+    lento = p99 >= args.tempo_bot * 1e3
+    print(f"{args.salas} salas, 1 pessoa + 3 bots cada, {args.tempo_bot * 1e3:.0f} ms de busca por jogada de bot")
+    print(f"eventos da pessoa ({len(tempos)}): p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"jogadas de bot: {sum(jogadas_bot.values())} "
+          f"({', '.join(f'{s}: {jogadas_bot.get(s, 0)}' for s in pessoas)})")
+    print(f"eventos da pessoa sem esperar a busca dos bots: {'ESPEROU' if lento else 'ok'}")
+    print(f"todas as salas voltaram {args.rodadas} vezes para a pessoa: "
+          f"{'PAROU em ' + ', '.join(paradas) if paradas else 'ok'}")
+    sys.exit(1 if lento or paradas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Benchmark: copiar um jogo da CLI no meio da partida para busca.
+# Compara copy.deepcopy(Game), Game.from_state, CompactGame.clone e
+# apply+undo no estado compacto.
+# Uso: python bench/bench_clone_undo.py [repetições]
+import copy, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+from t2r_cli import Game
+from compact import CompactGame
+from policies import greedy_policy
+
+
+def mid_game() -> Game:
+    g = Game(["A", "B", "C"], seed=3, log=None)
+    rng = random.Random(3)
+    while g.turns < 12:
+        ok, _ = g.step(greedy_policy(g, rng))
+        if not ok:
+            g.step(("pass",))
+    return g
+
+
+def rate(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def main(n=20_000):
+    g = mid_game()
+    s = CompactGame.from_game(g)
+    state = g.to_state()
+    actions = s.legal_actions()
+
+    def apply_undo():
+        for a in actions:
+            if s.apply(a):
+                s.undo()
+
+    results = [
+        ("copy.deepcopy(Game)", rate(lambda: copy.deepcopy(g), n // 10)),
+        ("Game.from_state(to_state)", rate(lambda: Game.from_state(state, log=None), n // 10)),
+        ("CompactGame.clone()", rate(s.clone, n)),
+        (f"apply+undo ({len(actions)} ações)", rate(apply_undo, n) * len(actions)),
+    ]
+    base = results[0][1]
+    for name, per_s in results:
+        print(f"{name:<28} {per_s:>12,.0f} /s   ({per_s / base:6.1f}x)")
+    assert s.to_state() == CompactGame.from_game(g).to_state(), "undo não voltou ao estado original"
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,228 @@
+# Benchmark: agendador de envios (web-flask/envios.py) com relógio simulado.
+#
+# Joga uma partida pelos eventos do servidor com uma ação a cada --intervalo-ms
+# e passa as saídas pelo agendador, que junta os patches de cada tick. Os
+# clientes aplicam o que recebem como a página (main.js) e confirmam a versão
+# logo depois de um estado completo, a cada 16 patches e a cada 250 ms; um
+# espectador lento aplica só uma mensagem a cada --lento-ms.
+# Mostra quantas atualizações saíram por patch gerado e a maior fila do
+# cliente lento, com e sem contrapressão. Sai com código 1 se algum cliente
+# terminar com um estado diferente do servidor ou se a fila do lento passar do
+# limite com a contrapressão ligada.
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_envios.py [--ticks-ms 0,20,50] [--intervalo-ms 5] [--lento-ms 100]
+import argparse, json, os, sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.join(AQUI, "..", "web-flask"))
+from bench_sync_bytes import simular
+from app import mensagem_estado
+from envios import FILA_MAX, AgendadorEnvios
+
+CONFIRMAR_MS = 250  # como na página
+CONFIRMAR_A_CADA = 16
+SALA = 'bench'
+
+
+class Cliente:
+    """Aplica estado e patches como static/js/main.js."""
+
+    def __init__(self, sid: str, ms_por_mensagem: int = 0):
+        self.sid = sid
+        self.ms_por_mensagem = ms_por_mensagem  # 0 = aplica na hora
+        self.fila: list[tuple[str, object]] = []
+        self.fila_max = 0
+        self.estado = None
+        self.privado = None
+        self.bytes = 0
+        self.confirmar_agora = False  # a página confirma logo depois de um estado completo
+        self.sem_confirmar = 0
+
+    def receber(self, evento, dados):
+        self.fila.append((evento, dados))
+        self.bytes += len(dados) if isinstance(dados, bytes) else len(json.dumps(dados))
+        self.fila_max = max(self.fila_max, len(self.fila))
+        if not self.ms_por_mensagem:
+            while self.fila:
+                self.aplicar_uma()
+
+    def aplicar_uma(self):
+        evento, dados = self.fila.pop(0)
+        if evento in ('estado_privado', 'patch_privado'):
+            self.privado = dados
+        elif evento == 'game_state_update':
+            self.estado = json.loads(dados)
+            self.confirmar_agora = True
+            privado, self.privado = self.privado, None
+            if privado and privado['versao'] == self.estado['versao']:
+                eu = self._eu()
+                eu.update({k: v for k, v in privado.items() if k != 'versao'})
+                eu['mao'] = _contagem(eu.pop('cartas_vagao', []))
+        elif evento == 'game_patch':
+            patch = json.loads(dados)
+            privado, self.privado = self.privado, None
+            if self.estado is None or patch['base'] != self.estado['versao']:
+                raise AssertionError(f"{self.sid}: patch com base {patch['base']} sobre a versão "
+                                     f"{self.estado and self.estado['versao']}")
+            privado = privado if privado and privado['versao'] == patch['versao'] else None
+            self._aplicar(patch['ops'] + (privado['ops'] if privado and 'ops' in privado else []))
+            if privado and 'ops' not in privado:
+                # Parte privada inteira (reconexão), depois da troca de sid
+                eu = self._eu()
+                eu.update({k: v for k, v in privado.items() if k != 'versao'})
+                eu['mao'] = _contagem(eu.pop('cartas_vagao', []))
+            self.estado['versao'] = patch['versao']
+            self.sem_confirmar += 1
+            self.confirmar_agora = self.sem_confirmar >= CONFIRMAR_A_CADA
+
+    def _eu(self):
+        return next((j for j in self.estado['jogadores'] if j['sid'] == self.sid), {})
+
+    def _aplicar(self, ops):
+        estado = self.estado
+        for op in ops:
+            tipo = op['op']
+            if tipo == 'rota':
+                estado['tabuleiro']['rotas'][op['i']]['dono_id'] = op['dono_id']
+            elif tipo == 'jogador':
+                for j in estado['jogadores']:
+                    if j['sid'] == op['sid']:
+                        j.update({k: v for k, v in op.items() if k not in ('op', 'sid')})
+            elif tipo == 'mercado':
+                estado['cartas_visiveis'] = op['cartas']
+            elif tipo == 'turno':
+                estado['jogador_da_vez_sid'], estado['acao_do_turno'] = op['jogador_da_vez_sid'], op['acao_do_turno']
+            elif tipo == 'fim':
+                estado['estado'], estado['vencedor'] = op['estado'], op['vencedor']
+            elif tipo == 'mao':
+                mao = self._eu().setdefault('mao', {})
+                for cor, n in op['delta'].items():
+                    mao[cor] = mao.get(cor, 0) + n
+            elif tipo == 'jogaveis':
+                self._eu()['rotas_jogaveis'] = op['rotas']
+            elif tipo == 'bilhetes':
+                self._eu()['bilhetes'], self._eu()['oferta_bilhetes'] = op['bilhetes'], op['oferta']
+            elif tipo == 'reassociar':
+                def troca(sid):
+                    return op['para'] if sid == op['de'] else sid
+                for j in estado['jogadores']:
+                    j['sid'] = troca(j['sid'])
+                for rota in estado['tabuleiro']['rotas']:
+                    rota['dono_id'] = troca(rota['dono_id'])
+                estado['jogador_da_vez_sid'] = troca(estado['jogador_da_vez_sid'])
+                for v in estado['vencedor'] or []:
+                    v['sid'] = troca(v['sid'])
+            elif tipo == 'conexao':
+                for j in estado['jogadores']:
+                    if j['sid'] == op['sid']:
+                        j['conectado'] = op['conectado']
+
+
+def _contagem(cartas):
+    mao = {}
+    for carta in cartas:
+        mao[carta['cor']] = mao.get(carta['cor'], 0) + 1
+    return mao
+
+
+def diferencas(cliente: Cliente, jogo) -> list[str]:
+    esperado = json.loads(json.dumps(jogo.estado_publico()))
+    estado = json.loads(json.dumps(cliente.estado))
+    erros = []
+    eu = next((j for j in estado['jogadores'] if j['sid'] == cliente.sid), None)
+    if eu is not None:
+        mao = {c: n for c, n in eu.pop('mao', {}).items() if n}
+        real = {c.value: n for c, n in jogo.jogadores[cliente.sid].cartas_vagao.items()}
+        if mao != real:
+            erros.append(f"mão {mao} != {real}")
+        if eu.pop('rotas_jogaveis', None) != jogo.rotas_jogaveis(jogo.jogadores[cliente.sid]):
+            erros.append("rotas jogáveis")
+        for campo in ('bilhetes', 'oferta_bilhetes'):
+            eu.pop(campo, None)
+        for campo in [k for k in eu if k not in next(j for j in esperado['jogadores'] if j['sid'] == eu['sid'])]:
+            eu.pop(campo)
+    for campo in esperado:
+        if estado.get(campo) != esperado[campo]:
+            erros.append(campo)
+    return erros
+
+
+def rodar(tick_ms: int, intervalo_ms: int, lento_ms: int, fila_max: int, espectadores: int, semente: int):
+    agendador = AgendadorEnvios(tick=tick_ms / 1000, fila_max=fila_max)
+    clientes: dict[str, Cliente] = {}
+    acoes = simular(4, seed=semente, espectadores=espectadores)
+    jogo, sids, _ = next(acoes)  # estado inicial: cada cliente começa com o estado completo
+    for sid in sids + [f"esp{i}" for i in range(espectadores)]:
+        clientes[sid] = Cliente(sid, lento_ms if sid == "esp0" else 0)
+        agendador.entrar(sid, SALA)
+        for evento, dados, _ in mensagem_estado(jogo, sid):
+            clientes[sid].receber(evento, dados)
+
+    def entregar(envios):
+        for evento, dados, destino, pular in envios:
+            alvos = [s for s in clientes if s not in (pular or ())] if destino == SALA else [destino]
+            for sid in alvos:
+                if sid in clientes:  # o resto (resumo das salas, controle) não vai para a página
+                    clientes[sid].receber(evento, dados)
+
+    ms = 0
+    fim = None
+    while fim is None or ms < fim:
+        ms += 1
+        if fim is None and ms % intervalo_ms == 0:
+            try:
+                jogo, _, saidas = next(acoes)
+                entregar(agendador.receber(saidas))
+            except StopIteration:
+                # Tempo para o cliente lento alcançar o resto
+                fim = ms + 2 * CONFIRMAR_MS + lento_ms * (len(clientes["esp0"].fila) + 4)
+        if agendador.tick > 0 and ms % tick_ms == 0:
+            entregar(agendador.drenar())
+        lento = clientes["esp0"]
+        if lento.fila and ms % lento_ms == 0:
+            lento.aplicar_uma()
+        for cliente in clientes.values():
+            if cliente.confirmar_agora or (ms % CONFIRMAR_MS == 0 and cliente.estado):
+                cliente.confirmar_agora, cliente.sem_confirmar = False, 0
+                if agendador.confirmar(cliente.sid, cliente.estado['versao']):
+                    # O servidor repassa 'pedir_snapshot' para quem alcançou
+                    entregar(agendador.receber(mensagem_estado(jogo, cliente.sid)))
+    entregar(agendador.drenar())
+    while clientes["esp0"].fila:
+        clientes["esp0"].aplicar_uma()
+    erros = {sid: d for sid, c in clientes.items() if (d := diferencas(c, jogo))}
+    return agendador.estatisticas(), clientes, erros
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Agendador de envios: junção por tick e contrapressão")
+    ap.add_argument("--ticks-ms", default="0,20,50")
+    ap.add_argument("--intervalo-ms", type=int, default=5, help="tempo entre ações na sala")
+    ap.add_argument("--lento-ms", type=int, default=100, help="tempo do cliente lento por mensagem")
+    ap.add_argument("--espectadores", type=int, default=3)
+    ap.add_argument("--semente", type=int, default=7)
+    args = ap.parse_args()
+    print(f"{'tick':>6} | {'contrapressão':<13} | {'patches':>7} | {'enviadas':>8} | {'razão':>5} | "
+          f"{'KB/jogador':>10} | {'fila lento':>10} | {'recuperações':>12} | estado")
+    falhou = False
+    for tick in (int(t) for t in args.ticks_ms.split(",")):
+        for contrapressao in (False, True):
+            fila_max = FILA_MAX if contrapressao else 10 ** 9
+            stats, clientes, erros = rodar(tick, args.intervalo_ms, args.lento_ms, fila_max, args.espectadores,
+                                           args.semente)
+            kb = sum(clientes[f"sid{i}"].bytes for i in range(4)) / 4 / 1024
+            fila = clientes["esp0"].fila_max
+            estourou = contrapressao and fila > FILA_MAX + 4
+            falhou |= bool(erros) or estourou
+            print(f"{tick:>4}ms | {'sim' if contrapressao else 'não':<13} | {stats['patches_recebidos']:>7} | "
+                  f"{stats['atualizacoes_enviadas']:>8} | {stats['razao_juncao']:>5.1f} | {kb:>10.1f} | "
+                  f"{fila:>10}{'!' if estourou else ' '}| {stats['recuperacoes']:>12} | "
+                  f"{'ok' if not erros else erros}")
+    print(f"\nclientes terminam com o estado do servidor e a fila do lento fica perto de {FILA_MAX}: "
+          f"{'FALHOU' if falhou else 'ok'}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
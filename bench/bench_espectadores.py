@@ -0,0 +1,90 @@
+# Benchmark: custo por ação de uma mesa com muitos espectadores (web-flask).
+#
+# Joga partidas pelos eventos do servidor com N espectadores na sala e entrega
+# as saídas por um transporte que imita o Socket.IO: cada mensagem é codificada
+# uma vez e o pacote pronto vai para cada membro do destino (sid ou sala).
+# "um envio por sid" reproduz o envio anterior, em que todo destinatário
+# recebia a sua própria mensagem (e a codificação dela). Sai com código 1 se,
+# no envio para a sala, as codificações por ação crescerem com os espectadores.
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_espectadores.py [--espectadores 0,10,100,500] [--partidas 5]
+import argparse, json, os, sys, time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.join(AQUI, "..", "web-flask"))
+from bench_sync_bytes import simular
+
+
+class Transporte:
+    """Salas e filas de saída por cliente, como no servidor Socket.IO."""
+
+    def __init__(self, membros: dict[str, list[str]]):
+        self.membros = membros  # sala -> sids
+        self.filas: dict[str, list] = {}
+        self.codificacoes = 0
+
+    def _codificar(self, evento, dados) -> bytes:
+        # Tupla = vários argumentos; bytes vão como anexo binário, o resto como JSON
+        self.codificacoes += 1
+        args = list(dados) if isinstance(dados, tuple) else [dados]
+        anexos = [a for a in args if isinstance(a, bytes)]
+        texto = [{'_placeholder': True} if isinstance(a, bytes) else a for a in args]
+        return json.dumps([evento, *texto]).encode() + b''.join(anexos)
+
+    def emit(self, evento, dados, destino):
+        pacote = self._codificar(evento, dados)
+        for sid in self.membros.get(destino, [destino]):
+            self.filas.setdefault(sid, []).append(pacote)
+
+    def emit_por_sid(self, evento, dados, destino):
+        for sid in self.membros.get(destino, [destino]):
+            self.filas.setdefault(sid, []).append(self._codificar(evento, dados))
+
+
+def medir(espectadores: int, partidas: int, por_sala: bool) -> tuple[float, float, float]:
+    tempo = codificacoes = entregas = 0.0
+    acoes = 0
+    for semente in range(partidas):
+        for jogo, sids, saidas in simular(4, seed=semente, espectadores=espectadores):
+            membros = {'bench': sids + [f"esp{i}" for i in range(espectadores)]}
+            transporte = Transporte(membros)
+            t0 = time.perf_counter()
+            if por_sala:
+                for evento, dados, destino in saidas:
+                    transporte.emit(evento, dados, destino)
+            else:
+                # Envio antigo: para cada membro da sala, estado público + a parte privada dele
+                publico = next(d for e, d, destino in saidas if e == 'game_patch')
+                privadas = {destino: d for e, d, destino in saidas if e == 'patch_privado'}
+                for sid in membros['bench']:
+                    transporte.emit_por_sid('game_patch', (publico, privadas.get(sid, {}).get('ops', [])), sid)
+            tempo += time.perf_counter() - t0
+            codificacoes += transporte.codificacoes
+            entregas += sum(len(f) for f in transporte.filas.values())
+            acoes += 1
+    return tempo / acoes, codificacoes / acoes, entregas / acoes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Custo por ação com espectadores na mesa")
+    ap.add_argument("--espectadores", default="0,10,100,500")
+    ap.add_argument("--partidas", type=int, default=5)
+    args = ap.parse_args()
+    niveis = [int(n) for n in args.espectadores.split(",")]
+    print(f"{'espectadores':>12} | {'modo':<16} | {'us/ação':>8} | {'codificações':>12} | {'entregas':>8}")
+    codificacoes_sala = []
+    for n in niveis:
+        for nome, por_sala in (("um envio por sid", False), ("envio para sala", True)):
+            dt, cod, ent = medir(n, args.partidas, por_sala)
+            if por_sala:
+                codificacoes_sala.append(cod)
+            print(f"{n:>12} | {nome:<16} | {dt * 1e6:>8.1f} | {cod:>12.1f} | {ent:>8.1f}")
+    # Com envio para a sala, a codificação depende só dos jogadores
+    ok = max(codificacoes_sala) - min(codificacoes_sala) < 1e-9
+    print(f"\ncodificações independentes dos espectadores: {'ok' if ok else 'FALHOU'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Benchmark: restaurar um jogo da CLI com 10k eventos a partir do log.
+# Uso: python bench/bench_journal_replay.py [eventos]
+import json, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+from t2r_cli import DRAW_DECK, DRAW_FACE, PASS, Game
+
+
+def draw_only(g, rng):
+    # Nunca reivindica: o mapa pequeno acabaria em poucas dezenas de ações
+    options = [(DRAW_FACE, i) for i in range(len(g.deck.market))]
+    if len(g.deck.cards) or len(g.deck.discard):
+        options.append((DRAW_DECK,))
+    return rng.choice(options) if options and rng.random() < 0.9 else (PASS,)
+
+
+def main(n_events=10_000):
+    tmp = tempfile.mkdtemp()
+    snap, log = os.path.join(tmp, "game.json"), os.path.join(tmp, "game.jsonl")
+    g = Game(["A", "B", "C"], seed=1, log=None)
+    g.save(snap, log)
+    rng = random.Random(1)
+    while g.journal.seq < n_events:
+        if g.finished:
+            break
+        ok, _ = g.step(draw_only(g, rng))
+        if not ok:
+            g.step((PASS,))
+    g.journal.close()
+    print(f"{g.journal.seq} eventos gravados ({os.path.getsize(log) / 1024:.0f} KiB de log)")
+
+    t0 = time.perf_counter()
+    restored = Game.load(snap, log, log=None)
+    elapsed = time.perf_counter() - t0
+    assert restored.to_state() == g.to_state(), "estado restaurado difere do original"
+    restored.journal.close()
+    print(f"restaurar (snapshot + eventos depois dele): {elapsed * 1000:.2f} ms")
+
+    # Comparação: reaplicar o log inteiro a partir do início
+    t0 = time.perf_counter()
+    full = Game(["A", "B", "C"], seed=1, log=None)
+    with open(log, "rb") as f:
+        for line in f:
+            full._apply(tuple(json.loads(line)[1]))
+    print(f"reaplicar todos os eventos:                 {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,256 @@
+# Teste de carga do servidor web com clientes Socket.IO simulados.
+#
+# Sobe o servidor localmente (app.py ou servidor_async.py) numa porta livre e
+# vai aumentando o número de clientes por etapas. Os clientes entram em salas
+# de `--grupo` jogadores (entrar_no_jogo), o primeiro inicia a partida, todos
+# escolhem os bilhetes iniciais e, na sua vez, reivindicam uma rota jogável
+# ou compram cartas do monte. Quando a partida acaba o grupo vai para uma sala
+# nova. Por etapa mostra as latências p50/p95/p99 entre a ação e a próxima
+# atualização de estado recebida (game_patch ou game_state_update), as
+# mensagens por segundo e a memória residente (RSS) do servidor e dos shards.
+#
+# Tudo local e offline; precisa de `pip install "python-socketio[asyncio_client]"`.
+# Uso: python bench/bench_load_web.py --etapas 100,250,500,1000 [--servidor async] [--shards 4]
+import argparse, asyncio, json, os, random, socket, subprocess, sys, time
+
+import socketio
+
+WEB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web-flask")
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_servidor(tipo: str, porta: int, shards: int) -> subprocess.Popen:
+    script = "servidor_async.py" if tipo == "async" else "app.py"
+    cmd = [sys.executable, script, "--host", "127.0.0.1", "--porta", str(porta), "--dados", ""]
+    if shards and tipo != "async":
+        cmd += ["--shards", str(shards)]
+    processo = subprocess.Popen(cmd, cwd=WEB, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"o servidor terminou na subida (código {processo.returncode})")
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.2).close()
+            return processo
+        except OSError:
+            time.sleep(0.1)
+    processo.kill()
+    raise RuntimeError("o servidor não abriu a porta a tempo")
+
+
+def rss_mb(pid: int) -> float:
+    """RSS do processo e dos seus filhos (shards), lido do /proc."""
+    total, pendentes = 0, [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with open(f"/proc/{atual}/status") as f:
+                total += next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+            for tarefa in os.listdir(f"/proc/{atual}/task"):
+                with open(f"/proc/{atual}/task/{tarefa}/children") as f:
+                    pendentes += [int(p) for p in f.read().split()]
+        except (FileNotFoundError, StopIteration):
+            continue
+    return total / 1024
+
+
+class Metricas:
+    def __init__(self):
+        self.zerar()
+
+    def zerar(self):
+        self.latencias: list[float] = []
+        self.mensagens = 0
+        self.acoes = 0
+        self.erros = 0
+        self.inicio = time.perf_counter()
+
+    def percentil(self, p: float) -> float:
+        if not self.latencias:
+            return float("nan")
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+
+class Cliente:
+    """Um jogador simulado: guarda só o que precisa para jogar lances válidos."""
+
+    def __init__(self, url: str, nome: str, grupo: str, tamanho: int, metricas: Metricas,
+                 pausa: float, rng: random.Random):
+        self.url, self.nome, self.grupo, self.tamanho = url, nome, grupo, tamanho
+        self.metricas, self.pausa, self.rng = metricas, pausa, rng
+        self.rodada = 0
+        self.recusada = False  # última compra recusada (monte e mercado vazios)
+        self.estado: dict | None = None
+        self.enviada: float | None = None  # instante da ação ainda sem resposta
+        self.privado: dict | None = None  # parte privada que chega antes da pública da mesma versão
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on("game_state_update", self._estado)
+        self.sio.on("game_patch", self._patch)
+        self.sio.on("estado_privado", self._privado)
+        self.sio.on("patch_privado", self._privado)
+        self.sio.on("erro_acao", self._erro)
+        self.sio.on("*", self._outra)
+
+    @property
+    def sala(self) -> str:
+        return f"{self.grupo}-{self.rodada}"
+
+    async def conectar(self):
+        await self.sio.connect(self.url, transports=["websocket"])
+        await self.sio.emit("entrar_no_jogo", {"nome": self.nome, "sala_id": self.sala})
+
+    async def fechar(self):
+        await self.sio.disconnect()
+
+    async def _outra(self, evento, *args):
+        self.metricas.mensagens += 1
+
+    def _respondido(self):
+        self.metricas.mensagens += 1
+        if self.enviada is not None:
+            self.metricas.latencias.append(time.perf_counter() - self.enviada)
+            self.enviada = None
+
+    async def _privado(self, dados):
+        self.metricas.mensagens += 1
+        self.privado = dados
+
+    def _tomar_privado(self, versao: int) -> dict:
+        privado, self.privado = self.privado, None
+        return privado if privado and privado["versao"] == versao else {}
+
+    async def _estado(self, publico):
+        self._respondido()
+        self.recusada = False
+        self.estado = json.loads(publico)
+        self.estado.update(self._tomar_privado(self.estado["versao"]))
+        await self._agir()
+
+    async def _patch(self, publico):
+        self._respondido()
+        patch = json.loads(publico)
+        privadas = self._tomar_privado(patch["versao"]).get("ops", [])
+        if self.estado is None or patch["base"] != self.estado["versao"]:
+            await self.sio.emit("pedir_snapshot")
+            return
+        for op in patch["ops"] + privadas:
+            tipo = op["op"]
+            if tipo == "turno":
+                self.estado["jogador_da_vez_sid"] = op["jogador_da_vez_sid"]
+                self.estado["acao_do_turno"] = op["acao_do_turno"]
+            elif tipo == "fim":
+                self.estado["estado"] = op["estado"]
+            elif tipo == "jogaveis":
+                self.estado["rotas_jogaveis"] = op["rotas"]
+            elif tipo == "bilhetes":
+                self.estado["oferta_bilhetes"] = op["oferta"]
+            elif tipo == "rota":
+                self.estado["tabuleiro"]["rotas"][op["i"]]["dono_id"] = op["dono_id"]
+        self.estado["versao"] = patch["versao"]
+        await self._agir()
+
+    async def _erro(self, dados):
+        self.metricas.erros += 1
+        self._respondido()
+        self.recusada = True
+        await self._agir()
+
+    async def _emitir(self, evento: str, dados: dict | None = None):
+        if self.pausa:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.pausa))
+        self.enviada = time.perf_counter()
+        self.metricas.acoes += 1
+        await self.sio.emit(evento, dados or {})
+
+    async def _agir(self):
+        e = self.estado
+        if self.enviada is not None or e is None:
+            return
+        eu = self.sio.get_sid()
+        if e["estado"] == "FINALIZADO":
+            # Partida acabou: o grupo recomeça numa sala nova
+            self.rodada += 1
+            self.estado = None
+            await self.sio.emit("entrar_no_jogo", {"nome": self.nome, "sala_id": self.sala})
+        elif e["estado"] == "AGUARDANDO_JOGADORES":
+            # Quem entrou primeiro inicia quando a sala enche
+            if len(e["jogadores"]) >= self.tamanho and e["jogadores"][0]["sid"] == eu:
+                await self._emitir("iniciar_jogo")
+        elif e.get("oferta_bilhetes"):
+            oferta = e["oferta_bilhetes"]
+            await self._emitir("escolher_bilhetes", {"manter": list(range(len(oferta["bilhetes"])))})
+        elif e["jogador_da_vez_sid"] == eu:
+            jogaveis = e.get("rotas_jogaveis") or []
+            if e["acao_do_turno"]["tipo"] is None and jogaveis:
+                jogada = self.rng.choice(jogaveis)
+                rota = e["tabuleiro"]["rotas"][jogada["i"]]
+                await self._emitir("reivindicar_rota", {
+                    "rota": {"cidadeA": rota["cidadeA"], "cidadeB": rota["cidadeB"]},
+                    "cartas": self.rng.choice(jogada["pagamentos"])})
+            elif self.recusada and e["acao_do_turno"]["tipo"] is None:
+                self.recusada = False
+                await self._emitir("comprar_bilhetes")
+            elif not self.recusada:
+                await self._emitir("comprar_carta", {"index": -1})
+
+
+async def rodar(args):
+    porta = porta_livre()
+    url = f"http://127.0.0.1:{porta}"
+    servidor = subir_servidor(args.servidor, porta, args.shards)
+    metricas = Metricas()
+    rng = random.Random(args.semente)
+    clientes: list[Cliente] = []
+    print(f"servidor {args.servidor} (pid {servidor.pid}, porta {porta}), salas de {args.grupo}, "
+          f"pausa média {args.pausa * 1e3:.0f} ms, {args.duracao:.0f}s por etapa")
+    print(f"{'clientes':>8} | {'ações/s':>8} | {'msgs/s':>8} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | "
+          f"{'p99 (ms)':>8} | {'erros':>5} | {'RSS (MB)':>8}")
+    try:
+        for alvo in args.etapas:
+            novos = []
+            while len(clientes) + len(novos) < alvo:
+                i = len(clientes) + len(novos)
+                novos.append(Cliente(url, f"c{i}", f"g{i // args.grupo}", args.grupo,
+                                     metricas, args.pausa, random.Random(rng.getrandbits(32))))
+            # Conecta em lotes para não estourar o backlog de accept
+            for k in range(0, len(novos), 100):
+                await asyncio.gather(*(c.conectar() for c in novos[k:k + 100]))
+            clientes += novos
+            await asyncio.sleep(1)  # aquecimento: entradas e inícios de partida
+            metricas.zerar()
+            await asyncio.sleep(args.duracao)
+            dt = time.perf_counter() - metricas.inicio
+            print(f"{len(clientes):>8} | {metricas.acoes / dt:>8.0f} | {metricas.mensagens / dt:>8.0f} | "
+                  f"{metricas.percentil(0.50) * 1e3:>8.1f} | {metricas.percentil(0.95) * 1e3:>8.1f} | "
+                  f"{metricas.percentil(0.99) * 1e3:>8.1f} | {metricas.erros:>5} | {rss_mb(servidor.pid):>8.1f}",
+                  flush=True)
+    finally:
+        await asyncio.gather(*(c.fechar() for c in clientes), return_exceptions=True)
+        servidor.terminate()
+        try:
+            servidor.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            servidor.kill()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Teste de carga com clientes Socket.IO simulados")
+    ap.add_argument("--etapas", default="100,250,500,1000",
+                    type=lambda s: [int(x) for x in s.split(",")], help="total de clientes em cada etapa")
+    ap.add_argument("--servidor", choices=["flask", "async"], default="flask")
+    ap.add_argument("--shards", type=int, default=0, help="só para o servidor flask")
+    ap.add_argument("--grupo", type=int, default=4, help="jogadores por sala")
+    ap.add_argument("--duracao", type=float, default=10.0, help="segundos medidos por etapa")
+    ap.add_argument("--pausa", type=float, default=0.05, help="tempo médio de reação dos clientes (s)")
+    ap.add_argument("--semente", type=int, default=0)
+    asyncio.run(rodar(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Benchmark: maior caminho contínuo (exato) em subgrafos densos e adversariais,
+# e o custo do modo ao vivo (TrailTracker) rota a rota, com o orçamento por
+# rota, e do fim de jogo, em redes adversariais e em redes do tamanho que
+# o jogo permite (45 vagões). Sai com código 1 se o resultado final do modo
+# ao vivo diferir do solver sem orçamento.
+# Uso: python bench/bench_longest_path.py
+import itertools, math, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from t2r_core import TrailTracker, longest_trail
+from t2r_core.longest import LIVE_BUDGET
+
+
+def complete(n: int):
+    # Todos os vértices com grau ímpar (n par): o pior caso para a poda por grau
+    return [(a, b, 1 + (a * 7 + b) % 5) for a, b in itertools.combinations(range(n), 2)]
+
+
+def grid(w: int, h: int):
+    # Grade: muitos ciclos curtos e ímpares espalhados pela borda
+    edges = []
+    for x in range(w):
+        for y in range(h):
+            if x + 1 < w:
+                edges.append(((x, y), (x + 1, y), 1 + (x + y) % 4))
+            if y + 1 < h:
+                edges.append(((x, y), (x, y + 1), 1 + (x * y) % 4))
+    return edges
+
+
+def planar_network(rnd: random.Random, routes: int, cities: int = 40, k: int = 4):
+    # Mapa plano (k vizinhos mais próximos) e uma rede de `routes` rotas que
+    # cresce quase sempre grudada no que o jogador já tem
+    pts = [(rnd.random(), rnd.random()) for _ in range(cities)]
+    pairs = set()
+    for i, p in enumerate(pts):
+        for j in sorted(range(cities), key=lambda j: math.dist(p, pts[j]))[1:k + 1]:
+            pairs.add((min(i, j), max(i, j)))
+    board = [(a, b, rnd.randint(1, 6)) for a, b in sorted(pairs)]
+    owned = [board.pop(rnd.randrange(len(board)))]
+    reached = {owned[0][0], owned[0][1]}
+    while len(owned) < routes and board:
+        touching = [i for i, (a, b, _) in enumerate(board) if a in reached or b in reached]
+        i = rnd.choice(touching) if touching and rnd.random() < 0.85 else rnd.randrange(len(board))
+        a, b, length = board.pop(i)
+        owned.append((a, b, length))
+        reached |= {a, b}
+    return owned
+
+
+def timed(edges):
+    t0 = time.perf_counter()
+    best = longest_trail(edges)
+    return best, time.perf_counter() - t0
+
+
+def main():
+    print(f"{'grafo':<14} | {'rotas':>5} | {'maior':>5} | {'tempo (ms)':>10}")
+    for name, edges in [("K8", complete(8)), ("K10", complete(10)), ("K12", complete(12)),
+                        ("grade 4x4", grid(4, 4)), ("grade 5x4", grid(5, 4)), ("grade 5x5", grid(5, 5))]:
+        best, dt = timed(edges)
+        print(f"{name:<14} | {len(edges):>5} | {best:>5} | {dt * 1e3:>10.1f}")
+
+    print()
+    print(f"{'rede plana':<14} | {'redes':>5} | {'média (ms)':>10} | {'p95 (ms)':>9} | {'pior (ms)':>9}")
+    rnd = random.Random(3)
+    for routes in (20, 30, 40, 45):
+        times = sorted(timed(planar_network(rnd, routes))[1] for _ in range(20))
+        print(f"{routes:>8} rotas | {len(times):>5} | {sum(times) / len(times) * 1e3:>10.1f} | "
+              f"{times[int(len(times) * 0.95) - 1] * 1e3:>9.1f} | {times[-1] * 1e3:>9.1f}")
+
+    errors = 0
+    for title, wagons in (("até 45 rotas (adversarial)", None), ("45 vagões, a regra do jogo", 45)):
+        print()
+        print(f"modo ao vivo: TrailTracker.add a cada rota (orçamento de {LIVE_BUDGET} passos), {title};")
+        print("no fim, length(exact=True) termina as buscas cortadas")
+        rnd = random.Random(4)
+        steps, ends = [], []
+        for _ in range(20):
+            tracker = TrailTracker()
+            network = planar_network(rnd, 45)
+            if wagons:
+                network = [e for e, used in zip(network, itertools.accumulate(e[2] for e in network))
+                           if used <= wagons]
+            for a, b, length in network:
+                t0 = time.perf_counter()
+                tracker.add(0, a, b, length)
+                steps.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            final = tracker.length(0, exact=True)
+            ends.append(time.perf_counter() - t0)
+            errors += final != longest_trail(network)
+        for name, xs in (("por rota", steps), ("fim de jogo", ends)):
+            xs.sort()
+            print(f"  {name:<11} ({len(xs):>3}): média {sum(xs) / len(xs) * 1e3:7.2f} ms, "
+                  f"p95 {xs[int(len(xs) * 0.95) - 1] * 1e3:7.2f} ms, pior {xs[-1] * 1e3:7.1f} ms")
+    print(f"  resultado final igual ao do solver sem orçamento: {'ok' if not errors else f'{errors} diferentes'}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Benchmark: custo por jogo do mapa compartilhado (MapTopology) x ler e
+# montar o mapa a cada jogo, em mapas gerados de vários tamanhos.
+# Mede o tempo de criar o tabuleiro e a memória que cada jogo a mais ocupa
+# (tracemalloc), e confere que o mapa é relido quando o arquivo muda.
+# Uso: python bench/bench_map_sharing.py
+import json, os, sys, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+from bench_route_index import generate_map
+from t2r_cli import Board
+from t2r_core import load_map
+
+N_BOARDS = 50
+
+
+def per_board(make) -> tuple:
+    make()  # aquece (e, no modo compartilhado, monta a topologia)
+    t0 = time.perf_counter()
+    for _ in range(N_BOARDS):
+        make()
+    dt = (time.perf_counter() - t0) / N_BOARDS
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = [make() for _ in range(N_BOARDS)]
+    size = (tracemalloc.get_traced_memory()[0] - before) / N_BOARDS
+    tracemalloc.stop()
+    del boards
+    return dt, size
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    print(f"{'rotas':>6} | {'modo':<14} | {'tabuleiro (ms)':>14} | {'memória/jogo (KB)':>17}")
+    for n in (100, 1_000, 10_000):
+        path = os.path.join(tmp, f"map{n}.json")
+        with open(path, "w") as f:
+            json.dump(generate_map(n), f)
+
+        def parsed():
+            # Como antes: o JSON é lido e todo o mapa montado de novo em cada jogo
+            with open(path) as f:
+                return Board(json.load(f))
+
+        for name, make in (("lido por jogo", parsed), ("compartilhado", lambda: Board(load_map(path)))):
+            dt, size = per_board(make)
+            print(f"{n:>6} | {name:<14} | {dt * 1e3:>14.3f} | {size / 1024:>17.1f}")
+
+    # Recarga: o mesmo arquivo devolve a mesma topologia até ser alterado
+    first = load_map(path)
+    assert load_map(path) is first
+    with open(path, "w") as f:
+        json.dump(generate_map(50, seed=1), f)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1))
+    reloaded = load_map(path)
+    assert reloaded is not first and len(reloaded.routes) == 50
+    print("\nrecarga pelo mtime: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Memória por jogo vivo (tracemalloc), com orçamento por motor.
+#
+# Cria muitos jogos, joga cada um até o meio (CLI com a política gulosa; web
+# pelos eventos do servidor, com os patches fechados e enviados como ao vivo)
+# e mede quanto cada jogo a mais ocupa. O mapa compartilhado e as tabelas
+# montadas uma vez por mapa não entram na conta (o primeiro jogo os cria).
+# Sai com código 1 se algum motor passar do orçamento.
+# Uso: python bench/bench_memory.py [--jogos 300]
+import argparse, gc, os, random, sys, tempfile, tracemalloc
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(AQUI, ".."))
+sys.path.insert(0, os.path.join(AQUI, "..", "cli"))
+sys.path.insert(0, os.path.join(AQUI, "..", "web-flask"))
+from compact import CompactGame
+from policies import greedy_policy
+from t2r_cli import Game
+
+import app
+from salas import GerenciadorSalas
+
+# Bytes por jogo vivo
+ORCAMENTO = {"cli": 24 * 1024, "compacto": 8 * 1024, "web": 48 * 1024}
+
+
+def jogo_cli(semente: int, acoes: int = 40) -> Game:
+    g = Game(["a", "b", "c", "d"], seed=semente, log=None)
+    rng = random.Random(semente)
+    for _ in range(acoes):
+        ok, _ = g.step(greedy_policy(g, rng))
+        if not ok:
+            g.step(("pass",))
+    return g
+
+
+def jogo_compacto(semente: int) -> CompactGame:
+    return CompactGame.from_game(jogo_cli(semente))
+
+
+class JogosWeb:
+    """Salas do servidor web, cada uma com quatro jogadores comprando cartas."""
+
+    def __init__(self):
+        self.salas = GerenciadorSalas(app.Jogo, tempfile.mkdtemp())
+
+    def novo(self, semente: int, acoes: int = 40):
+        sids = [f"{semente}-{i}" for i in range(4)]
+        for sid in sids:
+            app.processar_evento(self.salas, 'entrar_no_jogo', sid, {'sala_id': f"s{semente}", 'nome': sid})
+        app.processar_evento(self.salas, 'iniciar_jogo', sids[0], {})
+        for sid in sids:
+            app.processar_evento(self.salas, 'escolher_bilhetes', sid, {'manter': [0, 1]})
+        jogo = self.salas.get(f"s{semente}").jogo
+        for _ in range(acoes):
+            app.processar_evento(self.salas, 'comprar_carta', jogo.get_jogador_da_vez().sid, {'index': -1})
+        return jogo
+
+
+def bytes_por_jogo(criar, n: int) -> float:
+    criar(-1)  # monta o que é compartilhado (mapa, tabelas) fora da medição
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    vivos = [criar(i) for i in range(n)]
+    gc.collect()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del vivos
+    return (depois - antes) / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Memória por jogo vivo, com orçamento")
+    ap.add_argument("--jogos", type=int, default=300)
+    args = ap.parse_args()
+    web = JogosWeb()
+    # O servidor guarda as salas no gerenciador; a medição inclui a sala e os índices por sid
+    medidas = [("cli", jogo_cli), ("compacto", jogo_compacto), ("web", web.novo)]
+    print(f"{'motor':<9} | {'KB/jogo':>8} | {'orçamento':>9} | ok")
+    falhou = False
+    for nome, criar in medidas:
+        tamanho = bytes_por_jogo(criar, args.jogos)
+        ok = tamanho <= ORCAMENTO[nome]
+        falhou |= not ok
+        print(f"{nome:<9} | {tamanho / 1024:>8.1f} | {ORCAMENTO[nome] / 1024:>9.1f} | {'ok' if ok else 'ESTOUROU'}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Benchmark: chances de compra por rota (t2r_core.DrawOdds), NumPy x Python puro.
+#
+# Pega estados de partidas da CLI (política gulosa) e calcula a tabela de
+# chances de cada jogador: todas as cores e comprimentos em até 1..2 turnos de
+# compra. Compara os sorteios vetorizados com NumPy ao mesmo Monte Carlo em
+# laços de Python e confere as rotas de cor com a conta exata
+# (hipergeométrica), quando o monte não acaba no meio. Sai com código 1 se o
+# erro passar de 5 desvios-padrão do Monte Carlo.
+# Uso: python bench/bench_odds.py [--amostras 1024,4096,16384] [--estados 40]
+import argparse, math, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+import t2r_core.odds as odds_mod
+from t2r_core import DrawOdds
+from t2r_cli import ODDS_TURNS, TRAIN_COLORS, Game
+from policies import greedy_policy
+
+
+def estados(n: int):
+    # Jogos em vários momentos da partida, do ponto de vista do jogador da vez
+    out = []
+    seed = 0
+    while len(out) < n:
+        g = Game(["A", "B", "C"], seed=seed, log=None)
+        rng = random.Random(seed)
+        while not g.finished and len(out) < n:
+            ok, _ = g.step(greedy_policy(g, rng))
+            if not ok:
+                g.step(("pass",))
+            if g.drawn == 0 and not g.setup and g.turns % 6 == 0:
+                out.append(entradas(g, g.turn))
+        seed += 1
+    return out
+
+
+def entradas(g: Game, i: int):
+    # Mesmas contagens que Game.draw_odds passa para DrawOdds.table
+    engine = g.deck.engine
+    unseen = engine.count_by_color()
+    for j, q in enumerate(g.players):
+        if j != i:
+            for color, n in q.hand.items():
+                unseen[color] = unseen.get(color, 0) + n
+    p = g.players[i]
+    return (p.hand, unseen, len(engine.cards), engine.count_by_color(discard=True), g.deck.market.colors(), p.wagons)
+
+
+def medir(amostras: int, lista, python: bool):
+    odds = DrawOdds(TRAIN_COLORS, "LOCOMOTIVE", "GRAY", turns=ODDS_TURNS, samples=amostras, seed=1)
+    guardado = odds_mod.np
+    if python:
+        odds_mod.np = None  # força o caminho sem NumPy
+    try:
+        tempos, tabelas = [], []
+        for args in lista:
+            odds._cache.clear()
+            t0 = time.perf_counter()
+            tabelas.append(odds.table(*args))
+            tempos.append(time.perf_counter() - t0)
+    finally:
+        odds_mod.np = guardado
+    return sorted(tempos)[len(tempos) // 2], tabelas
+
+
+def exata(args, color: str, length: int, k: int):
+    # P(cartas da cor + locomotivas >= comprimento) sem reembaralhar o descarte
+    hand, unseen, _, _, face_up, _ = args
+    taken = min(face_up.count(color), 2 * k)
+    need = length - hand.count(color) - hand.count("LOCOMOTIVE") - taken
+    n = 2 * k - taken
+    total = sum(unseen.values())
+    good = unseen.get(color, 0) + unseen.get("LOCOMOTIVE", 0)
+    return sum(math.comb(good, x) * math.comb(total - good, n - x)
+               for x in range(max(need, 0), n + 1)) / math.comb(total, n)
+
+
+def erro_maximo(lista, tabelas) -> float:
+    pior = 0.0
+    for args, tabela in zip(lista, tabelas):
+        if args[2] < 2 * ODDS_TURNS:
+            continue  # o monte acaba no meio: a conta exata não vale
+        for (color, length), chances in tabela.items():
+            if color == "GRAY" or length > args[5]:
+                continue
+            for k, p in enumerate(chances, 1):
+                pior = max(pior, abs(p - exata(args, color, length, k)))
+    return pior
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Chances de compra por rota: NumPy x Python puro")
+    ap.add_argument("--amostras", default="1024,4096,16384")
+    ap.add_argument("--estados", type=int, default=40)
+    args = ap.parse_args()
+    if odds_mod.np is None:
+        print("NumPy não está instalado: só o cálculo em Python puro está disponível.")
+        sys.exit(1)
+    lista = estados(args.estados)
+    print(f"{'amostras':>8} | {'NumPy':>9} | {'Python':>9} | {'ganho':>6} | {'erro máx':>8} | {'limite':>6}")
+    falhou = False
+    for n in (int(a) for a in args.amostras.split(",")):
+        t_np, tabelas = medir(n, lista, python=False)
+        t_py, _ = medir(n, lista, python=True)
+        erro = erro_maximo(lista, tabelas)
+        limite = 5 * math.sqrt(0.25 / n)
+        falhou |= erro > limite
+        print(f"{n:>8} | {t_np * 1e3:>7.2f}ms | {t_py * 1e3:>7.1f}ms | {t_py / t_np:>5.0f}x | {erro:>8.4f} | {limite:>6.4f}")
+    print(f"\n{len(lista)} estados, até {ODDS_TURNS} turnos de compra; tempos são a mediana por tabela")
+    print(f"erro contra a conta exata: {'FALHOU' if falhou else 'ok'}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Benchmark: planejador de rotas (t2r_core.RoutePlanner) em mapas gerados.
+#
+# Quatro jogadores com mãos sorteadas consultam pares de cidades enquanto um
+# adversário reivindica rotas. Mede a consulta sem cache (frio) e com cache
+# (repetida) e confere cada resposta com um planejador sem cache: uma rota
+# reivindicada só pode invalidar os planos cujas buscas passaram por ela,
+# inclusive o caminho mais barato que não coube nos vagões. Sai com código
+# 1 se algum plano divergir ou se o p99 frio passar do limite no maior mapa.
+# Uso: python bench/bench_planner.py [--consultas 2000] [--limite-ms 10]
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+from bench_route_index import generate_map
+from t2r_cli import TRAIN_COLORS, Board
+from t2r_core import Hand
+
+JOGADORES = 4
+
+
+def percentil(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def rodar(n_rotas: int, consultas: int, semente: int = 0):
+    board = Board(generate_map(n_rotas, seed=semente))
+    rng = random.Random(semente)
+    cidades = list(board.topology.cities)
+    maos = [Hand(rng.choice(TRAIN_COLORS) for _ in range(rng.randint(4, 30))) for _ in range(JOGADORES)]
+    # Poucos vagões em metade dos jogadores: o caminho mais barato nem sempre
+    # cabe e o plano cai no de menos vagões
+    vagoes = [45, 45, 12, 8]
+    # Pares repetidos de propósito (um jogador volta a olhar os mesmos bilhetes)
+    pares = [tuple(rng.sample(cidades, 2)) for _ in range(max(1, consultas // 10))]
+    livres = list(range(len(board.routes)))
+    rng.shuffle(livres)
+    frio, quente, divergencias = [], [], 0
+    for k in range(consultas):
+        if k % 5 == 0 and livres:
+            # Um adversário (que não consulta) reivindica uma rota qualquer
+            board.claim(board.routes[livres.pop()], JOGADORES)
+        jogador = rng.randrange(JOGADORES)
+        a, b = rng.choice(pares)
+        planner = board.planner
+        antes = planner.hits
+        t0 = time.perf_counter()
+        plano = planner.plan(jogador, maos[jogador], vagoes[jogador], a, b)
+        dt = time.perf_counter() - t0
+        (quente if planner.hits > antes else frio).append(dt)
+        # Referência: o mesmo tabuleiro sem cache
+        ref = planner.fresh()
+        ref._owner = dict(planner._owner)
+        esperado = ref.plan(jogador, maos[jogador], vagoes[jogador], a, b)
+        if (plano is None) != (esperado is None) or (plano and _custo(plano) != _custo(esperado)):
+            divergencias += 1
+    return frio, quente, divergencias
+
+
+def _custo(plano):
+    # Planos empatados podem usar rotas diferentes; compara o que importa ao jogador
+    return (sum(plano.missing.values()), len(plano.to_claim), plano.wagons)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Planejador de rotas em mapas gerados")
+    ap.add_argument("--consultas", type=int, default=2000)
+    ap.add_argument("--limite-ms", type=float, default=10.0, help="p99 máximo da consulta sem cache")
+    args = ap.parse_args()
+    print(f"{'rotas':>6} | {'frio p50':>9} | {'frio p99':>9} | {'cache p50':>9} | {'acertos':>7} | divergências")
+    falhou = False
+    for n in (100, 1_000, 10_000):
+        frio, quente, div = rodar(n, args.consultas)
+        taxa = len(quente) / (len(frio) + len(quente))
+        p99 = percentil(frio, 0.99) * 1e3
+        print(f"{n:>6} | {percentil(frio, 0.5) * 1e3:>7.2f}ms | {p99:>7.2f}ms | "
+              f"{(percentil(quente, 0.5) * 1e3 if quente else float('nan')):>7.3f}ms | {taxa:>7.0%} | {div}")
+        falhou |= div > 0
+    falhou |= p99 > args.limite_ms
+    print(f"\np99 frio no maior mapa: {p99:.2f} ms (limite {args.limite_ms:.0f} ms): {'ESTOUROU' if p99 > args.limite_ms else 'ok'}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
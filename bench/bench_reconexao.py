@@ -0,0 +1,127 @@
+# Benchmark: tempestade de reconexões (web-flask), patches x estado completo.
+#
+# Abre --salas mesas de 4 jogadores, joga --acoes ações em cada uma e então
+# derruba todas as conexões de uma vez, como um proxy reiniciando. Cada
+# jogador volta com outra conexão pelo token da sessão ('retomar'), em ordem
+# aleatória entre as salas, mandando a última versão que aplicou ("patches")
+# ou nenhuma ("estado", como uma página recarregada). Mostra o tempo por
+# retomada, os bytes enviados e quantas vezes o estado público de um jogo foi
+# serializado. Sai com código 1 se algum cliente terminar com um estado
+# diferente do servidor ou se a retomada por patches serializar algum estado.
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_reconexao.py [--salas 200] [--acoes 30]
+import argparse, os, random, sys, time
+from itertools import islice
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.join(AQUI, "..", "web-flask"))
+import metricas
+from app import Jogo, mensagem_estado, processar_evento
+from bench_envios import Cliente, diferencas
+from bench_sync_bytes import simular, tamanho_mensagem
+from envios import AgendadorEnvios
+from salas import GerenciadorSalas
+
+
+def percentil(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def serializacoes(tipo: str) -> int:
+    h = metricas._histogramas.get(('t2r_serializacao_segundos', f'tipo="{tipo}"'))
+    return h.total if h else 0
+
+
+def rodar(n_salas: int, acoes: int, com_versao: bool, semente: int):
+    salas = GerenciadorSalas(lambda: Jogo(semente=semente))
+    agendador = AgendadorEnvios(tick=0)
+    clientes: dict[str, Cliente] = {}
+    membros: dict[str, set[str]] = {}
+    enviados = [0]
+
+    def entregar(saidas):
+        for evento, dados, destino, pular in agendador.receber(saidas):
+            alvos = [s for s in membros[destino] if s not in (pular or ())] if destino in membros else [destino]
+            for sid in alvos:
+                if sid in clientes:  # o resto (resumo das salas) não vai para a página
+                    clientes[sid].receber(evento, dados)
+                    enviados[0] += tamanho_mensagem(dados)
+
+    for k in range(n_salas):
+        sala_id = f"s{k}"
+        partida = simular(4, seed=semente + k, salas=salas, sala_id=sala_id)
+        jogo, sids, _ = next(partida)
+        membros[sala_id] = set(sids)
+        for sid in sids:
+            clientes[sid] = Cliente(sid)
+            agendador.entrar(sid, sala_id)
+            for evento, dados, _ in mensagem_estado(jogo, sid):
+                clientes[sid].receber(evento, dados)
+        for _, _, saidas in islice(partida, acoes):
+            entregar(saidas)
+
+    # O proxy reinicia: todas as conexões caem juntas, ninguém recebe nada até voltar
+    caidos = []
+    for sala_id, sids in membros.items():
+        for sid in sids:
+            agendador.sair(sid)
+            caidos.append((sala_id, sid))
+        sids.clear()
+    for sala_id, sid in caidos:
+        entregar(processar_evento(salas, 'disconnect', sid, {}))
+
+    random.Random(semente).shuffle(caidos)
+    antes_estado, antes_patch = serializacoes('estado'), serializacoes('patch')
+    enviados[0] = 0
+    tempos = []
+    for sala_id, sid in caidos:
+        cliente = clientes.pop(sid)
+        jogo = salas.get(sala_id).jogo
+        token = jogo.jogadores[sid].token  # a página guarda o que veio em 'sala_atual'
+        if not com_versao:
+            cliente.estado = None  # página recarregada
+        novo = cliente.sid = f"{sid}#2"
+        clientes[novo] = cliente
+        membros[sala_id].add(novo)
+        agendador.entrar(novo, sala_id)
+        versao = cliente.estado['versao'] if cliente.estado else None
+        t0 = time.perf_counter()
+        saidas = processar_evento(salas, 'retomar', novo, {'sala_id': sala_id, 'token': token, 'versao': versao})
+        tempos.append(time.perf_counter() - t0)
+        entregar(saidas)
+    entregar(agendador.drenar())
+
+    erros = {}
+    for sala_id, sids in membros.items():
+        jogo = salas.get(sala_id).jogo
+        erros.update({sid: d for sid in sids if (d := diferencas(clientes[sid], jogo))})
+    return {'tempos': tempos, 'bytes': enviados[0], 'estado': serializacoes('estado') - antes_estado,
+            'patch': serializacoes('patch') - antes_patch, 'erros': erros}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tempestade de reconexões: patches x estado completo")
+    ap.add_argument("--salas", type=int, default=200)
+    ap.add_argument("--acoes", type=int, default=30, help="ações jogadas em cada sala antes da queda")
+    ap.add_argument("--semente", type=int, default=7)
+    args = ap.parse_args()
+    metricas.ativar()  # conta as serializações
+    print(f"{'retomada':<8} | {'reconexões':>10} | {'p50':>8} | {'p99':>8} | {'KB/reconexão':>12} | "
+          f"{'estados serializados':>20} | {'patches':>7} | estado")
+    falhou = False
+    for com_versao in (True, False):
+        r = rodar(args.salas, args.acoes, com_versao, args.semente)
+        n = len(r['tempos'])
+        falhou |= bool(r['erros']) or (com_versao and r['estado'] > 0)
+        print(f"{'patches' if com_versao else 'estado':<8} | {n:>10} | {percentil(r['tempos'], 0.5) * 1e3:>6.2f}ms | "
+              f"{percentil(r['tempos'], 0.99) * 1e3:>6.2f}ms | {r['bytes'] / n / 1024:>12.1f} | {r['estado']:>20} | "
+              f"{r['patch']:>7} | {'ok' if not r['erros'] else str(len(r['erros'])) + ' diferentes'}")
+    print(f"\n{args.salas} salas x 4 jogadores; a retomada por patches não serializa nenhum estado completo e "
+          f"todos terminam com o estado do servidor: {'FALHOU' if falhou else 'ok'}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Benchmark: recuperar salas da web (web-flask) a partir dos diários.
+#
+# Joga --salas mesas de 4 jogadores com diário; em cada uma, depois de
+# --acoes ações, um jogador que já tem rotas cai e perde o assento (a graça
+# expira; as rotas continuam dele), o diário grava um snapshot e a partida
+# continua mais --acoes ações. Depois recupera todas as salas com um
+# gerenciador novo, como um servidor reiniciando, e mede o tempo. Sai com
+# código 1 se alguma rota de quem saiu ficar livre ou se alguma sala não
+# voltar ou voltar com um estado diferente do original.
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_restaurar_web.py [--salas 50] [--acoes 40]
+import argparse, os, sys, tempfile, time
+from itertools import islice
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.join(AQUI, "..", "web-flask"))
+from app import Jogo, processar_evento
+from bench_sync_bytes import simular
+from salas import GerenciadorSalas
+
+
+def _sem_versao(estado: dict) -> dict:
+    # A versão conta também os envios de estado completo, que o diário não reaplica
+    return {k: v for k, v in estado.items() if k != 'versao'}
+
+
+def jogar(salas: GerenciadorSalas, n_salas: int, acoes: int, semente: int, erros: list[str]) -> dict[str, dict]:
+    for k in range(n_salas):
+        sala_id = f"s{k}"
+        partida = simular(4, seed=semente + k, salas=salas, sala_id=sala_id)
+        jogo, sids, _ = next(partida)
+        for _ in islice(partida, acoes):
+            pass
+        # Sai quem tem mais rotas: elas continuam dele no snapshot seguinte
+        donos = [r.get_dono().sid for r in jogo.tabuleiro.rotas if r.get_dono()]
+        saiu = max(sids, key=donos.count)
+        processar_evento(salas, 'disconnect', saiu, {})
+        processar_evento(salas, 'expirar_assentos', None, {'sala_id': sala_id, 'graca': 0})
+        depois = [r.get_dono().sid for r in jogo.tabuleiro.rotas if r.get_dono()]
+        if saiu in jogo.jogadores or depois.count(saiu) != donos.count(saiu):
+            erros.append(f"{sala_id}: as rotas de quem saiu não continuaram tomadas")
+        jogo.diario.snapshot(jogo.to_state())
+        for _ in islice(partida, acoes):
+            pass
+    return {sala_id: _sem_versao(sala.jogo.to_state()) for sala_id, sala in salas.salas.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recuperação das salas da web a partir dos diários")
+    ap.add_argument("--salas", type=int, default=50)
+    ap.add_argument("--acoes", type=int, default=40, help="ações antes e depois da saída de um jogador")
+    ap.add_argument("--semente", type=int, default=7)
+    args = ap.parse_args()
+    dir_dados = tempfile.mkdtemp()
+    salas = GerenciadorSalas(lambda: Jogo(semente=args.semente), dir_dados)
+    erros = []
+    originais = jogar(salas, args.salas, args.acoes, args.semente, erros)
+    for sala in salas.salas.values():
+        sala.jogo.diario.close()
+
+    novas = GerenciadorSalas(Jogo, dir_dados)
+    t0 = time.perf_counter()
+    try:
+        novas.recuperar()
+    except Exception as erro:
+        erros.append(f"recuperar: {erro!r}")
+    elapsed = time.perf_counter() - t0
+    for sala_id, estado in originais.items():
+        sala = novas.get(sala_id)
+        if sala is None:
+            erros.append(f"{sala_id}: não voltou")
+        elif _sem_versao(sala.jogo.to_state()) != estado:
+            erros.append(f"{sala_id}: estado diferente do original")
+    print(f"{len(novas.salas)}/{len(originais)} salas recuperadas em {elapsed * 1000:.1f} ms "
+          f"({elapsed * 1000 / max(len(novas.salas), 1):.2f} ms/sala)")
+    for erro in erros[:10]:
+        print(f"  {erro}")
+    print(f"jogador com rotas saiu antes do snapshot em todas as salas, rotas dele continuam tomadas: "
+          f"{'FALHOU' if erros else 'ok'}")
+    sys.exit(1 if erros else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Benchmark: busca de rotas indexada x varredura linear em mapas gerados.
+# Uso: python bench/bench_route_index.py
+import os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+from t2r_cli import Board
+
+COLORS = ["RED", "BLUE", "GREEN", "YELLOW", "BLACK", "WHITE", "ORANGE", "PURPLE", "GRAY"]
+
+
+def generate_map(n_edges: int, seed: int = 0, double_ratio: float = 0.1):
+    rnd = random.Random(seed)
+    n_cities = max(2, n_edges // 3)
+    cities = [{"name": f"C{i}", "x": 0, "y": 0} for i in range(n_cities)]
+    routes, seen = [], set()
+    while len(routes) < n_edges:
+        a, b = rnd.sample(range(n_cities), 2)
+        key = (min(a, b), max(a, b))
+        if key in seen:
+            continue
+        seen.add(key)
+        route = {"a": f"C{a}", "b": f"C{b}", "color": rnd.choice(COLORS), "length": rnd.randint(1, 6)}
+        routes.append(route)
+        # Parte das ligações ganha uma rota paralela
+        if rnd.random() < double_ratio and len(routes) < n_edges:
+            routes.append(dict(route, color=rnd.choice(COLORS)))
+    return {"cities": cities, "routes": routes}
+
+
+def linear_find(routes, a, b):
+    for r in routes:
+        if r.owner is None and ((r.a == a and r.b == b) or (r.a == b and r.b == a)):
+            return r
+    return None
+
+
+def bench(n_edges: int, claims: int = 2000):
+    board = Board(generate_map(n_edges))
+    rnd = random.Random(1)
+    pairs = [(r.b, r.a) for r in rnd.sample(board.routes, min(claims, len(board.routes)))]
+
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        linear_find(board.routes, a, b)
+    linear = (time.perf_counter() - t0) / len(pairs)
+
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        r = board.find_route(a, b)
+        if r is not None and r.owner is None:
+            board.claim(r, 0)
+    indexed = (time.perf_counter() - t0) / len(pairs)
+    return linear, indexed
+
+
+def main():
+    print(f"{'rotas':>8} | {'linear (us)':>12} | {'índice (us)':>12}")
+    for n in (100, 1_000, 10_000):
+        linear, indexed = bench(n)
+        print(f"{n:>8} | {linear * 1e6:>12.2f} | {indexed * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Benchmark: CPU para serializar o estado a cada ação (web-flask).
+# Antes: um dict montado e codificado por destinatário. Agora: parte pública
+# codificada uma vez por versão + parte privada pequena por jogador.
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_state_encoding.py [espectadores]
+import json, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_sync_bytes import simular
+
+
+def estado_sem_cache(jogo, para_sid):
+    # Reproduz a montagem antiga de get_estado_para_frontend, sem caches
+    jogador_da_vez = jogo.get_jogador_da_vez()
+    jogadores = []
+    for j in jogo.jogadores.values():
+        d = {'sid': j.sid, 'nome': j.nome, 'cor': j.cor.value, 'pontos': j.pontos,
+             'pecas_vagao': j.pecas_vagao, 'num_cartas_vagao': len(j.cartas_vagao),
+             'num_cartas_destino': len(j.cartas_destino)}
+        if j.sid == para_sid:
+            d['cartas_vagao'] = [{'tipo': 'vagao', 'cor': cor.value} for cor in j.cartas_vagao.colors()]
+        jogadores.append(d)
+    return {
+        'estado': jogo.estado,
+        'jogadores': jogadores,
+        'tabuleiro': {'cidades': [c.nome for c in jogo.tabuleiro.cidades],
+                      'rotas': [r.to_dict() for r in jogo.tabuleiro.rotas]},
+        'cartas_visiveis': [c.to_dict() for c in jogo.cartas_visiveis],
+        'jogador_da_vez_sid': jogador_da_vez.sid if jogador_da_vez else None,
+        'acao_do_turno': jogo.acao_do_turno,
+        'vencedor': jogo.vencedor,
+    }
+
+
+def main(espectadores=100, rodadas=20):
+    antes = depois = 0.0
+    acoes = 0
+    for r in range(rodadas):
+        for jogo, sids, _ in simular(4, seed=r):
+            destinatarios = sids + [f"esp{i}" for i in range(espectadores)]
+            t0 = time.perf_counter()
+            for sid in destinatarios:
+                json.dumps(estado_sem_cache(jogo, sid))
+            t1 = time.perf_counter()
+            jogo.estado_publico_bytes()
+            for sid in sids:
+                json.dumps(jogo.estado_privado(sid))
+            t2 = time.perf_counter()
+            antes += t1 - t0
+            depois += t2 - t1
+            acoes += 1
+    print(f"4 jogadores + {espectadores} espectadores, {acoes} ações")
+    print(f"por destinatário: {antes / acoes * 1e6:>9.1f} us/ação")
+    print(f"público em cache: {depois / acoes * 1e6:>9.1f} us/ação ({antes / depois:.1f}x menos CPU)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
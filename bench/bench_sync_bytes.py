@@ -0,0 +1,82 @@
+# Benchmark: bytes por ação, estado completo x patches versionados (web-flask).
+# Requer as dependências de web-flask/requirements.txt.
+# Uso: python bench/bench_sync_bytes.py [num_jogadores]
+import json, os, random, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web-flask"))
+from app import Cor, Jogo, processar_evento
+from salas import GerenciadorSalas
+
+
+def tamanho_mensagem(dados) -> int:
+    # Parte pública já codificada (bytes) ou um dict comum
+    if isinstance(dados, bytes):
+        return len(dados)
+    return len(json.dumps(dados))
+
+
+def _tentar_rota(jogo, sid):
+    jogador = jogo.jogadores[sid]
+    for rota in jogo.tabuleiro.rotas_livres():
+        cores = [rota.cor] if rota.cor != Cor.CINZA else [c for c, _ in jogador.cartas_vagao.items() if c != Cor.LOCOMOTIVA]
+        for cor in cores:
+            pagamento = jogador.cartas_vagao.payment_for(cor, rota.comprimento, Cor.LOCOMOTIVA)
+            if pagamento:
+                return {'rota': {'cidadeA': rota.cidadeA.nome, 'cidadeB': rota.cidadeB.nome},
+                        'cartas': {c.value: n for c, n in pagamento.items()}}
+    return None
+
+
+def simular(num_jogadores=4, seed=7, max_acoes=2000, espectadores=0, salas=None, sala_id='bench'):
+    """Joga uma partida pelos eventos do servidor; gera (jogo, sids, saídas) por ação aceita.
+
+    Os espectadores (sids "esp0", "esp1", ...) entram na sala antes do início.
+    Com `salas`, a partida fica na sala `sala_id` desse gerenciador (os sids
+    ganham o id da sala como prefixo)."""
+    rnd = random.Random(seed)
+    prefixo = '' if salas is None else f"{sala_id}:"
+    salas = salas or GerenciadorSalas(lambda: Jogo(semente=seed))
+    sids = [f"{prefixo}sid{i}" for i in range(num_jogadores)]
+    for sid in sids:
+        processar_evento(salas, 'entrar_no_jogo', sid, {'nome': sid, 'sala_id': sala_id})
+    for i in range(espectadores):
+        processar_evento(salas, 'assistir', f"{prefixo}esp{i}", {'sala_id': sala_id})
+    processar_evento(salas, 'iniciar_jogo', sids[0], {})
+    for sid in sids:
+        processar_evento(salas, 'escolher_bilhetes', sid, {'manter': [0, 1]})
+    jogo = salas.get(sala_id).jogo
+
+    for _ in range(max_acoes):
+        if jogo.estado != "EM_ANDAMENTO":
+            break
+        sid = jogo.get_jogador_da_vez().sid
+        dados = _tentar_rota(jogo, sid) if jogo.acao_do_turno['tipo'] is None else None
+        if dados:
+            saidas = processar_evento(salas, 'reivindicar_rota', sid, dados)
+        else:
+            indice = rnd.choice([-1, 0, 1, 2, 3, 4])
+            saidas = processar_evento(salas, 'comprar_carta', sid, {'index': indice})
+            if any(nome == 'erro_acao' for nome, _, _ in saidas):
+                saidas = processar_evento(salas, 'comprar_carta', sid, {'index': -1})
+        if not any(nome == 'game_patch' for nome, _, _ in saidas):
+            break
+        yield jogo, sids, saidas
+
+
+def main(num_jogadores=4, seed=7):
+    acoes = antes = depois = 0
+    for jogo, sids, saidas in simular(num_jogadores, seed):
+        acoes += 1
+        # O patch público vai uma vez para a sala e chega a cada jogador; o privado só ao dono
+        depois += sum(tamanho_mensagem(dados) * (len(sids) if nome == 'game_patch' else 1)
+                      for nome, dados, _ in saidas if nome in ('game_patch', 'patch_privado'))
+        # O que seria enviado antes: estado completo para cada jogador
+        antes += sum(len(json.dumps(jogo.get_estado_para_frontend(para_sid=s))) for s in sids)
+
+    print(f"{acoes} ações, {num_jogadores} jogadores")
+    print(f"estado completo: {antes / acoes:>8.0f} bytes/ação")
+    print(f"patches:         {depois / acoes:>8.0f} bytes/ação ({antes / max(depois, 1):.1f}x menos)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,266 @@
+# Estatísticas de balanceamento sobre partidas gravadas (saída de simulate.py
+# ou de tournament.py): frequência de cada rota, vitórias por assento e número
+# de jogadores, turno médio da primeira rota e uso de locomotivas nas rotas
+# cinzas. Os arquivos são lidos como um pipeline de geradores (linhas ->
+# resultados -> agregados), em memória constante; arquivos grandes são
+# divididos em faixas de bytes entre workers e os agregados de cada faixa são
+# somados no fim. Grava uma tabela CSV por estatística.
+#
+#   python analytics.py results.jsonl --workers 8 --out-dir stats/
+#   python simulate.py -n 100000 | python analytics.py -
+import argparse, csv, gzip, json, os, sys, time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from t2r_cli import MAP_PATH
+from t2r_core import load_map
+
+PIECE_MIN = 4 << 20  # bytes por faixa, no mínimo; menos que isso não compensa o worker
+
+
+def route_list(map_path: str) -> List[Tuple[str, int]]:
+    # Id da rota -> (cor, comprimento)
+    return [(r.color, r.length) for r in load_map(map_path).routes]
+
+
+class Stats:
+    """Agregados incrementais de um conjunto de partidas.
+
+    Só guarda contadores (somas inteiras por chave), então o tamanho não
+    depende do número de partidas e `merge` de agregados feitos em processos
+    diferentes dá exatamente o mesmo que uma leitura única. As rotas das
+    jogadas são resolvidas pelo mapa (`map_path`), que diz a cor e o
+    comprimento de cada uma; partidas de torneio não trazem as jogadas e só
+    contam nas tabelas de jogadores e assentos.
+    """
+
+    FIELDS = ("players", "seats", "routes", "gray")
+
+    def __init__(self, map_path: str = MAP_PATH):
+        self.map_path = map_path
+        self._routes = route_list(map_path)
+        # Turnos e pontos são somas; as médias saem em `tables`
+        # n jogadores -> partidas, inacabadas, turnos, partidas com jogadas, partidas com rota, turno da 1ª rota
+        self.players: Dict[int, Counter] = {}
+        # (n, assento) -> partidas, vitórias, empates, pontos, partidas com rota, turno da 1ª rota
+        self.seats: Dict[Tuple[int, int], Counter] = {}
+        # (a, b, cor, comprimento) -> reivindicações, turnos, vezes em que foi a 1ª da partida
+        self.routes: Dict[Tuple[str, str, str, int], Counter] = {}
+        # cor escolhida numa rota cinza ("LOCOMOTIVE" se só locomotivas) ->
+        # reivindicações, locomotivas, com locomotiva, só locomotivas
+        self.gray: Dict[str, Counter] = {}
+        self.games = 0
+        self.bytes = 0  # lidos (descomprimidos), para medir a vazão
+        self.bad = 0  # linhas que não são resultados (cortadas ou corrompidas)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_routes"]  # refeito a partir do mapa no outro processo
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._routes = route_list(self.map_path)
+
+    def add(self, result: Dict):
+        scores = result["scores"]
+        n = len(scores)
+        winners = result["winners"]
+        turns = result["turns"]
+        self.games += 1
+        p = self.players.get(n)
+        if p is None:
+            p = self.players[n] = Counter()
+        p["games"] += 1
+        p["unfinished"] += not result.get("finished", True)
+        p["turns"] += turns
+        for seat, score in enumerate(scores):
+            s = self.seats.get((n, seat))
+            if s is None:
+                s = self.seats[n, seat] = Counter()
+            s["games"] += 1
+            s["score"] += score
+            if seat in winners:
+                s["wins" if len(winners) == 1 else "ties"] += 1
+
+        claims = result.get("claims")
+        if claims is None:
+            return
+        p["logged"] += 1
+        first_seen = set()
+        for i, (turn, seat, a, b, chosen, locos, rid) in enumerate(claims):
+            # O id diz qual das paralelas foi reivindicada
+            color, length = self._routes[rid]
+            key = (a, b, color, length)
+            r = self.routes.get(key)
+            if r is None:
+                r = self.routes[key] = Counter()
+            r["claims"] += 1
+            r["turns"] += turn
+            if i == 0:
+                r["first"] += 1
+                p["claimed"] += 1
+                p["first_turn"] += turn
+            if seat not in first_seen:
+                first_seen.add(seat)
+                s = self.seats[n, seat]
+                s["claimed"] += 1
+                s["first_turn"] += turn
+            if color == "GRAY":
+                g = self.gray.get(chosen)
+                if g is None:
+                    g = self.gray[chosen] = Counter()
+                g["claims"] += 1
+                g["locos"] += locos
+                g["with_locos"] += locos > 0
+                g["all_locos"] += locos == length
+
+    def merge(self, other: "Stats") -> "Stats":
+        for field in self.FIELDS:
+            mine = getattr(self, field)
+            for key, counts in getattr(other, field).items():
+                if key in mine:
+                    mine[key].update(counts)
+                else:
+                    mine[key] = Counter(counts)
+        self.games += other.games
+        self.bytes += other.bytes
+        self.bad += other.bad
+        return self
+
+    def tables(self) -> Dict[str, Tuple[List[str], List[List]]]:
+        """Tabelas prontas para o CSV: nome -> (cabeçalho, linhas)."""
+        def rate(a, b):
+            return round(a / b, 4) if b else ""
+
+        logged = sum(p["logged"] for p in self.players.values())
+        players = [[n, p["games"], p["unfinished"], rate(p["turns"], p["games"]), p["logged"],
+                    rate(p["first_turn"], p["claimed"])]
+                   for n, p in sorted(self.players.items())]
+        seats = [[n, seat, s["games"], s["wins"], s["ties"], rate(s["wins"], s["games"]),
+                  rate(s["ties"], s["games"]), rate(s["score"], s["games"]), rate(s["first_turn"], s["claimed"])]
+                 for (n, seat), s in sorted(self.seats.items())]
+        routes = [[a, b, color, length, r["claims"], rate(r["claims"], logged), rate(r["turns"], r["claims"]),
+                   r["first"]]
+                  for (a, b, color, length), r in sorted(self.routes.items(), key=lambda kv: (-kv[1]["claims"], kv[0]))]
+        gray = [[chosen, g["claims"], g["locos"], rate(g["locos"], g["claims"]), g["with_locos"],
+                 rate(g["with_locos"], g["claims"]), g["all_locos"]]
+                for chosen, g in sorted(self.gray.items(), key=lambda kv: (-kv[1]["claims"], kv[0]))]
+        return {
+            "players": (["players", "games", "unfinished", "avg_turns", "games_with_claims", "avg_first_claim_turn"],
+                        players),
+            "seats": (["players", "seat", "games", "wins", "ties", "win_rate", "tie_rate", "avg_score",
+                       "avg_first_claim_turn"], seats),
+            "routes": (["a", "b", "color", "length", "claims", "claim_rate", "avg_turn", "first_claim"], routes),
+            "gray_routes": (["chosen_color", "claims", "locomotives", "avg_locomotives", "claims_with_locomotives",
+                             "locomotive_rate", "all_locomotives"], gray),
+        }
+
+    def write_csv(self, out_dir: str) -> List[str]:
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for name, (header, rows) in self.tables().items():
+            path = os.path.join(out_dir, f"{name}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(header)
+                w.writerows(rows)
+            paths.append(path)
+        return paths
+
+
+# --- Pipeline ---
+
+def read_lines(path: str) -> Iterator[bytes]:
+    if path == "-":
+        yield from sys.stdin.buffer
+        return
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as f:
+        yield from f
+
+
+def read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    # Linhas que começam em [start, end): cada linha cai em exatamente uma faixa
+    with open(path, "rb") as f:
+        pos = start
+        if start:
+            f.seek(start - 1)
+            pos += len(f.readline()) - 1  # resto da linha anterior, que é da faixa anterior
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            yield line
+
+
+def parse(lines: Iterable[bytes], stats: Stats) -> Iterator[Dict]:
+    for line in lines:
+        stats.bytes += len(line)
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            if line.strip():
+                stats.bad += 1  # ex.: última linha de um torneio interrompido
+            continue
+        if "scores" in rec:  # pula o cabeçalho dos torneios
+            yield rec
+
+
+def scan(lines: Iterable[bytes], map_path: str = MAP_PATH) -> Stats:
+    stats = Stats(map_path)
+    for result in parse(lines, stats):
+        stats.add(result)
+    return stats
+
+
+def _scan_range(task: Tuple[str, int, int, str]) -> Stats:
+    path, start, end, map_path = task
+    return scan(read_range(path, start, end), map_path)
+
+
+def ranges(path: str, pieces: int) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    pieces = max(1, min(pieces, size // PIECE_MIN))
+    bounds = [size * i // pieces for i in range(pieces + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def analyze(paths: List[str], workers: int = 1, map_path: str = MAP_PATH) -> Stats:
+    """Soma os agregados de todos os arquivos; com workers, arquivos comuns
+    (não comprimidos, não stdin) são divididos em faixas de bytes."""
+    total = Stats(map_path)
+    splittable = [p for p in paths if p != "-" and not p.endswith(".gz")]
+    for path in paths:
+        if workers <= 1 or path not in splittable:
+            total.merge(scan(read_lines(path), map_path))
+    if workers > 1 and splittable:
+        # Mais faixas que workers: as que terminam antes pegam as que sobram
+        tasks = [(path, start, end, map_path) for path in splittable for start, end in ranges(path, workers * 4)]
+        with Pool(workers) as pool:
+            for stats in pool.imap_unordered(_scan_range, tasks):
+                total.merge(stats)
+    return total
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Estatísticas de balanceamento sobre partidas gravadas")
+    ap.add_argument("inputs", nargs="+", help="arquivos .jsonl (ou .jsonl.gz) de simulate.py/tournament.py; - = stdin")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--map", default=MAP_PATH, help="mapa usado nas partidas (cor e comprimento das rotas)")
+    ap.add_argument("--out-dir", default="analytics", help="pasta das tabelas CSV")
+    args = ap.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = analyze(args.inputs, args.workers, args.map)
+    elapsed = time.perf_counter() - start
+    paths = stats.write_csv(args.out_dir)
+    rate = stats.games / elapsed if elapsed else float("inf")
+    mb = stats.bytes / 2 ** 20
+    print(f"{stats.games} jogos, {mb:.1f} MB em {elapsed:.2f}s ({rate:.0f} jogos/s, {mb / elapsed if elapsed else 0:.1f} "
+          f"MB/s, {args.workers} workers); {stats.bad} linhas inválidas", file=sys.stderr)
+    print(f"tabelas: {', '.join(paths)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
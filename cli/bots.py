@@ -0,0 +1,169 @@
+# Bots com MCTS (t2r_core.mcts) para a CLI e para a simulação headless.
+#
+#   python bots.py --games 50 --time 0.2 --workers 4   # MCTS contra o guloso
+import argparse, os, random, time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from t2r_cli import CLAIM, DRAW_DECK, DRAW_FACE, KEEP_TICKETS, PASS, ROUTE_SCORE, Game
+from compact import CompactGame
+from policies import greedy_policy
+from t2r_core import GameModel, MCTSBot
+
+BOT_TIME = 1.0  # segundos por jogada
+
+
+class CLIModel(GameModel):
+    """A busca trabalha sobre CompactGame: cada determinização é um clone."""
+
+    def state(self, g: Game) -> CompactGame:
+        return CompactGame.from_game(g)
+
+    def determinize(self, state: CompactGame, me: int, rng: random.Random) -> CompactGame:
+        # O bot vê a própria mão, as abertas, o descarte e o tamanho das outras
+        # mãos; o resto (mãos dos outros + monte) é embaralhado e redistribuído.
+        # O mesmo vale para os bilhetes dos outros e o monte de bilhetes
+        s = state.clone()
+        colors = s.t.colors
+        others = [i for i in range(s.n) if i != me]
+        unseen = s.cards.tolist()
+        sizes = []
+        for i in others:
+            hand = s.hands[i * colors:(i + 1) * colors]
+            sizes.append(sum(hand))
+            for code, count in enumerate(hand):
+                unseen += [code] * count
+            s.hands[i * colors:(i + 1) * colors] = array("H", bytes(2 * colors))
+        rng.shuffle(unseen)
+        for i, size in zip(others, sizes):
+            for code in unseen[:size]:
+                s.hands[i * colors + code] += 1
+            del unseen[:size]
+        s.cards, s.cursor = array("B", unseen), len(unseen)
+        s.rng = random.Random(rng.getrandbits(64))
+        tickets = list(s.ticket_pile)
+        for i in others:
+            tickets += s.tickets[i] + s.offers[i]
+        if tickets:
+            rng.shuffle(tickets)
+            for i in others:
+                kept, offered = len(s.tickets[i]), len(s.offers[i])
+                s.tickets[i], s.offers[i] = tuple(tickets[:kept]), tuple(tickets[kept:kept + offered])
+                del tickets[:kept + offered]
+            s.ticket_pile = tuple(tickets)
+        return s
+
+    def to_move(self, s) -> int:
+        return s.turn
+
+    def legal_actions(self, s: CompactGame) -> List[Tuple]:
+        return s.legal_actions()
+
+    def apply(self, s: CompactGame, action: Tuple):
+        if not s.apply(action):
+            s.apply((PASS,))
+
+    def is_over(self, s: CompactGame) -> bool:
+        return s.finished
+
+    def rewards(self, s: CompactGame) -> List[float]:
+        winners = s.winners()
+        return [1.0 / len(winners) if i in winners else 0.0 for i in range(s.n)]
+
+    def rollout_action(self, s: CompactGame, rng: random.Random) -> Tuple:
+        # Mesma escolha de policies.greedy_policy, sobre o estado compacto
+        t = s.t
+        p = s.turn
+        offer = s.offers[p]
+        if offer:
+            # Os bilhetes de menor valor
+            cheapest = sorted(range(len(offer)), key=lambda i: t.ticket_points[offer[i]])[:s.min_keep(p)]
+            return (KEEP_TICKETS, *sorted(cheapest))
+        if s.drawn == 0:
+            claims = s.claimable_routes(p)
+            if claims:
+                rid = max(claims, key=lambda r: (ROUTE_SCORE.get(t.route_len[r], 0), t.route_len[r]))
+                return (CLAIM, t.route_a[rid], t.route_b[rid], rid)
+        best_idx, best_count = None, 0
+        for i, code in enumerate(s.market):
+            if code != t.loco and s.count(p, code) > best_count:
+                best_idx, best_count = i, s.count(p, code)
+        if best_idx is not None:
+            return (DRAW_FACE, best_idx)
+        if s.can_draw_deck():
+            return (DRAW_DECK,)
+        if len(s.market):
+            return (DRAW_FACE, 0)
+        return (PASS,)
+
+
+class CLIBot:
+    """Política (g, rng) -> ação que usa MCTS; serve na CLI e em simulate.py."""
+
+    def __init__(self, time_budget: float = BOT_TIME, workers: int = 1, max_iterations: Optional[int] = None,
+                 seed: int = 0):
+        self.search = MCTSBot(CLIModel(), time_budget, workers, max_iterations, seed=seed)
+
+    def __call__(self, g: Game, rng: random.Random) -> Tuple:
+        return self.search.choose(g)
+
+    @property
+    def last_stats(self) -> Dict[str, float]:
+        return self.search.last_stats
+
+    def close(self):
+        self.search.close()
+
+
+def mcts_policy(g: Game, rng: random.Random) -> Tuple:
+    # Versão para simulate.py: orçamento por iterações, reproduzível pela semente
+    return MCTSBot(CLIModel(), float("inf"), max_iterations=200, seed=rng.getrandbits(32)).choose(g)
+
+
+def play_vs_greedy(bot: CLIBot, games: int, seed: int) -> Tuple[float, float]:
+    """Joga `games` partidas MCTS x guloso (alternando quem começa).
+
+    Devolve (taxa de vitória do MCTS, rollouts/s médios).
+    """
+    wins = 0.0
+    rates = []
+    for n in range(games):
+        bot_seat = n % 2
+        g = Game(["mcts", "greedy"] if bot_seat == 0 else ["greedy", "mcts"], seed=seed + n, log=None)
+        rng = random.Random(seed + n)
+        while not g.finished and g.turns < 500:
+            if g.turn == bot_seat:
+                action = bot(g, rng)
+                if bot.last_stats:
+                    rates.append(bot.last_stats["rollouts_per_s"])
+            else:
+                action = greedy_policy(g, rng)
+            ok, _ = g.step(action)
+            if not ok:
+                g.step((PASS,))
+        winners = g.winners()
+        if bot_seat in winners:
+            wins += 1.0 / len(winners)
+    return wins / games, sum(rates) / len(rates) if rates else 0.0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="MCTS contra a política gulosa")
+    ap.add_argument("--games", type=int, default=20)
+    ap.add_argument("--time", type=float, default=0.2, help="segundos por jogada")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    bot = CLIBot(args.time, args.workers, seed=args.seed)
+    try:
+        start = time.perf_counter()
+        win_rate, rate = play_vs_greedy(bot, args.games, args.seed)
+    finally:
+        bot.close()
+    print(f"{args.games} jogos em {time.perf_counter() - start:.1f}s: MCTS venceu {win_rate:.0%} contra o guloso "
+          f"({rate:.0f} rollouts/s, {args.workers} workers, {args.time}s por jogada)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+# Estado compacto de um Game, para busca (bots) e análises "e se".
+#
+# Tudo que muda durante o jogo fica em poucos arrays: dono de cada rota, mãos
+# como vetores de contagem (jogador x cor), baralho como array + cursor;
+# bilhetes de destino como tuplas imutáveis, compartilhadas entre clones.
+# clone() copia só esses arrays; apply()/undo() guardam o mínimo para voltar
+# uma ação. As regras são as mesmas de Game._apply (ver t2r_cli.py).
+import random
+from array import array
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+from t2r_cli import (CLAIM, DRAW_DECK, DRAW_FACE, DRAW_TICKETS, KEEP_TICKETS, LAST_ROUND_WAGONS, LONGEST_BONUS, PASS,
+                     ROUTE_SCORE, TICKETS_KEEP, TICKETS_KEEP_START, TICKETS_OFFERED, Game)
+from t2r_core import UnionFind, longest_trail
+from t2r_core.route_index import pair_key
+
+MARKET_SIZE = 5
+MAX_MARKET_LOCOMOTIVES = 3
+MAX_MARKET_RECYCLES = 3
+
+
+class CompactTables:
+    """Parte imutável (mapa e paleta), compartilhada por todos os clones."""
+
+    def __init__(self, g: Game):
+        engine = g.deck.engine
+        self.palette = engine.palette
+        self.codes = engine.codes
+        self.colors = len(self.palette)
+        self.loco = engine.codes["LOCOMOTIVE"]
+        self.gray = engine.codes["GRAY"]
+        # Cores que pagam uma rota cinza, na ordem de TRAIN_COLORS
+        self.plain = [c for c in range(self.colors) if c != self.loco]
+        routes = g.board.routes
+        self.route_a = [r.a for r in routes]
+        self.route_b = [r.b for r in routes]
+        self.route_color = array("b", (engine.codes[r.color] for r in routes))
+        self.route_len = array("B", (r.length for r in routes))
+        self.by_pair: Dict[Tuple[str, str], List[int]] = {}
+        for i, r in enumerate(routes):
+            self.by_pair.setdefault(pair_key(r.a, r.b), []).append(i)
+        tickets = g.board.tickets
+        self.ticket_a = [t.a for t in tickets]
+        self.ticket_b = [t.b for t in tickets]
+        self.ticket_points = [t.points for t in tickets]
+
+
+class CompactGame:
+    __slots__ = ("t", "names", "seed", "n", "owners", "free_count", "hands", "wagons", "scores",
+                 "cards", "cursor", "discard", "market", "recycles", "changes", "rng", "rng_state",
+                 "turn", "turns", "drawn", "final_turns", "finished", "claims", "tickets", "offers",
+                 "ticket_pile", "setup", "_undo")
+
+    @classmethod
+    def from_game(cls, g: Game, tables: Optional[CompactTables] = None) -> "CompactGame":
+        # As tabelas dependem só do mapa: uma por topologia, compartilhada entre jogos
+        t = tables or g.board.topology.shared(CompactTables, lambda _: CompactTables(g))
+        s = cls.__new__(cls)
+        s.t = t
+        s.names = [p.name for p in g.players]
+        s.seed = g.seed
+        s.n = len(g.players)
+        s.owners = array("b", (-1 if r.owner is None else r.owner for r in g.board.routes))
+        s.free_count = g.board.index.free_count()
+        s.hands = array("H", bytes(2 * s.n * t.colors))
+        for i, p in enumerate(g.players):
+            for color, count in p.hand.items():
+                s.hands[i * t.colors + t.codes[color]] = count
+        s.wagons = array("H", (p.wagons for p in g.players))
+        s.scores = array("H", (p.score for p in g.players))
+        engine, market = g.deck.engine, g.deck.market
+        s.cards = array("B", engine.cards)
+        s.cursor = len(s.cards)
+        s.discard = array("B", engine.discard)
+        s.market = array("B", market.slots)
+        s.recycles, s.changes = market.recycles, market.changes
+        # Um Random (2,5 KB) em vez da tupla de getstate() (625 ints, ~25 KB); os clones passam a tupla adiante
+        s.rng, s.rng_state = random.Random(), None
+        s.rng.setstate(engine.rng.getstate())
+        s.turn, s.turns, s.drawn = g.turn, g.turns, g.drawn
+        s.final_turns, s.finished = g.final_turns, g.finished
+        s.claims = list(g.claims)
+        s.tickets = [tuple(p.tickets) for p in g.players]
+        s.offers = [tuple(p.offer) for p in g.players]
+        s.ticket_pile, s.setup = tuple(g.ticket_deck.pile), g.setup
+        s._undo = []
+        return s
+
+    def clone(self) -> "CompactGame":
+        c = CompactGame.__new__(CompactGame)
+        c.t, c.names, c.seed, c.n = self.t, self.names, self.seed, self.n
+        c.owners, c.free_count = self.owners[:], self.free_count
+        c.hands, c.wagons, c.scores = self.hands[:], self.wagons[:], self.scores[:]
+        c.cards, c.cursor = self.cards[:self.cursor], self.cursor
+        c.discard, c.market = self.discard[:], self.market[:]
+        c.recycles, c.changes = self.recycles, self.changes
+        # O RNG só é usado ao reembaralhar: os clones compartilham o estado
+        # (uma tupla imutável) e criam o Random quando precisarem
+        if self.rng is not None:
+            self.rng_state, self.rng = self.rng.getstate(), None
+        c.rng, c.rng_state = None, self.rng_state
+        c.turn, c.turns, c.drawn = self.turn, self.turns, self.drawn
+        c.final_turns, c.finished = self.final_turns, self.finished
+        c.claims = list(self.claims)
+        c.tickets, c.offers = list(self.tickets), list(self.offers)
+        c.ticket_pile, c.setup = self.ticket_pile, self.setup
+        c._undo = []
+        return c
+
+    # --- Consultas ---
+    def count(self, player: int, code: int) -> int:
+        return self.hands[player * self.t.colors + code]
+
+    def hand_size(self, player: int) -> int:
+        start = player * self.t.colors
+        return sum(self.hands[start:start + self.t.colors])
+
+    def _payment(self, player: int, rid: int) -> Optional[Tuple[int, int, int]]:
+        # (cor, cartas da cor, locomotivas) para reivindicar rid, como Game.claim_route; None se não dá
+        t = self.t
+        base = player * t.colors
+        need = t.route_len[rid]
+        if self.owners[rid] >= 0 or self.wagons[player] < need:
+            return None
+        color = t.route_color[rid]
+        loco = self.hands[base + t.loco]
+        if color == t.gray:
+            # A cor que o jogador mais tem, entre as que pagam a rota
+            best, best_have = -1, -1
+            for c in t.plain:
+                have = self.hands[base + c]
+                if have + loco >= need and have > best_have:
+                    best, best_have = c, have
+            if best < 0:
+                return None
+            color = best
+        if color == t.loco:
+            own, locos = 0, need
+        else:
+            own = min(self.hands[base + color], need)
+            locos = need - own
+        if locos > loco:
+            return None
+        return color, own, locos
+
+    def claimable_routes(self, player: int) -> List[int]:
+        t = self.t
+        base = player * t.colors
+        hand = self.hands
+        loco = hand[base + t.loco]
+        best = max(hand[base + c] for c in t.plain)
+        wagons = self.wagons[player]
+        out = []
+        for rid, owner in enumerate(self.owners):
+            if owner >= 0 or t.route_len[rid] > wagons:
+                continue
+            color = t.route_color[rid]
+            have = best if color == t.gray else hand[base + color]
+            if have + loco >= t.route_len[rid]:
+                out.append(rid)
+        return out
+
+    def can_draw_deck(self) -> bool:
+        return bool(self.cursor or self.discard)
+
+    def min_keep(self, player: int) -> int:
+        return min(TICKETS_KEEP_START if self.setup else TICKETS_KEEP, len(self.offers[player]))
+
+    def legal_actions(self) -> List[Tuple]:
+        t = self.t
+        offer = self.offers[self.turn]
+        if offer:
+            return [(KEEP_TICKETS, *keep) for n in range(self.min_keep(self.turn), len(offer) + 1)
+                    for keep in combinations(range(len(offer)), n)]
+        actions = []
+        if self.drawn == 0:
+            actions += [(CLAIM, t.route_a[rid], t.route_b[rid], rid) for rid in self.claimable_routes(self.turn)]
+            if self.ticket_pile:
+                actions.append((DRAW_TICKETS,))
+        if self.can_draw_deck():
+            actions.append((DRAW_DECK,))
+        seen = set()
+        for i, code in enumerate(self.market):
+            if code not in seen:
+                seen.add(code)
+                actions.append((DRAW_FACE, i))
+        return actions or [(PASS,)]
+
+    def ticket_scores(self) -> List[int]:
+        # Como TicketTracker.score, mas montando a rede de cada jogador só aqui
+        # (a busca só pergunta no fim do rollout)
+        t = self.t
+        out = []
+        for p in range(self.n):
+            if not self.tickets[p]:
+                out.append(0)
+                continue
+            uf = UnionFind()
+            for rid, owner in enumerate(self.owners):
+                if owner == p:
+                    uf.union(t.route_a[rid], t.route_b[rid])
+            out.append(sum(t.ticket_points[i] if uf.connected(t.ticket_a[i], t.ticket_b[i]) else -t.ticket_points[i]
+                           for i in self.tickets[p]))
+        return out
+
+    def longest_bonus(self) -> List[int]:
+        # Como Game.longest_bonus, resolvendo o maior caminho do zero
+        t = self.t
+        lengths = [longest_trail((t.route_a[rid], t.route_b[rid], t.route_len[rid])
+                                 for rid, owner in enumerate(self.owners) if owner == p)
+                   for p in range(self.n)]
+        top = max(lengths)
+        return [LONGEST_BONUS if top and n == top else 0 for n in lengths]
+
+    def final_scores(self) -> List[int]:
+        return [s + b + l for s, b, l in zip(self.scores, self.ticket_scores(), self.longest_bonus())]
+
+    def winners(self) -> List[int]:
+        scores = self.final_scores()
+        best = max(scores)
+        return [i for i, s in enumerate(scores) if s == best]
+
+    # --- Baralho e abertas (mesma ordem de sorteio que CardDeck/FaceUpMarket) ---
+    def _random(self) -> random.Random:
+        if self.rng is None:
+            self.rng = random.Random()
+            self.rng.setstate(self.rng_state)
+        return self.rng
+
+    def _draw_code(self) -> Optional[int]:
+        if not self.cursor:
+            if not self.discard:
+                return None
+            # Reembaralha o descarte em um array novo; o antigo fica para o undo
+            rng = self._random()
+            self._undo[-1][-1].append((self.cards, self.discard, rng.getstate()))
+            cards = array("B", self.discard)
+            rng.shuffle(cards)
+            self.cards, self.cursor, self.discard = cards, len(cards), array("B")
+        self.cursor -= 1
+        return self.cards[self.cursor]
+
+    def _take(self, idx: int) -> int:
+        code = self.market[idx]
+        self.changes += 1
+        new = self._draw_code()
+        if new is None:
+            del self.market[idx]
+        else:
+            self.market[idx] = new
+        self._check_locomotives()
+        return code
+
+    def _check_locomotives(self):
+        attempts = 0
+        while self.market.count(self.t.loco) >= MAX_MARKET_LOCOMOTIVES and attempts < MAX_MARKET_RECYCLES:
+            attempts += 1
+            self.recycles += 1
+            self.changes += 1
+            self.discard.extend(self.market)
+            del self.market[:]
+            while len(self.market) < MARKET_SIZE:
+                code = self._draw_code()
+                if code is None:
+                    break
+                self.market.append(code)
+
+    # --- Ações ---
+    def _push(self):
+        p = self.turn
+        start = p * self.t.colors
+        self._undo.append([self.turn, self.turns, self.drawn, self.final_turns, self.finished,
+                           self.cursor, len(self.discard), self.market[:], self.recycles, self.changes,
+                           self.hands[start:start + self.t.colors], self.wagons[p], self.scores[p],
+                           len(self.claims), self.tickets[p], self.offers[p], self.ticket_pile, self.setup,
+                           -1, []])
+
+    def apply(self, action: Tuple) -> bool:
+        """Aplica uma ação do jogador da vez; False (sem mudar nada) se for inválida."""
+        if self.finished:
+            return False
+        t = self.t
+        p = self.turn
+        base = p * t.colors
+        kind = action[0]
+        if self.offers[p]:
+            if kind == KEEP_TICKETS:
+                return self._keep(action[1:])
+            if kind == PASS:
+                return self._keep(range(self.min_keep(p)))
+            return False
+        if kind == DRAW_TICKETS:
+            if self.drawn or not self.ticket_pile:
+                return False
+            self._push()
+            self.offers[p] = self.ticket_pile[:-TICKETS_OFFERED - 1:-1]
+            self.ticket_pile = self.ticket_pile[:-TICKETS_OFFERED]
+            return True
+        if kind == CLAIM:
+            if self.drawn:
+                return False
+            ids = t.by_pair.get(pair_key(action[1], action[2]), ())
+            if len(action) > 3:
+                ids = [rid for rid in ids if rid == action[3]]
+            # Entre as paralelas, a primeira que a mão paga
+            for rid in ids:
+                paid = self._payment(p, rid)
+                if paid is not None:
+                    break
+            else:
+                return False
+            color, own, locos = paid
+            need = t.route_len[rid]
+            self._push()
+            self._undo[-1][-2] = rid
+            self.hands[base + color] -= own
+            self.hands[base + t.loco] -= locos
+            self.discard.extend([color] * own + [t.loco] * locos)
+            self.wagons[p] -= need
+            self.scores[p] += ROUTE_SCORE.get(need, 0)
+            self.owners[rid] = p
+            self.free_count -= 1
+            chosen = t.palette[color] if own or t.route_color[rid] != t.gray else "LOCOMOTIVE"
+            self.claims.append((self.turns, p, t.route_a[rid], t.route_b[rid], chosen, locos, rid))
+            self._end_turn()
+            return True
+        if kind == PASS:
+            self._push()
+            self._end_turn()
+            return True
+        if kind == DRAW_DECK:
+            if not self.cursor and not self.discard:
+                return False
+            self._push()
+            self.hands[base + self._draw_code()] += 1
+        elif kind == DRAW_FACE:
+            idx = action[1]
+            if idx < 0 or idx >= len(self.market):
+                return False
+            self._push()
+            first_loco = self.drawn == 0 and self.market[idx] == t.loco
+            self.hands[base + self._take(idx)] += 1
+            if first_loco:
+                self._end_turn()  # Locomotiva aberta como primeira carta encerra o turno
+                return True
+        else:
+            return False
+        self.drawn += 1
+        if self.drawn >= 2:
+            self._end_turn()
+        return True
+
+    def _keep(self, positions) -> bool:
+        p = self.turn
+        offer = self.offers[p]
+        try:
+            keep = sorted({int(i) for i in positions})
+        except (TypeError, ValueError):
+            return False
+        if any(i < 0 or i >= len(offer) for i in keep) or len(keep) < self.min_keep(p):
+            return False
+        self._push()
+        self.tickets[p] += tuple(offer[i] for i in keep)
+        self.ticket_pile = tuple(x for i, x in enumerate(offer) if i not in keep) + self.ticket_pile
+        self.offers[p] = ()
+        if self.setup:
+            self.setup = any(self.offers)
+            self.turn = (self.turn + 1) % self.n
+            while self.setup and not self.offers[self.turn]:
+                self.turn = (self.turn + 1) % self.n
+            if not self.setup:
+                self.turn = 0
+        else:
+            self._end_turn()
+        return True
+
+    def _end_turn(self):
+        p = self.turn
+        self.drawn = 0
+        self.turns += 1
+        if self.final_turns is not None:
+            self.final_turns -= 1
+            if self.final_turns <= 0:
+                self.finished = True
+        elif self.wagons[p] <= LAST_ROUND_WAGONS:
+            self.final_turns = self.n
+        if self.free_count == 0:
+            self.finished = True
+        self.turn = (self.turn + 1) % self.n
+
+    def undo(self):
+        (self.turn, self.turns, self.drawn, self.final_turns, self.finished, cursor, discard_len,
+         self.market, self.recycles, self.changes, hand, wagons, score, claims_len, tickets, offer,
+         self.ticket_pile, self.setup, claimed, reshuffles) = self._undo.pop()
+        if reshuffles:
+            self.cards, self.discard, self.rng_state = reshuffles[0]
+            self.rng = None
+        self.cursor = cursor
+        del self.discard[discard_len:]
+        p = self.turn
+        start = p * self.t.colors
+        self.hands[start:start + self.t.colors] = hand
+        self.wagons[p], self.scores[p] = wagons, score
+        self.tickets[p], self.offers[p] = tickets, offer
+        if claimed >= 0:
+            self.owners[claimed] = -1
+            self.free_count += 1
+        del self.claims[claims_len:]
+
+    # --- Estado no formato de Game.to_state ---
+    def to_state(self) -> Dict:
+        t = self.t
+        version, internal, gauss = self.rng.getstate() if self.rng is not None else self.rng_state
+        players = []
+        for i, name in enumerate(self.names):
+            base = i * t.colors
+            hand = {t.palette[c]: self.hands[base + c] for c in range(t.colors) if self.hands[base + c]}
+            players.append({"name": name, "wagons": self.wagons[i], "score": self.scores[i], "hand": hand,
+                            "tickets": list(self.tickets[i]), "offer": list(self.offers[i])})
+        return {
+            "seed": self.seed,
+            "players": players,
+            "owners": [None if o < 0 else o for o in self.owners],
+            "turn": self.turn, "turns": self.turns, "drawn": self.drawn,
+            "final_turns": self.final_turns, "finished": self.finished,
+            "claims": [list(c) for c in self.claims],
+            "deck": {"cards": self.cards[:self.cursor].tolist(), "discard": self.discard.tolist(),
+                     "rng": [version, list(internal), gauss]},
+            "market": {"slots": self.market.tolist(), "recycles": self.recycles, "changes": self.changes},
+            "ticket_pile": list(self.ticket_pile), "setup": self.setup,
+        }
@@ -0,0 +1,91 @@
+# Políticas para o modo headless: recebem o jogo e um RNG próprio do assento
+# e devolvem uma ação para Game.step.
+import importlib
+import random
+from typing import Callable, Dict, Tuple
+
+from t2r_cli import CLAIM, DRAW_DECK, DRAW_FACE, DRAW_TICKETS, KEEP_TICKETS, PASS, ROUTE_SCORE, Game
+
+Policy = Callable[[Game, random.Random], Tuple]
+
+
+def _draw_options(g: Game):
+    options = []
+    if len(g.deck.cards) or len(g.deck.discard):
+        options.append((DRAW_DECK,))
+    options += [(DRAW_FACE, i) for i in range(len(g.deck.market))]
+    return options
+
+
+def keep_easiest(g: Game) -> Tuple:
+    # Fica com os bilhetes que a rede já completa e, se faltar, com os de menor valor
+    p = g.players[g.turn]
+    tickets = g.board.tickets
+    order = sorted(range(len(p.offer)),
+                   key=lambda i: (not g.ticket_connected(g.turn, p.offer[i]), tickets[p.offer[i]].points))
+    done = [i for i in order if g.ticket_connected(g.turn, p.offer[i])]
+    return (KEEP_TICKETS, *sorted(order[:max(g.min_keep(p), len(done))]))
+
+
+def claim_action(g: Game, r) -> Tuple:
+    # Com o id: em rotas paralelas, é esta a reivindicada
+    return (CLAIM, r.a, r.b, g.board.index.route_id(r))
+
+
+def random_policy(g: Game, rng: random.Random) -> Tuple:
+    p = g.players[g.turn]
+    if p.offer:
+        keep = rng.randint(g.min_keep(p), len(p.offer))
+        return (KEEP_TICKETS, *sorted(rng.sample(range(len(p.offer)), keep)))
+    if g.drawn == 0 and len(g.ticket_deck) and rng.random() < 0.05:
+        return (DRAW_TICKETS,)
+    claims = g.claimable_routes(p) if g.drawn == 0 else []
+    if claims and rng.random() < 0.5:
+        return claim_action(g, rng.choice(claims))
+    draws = _draw_options(g)
+    if draws:
+        return rng.choice(draws)
+    if claims:
+        return claim_action(g, rng.choice(claims))
+    return (PASS,)
+
+
+def greedy_policy(g: Game, rng: random.Random) -> Tuple:
+    # Reivindica a rota que mais pontua; senão compra a carta aberta da cor que mais tem
+    p = g.players[g.turn]
+    if p.offer:
+        return keep_easiest(g)
+    if g.drawn == 0:
+        claims = g.claimable_routes(p)
+        if claims:
+            return claim_action(g, max(claims, key=lambda r: (ROUTE_SCORE.get(r.length, 0), r.length)))
+    market = g.deck.market
+    best_idx, best_count = None, 0
+    for i in range(len(market)):
+        color = market.color_at(i)
+        if color == "LOCOMOTIVE":
+            continue
+        if p.count_color(color) > best_count:
+            best_idx, best_count = i, p.count_color(color)
+    if best_idx is not None:
+        return (DRAW_FACE, best_idx)
+    draws = _draw_options(g)
+    if draws:
+        return draws[0]
+    return (PASS,)
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+def get_policy(spec: str) -> Policy:
+    """Nome registrado em POLICIES ou "modulo:funcao"."""
+    if spec in POLICIES:
+        return POLICIES[spec]
+    if ":" in spec:
+        module, name = spec.split(":", 1)
+        return getattr(importlib.import_module(module), name)
+    raise ValueError(f"Política desconhecida: {spec}")
@@ -0,0 +1,73 @@
+# Simulação em lote, sem interface: roda N jogos com sementes fixas em um
+# pool de processos e grava um resultado por linha (JSON Lines).
+#
+#   python simulate.py -n 10000 --policies greedy,random --workers 8 -o results.jsonl
+import argparse, json, os, random, sys, time
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+from t2r_cli import PASS, Game
+from policies import get_policy
+
+
+def play_game(task: Tuple[int, int, List[str], int]) -> Dict:
+    index, seed, policies, max_turns = task
+    names = [f"P{i}" for i in range(len(policies))]
+    g = Game(names, seed=seed, log=None)
+    fns = [get_policy(name) for name in policies]
+    # RNG por assento derivado só da semente: o resultado não depende do worker
+    rngs = [random.Random(seed * 1000 + i) for i in range(len(policies))]
+    while not g.finished and g.turns < max_turns:
+        i = g.turn
+        ok, _ = g.step(fns[i](g, rngs[i]))
+        if not ok:
+            # Ação inválida da política: o turno é perdido para não travar o jogo
+            g.step((PASS,))
+    result = g.result()
+    result.update(game=index, seed=seed, policies=policies)
+    return result
+
+
+def run(n_games: int, seed: int, policies: List[str], workers: int, max_turns: int, out, chunksize: int = 64) -> float:
+    tasks = ((i, seed + i, policies, max_turns) for i in range(n_games))
+    start = time.perf_counter()
+    if workers <= 1:
+        results = map(play_game, tasks)
+        for r in results:
+            out.write(json.dumps(r) + "\n")
+    else:
+        with Pool(workers) as pool:
+            # imap preserva a ordem: a saída é idêntica para qualquer número de workers
+            for r in pool.imap(play_game, tasks, chunksize=chunksize):
+                out.write(json.dumps(r) + "\n")
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Simulação headless de partidas")
+    ap.add_argument("-n", "--games", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--policies", default="greedy,random",
+                    help="uma política por assento (nome ou modulo:funcao)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--max-turns", type=int, default=500)
+    ap.add_argument("--chunksize", type=int, default=64)
+    ap.add_argument("-o", "--out", help="arquivo .jsonl (padrão: stdout)")
+    args = ap.parse_args(argv)
+
+    policies = [p.strip() for p in args.policies.split(",") if p.strip()]
+    for name in policies:
+        get_policy(name)  # falha cedo se o nome estiver errado
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        elapsed = run(args.games, args.seed, policies, args.workers, args.max_turns, out, args.chunksize)
+    finally:
+        if args.out:
+            out.close()
+    rate = args.games / elapsed if elapsed else float("inf")
+    print(f"{args.games} jogos em {elapsed:.2f}s ({rate:.1f} jogos/s, {args.workers} workers)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
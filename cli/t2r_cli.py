@@ -1,151 +1,219 @@
-import json, random, os, sys
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+import os, re, sys
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from t2r_core import (CardDeck, DrawOdds, FaceUpMarket, Hand, Journal, MapTopology, MoveGenerator, Plan, RouteIndex,
+                      RoutePlanner, TicketDeck, TicketTracker, TrailTracker, best_payment, load_map)
 
 # --- Constantes (sem alterações) ---
-SAVE_PATH = os.path.join(os.path.dirname(__file__), "saves.json")
+SAVE_PATH = os.path.join(os.path.dirname(__file__), "saves.json")       # snapshot
+SAVE_LOG_PATH = os.path.join(os.path.dirname(__file__), "saves.jsonl")  # eventos depois do snapshot
 MAP_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "map_simple.json")
 
 TRAIN_COLORS = ["RED","BLUE","GREEN","YELLOW","BLACK","WHITE","ORANGE","PURPLE","GRAY","LOCOMOTIVE"]
 ROUTE_SCORE = {1:1, 2:2, 3:4, 4:7, 5:10, 6:15}
 START_WAGONS = 45
 START_TRAINS = 4
+LAST_ROUND_WAGONS = 2  # com 2 vagões ou menos, cada jogador joga mais um turno
+TICKETS_OFFERED = 3     # bilhetes de destino sorteados de cada vez
+TICKETS_KEEP_START = 2  # mínimo a manter na escolha inicial
+TICKETS_KEEP = 1        # mínimo a manter ao comprar bilhetes durante o jogo
+LONGEST_BONUS = 10      # bônus para quem tem o maior caminho contínuo (empates levam todos)
+ODDS_TURNS = 2          # turnos de compra nas chances mostradas para cada rota
+
+# Ações de um turno, usadas por Game.step (modo headless, simulação e bots)
+DRAW_DECK = "deck"      # ("deck",)
+DRAW_FACE = "face"      # ("face", idx)
+CLAIM = "claim"         # ("claim", cidadeA, cidadeB[, id da rota]) sem id: a paralela livre que a mão paga
+PASS = "pass"           # ("pass",) só quando não há mais nada a fazer
+DRAW_TICKETS = "tickets"  # ("tickets",) sorteia bilhetes de destino
+KEEP_TICKETS = "keep"     # ("keep", i, j, ...) mantém os bilhetes sorteados nessas posições
 
 # --- Classes de Dados (sem alterações) ---
 @dataclass
 class TrainCard:
     color: str
 
-@dataclass
+@dataclass(frozen=True)
 class City:
     name: str
 
-@dataclass
 class Route:
+    # Uma por rota do mapa em cada jogo. Os campos do mapa apontam para as
+    # strings (internadas) da topologia compartilhada; do jogo é só o dono.
+    __slots__ = ("a", "b", "color", "length", "owner")
+
+    def __init__(self, a: str, b: str, color: str, length: int, owner: Optional[int] = None):
+        self.a, self.b, self.color, self.length, self.owner = a, b, color, length, owner
+
+    def __repr__(self):
+        return f"Route({self.a!r}, {self.b!r}, {self.color!r}, {self.length}, owner={self.owner})"
+
+@dataclass(frozen=True)
+class Ticket:
     a: str
     b: str
-    color: str
-    length: int
-    owner: Optional[int] = None
+    points: int
 
-@dataclass
 class Player:
-    name: str
-    wagons: int = START_WAGONS
-    score: int = 0
-    hand: List[TrainCard] = field(default_factory=list)
+    __slots__ = ("name", "wagons", "score", "hand", "tickets", "offer")
+
+    def __init__(self, name: str, wagons: int = START_WAGONS, score: int = 0, hand: Optional[Hand] = None,
+                 tickets: Optional[List[int]] = None, offer: Optional[List[int]] = None):
+        self.name = name
+        self.wagons = wagons
+        self.score = score
+        # Mão como contagem por cor (ver t2r_core.Hand)
+        self.hand = hand if hand is not None else Hand()
+        self.tickets = tickets if tickets is not None else []  # ids em Board.tickets
+        self.offer = offer if offer is not None else []        # bilhetes sorteados, aguardando a escolha
+
+    def __repr__(self):
+        return f"Player({self.name!r}, wagons={self.wagons}, score={self.score}, hand={self.hand!r})"
 
     def count_color(self, color: str) -> int:
-        return sum(1 for c in self.hand if c.color == color)
-
-    def remove_cards(self, color: str, n: int) -> List[TrainCard]:
-        used = []
-        hand_copy = self.hand[:]
-        # Primeiro, tenta usar as cartas da cor específica
-        for _ in range(n):
-            card_to_remove = next((c for c in hand_copy if c.color == color), None)
-            if card_to_remove:
-                used.append(card_to_remove)
-                hand_copy.remove(card_to_remove)
-        
-        # Se ainda faltarem cartas, usa Locomotivas
-        remaining_needed = n - len(used)
-        for _ in range(remaining_needed):
-            loco_to_remove = next((c for c in hand_copy if c.color == "LOCOMOTIVE"), None)
-            if loco_to_remove:
-                used.append(loco_to_remove)
-                hand_copy.remove(loco_to_remove)
-            else:
-                # Se não houver locomotivas suficientes, a operação falha
-                raise ValueError("not enough cards")
-        
-        # Se chegou até aqui, atualiza a mão real
-        self.hand = hand_copy
-        return used
+        return self.hand.count(color)
+
+    def remove_cards(self, color: str, n: int) -> Dict[str, int]:
+        # Primeiro usa as cartas da cor específica, depois completa com Locomotivas
+        payment = self.hand.payment_for(color, n, "LOCOMOTIVE")
+        if payment is None:
+            raise ValueError("not enough cards")
+        return self.hand.pay(payment)
 
 # --- Classes de Jogo (com alterações) ---
+# Uma instância de TrainCard por cor, compartilhada por todo o jogo
+CARDS = {c: TrainCard(c) for c in TRAIN_COLORS}
+
+def _quiet(msg: str):
+    pass
+
 class Deck:
-    def __init__(self, seed: int = 42):
-        rnd = random.Random(seed)
-        cards = []
-        for color in TRAIN_COLORS:
-            if color == "LOCOMOTIVE":
-                cards += [TrainCard(color)] * 14 # Aumentado para um baralho mais realista
-            else:
-                cards += [TrainCard(color)] * 12
-        rnd.shuffle(cards)
-        self._rnd = rnd
-        self.cards = cards
-        self.discard: List[TrainCard] = []
-        self.face_up: List[TrainCard] = []
-        self._refill_face_up()
+    __slots__ = ("log", "engine", "market")
+
+    def __init__(self, seed: int = 42, log: Callable[[str], None] = print):
+        self.log = log
+        # Aumentado para um baralho mais realista (14 locomotivas)
+        composition = [(c, 14 if c == "LOCOMOTIVE" else 12) for c in TRAIN_COLORS]
+        self.engine = CardDeck(composition, seed)
+        self.market = FaceUpMarket(self.engine, "LOCOMOTIVE")
+
+    @property
+    def cards(self):
+        return self.engine.cards
+
+    @property
+    def discard(self):
+        return self.engine.discard
+
+    @property
+    def face_up(self) -> List[TrainCard]:
+        return [CARDS[c] for c in self.market.colors()]
 
     def draw(self) -> Optional[TrainCard]:
-        if not self.cards and not self.discard:
-            return None # Fim do baralho
-        if not self.cards:
-            self.cards = self.discard
-            self.discard = []
-            self._rnd.shuffle(self.cards)
-        return self.cards.pop()
+        color = self.engine.draw()
+        return CARDS[color] if color is not None else None # None = fim do baralho
+
+    def discard_cards(self, used: Dict[str, int]):
+        for color, n in used.items():
+            self.engine.discard_color(color, n)
 
     def take_face_up(self, idx: int) -> TrainCard:
-        card = self.face_up.pop(idx)
-        self._refill_one()
+        recycles = self.market.recycles
+        card = CARDS[self.market.take(idx)]
+        # Regra opcional: se houver 3+ locomotivas, as abertas são recicladas
+        if self.market.recycles != recycles:
+            self.log("(!) 3 ou mais locomotivas abertas. Reciclando...")
         return card
 
-    def _refill_one(self):
-        new_card = self.draw()
-        if new_card:
-            self.face_up.append(new_card)
-        
-        # Regra opcional: se houver 3+ locomotivas, recicla as abertas
-        if sum(1 for c in self.face_up if c.color == "LOCOMOTIVE") >= 3:
-            print("(!) 3 ou mais locomotivas abertas. Reciclando...")
-            self.discard.extend(self.face_up)
-            self.face_up = []
-            self._refill_face_up()
-
-    def _refill_face_up(self):
-        while len(self.face_up) < 5:
-            card = self.draw()
-            if card is None: break # Para se o baralho acabar
-            self.face_up.append(card)
+def _route_ends(r: Route) -> Tuple[str, str]:
+    return r.a, r.b
+
+def _shared_tables(m: MapTopology):
+    # Partes imutáveis, montadas uma vez por mapa: cidades, bilhetes e as tabelas do gerador de jogadas e do planejador
+    specs = [(r.color, r.length) for r in m.routes]
+    return ({name: City(name) for name in m.cities}, [Ticket(*t) for t in m.tickets],
+            MoveGenerator(specs, TRAIN_COLORS, "LOCOMOTIVE", "GRAY"),
+            RoutePlanner(m, specs, TRAIN_COLORS, "LOCOMOTIVE", "GRAY"))
 
 class Board:
-    # (sem alterações)
-    def __init__(self, data: Dict):
-        self.cities = {c["name"]: City(c["name"]) for c in data["cities"]}
-        self.routes = [Route(**r) for r in data["routes"]]
+    __slots__ = ("topology", "cities", "tickets", "routes", "index", "moves", "planner")
+
+    def __init__(self, topology):
+        # Aceita também o dict do JSON (ex.: mapas gerados nos benchmarks)
+        if not isinstance(topology, MapTopology):
+            topology = MapTopology(topology)
+        self.topology = topology
+        self.cities, self.tickets, moves, planner = topology.shared("cli.board", _shared_tables)
+        self.routes = [Route(*spec) for spec in topology.routes]
+        # Índice por par de cidades (aceita rotas duplas); pares e adjacência vêm da topologia
+        self.index = RouteIndex(self.routes, _route_ends, topology)
+        # Rotas reivindicáveis e opções de pagamento por jogador (incremental)
+        self.moves = moves.fresh()
+        # Caminho mais barato entre duas cidades para cada jogador (com cache)
+        self.planner = planner.fresh()
 
     def find_route(self, a: str, b: str) -> Optional[Route]:
-        for r in self.routes:
-            if (r.a==a and r.b==b) or (r.a==b and r.b==a):
-                return r
-        return None
+        return self.index.find(a, b)
+
+    def find_routes(self, a: str, b: str) -> List[Route]:
+        return self.index.between(a, b)
+
+    def neighbors(self, city: str) -> List[str]:
+        return self.index.neighbors(city)
+
+    def free_routes(self) -> List[Route]:
+        return self.index.free_routes()
+
+    def claim(self, r: Route, owner: int):
+        r.owner = owner
+        self.index.mark_claimed(r)
+        self.planner.claimed(self.index.route_id(r), owner)
 
 class Game:
-    # (sem alterações no __init__)
-    def __init__(self, names: List[str], seed: int = 42):
-        with open(MAP_PATH, 'r') as f:
-            data = json.load(f)
+    # log=None deixa o motor em silêncio (modo headless)
+    def __init__(self, names: List[str], seed: int = 42, log: Optional[Callable[[str], None]] = print,
+                 topology: Optional[MapTopology] = None):
         if len(names) < 2:
             raise ValueError("É preciso pelo menos 2 jogadores.")
-        self.board = Board(data)
+        self.log = log if log is not None else _quiet
+        # O mapa é lido uma vez (e de novo só se o arquivo mudar) e compartilhado entre jogos
+        self.board = Board(topology or load_map(MAP_PATH))
         self.players = [Player(n) for n in names]
         self.turn = 0
-        self.deck = Deck(seed)
+        self.turns = 0  # turnos já encerrados
+        self.drawn = 0  # cartas compradas no turno atual
+        self.final_turns: Optional[int] = None
+        self.finished = False
+        # (turno, jogador, cidadeA, cidadeB, cor usada, locomotivas usadas)
+        self.claims: List[Tuple[int, int, str, str, str, int]] = []
+        # (turno, jogador, cidadeA, cidadeB, cor usada, locomotivas usadas, id da rota)
+        self.claims: List[Tuple[int, int, str, str, str, int, int]] = []
+        self.seed = seed
+        self.journal: Optional[Journal] = None  # quando definido, registra cada ação aceita
+        self.deck = Deck(seed, self.log)
         for p in self.players:
             for _ in range(START_TRAINS):
-                p.hand.append(self.deck.draw())
+                p.hand.add(self.deck.draw().color)
+        # Rede de cada jogador (union-find) e status dos bilhetes, por índice do jogador
+        self.network = TicketTracker(lambda t: (t.a, t.b), lambda t: t.points)
+        self.ticket_deck = TicketDeck(len(self.board.tickets), seed)
+        for p in self.players:
+            p.offer = self.ticket_deck.draw(TICKETS_OFFERED)
+        # Antes do primeiro turno cada jogador, em ordem, escolhe os bilhetes iniciais
+        self.setup = any(p.offer for p in self.players)
+        # Maior caminho contínuo de cada jogador, atualizado a cada rota
+        self.trails = TrailTracker()
+        self.odds: Optional[DrawOdds] = None  # criado na primeira consulta de chances
 
     def draw_from_deck(self, p: Player):
         card = self.deck.draw()
         if card:
-            p.hand.append(card)
-            print(f"Você comprou uma carta {card.color} do baralho.")
+            p.hand.add(card.color)
+            self.log(f"Você comprou uma carta {card.color} do baralho.")
         else:
-            print("O baralho acabou!")
+            self.log("O baralho acabou!")
 
     def draw_face_up(self, p: Player, idx: int):
         if idx < 0 or idx >= len(self.deck.face_up):
@@ -153,68 +221,319 @@ class Game:
         card = self.deck.face_up[idx]
         if card.color == "LOCOMOTIVE":
              raise ValueError("Você não pode pegar uma Locomotiva como sua primeira carta. Se quiser, pegue-a como uma ação única.")
-        p.hand.append(self.deck.take_face_up(idx))
-        print(f"Você pegou uma carta {card.color} das abertas.")
+        p.hand.add(self.deck.take_face_up(idx).color)
+        self.log(f"Você pegou uma carta {card.color} das abertas.")
 
     def draw_locomotive(self, p: Player, idx: int):
         if self.deck.face_up[idx].color != "LOCOMOTIVE":
             raise ValueError("Esta ação é apenas para pegar uma Locomotiva aberta.")
         card = self.deck.take_face_up(idx)
-        p.hand.append(card)
-        print(f"Você pegou uma Locomotiva! Seu turno acabou.")
+        p.hand.add(card.color)
+        self.log("Você pegou uma Locomotiva! Seu turno acabou.")
 
     # ALTERAÇÃO: Agora retorna um booleano indicando sucesso.
-    def claim_route(self, p: Player, a: str, b: str) -> (bool, str):
-        r = self.board.find_route(a,b)
-        if not r:
+    def claim_route(self, p: Player, a: str, b: str, rid: Optional[int] = None) -> (bool, str):
+        routes = self.board.find_routes(a, b)
+        if rid is not None:
+            # Rota escolhida pelo id (bots, replay): tem de ligar as duas cidades
+            routes = [r for r in routes if self.board.index.route_id(r) == rid]
+        if not routes:
             return False, "Rota inexistente"
-        if r.owner is not None:
+        free = [r for r in routes if r.owner is None]
+        if not free:
             return False, "Rota já ocupada"
-        
-        color = r.color
-        need = r.length
-        
-        if p.wagons < need:
-            return False, "Vagões insuficientes."
-
-        # rotas cinzas: escolhe a cor mais abundante do jogador
-        chosen_color = color
-        if color == "GRAY":
-            # Filtra cores que o jogador pode usar (tem cartas suficientes)
-            possible_colors = []
-            for c in TRAIN_COLORS:
-                if c == "LOCOMOTIVE": continue
-                have_color = p.count_color(c)
-                have_loco = p.count_color("LOCOMOTIVE")
-                if have_color + have_loco >= need:
-                    possible_colors.append((have_color, c))
-            
-            if not possible_colors:
-                return False, "Cartas insuficientes para qualquer cor na rota cinza."
 
-            # Escolhe a cor que o jogador tem em maior quantidade
-            best_color = max(possible_colors, key=lambda item: item[0])[1]
-            chosen_color = best_color
+        # Entre as paralelas livres, a primeira que a mão paga; em cada uma, a
+        # opção da cor que o jogador tem em maior quantidade (só faz diferença em rotas cinzas)
+        i = self.players.index(p)
+        for r in free:
+            options = self.board.moves.route_options(i, p.hand, self.board.index.route_id(r))
+            payment = best_payment(options, p.hand, "LOCOMOTIVE")
+            if payment is not None and p.wagons >= r.length:
+                break
+        else:
+            r = free[0]
+            need = r.length
+            if p.wagons < need:
+                return False, "Vagões insuficientes."
+            if len(free) > 1:
+                return False, "Cartas insuficientes para qualquer uma das rotas paralelas."
+            if r.color == "GRAY":
+                return False, "Cartas insuficientes para qualquer cor na rota cinza."
+            loco = p.count_color("LOCOMOTIVE")
+            return False, f"Cartas insuficientes da cor {r.color} (precisa: {need}, tem: {p.count_color(r.color)} + {loco} locos)."
+        need = r.length
+        # Só locomotivas numa rota cinza: nenhuma cor foi escolhida
+        chosen_color = next((c for c, n in payment.items() if c != "LOCOMOTIVE" and n),
+                            "LOCOMOTIVE" if r.color == "GRAY" else r.color)
+        used = p.hand.pay(payment)
 
-        have = p.count_color(chosen_color) + p.count_color("LOCOMOTIVE")
-        if have < need:
-            return False, f"Cartas insuficientes da cor {chosen_color} (precisa: {need}, tem: {have-p.count_color('LOCOMOTIVE')} + {p.count_color('LOCOMOTIVE')} locos)."
-        
-        try:
-            used = p.remove_cards(chosen_color, need)
-        except ValueError:
-            return False, "Falha ao consumir cartas (erro interno)."
-        
-        self.deck.discard.extend(used)
+        self.deck.discard_cards(used)
         p.wagons -= need
         score_gain = ROUTE_SCORE.get(need, 0)
         p.score += score_gain
-        r.owner = self.turn
-        return True, f"Rota {a}-{b} reivindicada com {chosen_color}! (+{score_gain} pts)"
+        self.board.claim(r, self.turn)
+        done = self.network.claim(self.turn, r.a, r.b)
+        self.trails.add(self.turn, r.a, r.b, r.length)
+        self.claims.append((self.turns, self.turn, r.a, r.b, chosen_color, used.get("LOCOMOTIVE", 0),
+                            self.board.index.route_id(r)))
+        msg = f"Rota {a}-{b} reivindicada com {chosen_color}! (+{score_gain} pts)"
+        for t in done:
+            msg += f" Bilhete {t.a}-{t.b} completo!"
+        return True, msg
+
+    # --- Bilhetes de destino ---
+    def min_keep(self, p: Player) -> int:
+        return min(TICKETS_KEEP_START if self.setup else TICKETS_KEEP, len(p.offer))
+
+    def draw_tickets(self, p: Player) -> Tuple[bool, str]:
+        if self.drawn:
+            return False, "Você já começou a comprar cartas neste turno."
+        if not len(self.ticket_deck):
+            return False, "Não há mais bilhetes de destino."
+        p.offer = self.ticket_deck.draw(TICKETS_OFFERED)
+        return True, ""
+
+    def keep_tickets(self, p: Player, positions) -> Tuple[bool, str]:
+        if not p.offer:
+            return False, "Não há bilhetes para escolher."
+        try:
+            positions = sorted({int(i) for i in positions})
+        except (TypeError, ValueError):
+            return False, "Bilhete inválido."
+        if any(i < 0 or i >= len(p.offer) for i in positions):
+            return False, "Bilhete inválido."
+        need = self.min_keep(p)
+        if len(positions) < need:
+            return False, f"Fique com pelo menos {need} bilhete(s)."
+        kept = [p.offer[i] for i in positions]
+        self.ticket_deck.put_back(t for i, t in enumerate(p.offer) if i not in positions)
+        p.offer = []
+        p.tickets += kept
+        done = self.network.add(self.turn, [self.board.tickets[t] for t in kept])
+        msg = f"{p.name} ficou com {len(kept)} bilhete(s)."
+        for t in done:
+            msg += f" Bilhete {t.a}-{t.b} completo!"
+        if self.setup:
+            # Escolha inicial não conta como turno; o jogo começa pelo jogador 0
+            self.setup = any(pl.offer for pl in self.players)
+            self.next_turn()
+            while self.setup and not self.players[self.turn].offer:
+                self.next_turn()
+            if not self.setup:
+                self.turn = 0
+        else:
+            self.end_turn()
+        return True, msg
+
+    def ticket_connected(self, i: int, ticket: int) -> bool:
+        t = self.board.tickets[ticket]
+        return self.network.network(i).connected(t.a, t.b)
+
+    def ticket_status(self, i: int) -> List[Tuple[Ticket, bool]]:
+        return self.network.status(i)
+
+    def longest_bonus(self) -> List[int]:
+        # Durante a partida vale a estimativa ao vivo; no fim, o maior caminho exato
+        _, leaders = self.trails.leaders(range(len(self.players)), exact=self.finished)
+        return [LONGEST_BONUS if i in leaders else 0 for i in range(len(self.players))]
+
+    def final_scores(self) -> List[int]:
+        # Rotas + bilhetes (completos somam, incompletos descontam) + maior caminho:
+        # o placar se o jogo acabasse agora
+        return [p.score + self.network.score(i) + bonus
+                for i, (p, bonus) in enumerate(zip(self.players, self.longest_bonus()))]
 
     def next_turn(self):
         self.turn = (self.turn + 1) % len(self.players)
 
+    # --- API de ações (sem input/print) ---
+    def claim_options(self, p: Player) -> List[Tuple[Route, List[Dict[str, int]]]]:
+        # Rotas livres que p pode reivindicar agora, com as opções de pagamento
+        claims = self.board.moves.claims(self.players.index(p), p.hand, p.wagons, self.board.index.free_ids())
+        return [(self.board.routes[rid], options) for rid, options in claims]
+
+    def claimable_routes(self, p: Player) -> List[Route]:
+        return [r for r, _ in self.claim_options(p)]
+
+    def plan_route(self, i: int, a: str, b: str) -> Optional[Plan]:
+        # Caminho mais barato de a até b para o jogador i, com a mão e os vagões atuais
+        p = self.players[i]
+        return self.board.planner.plan(i, p.hand, p.wagons, a, b)
+
+    def draw_odds(self, i: int) -> Dict[Tuple[str, int], Tuple[float, ...]]:
+        # (cor, tamanho) -> chance de o jogador i juntar as cartas em até 1..ODDS_TURNS turnos de compra.
+        # Para ele, as cartas escondidas são o monte e as mãos dos adversários.
+        engine = self.deck.engine
+        unseen = engine.count_by_color()
+        for j, q in enumerate(self.players):
+            if j != i:
+                for color, n in q.hand.items():
+                    unseen[color] = unseen.get(color, 0) + n
+        if self.odds is None:
+            self.odds = DrawOdds(TRAIN_COLORS, "LOCOMOTIVE", "GRAY", turns=ODDS_TURNS, seed=self.seed)
+        p = self.players[i]
+        return self.odds.table(p.hand, unseen, len(engine.cards), engine.count_by_color(discard=True),
+                               self.deck.market.colors(), p.wagons)
+
+    def can_draw(self) -> bool:
+        return bool(len(self.deck.cards) or len(self.deck.discard) or len(self.deck.market))
+
+    def step(self, action: Tuple) -> Tuple[bool, str]:
+        """Aplica uma ação do jogador da vez; encerra o turno quando ele acaba."""
+        ok, msg = self._apply(action)
+        if ok and self.journal is not None:
+            if action[0] == CLAIM:
+                # Grava a rota que foi reivindicada: o replay não escolhe de novo entre as paralelas
+                action = (CLAIM, action[1], action[2], self.claims[-1][6])
+            self.journal.record(list(action), self.to_state)
+        return ok, msg
+
+    def _apply(self, action: Tuple) -> Tuple[bool, str]:
+        if self.finished:
+            return False, "O jogo já terminou."
+        p = self.players[self.turn]
+        kind = action[0]
+        if p.offer and kind not in (KEEP_TICKETS, PASS):
+            return False, "Escolha primeiro os bilhetes de destino."
+        try:
+            if kind == KEEP_TICKETS:
+                return self.keep_tickets(p, action[1:])
+            if kind == DRAW_TICKETS:
+                return self.draw_tickets(p)
+            if kind == CLAIM:
+                if self.drawn:
+                    return False, "Você já começou a comprar cartas neste turno."
+                ok, msg = self.claim_route(p, action[1], action[2], action[3] if len(action) > 3 else None)
+                if ok:
+                    self.end_turn()
+                return ok, msg
+            if kind == PASS:
+                if p.offer:
+                    # Passar com bilhetes sorteados fica com os primeiros
+                    return self.keep_tickets(p, range(self.min_keep(p)))
+                self.end_turn()
+                return True, "Turno passado."
+            if kind == DRAW_DECK:
+                if not len(self.deck.cards) and not len(self.deck.discard):
+                    return False, "O baralho acabou!"
+                self.draw_from_deck(p)
+            elif kind == DRAW_FACE:
+                idx = action[1]
+                if idx < 0 or idx >= len(self.deck.market):
+                    raise IndexError("Índice inválido para cartas abertas (0-4).")
+                if self.drawn == 0 and self.deck.market.color_at(idx) == "LOCOMOTIVE":
+                    self.draw_locomotive(p, idx)
+                    self.end_turn() # Pegar locomotiva encerra o turno
+                    return True, ""
+                if self.drawn == 0:
+                    self.draw_face_up(p, idx)
+                else:
+                    # Na segunda compra, pode pegar locomotiva
+                    card = self.deck.take_face_up(idx)
+                    p.hand.add(card.color)
+                    self.log(f"Você pegou uma carta {card.color} das abertas.")
+            else:
+                return False, f"Ação desconhecida: {kind}"
+        except (ValueError, IndexError) as e:
+            return False, str(e)
+        self.drawn += 1
+        if self.drawn >= 2:
+            self.end_turn()
+        return True, ""
+
+    def end_turn(self):
+        p = self.players[self.turn]
+        self.drawn = 0
+        self.turns += 1
+        if self.final_turns is not None:
+            self.final_turns -= 1
+            if self.final_turns <= 0:
+                self.finished = True
+        elif p.wagons <= LAST_ROUND_WAGONS:
+            self.final_turns = len(self.players)
+        if self.board.index.free_count() == 0:
+            self.finished = True
+        self.next_turn()
+
+    # --- Save/load ---
+    def to_state(self) -> Dict:
+        return {
+            "seed": self.seed,
+            "players": [{"name": p.name, "wagons": p.wagons, "score": p.score, "hand": p.hand.as_dict(),
+                         "tickets": list(p.tickets), "offer": list(p.offer)}
+                        for p in self.players],
+            "owners": [r.owner for r in self.board.routes],
+            "turn": self.turn, "turns": self.turns, "drawn": self.drawn,
+            "final_turns": self.final_turns, "finished": self.finished,
+            "claims": [list(c) for c in self.claims],
+            "deck": self.deck.engine.to_state(),
+            "market": self.deck.market.to_state(),
+            "ticket_pile": self.ticket_deck.to_state(), "setup": self.setup,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict, log: Optional[Callable[[str], None]] = print) -> "Game":
+        g = cls([p["name"] for p in state["players"]], seed=state["seed"], log=log)
+        for p, data in zip(g.players, state["players"]):
+            p.wagons, p.score = data["wagons"], data["score"]
+            p.hand = Hand.from_counts(data["hand"])
+            p.tickets, p.offer = list(data.get("tickets", [])), list(data.get("offer", []))
+        g.network = TicketTracker(lambda t: (t.a, t.b), lambda t: t.points)
+        for i, p in enumerate(g.players):
+            g.network.add(i, [g.board.tickets[t] for t in p.tickets])
+        for r, owner in zip(g.board.routes, state["owners"]):
+            if owner is not None:
+                g.board.claim(r, owner)
+                g.network.claim(owner, r.a, r.b)
+                g.trails.add(owner, r.a, r.b, r.length)
+        g.turn, g.turns, g.drawn = state["turn"], state["turns"], state["drawn"]
+        g.final_turns, g.finished = state["final_turns"], state["finished"]
+        g.claims = [tuple(c) for c in state["claims"]]
+        g.deck.engine.load_state(state["deck"])
+        g.deck.market.load_state(state["market"])
+        g.ticket_deck.load_state(state.get("ticket_pile", []))
+        g.setup = state.get("setup", False)
+        return g
+
+    def save(self, snapshot_path: str = SAVE_PATH, log_path: str = SAVE_LOG_PATH):
+        # Snapshot agora; daqui em diante cada ação é anexada ao log
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = Journal(log_path, snapshot_path)
+        self.journal.start(self.to_state())
+
+    @classmethod
+    def load(cls, snapshot_path: str = SAVE_PATH, log_path: str = SAVE_LOG_PATH,
+             log: Optional[Callable[[str], None]] = print) -> "Game":
+        journal = Journal(log_path, snapshot_path)
+        state, events = journal.load()
+        g = cls.from_state(state, log=None)
+        for action in events:
+            g._apply(tuple(action))
+        g.log = log if log is not None else _quiet
+        g.deck.log = g.log
+        g.journal = journal
+        return g
+
+    def winners(self) -> List[int]:
+        scores = self.final_scores()
+        best = max(scores)
+        return [i for i, s in enumerate(scores) if s == best]
+
+    def result(self) -> Dict:
+        return {
+            "winners": self.winners(),
+            "scores": self.final_scores(),
+            "tickets": [[sum(done for _, done in self.ticket_status(i)), len(p.tickets)]
+                        for i, p in enumerate(self.players)],
+            "longest": [self.trails.length(i) for i in range(len(self.players))],
+            "turns": self.turns,
+            "finished": self.finished,
+            "routes_claimed": [sum(1 for c in self.claims if c[1] == i) for i in range(len(self.players))],
+            "claims": [list(c) for c in self.claims],
+        }
+
 def print_state(g: Game):
     p = g.players[g.turn]
     print("\n" + "="*40)
@@ -223,13 +542,119 @@ def print_state(g: Game):
     counts = {c: p.count_color(c) for c in TRAIN_COLORS if p.count_color(c) > 0}
     print("Sua Mão:", " ".join([f"{k}:{v}" for k,v in counts.items()]))
     print("Cartas Abertas:", ", ".join([f"[{i}]{c.color}" for i, c in enumerate(g.deck.face_up)]))
-    print("Rotas Livres:")
-    for r in g.board.routes:
-        if r.owner is None:
-            print(f"  - {r.a:<12} -> {r.b:<12} | Cor: {r.color:<8} | Tamanho: {r.length}")
+    print(f"Rotas Livres (chance de juntar as cartas em 1..{ODDS_TURNS} turnos de compra):")
+    odds = g.draw_odds(g.turn)
+    for r in g.board.free_routes():
+        chances = " ".join(f"{c:>4.0%}" for c in odds.get((r.color, r.length), (0.0,) * ODDS_TURNS))
+        print(f"  - {r.a:<12} -> {r.b:<12} | Cor: {r.color:<8} | Tamanho: {r.length} | Chance: {chances}")
+    if p.tickets:
+        print("Bilhetes:")
+        for t, done in g.ticket_status(g.turn):
+            print(f"  [{'x' if done else ' '}] {t.a:<12} -> {t.b:<12} | {t.points} pts")
+    top, leaders = g.trails.leaders(range(len(g.players)))
+    if top:
+        names = ", ".join(g.players[i].name for i in leaders)
+        print(f"Maior caminho: {g.trails.length(g.turn)} (líder: {names} com {top}, +{LONGEST_BONUS} pts no fim)")
+    claims = g.claim_options(p) if g.drawn == 0 else []
+    if claims:
+        print("Você pode reivindicar:")
+        for r, options in claims:
+            pays = " | ".join(" + ".join(f"{n} {c}" for c, n in pay.items()) for pay in options)
+            print(f"  * {r.a:<12} -> {r.b:<12} | {pays}")
     print("="*40)
 
 
+def print_plan(g: Game, a: str, b: str):
+    try:
+        plan = g.plan_route(g.turn, a, b)
+    except ValueError as e:
+        print(e)
+        return
+    if plan is None:
+        print(f"Não há caminho livre de {a} até {b} com os seus vagões.")
+        return
+    print("Caminho: " + " -> ".join(plan.cities))
+    if not plan.to_claim:
+        print("Você já liga as duas cidades.")
+        return
+    routes = [g.board.routes[rid] for rid in plan.to_claim]
+    print("A reivindicar: " + ", ".join(f"{r.a}-{r.b} ({r.color} {r.length})" for r in routes)
+          + f" | vagões: {plan.wagons}")
+    if plan.missing:
+        print("Faltam: " + ", ".join(f"{n} {'de qualquer cor' if c == 'GRAY' else c}" for c, n in plan.missing.items()))
+    else:
+        print("Você já tem as cartas para todas essas rotas.")
+
+def save_paths(name: Optional[str] = None) -> Tuple[str, str]:
+    if not name:
+        return SAVE_PATH, SAVE_LOG_PATH
+    base = os.path.join(os.path.dirname(SAVE_PATH), f"saves_{name}")
+    return base + ".json", base + ".jsonl"
+
+
+# Nomes "bot", "bot2" ou "bot:Nome" são jogados pelo MCTS (ver bots.py)
+BOT_NAME = re.compile(r"bot(\d*|:.*)$", re.IGNORECASE)
+
+
+def describe(action: Tuple) -> str:
+    if action[0] == CLAIM:
+        return f"reivindica {action[1]}-{action[2]}"
+    if action[0] == DRAW_FACE:
+        return f"compra a carta aberta [{action[1]}]"
+    if action[0] == DRAW_DECK:
+        return "compra do baralho"
+    if action[0] == DRAW_TICKETS:
+        return "compra bilhetes de destino"
+    if action[0] == KEEP_TICKETS:
+        return f"fica com {len(action) - 1} bilhete(s)"
+    return "passa a vez"
+
+
+def play_bot_turn(g: Game, bot):
+    seat = g.turn
+    p = g.players[seat]
+    turn = g.turns
+    while g.turns == turn and g.turn == seat and not g.finished:
+        action = bot(g, None)
+        ok, msg = g.step(action)
+        if not ok:
+            action = (PASS,)
+            g.step(action)
+        print(f"[bot] {p.name} {describe(action)}" + (f" ({bot.last_stats['rollouts']} rollouts)" if bot.last_stats else ""))
+        if msg:
+            print(msg)
+
+
+def choose_tickets(g: Game, p: Player):
+    need = g.min_keep(p)
+    print(f"\n{p.name}, bilhetes de destino sorteados (fique com pelo menos {need}):")
+    for i, t in enumerate(p.offer):
+        ticket = g.board.tickets[t]
+        print(f"  [{i}] {ticket.a:<12} -> {ticket.b:<12} | {ticket.points} pts")
+    while True:
+        raw = input("Quais manter? (ex: 0 2; vazio = todos) >> ").split()
+        try:
+            positions = [int(x) for x in raw] if raw else list(range(len(p.offer)))
+        except ValueError:
+            print("Use os números dos bilhetes.")
+            continue
+        ok, msg = g.step((KEEP_TICKETS, *positions))
+        if msg:
+            print(msg)
+        if ok:
+            return
+
+
+def read_draw(label: str) -> Optional[Tuple]:
+    print(f"Escolha sua {label} carta: [d]eck ou [f]ace-up <0-4>?")
+    parts = input(">> ").strip().split()
+    if parts and parts[0] == 'd':
+        return (DRAW_DECK,)
+    if len(parts) > 1 and parts[0] == 'f':
+        return (DRAW_FACE, int(parts[1]))
+    return None
+
+
 def main():
     os.makedirs("data", exist_ok=True)
     if not os.path.exists(MAP_PATH):
@@ -237,84 +662,130 @@ def main():
         sys.exit(1)
 
     print("=== Ticket to Ride – CLI (Corrigido) ===")
-    names_raw = input("Nomes dos jogadores (separados por vírgula): ").strip()
-    names = [n.strip() for n in names_raw.split(',') if n.strip()]
-    
-    try:
-        g = Game(names)
-    except Exception as e:
-        print(f"Erro ao iniciar jogo: {e}")
-        return
+    g = None
+    if Journal.exists(SAVE_PATH) and input("Carregar o jogo salvo? [s/N] ").strip().lower() == 's':
+        try:
+            g = Game.load()
+        except (OSError, ValueError) as e:
+            print(f"Erro ao carregar: {e}")
 
-    while True:
+    if g is None:
+        names_raw = input("Nomes dos jogadores (separados por vírgula): ").strip()
+        names = [n.strip() for n in names_raw.split(',') if n.strip()]
+        
+        try:
+            g = Game(names)
+        except Exception as e:
+            print(f"Erro ao iniciar jogo: {e}")
+            return
+
+    bots = {}
+    while not g.finished:
+        if not bots and any(BOT_NAME.match(pl.name) for pl in g.players):
+            from bots import CLIBot  # bots.py importa este módulo
+            bots = {i: CLIBot() for i, pl in enumerate(g.players) if BOT_NAME.match(pl.name)}
+        if g.turn in bots:
+            play_bot_turn(g, bots[g.turn])
+            continue
         p = g.players[g.turn]
+        if p.offer:
+            choose_tickets(g, p)
+            continue
         print_state(g)
         
-        # --- LÓGICA DE TURNO CORRIGIDA ---
-        action_taken = False
-        while not action_taken:
-            cmd_raw = input(f"\nAção para {p.name} [d]raw, [c]laim, [q]uit >> ").strip().lower()
-            if not cmd_raw: continue
-
-            if cmd_raw == 'd':
-                # Lógica para comprar 2 cartas
-                print("Escolha sua primeira carta: [d]eck ou [f]ace-up <0-4>?")
-                draw1_cmd = input(">> ").strip().split()
-                
+        turn = g.turns
+        while g.turns == turn:
+            cmd_raw = input(f"\nAção para {p.name} [d]raw, [c]laim, [t]ickets, [p]ass, [h]int, [s]ave, [l]oad, [q]uit >> ").strip()
+            cmd = cmd_raw.lower()
+            if not cmd: continue
+
+            if cmd == 'd':
+                # Primeira carta; pegar uma Locomotiva aberta encerra o turno
                 try:
-                    if draw1_cmd[0] == 'd':
-                        g.draw_from_deck(p)
-                    elif draw1_cmd[0] == 'f':
-                        idx = int(draw1_cmd[1])
-                        card = g.deck.face_up[idx]
-                        if card.color == "LOCOMOTIVE":
-                           g.draw_locomotive(p, idx)
-                           action_taken = True # Pegar locomotiva encerra o turno
-                           continue
-                        else:
-                           g.draw_face_up(p, idx)
-                    else:
-                        print("Comando inválido.")
-                        continue # Volta para o prompt de ação
-                    
-                    # Segunda compra
+                    action = read_draw("primeira")
+                except ValueError:
+                    action = None
+                if action is None:
+                    print("Comando inválido.")
+                    continue # Volta para o prompt de ação
+                ok, msg = g.step(action)
+                if not ok:
+                    print(f"Erro na jogada: {msg}. Tente novamente.")
+                    continue
+
+                # Segunda compra
+                while g.turns == turn:
+                    if not g.can_draw():
+                        g.step((PASS,))
+                        break
                     print_state(g)
-                    print("Escolha sua segunda carta: [d]eck ou [f]ace-up <0-4>?")
-                    draw2_cmd = input(">> ").strip().split()
-                    if draw2_cmd[0] == 'd':
-                        g.draw_from_deck(p)
-                    elif draw2_cmd[0] == 'f':
-                        idx = int(draw2_cmd[1])
-                        # Na segunda compra, pode pegar locomotiva
-                        card = g.deck.take_face_up(idx)
-                        p.hand.append(card)
-                        print(f"Você pegou uma carta {card.color} das abertas.")
-                    
-                    action_taken = True
-
-                except (ValueError, IndexError) as e:
-                    print(f"Erro na jogada: {e}. Tente novamente.")
-
-            elif cmd_raw.startswith('c'):
+                    try:
+                        action = read_draw("segunda")
+                    except ValueError:
+                        action = None
+                    if action is None:
+                        print("Comando inválido.")
+                        continue
+                    ok, msg = g.step(action)
+                    if not ok:
+                        print(f"Erro na jogada: {msg}. Tente novamente.")
+
+            elif cmd.startswith('c'):
                 parts = cmd_raw.split()
                 if len(parts) < 3:
                     print("Uso: c <CidadeA> <CidadeB>"); 
                     continue
                 
-                success, msg = g.claim_route(p, parts[1], parts[2])
+                success, msg = g.step((CLAIM, parts[1], parts[2]))
                 print(msg)
-                if success:
-                    action_taken = True
-                # Se não teve sucesso (success=False), o loop continua e o jogador tenta de novo.
+                # Se não teve sucesso, o loop continua e o jogador tenta de novo.
+
+            elif cmd == 't':
+                ok, msg = g.step((DRAW_TICKETS,))
+                if not ok:
+                    print(msg)
+                    continue
+                choose_tickets(g, p)
+
+            elif cmd == 'p':
+                g.step((PASS,))
+
+            elif cmd.split()[0] == 'h':
+                # Dica: não gasta o turno
+                parts = cmd_raw.split()
+                if len(parts) < 3:
+                    print("Uso: h <CidadeA> <CidadeB>")
+                    continue
+                print_plan(g, parts[1], parts[2])
+
+            elif cmd.split()[0] == 's':
+                paths = save_paths(cmd_raw.split()[1] if len(cmd_raw.split()) > 1 else None)
+                g.save(*paths)
+                print(f"Jogo salvo em {paths[0]} (as próximas jogadas também são gravadas).")
+
+            elif cmd.split()[0] == 'l':
+                paths = save_paths(cmd_raw.split()[1] if len(cmd_raw.split()) > 1 else None)
+                try:
+                    g = Game.load(*paths)
+                except (OSError, ValueError) as e:
+                    print(f"Erro ao carregar: {e}")
+                    continue
+                print("Jogo carregado.")
+                bots = {}
+                break
 
-            elif cmd_raw == 'q':
+            elif cmd == 'q':
                 print("Saindo...")
                 return # Encerra o programa
             
             else:
-                print("Comando desconhecido. Opções: [d]raw, [c]laim <A> <B>, [q]uit")
+                print("Comando desconhecido. Opções: [d]raw, [c]laim <A> <B>, [t]ickets, [p]ass, [h]int <A> <B>, [s]ave [nome], [l]oad [nome], [q]uit")
 
-        g.next_turn()
+    print("\n=== Fim de jogo ===")
+    for i, (pl, total, bonus) in enumerate(zip(g.players, g.final_scores(), g.longest_bonus())):
+        extra = f", +{bonus} maior caminho ({g.trails.length(i)})" if bonus else ""
+        print(f"{pl.name}: {total} pts ({pl.score} em rotas, {g.network.score(i):+d} em bilhetes{extra})")
+    print("Vencedor(es):", ", ".join(g.players[i].name for i in g.winners()))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,292 @@
+# Torneio entre políticas: agenda as partidas (todos contra todos ou suíço),
+# joga em um pool de processos com baralhos por semente, grava cada resultado
+# assim que termina (JSON Lines) e mantém um Elo atualizado com intervalo de
+# confiança. Se o torneio for interrompido, rodar de novo com o mesmo arquivo
+# continua de onde parou, sem rejogar as partidas já gravadas.
+#
+#   python tournament.py greedy random bots:mcts_policy --games 20 -o torneio.jsonl
+#   python tournament.py greedy random --formato suico --rodadas 5 -o suico.jsonl
+import argparse, itertools, json, math, os, random, sys, time
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from policies import get_policy
+from simulate import play_game
+
+ELO_INICIAL = 1500.0
+Z95 = 1.96
+
+
+class Elo:
+    """Elo por participante, atualizado partida a partida.
+
+    Partidas com mais de dois assentos viram confrontos dois a dois pela
+    pontuação final (vitória 1, empate 0.5), com K dividido pelo número de
+    adversários. Os resultados são aplicados na ordem dos ids das partidas
+    (um buffer segura os que chegam fora de ordem), então o Elo final é o
+    mesmo com qualquer número de workers e depois de retomar o torneio.
+    """
+
+    def __init__(self, entrants: Iterable[str], k: float = 16.0):
+        self.k = k
+        self.rating: Dict[str, float] = {e: ELO_INICIAL for e in entrants}
+        # Placar acumulado por participante: pontos (0..1 por confronto), confrontos e soma do Elo dos adversários
+        self.points: Dict[str, float] = {e: 0.0 for e in self.rating}
+        self.bouts: Dict[str, int] = {e: 0 for e in self.rating}
+        self.games: Dict[str, int] = {e: 0 for e in self.rating}
+        self.opp_sum: Dict[str, float] = {e: 0.0 for e in self.rating}
+        self.applied = 0
+        self._next = 0
+        self._pending: Dict[int, Dict] = {}
+
+    def push(self, result: Dict):
+        self._pending[result["game"]] = result
+        while self._next in self._pending:
+            self._apply(self._pending.pop(self._next))
+            self._next += 1
+
+    def _apply(self, result: Dict):
+        seats, scores = result["entrants"], result["scores"]
+        n = len(seats)
+        k = self.k / max(1, n - 1)
+        before = [self.rating[e] for e in seats]
+        delta = [0.0] * n
+        for i, j in itertools.combinations(range(n), 2):
+            actual = 1.0 if scores[i] > scores[j] else 0.0 if scores[i] < scores[j] else 0.5
+            expected = 1.0 / (1.0 + 10 ** ((before[j] - before[i]) / 400))
+            delta[i] += k * (actual - expected)
+            delta[j] -= k * (actual - expected)
+            for a, b, s in ((i, j, actual), (j, i, 1.0 - actual)):
+                self.points[seats[a]] += s
+                self.bouts[seats[a]] += 1
+                self.opp_sum[seats[a]] += before[b]
+        for i, e in enumerate(seats):
+            self.rating[e] += delta[i]
+            self.games[e] += 1
+        self.applied += 1
+
+    def interval(self, e: str) -> Tuple[float, float]:
+        # Wilson (95%) sobre a taxa de pontos nos confrontos, convertido em diferença de Elo
+        # (medida a partir do centro do intervalo) e aplicado em torno do Elo atual
+        n = self.bouts[e]
+        if n == 0:
+            return (-math.inf, math.inf)
+        p = self.points[e] / n
+        center = (p + Z95 ** 2 / (2 * n)) / (1 + Z95 ** 2 / n)
+        half = Z95 * math.sqrt(p * (1 - p) / n + Z95 ** 2 / (4 * n * n)) / (1 + Z95 ** 2 / n)
+        r = self.rating[e]
+        mid = elo_diff(center)
+        return (r + elo_diff(center - half) - mid, r + elo_diff(center + half) - mid)
+
+    def standings(self) -> List[str]:
+        return sorted(self.rating, key=lambda e: (-self.rating[e], e))
+
+
+def elo_diff(p: float) -> float:
+    # Diferença de Elo que dá taxa de pontos p (limitada para não estourar em 0 e 1)
+    p = min(max(p, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / p - 1)
+
+
+def table_games(table: Tuple[str, ...], deals: int, seed: int, first_id: int) -> List[Tuple]:
+    # Cada mesa joga `deals` baralhos; cada baralho é jogado uma vez em cada rotação
+    # dos assentos, para que ninguém leve vantagem pela ordem ou pelas cartas
+    tasks = []
+    for d in range(deals):
+        for rot in range(len(table)):
+            seats = table[rot:] + table[:rot]
+            tasks.append((first_id + len(tasks), seed + d, list(seats)))
+    return tasks
+
+
+def round_robin(entrants: List[str], seats: int, deals: int, seed: int) -> List[Tuple]:
+    tasks = []
+    for t, table in enumerate(itertools.combinations(entrants, seats)):
+        tasks += table_games(table, deals, seed + t * deals, len(tasks))
+    return tasks
+
+
+def swiss_round(entrants: List[str], elo: Elo, seats: int, deals: int, seed: int,
+                rnd: int, first_id: int) -> List[Tuple]:
+    # Mesas de participantes com pontuação parecida; empates sorteados pela semente da
+    # rodada. Se o número não for divisível pelos assentos, folgam os que jogaram mais
+    # partidas (entre eles, os de menor pontuação), para a folga ir passando entre todos.
+    order = list(entrants)
+    random.Random(seed * 7919 + rnd).shuffle(order)
+    order.sort(key=lambda e: -elo.points[e])
+    extra = len(order) % seats
+    if extra:
+        bye = sorted(reversed(order), key=lambda e: -elo.games[e])[:extra]
+        order = [e for e in order if e not in bye]
+    tasks = []
+    for t in range(len(order) // seats):
+        table = tuple(order[t * seats:(t + 1) * seats])
+        tasks += table_games(table, deals, seed + (rnd * len(order) + t) * deals, first_id + len(tasks))
+    return tasks
+
+
+def play(task: Tuple[int, int, List[str], int]) -> Dict:
+    result = play_game(task)
+    # `policies` guarda as especificações na ordem dos assentos
+    result["entrants"] = result.pop("policies")
+    del result["claims"]
+    return result
+
+
+class ResultsFile:
+    """Arquivo de resultados: um cabeçalho com a configuração e uma partida por linha.
+
+    Ao abrir um arquivo existente, confere a configuração, descarta uma linha
+    final cortada (queda no meio da escrita) e devolve as partidas já jogadas.
+    """
+
+    def __init__(self, path: Optional[str], config: Dict):
+        self.path = path
+        self.done: Dict[int, Dict] = {}
+        if path is None:
+            self.f = None
+            return
+        if os.path.exists(path) and os.path.getsize(path):
+            self._load(config)
+            self.f = open(path, "a", encoding="utf-8")
+        else:
+            self.f = open(path, "w", encoding="utf-8")
+            self._write({"tournament": config})
+
+    def _load(self, config: Dict):
+        with open(self.path, "r+", encoding="utf-8") as f:
+            good = 0
+            for n, line in enumerate(iter(f.readline, "")):
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith("\n"):
+                    break
+                if n == 0:
+                    if rec.get("tournament") != config:
+                        raise SystemExit(f"{self.path}: configuração diferente da do torneio gravado "
+                                         f"({rec.get('tournament')})")
+                else:
+                    self.done[rec["game"]] = rec
+                good = f.tell()
+            f.truncate(good)
+
+    def _write(self, rec: Dict):
+        self.f.write(json.dumps(rec) + "\n")
+        self.f.flush()
+
+    def add(self, result: Dict):
+        self.done[result["game"]] = result
+        if self.f is not None:
+            self._write(result)
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+
+
+class Tournament:
+    def __init__(self, args, entrants: List[str]):
+        self.args = args
+        self.entrants = entrants
+        self.elo = Elo(entrants, args.k)
+        config = {"entrants": entrants, "format": args.formato, "seats": args.assentos, "games": args.games,
+                  "rounds": args.rodadas, "seed": args.seed, "max_turns": args.max_turns}
+        self.results = ResultsFile(args.out, config)
+        self.resumed = len(self.results.done)
+        self.played = 0
+        self._last_report = time.perf_counter()
+
+    def run(self, pool: Optional[Pool]):
+        a = self.args
+        if a.formato == "todos":
+            self._play(pool, round_robin(self.entrants, a.assentos, a.games, a.seed))
+            return
+        first_id = 0
+        for rnd in range(a.rodadas):
+            # A rodada seguinte depende dos pontos desta: espera todas as partidas terminarem
+            tasks = swiss_round(self.entrants, self.elo, a.assentos, a.games, a.seed, rnd, first_id)
+            self._play(pool, tasks)
+            first_id += len(tasks)
+
+    def _play(self, pool: Optional[Pool], tasks: List[Tuple]):
+        done = self.results.done
+        for t in tasks:
+            if t[0] in done:
+                self.elo.push(done[t[0]])
+        pending = [(i, seed, seats, self.args.max_turns) for i, seed, seats in tasks if i not in done]
+        results = map(play, pending) if pool is None else pool.imap_unordered(play, pending, chunksize=1)
+        for r in results:
+            self.results.add(r)
+            self.elo.push(r)
+            self.played += 1
+            self._report()
+
+    def _report(self):
+        now = time.perf_counter()
+        if now - self._last_report < self.args.report:
+            return
+        self._last_report = now
+        leader = self.elo.standings()[0]
+        print(f"{len(self.results.done)} partidas | líder: {leader} ({self.elo.rating[leader]:.0f})", file=sys.stderr)
+
+    def print_table(self, out=sys.stdout):
+        elo = self.elo
+        print(f"{'#':>2} | {'participante':<24} | {'Elo':>6} | {'IC 95%':>13} | {'partidas':>8} | {'pontos %':>8} | {'adv. médio':>10}",
+              file=out)
+        for pos, e in enumerate(elo.standings(), 1):
+            lo, hi = elo.interval(e)
+            n = elo.bouts[e]
+            rate = 100 * elo.points[e] / n if n else 0.0
+            opp = elo.opp_sum[e] / n if n else ELO_INICIAL
+            print(f"{pos:>2} | {e:<24} | {elo.rating[e]:>6.0f} | {lo:>6.0f}–{hi:<6.0f} | {elo.games[e]:>8} | "
+                  f"{rate:>8.1f} | {opp:>10.0f}", file=out)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Torneio entre políticas com Elo")
+    ap.add_argument("entrants", nargs="+", help="políticas participantes (nome ou modulo:funcao)")
+    ap.add_argument("--formato", choices=("todos", "suico"), default="todos",
+                    help="todos contra todos ou suíço (mesas por pontuação)")
+    ap.add_argument("--assentos", type=int, default=2, help="jogadores por partida")
+    ap.add_argument("--games", type=int, default=10, help="baralhos por mesa (cada um jogado em todas as rotações)")
+    ap.add_argument("--rodadas", type=int, default=5, help="rodadas do suíço")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-k", type=float, default=16.0, help="fator K do Elo")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--max-turns", type=int, default=500)
+    ap.add_argument("--report", type=float, default=5.0, help="segundos entre linhas de progresso")
+    ap.add_argument("-o", "--out", help="arquivo .jsonl de resultados (também usado para retomar)")
+    args = ap.parse_args(argv)
+
+    entrants = list(dict.fromkeys(args.entrants))
+    for name in entrants:
+        get_policy(name)  # falha cedo se o nome estiver errado
+    if not 2 <= args.assentos <= len(entrants):
+        ap.error("--assentos deve estar entre 2 e o número de participantes")
+    if args.formato == "todos":
+        args.rodadas = 0  # não faz parte da configuração do todos contra todos
+
+    t = Tournament(args, entrants)
+    if t.resumed:
+        print(f"retomando: {t.resumed} partidas já gravadas em {args.out}", file=sys.stderr)
+    start = time.perf_counter()
+    try:
+        if args.workers <= 1:
+            t.run(None)
+        else:
+            with Pool(args.workers) as pool:
+                t.run(pool)
+    except KeyboardInterrupt:
+        print(f"\ninterrompido: {len(t.results.done)} partidas gravadas; rode de novo para continuar", file=sys.stderr)
+    finally:
+        t.results.close()
+    elapsed = time.perf_counter() - start
+    rate = t.played / elapsed if elapsed else float("inf")
+    print(f"{t.played} partidas jogadas em {elapsed:.2f}s ({rate:.1f} partidas/s, {args.workers} workers)", file=sys.stderr)
+    t.print_table()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# Núcleo compartilhado entre a versão CLI e a versão web-flask.
+from .route_index import RouteIndex
+from .topology import MapError, MapTopology, RouteSpec, TicketSpec, load_map
+from .hand import Hand
+from .deck import CardDeck, FaceUpMarket
+from .journal import Journal
+from .moves import MoveGenerator, best_payment
+from .planner import Plan, RoutePlanner
+from .odds import DrawOdds
+from .tickets import TicketDeck, TicketTracker, UnionFind
+from .longest import TrailTracker, longest_trail
+from .mcts import GameModel, MCTSBot
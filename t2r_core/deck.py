@@ -0,0 +1,171 @@
+import random
+from array import array
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+Color = Hashable
+
+
+# cores -> (paleta, código de cada cor); não altere os devolvidos
+_palettes: Dict[Tuple[Color, ...], Tuple[Tuple[Color, ...], Dict[Color, int]]] = {}
+
+
+def _palette(colors: Tuple[Color, ...]) -> Tuple[Tuple[Color, ...], Dict[Color, int]]:
+    found = _palettes.get(colors)
+    if found is None:
+        found = _palettes.setdefault(colors, (colors, {c: i for i, c in enumerate(colors)}))
+    return found
+
+
+class CardDeck:
+    """Baralho compacto: cada carta é um código inteiro pequeno em um `array`.
+
+    `palette[code]` é a cor correspondente (string na CLI, `Cor` na web).
+    Compra pelo fim do array (O(1)), reembaralha o descarte no lugar e usa um
+    `random.Random` próprio, então cada jogo é reproduzível pela sua semente.
+    Paleta e códigos são compartilhados entre baralhos com as mesmas cores.
+    """
+
+    __slots__ = ("palette", "codes", "rng", "cards", "discard")
+
+    def __init__(self, composition: Sequence[Tuple[Color, int]], seed: Optional[int] = None):
+        self.palette, self.codes = _palette(tuple(c for c, _ in composition))
+        self.rng = random.Random(seed)
+        self.cards = array("B")
+        for code, (_, n) in enumerate(composition):
+            self.cards.extend([code] * n)
+        self.discard = array("B")
+        self.shuffle()
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def shuffle(self):
+        self.rng.shuffle(self.cards)
+
+    def draw_code(self) -> Optional[int]:
+        if not self.cards:
+            if not self.discard:
+                return None  # Fim do baralho
+            self._reshuffle_discard()
+        return self.cards.pop()
+
+    def draw(self) -> Optional[Color]:
+        code = self.draw_code()
+        return None if code is None else self.palette[code]
+
+    def discard_code(self, code: int, n: int = 1):
+        self.discard.extend([code] * n)
+
+    def discard_color(self, color: Color, n: int = 1):
+        self.discard_code(self.codes[color], n)
+
+    def _reshuffle_discard(self):
+        # Troca os arrays em vez de copiar: o descarte vira o monte
+        self.cards, self.discard = self.discard, self.cards
+        self.shuffle()
+
+    # --- Estado (snapshots) ---
+    def to_state(self) -> Dict:
+        version, internal, gauss = self.rng.getstate()
+        return {"cards": self.cards.tolist(), "discard": self.discard.tolist(),
+                "rng": [version, list(internal), gauss]}
+
+    def load_state(self, state: Dict):
+        self.cards = array("B", state["cards"])
+        self.discard = array("B", state["discard"])
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+
+    def count_by_color(self, discard: bool = False) -> Dict[Color, int]:
+        # Contagem do monte (ou do descarte) sem expandir as cartas em cores
+        pile = self.discard if discard else self.cards
+        return {color: n for color, n in ((c, pile.count(i)) for i, c in enumerate(self.palette)) if n}
+
+
+class FaceUpMarket:
+    """Cartas abertas com contagem corrente de locomotivas.
+
+    Com `max_locomotives` definido, o mercado é reciclado quando atinge esse
+    número de locomotivas, no máximo `max_recycles` vezes seguidas, para não
+    entrar em laço quando o baralho restante é quase só locomotivas.
+    """
+
+    __slots__ = ("deck", "loco_code", "size", "max_locomotives", "max_recycles", "slots", "locomotives",
+                 "recycles", "changes")
+
+    def __init__(self, deck: CardDeck, locomotive: Color, size: int = 5,
+                 max_locomotives: Optional[int] = 3, max_recycles: int = 3, fill: bool = True):
+        self.deck = deck
+        self.loco_code = deck.codes[locomotive]
+        self.size = size
+        self.max_locomotives = max_locomotives
+        self.max_recycles = max_recycles
+        self.slots = array("B")
+        self.locomotives = 0
+        self.recycles = 0  # total de reciclagens (para quem quiser avisar o jogador)
+        self.changes = 0   # cresce a cada mudança nas abertas (invalida caches)
+        if fill:  # fill=False ao restaurar de um snapshot (ver load_state)
+            self.refill()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def colors(self) -> List[Color]:
+        return [self.deck.palette[c] for c in self.slots]
+
+    def color_at(self, idx: int) -> Color:
+        return self.deck.palette[self.slots[idx]]
+
+    def to_state(self) -> Dict:
+        return {"slots": self.slots.tolist(), "recycles": self.recycles, "changes": self.changes}
+
+    def load_state(self, state: Dict):
+        self.slots = array("B", state["slots"])
+        self.locomotives = sum(1 for c in self.slots if c == self.loco_code)
+        self.recycles = state["recycles"]
+        self.changes = state["changes"]
+
+    def take(self, idx: int) -> Color:
+        code = self.slots[idx]
+        self.changes += 1
+        if code == self.loco_code:
+            self.locomotives -= 1
+        new = self.deck.draw_code()
+        if new is None:
+            del self.slots[idx]
+        else:
+            self.slots[idx] = new
+            if new == self.loco_code:
+                self.locomotives += 1
+        self._check_locomotives()
+        return self.deck.palette[code]
+
+    def refill(self):
+        self.changes += 1
+        while len(self.slots) < self.size:
+            code = self.deck.draw_code()
+            if code is None:
+                break  # Para se o baralho acabar
+            self.slots.append(code)
+            if code == self.loco_code:
+                self.locomotives += 1
+        self._check_locomotives()
+
+    def _check_locomotives(self):
+        if self.max_locomotives is None:
+            return
+        attempts = 0
+        while self.locomotives >= self.max_locomotives and attempts < self.max_recycles:
+            attempts += 1
+            self.recycles += 1
+            self.changes += 1
+            self.deck.discard.extend(self.slots)
+            del self.slots[:]
+            self.locomotives = 0
+            while len(self.slots) < self.size:
+                code = self.deck.draw_code()
+                if code is None:
+                    break
+                self.slots.append(code)
+                if code == self.loco_code:
+                    self.locomotives += 1
@@ -0,0 +1,92 @@
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+Color = Hashable
+
+
+class Hand:
+    """Mão de cartas de vagão guardada como contagem por cor.
+
+    Contagens são O(1); `pay` desconta vários cartões de uma vez (tudo ou nada)
+    e `refund` desfaz um pagamento. `version` muda a cada alteração da mão.
+    """
+
+    __slots__ = ("_counts", "_total", "version")
+
+    def __init__(self, colors: Iterable[Color] = ()):
+        self._counts: Dict[Color, int] = {}
+        self._total = 0
+        self.version = 0
+        for c in colors:
+            self.add(c)
+
+    @classmethod
+    def from_counts(cls, counts: Mapping[Color, int]) -> "Hand":
+        hand = cls()
+        for c, n in counts.items():
+            hand.add(c, n)
+        return hand
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __repr__(self) -> str:
+        return f"Hand({self.as_dict()!r})"
+
+    def add(self, color: Color, n: int = 1):
+        if n < 0:
+            raise ValueError("quantidade negativa")
+        self._counts[color] = self._counts.get(color, 0) + n
+        self._total += n
+        self.version += 1
+
+    def count(self, color: Color) -> int:
+        return self._counts.get(color, 0)
+
+    def counts(self, colors: Iterable[Color]) -> List[int]:
+        get = self._counts.get
+        return [get(c, 0) for c in colors]
+
+    def items(self) -> List[Tuple[Color, int]]:
+        return [(c, n) for c, n in self._counts.items() if n > 0]
+
+    def as_dict(self) -> Dict[Color, int]:
+        return dict(self.items())
+
+    def colors(self) -> List[Color]:
+        # Expande a mão em uma carta por entrada (para exibição)
+        return [c for c, n in self._counts.items() for _ in range(n)]
+
+    # --- Pagamento ---
+    def can_pay(self, payment: Mapping[Color, int]) -> bool:
+        return all(n >= 0 and self._counts.get(c, 0) >= n for c, n in payment.items())
+
+    def pay(self, payment: Mapping[Color, int]) -> Dict[Color, int]:
+        if not self.can_pay(payment):
+            raise ValueError("not enough cards")
+        paid = {}
+        for c, n in payment.items():
+            if n:
+                self._counts[c] -= n
+                self._total -= n
+                paid[c] = n
+        self.version += 1
+        return paid
+
+    def refund(self, payment: Mapping[Color, int]):
+        for c, n in payment.items():
+            self.add(c, n)
+
+    def payment_for(self, color: Color, n: int, wildcard: Color) -> Optional[Dict[Color, int]]:
+        # Usa primeiro as cartas da cor pedida e completa com curingas (locomotivas)
+        if color == wildcard:
+            return {wildcard: n} if self.count(wildcard) >= n else None
+        own = min(self.count(color), n)
+        loco = n - own
+        if loco > self.count(wildcard):
+            return None
+        payment = {}
+        if own:
+            payment[color] = own
+        if loco:
+            payment[wildcard] = payment.get(wildcard, 0) + loco
+        return payment
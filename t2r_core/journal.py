@@ -0,0 +1,87 @@
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Journal:
+    """Log de eventos append-only (JSON Lines) com snapshots periódicos.
+
+    Cada linha é `[seq, evento]`. O snapshot guarda o estado completo, o `seq`
+    do último evento aplicado e o offset do log naquele momento, então para
+    restaurar basta ler o snapshot e reaplicar só as linhas depois do offset.
+    """
+
+    def __init__(self, log_path: str, snapshot_path: str, snapshot_every: int = 500, fsync: bool = False):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.seq = 0
+        self._fh = None
+
+    # --- Escrita ---
+    def start(self, state: Dict, seq: int = 0):
+        # Começa um log novo a partir do estado atual
+        self.close()
+        self.seq = seq
+        self._fh = open(self.log_path, "wb")
+        self.snapshot(state)
+
+    def record(self, event: Any, state_fn: Optional[Callable[[], Dict]] = None) -> int:
+        self.seq += 1
+        self._fh.write(json.dumps([self.seq, event], separators=(",", ":")).encode() + b"\n")
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
+        if state_fn is not None and self.seq % self.snapshot_every == 0:
+            self.snapshot(state_fn())
+        return self.seq
+
+    def snapshot(self, state: Dict):
+        data = {"seq": self.seq, "offset": self._fh.tell(), "state": state}
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.snapshot_path)  # troca atômica: nunca fica um snapshot pela metade
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def remove(self):
+        self.close()
+        for path in (self.log_path, self.snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # --- Leitura ---
+    def load(self) -> Tuple[Dict, List[Any]]:
+        """Devolve (estado do snapshot, eventos posteriores) e reabre o log para append.
+
+        Uma última linha incompleta (queda no meio da escrita) é descartada.
+        """
+        with open(self.snapshot_path) as f:
+            snap = json.load(f)
+        events = []
+        seq = snap["seq"]
+        good = snap["offset"]
+        with open(self.log_path, "rb") as f:
+            f.seek(good)
+            for line in f:
+                try:
+                    seq, event = json.loads(line)
+                except ValueError:
+                    break
+                events.append(event)
+                good += len(line)
+        self.close()
+        self._fh = open(self.log_path, "r+b")
+        self._fh.truncate(good)
+        self._fh.seek(good)
+        self.seq = seq
+        return snap["state"], events
+
+    @staticmethod
+    def exists(snapshot_path: str) -> bool:
+        return os.path.exists(snapshot_path)
@@ -0,0 +1,315 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .tickets import UnionFind
+
+Edge = Tuple[Hashable, Hashable, int]  # (cidade, cidade, comprimento)
+
+# Passos (nós da busca e subconjuntos do emparelhamento) por rota reivindicada
+# no modo ao vivo (TrailTracker). A busca exata é exponencial no pior caso; com
+# o orçamento, cada rota custa no máximo uns 10 ms e o fim de jogo
+# termina o que ficou aberto.
+LIVE_BUDGET = 1000
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+def longest_trail(edges: Iterable[Edge]) -> int:
+    """Comprimento do maior caminho contínuo (sem repetir rota) de uma rede.
+
+    Exato: separa a rede em componentes e resolve cada um com
+    `component_longest_trail`.
+    """
+    uf = UnionFind()
+    edges = list(edges)
+    for a, b, _ in edges:
+        uf.union(a, b)
+    components: Dict[Hashable, List[Edge]] = {}
+    for e in edges:
+        components.setdefault(uf.find(e[0]), []).append(e)
+    return max((component_longest_trail(c) for c in components.values()), default=0)
+
+
+def component_longest_trail(edges: Sequence[Edge], known: int = 0) -> int:
+    """Maior caminho de um componente conexo (ver `solve_component`)."""
+    return solve_component(edges, known)[0]
+
+
+def solve_component(edges: Sequence[Edge], known: int = 0, budget: Optional[int] = None) -> Tuple[int, bool]:
+    """(maior caminho, exato?) de um componente conexo (problema NP-difícil em geral).
+
+    Poda pelos graus: um caminho máximo que não usa todas as rotas começa e
+    termina em vértices de grau ímpar, então
+      - com 0 ou 2 vértices ímpares há caminho euleriano: a resposta é o total;
+      - senão a busca só parte dos ímpares e os vértices de grau 2 viram uma
+        aresta só (o caminho nunca termina neles).
+    A busca é um branch and bound com as rotas em bitmasks. As rotas que
+    ficam de fora precisam acertar a paridade de todos os vértices ímpares
+    menos o fim do caminho, então custam pelo menos um emparelhamento mínimo
+    desses vértices pelas distâncias do grafo; esse é o limite da poda.
+    Estados com as mesmas rotas livres ao alcance são podados por dominância.
+    `known` é um caminho que já se sabe existir e só serve para podar mais cedo.
+    Com `budget`, a busca para depois desse número de passos e devolve o maior
+    caminho achado até ali (um caminho que existe) com exato = False.
+    """
+    total = sum(length for _, _, length in edges)
+    degree: Dict[Hashable, int] = {}
+    for a, b, _ in edges:
+        degree[a] = degree.get(a, 0) + 1
+        degree[b] = degree.get(b, 0) + 1
+    odd = [v for v, d in degree.items() if d % 2]
+    if len(odd) <= 2:
+        return total, True
+    edges = _contract(list(edges), degree)
+
+    index = {v: i for i, v in enumerate(dict.fromkeys(v for a, b, _ in edges for v in (a, b)))}
+    n = len(index)
+    adj: List[List[Tuple[int, int, int, int]]] = [[] for _ in range(n)]
+    dist = [[0 if i == j else total for j in range(n)] for i in range(n)]
+    for bit, (a, b, length) in enumerate(edges):
+        i, j = index[a], index[b]
+        flip = (1 << i) ^ (1 << j)
+        adj[i].append((j, 1 << bit, length, flip))
+        if i != j:
+            adj[j].append((i, 1 << bit, length, flip))
+            dist[i][j] = dist[j][i] = min(dist[i][j], length)
+    for options in adj:
+        options.sort(key=lambda o: -o[2])  # rotas longas primeiro: bom limite cedo
+    for k in range(n):
+        dk = dist[k]
+        for di in dist:
+            via = di[k]
+            for j in range(n):
+                if via + dk[j] < di[j]:
+                    di[j] = via + dk[j]
+
+    odd_mask = sum(1 << index[v] for v in odd)
+    steps_left = budget
+
+    def pairing(unmatched: List[int]):
+        # Emparelhamento mínimo das cidades deixando uma de fora, que custa
+        # `unmatched[cidade]` (a distância dela até um fim de caminho permitido)
+        memo: Dict[int, int] = {0: total}
+
+        def cost(cities: int) -> int:
+            nonlocal steps_left
+            found = memo.get(cities)
+            if found is not None:
+                return found
+            if steps_left is not None:
+                steps_left -= 1
+                if steps_left < 0:
+                    raise _OutOfBudget
+            i = (cities & -cities).bit_length() - 1
+            rest = cities & (cities - 1)
+            found = unmatched[i] + paired(rest)
+            others = rest
+            while others:
+                low = others & -others
+                others ^= low
+                found = min(found, dist[i][low.bit_length() - 1] + cost(rest ^ low))
+            memo[cities] = found
+            return found
+
+        return cost
+
+    pairs: Dict[int, int] = {0: 0}
+
+    def paired(cities: int) -> int:
+        # Emparelhamento perfeito mínimo (número par de cidades)
+        nonlocal steps_left
+        found = pairs.get(cities)
+        if found is not None:
+            return found
+        if steps_left is not None:
+            steps_left -= 1
+            if steps_left < 0:
+                raise _OutOfBudget
+        i = (cities & -cities).bit_length() - 1
+        rest = cities & (cities - 1)
+        found = total
+        others = rest
+        while others:
+            low = others & -others
+            others ^= low
+            found = min(found, dist[i][low.bit_length() - 1] + paired(rest ^ low))
+        pairs[cities] = found
+        return found
+
+    incident = [0] * n
+    for i, options in enumerate(adj):
+        for _, mask, _, _ in options:
+            incident[i] |= mask
+
+    def split(v: int, w: int, free: int) -> Tuple[int, int, int]:
+        # Componente de w nas rotas livres, ou nada se ele ainda chega em v
+        room, seen_free, cities, stack = 0, 0, 1 << w, [w]
+        while stack:
+            for x, mask, length, _ in adj[stack.pop()]:
+                if free & mask and not seen_free & mask:
+                    if x == v:
+                        return -1, 0, 0
+                    seen_free |= mask
+                    room += length
+                    if not cities >> x & 1:
+                        cities |= 1 << x
+                        stack.append(x)
+        return room, seen_free, cities
+
+    seen: Dict[int, int] = {}
+    best = known
+
+    def search(v: int, walked: int, odd_free: int, free: int, room: int, cities: int):
+        # O futuro só depende das rotas livres ao alcance de v: quem já chegou
+        # ao mesmo ponto andando pelo menos o mesmo não precisa ser repetido
+        nonlocal best, steps_left
+        if steps_left is not None:
+            steps_left -= 1
+            if steps_left < 0:
+                raise _OutOfBudget
+        if walked > best:
+            best = walked
+        key = free * n + v
+        if seen.get(key, -1) >= walked:
+            return
+        seen[key] = walked
+        for w, mask, length, flip in adj[v]:
+            if not free & mask:
+                continue
+            now_free = free ^ mask
+            now_room, now_cities = room - length, cities
+            if v != w:
+                cut_room, cut_free, cut_cities = split(v, w, now_free)
+                if cut_room >= 0:  # a rota era ponte: o lado de v fica para trás
+                    now_room, now_free, now_cities = cut_room, cut_free, cut_cities
+                elif not now_free & incident[v]:
+                    now_cities &= ~(1 << v)
+            now_walked, now_odd = walked + length, odd_free ^ flip
+            if now_room and now_walked + now_room - bound((now_odd & now_cities) ^ (1 << w)) <= best:
+                continue
+            search(w, now_walked, now_odd, now_free, now_room, now_cities)
+            if best >= ceiling:
+                return
+
+    # Maior teto primeiro, para achar logo um bom caminho. Cada caminho seria
+    # achado pelas duas pontas, então partindo de um ímpar o fim só pode ser
+    # um dos ímpares seguintes
+    starts = [index[v] for v in odd]
+    everything, every_city = (1 << len(edges)) - 1, (1 << n) - 1
+    try:
+        loose = pairing([0] * n)
+        starts.sort(key=lambda v: loose(odd_mask ^ (1 << v)))
+        for i, start in enumerate(starts[:-1]):
+            ends = starts[i + 1:]
+            bound = pairing([min(dist[x][e] for e in ends) for x in range(n)])
+            ceiling = total - bound(odd_mask ^ (1 << start))
+            if ceiling <= best:
+                continue
+            search(start, 0, odd_mask, everything, total, every_city)
+            if best >= ceiling:
+                seen.clear()  # a busca parou no meio: os estados não foram esgotados
+    except _OutOfBudget:
+        return best, False
+    return best, True
+
+
+def _contract(edges: List[Edge], degree: Dict[Hashable, int]) -> List[Edge]:
+    # Junta as duas rotas de cada vértice de grau 2 numa rota só (laços ficam)
+    incident: Dict[Hashable, List[int]] = {}
+    for i, (a, b, _) in enumerate(edges):
+        incident.setdefault(a, []).append(i)
+        if a != b:
+            incident.setdefault(b, []).append(i)
+    alive = [True] * len(edges)
+    for v, d in degree.items():
+        if d != 2 or len(incident[v]) != 2:
+            continue
+        i, j = (k for k in incident[v] if alive[k])
+        (a1, b1, l1), (a2, b2, l2) = edges[i], edges[j]
+        x = b1 if a1 == v else a1
+        y = b2 if a2 == v else a2
+        alive[i] = alive[j] = False
+        edges.append((x, y, l1 + l2))
+        alive.append(True)
+        new = len(edges) - 1
+        for end, old in ((x, i), (y, j)):
+            incident[end] = [new if k == old else k for k in incident[end]]
+    return [e for e, ok in zip(edges, alive) if ok]
+
+
+class TrailTracker:
+    """Maior caminho de cada jogador, atualizado a cada rota (modo ao vivo).
+
+    Uma rota nova só muda o componente da rede do jogador em que ela entra;
+    os demais componentes guardam o resultado já calculado. A busca de cada
+    rota tem um orçamento de `budget` passos: se não termina, o componente fica
+    com o maior caminho achado (um limite inferior) e marcado como aberto.
+    `exact=True` em `length`/`leaders` termina as buscas abertas, sem limite
+    (exponencial no pior caso); é o que vale para o bônus no fim do jogo.
+    """
+
+    __slots__ = ("budget", "_networks", "_edges", "_best", "_open")
+
+    def __init__(self, budget: Optional[int] = LIVE_BUDGET):
+        self.budget = budget
+        self._networks: Dict[Hashable, UnionFind] = {}
+        self._edges: Dict[Hashable, Dict[Hashable, List[Edge]]] = {}  # jogador -> raiz -> rotas
+        self._best: Dict[Hashable, Dict[Hashable, int]] = {}          # jogador -> raiz -> maior caminho
+        self._open: Dict[Hashable, Set[Hashable]] = {}                # jogador -> raízes com busca cortada
+
+    def add(self, player: Hashable, a: Hashable, b: Hashable, length: int) -> int:
+        """Registra a rota e devolve o novo maior caminho do jogador."""
+        uf = self._networks.setdefault(player, UnionFind())
+        edges = self._edges.setdefault(player, {})
+        best = self._best.setdefault(player, {})
+        ra, rb = uf.find(a), uf.find(b)
+        merged = edges.pop(ra, []) + (edges.pop(rb, []) if rb != ra else [])
+        # Os caminhos dos componentes antigos continuam existindo
+        known = max(best.pop(ra, 0), best.pop(rb, 0))
+        uf.union(a, b)
+        root = uf.find(a)
+        merged.append((a, b, length))
+        edges[root] = merged
+        best[root], exact = solve_component(merged, known, self.budget)
+        open_roots = self._open.setdefault(player, set())
+        open_roots.difference_update((ra, rb))
+        if not exact:
+            open_roots.add(root)
+        return self.length(player)
+
+    def length(self, player: Hashable, exact: bool = False) -> int:
+        best = self._best.get(player, {})
+        if exact:
+            for root in self._open.pop(player, ()):
+                best[root] = component_longest_trail(self._edges[player][root], best[root])
+        return max(best.values(), default=0)
+
+    def _ceiling(self, player: Hashable) -> int:
+        # Teto do maior caminho: um componente aberto não passa do total das rotas dele
+        best, edges = self._best.get(player, {}), self._edges.get(player, {})
+        return max((sum(e[2] for e in edges[root]) if root in self._open.get(player, ()) else n
+                    for root, n in best.items()), default=0)
+
+    def leaders(self, players: Iterable[Hashable], exact: bool = False) -> Tuple[int, List[Hashable]]:
+        """(maior comprimento, jogadores que o têm); ninguém se não há rotas.
+
+        Com `exact`, só termina as buscas de quem ainda alcança o maior
+        comprimento conhecido; os outros não mudam o resultado.
+        """
+        lengths = {p: self.length(p) for p in players}
+        if exact:
+            for p in sorted(lengths, key=self._ceiling, reverse=True):
+                if self._open.get(p) and self._ceiling(p) >= max(lengths.values()):
+                    lengths[p] = self.length(p, exact=True)
+        top = max(lengths.values(), default=0)
+        return top, [p for p, n in lengths.items() if top and n == top]
+
+    def rename(self, old: Hashable, new: Hashable):
+        for table in (self._networks, self._edges, self._best, self._open):
+            if old in table:
+                table[new] = table.pop(old)
+
+    def forget(self, player: Hashable):
+        for table in (self._networks, self._edges, self._best, self._open):
+            table.pop(player, None)
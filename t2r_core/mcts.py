@@ -0,0 +1,181 @@
+import math
+import random
+import time
+from abc import ABC, abstractmethod
+from multiprocessing import Pool
+from typing import Dict, Hashable, List, Optional, Tuple
+
+Action = Hashable
+
+
+class GameModel(ABC):
+    """Interface que a busca usa para falar com um motor de jogo.
+
+    Cada frontend (CLI e web) implementa a sua; a busca só vê estados
+    serializáveis (`to_state`) e ações imutáveis (tuplas).
+    """
+
+    @abstractmethod
+    def state(self, game) -> Dict:
+        ...
+
+    @abstractmethod
+    def determinize(self, state: Dict, me: int, rng: random.Random):
+        """Monta um jogo a partir de `state` sorteando o que `me` não vê
+        (mãos dos outros e ordem do baralho)."""
+
+    @abstractmethod
+    def to_move(self, game) -> int:
+        ...
+
+    @abstractmethod
+    def legal_actions(self, game) -> List[Action]:
+        ...
+
+    @abstractmethod
+    def apply(self, game, action: Action):
+        ...
+
+    @abstractmethod
+    def is_over(self, game) -> bool:
+        ...
+
+    @abstractmethod
+    def rewards(self, game) -> List[float]:
+        """Recompensa por assento (1 para quem vence, dividido em caso de empate)."""
+
+    def rollout_action(self, game, rng: random.Random) -> Optional[Action]:
+        # None = ninguém pode jogar (o rollout para e avalia o placar atual)
+        legal = self.legal_actions(game)
+        return rng.choice(legal) if legal else None
+
+
+class _Node:
+    __slots__ = ("player", "children", "visits", "value", "avail")
+
+    def __init__(self, player: int = -1):
+        self.player = player  # assento que fez a ação que leva a este nó
+        self.children: Dict[Action, "_Node"] = {}
+        self.visits = 0
+        self.value = 0.0
+        self.avail = 0
+
+
+def search(model: GameModel, state: Dict, me: int, time_budget: float, max_iterations: Optional[int] = None,
+           seed: int = 0, c: float = 0.7, rollout_steps: int = 200) -> Tuple[Dict[Action, List[float]], int]:
+    """ISMCTS com um observador: cada iteração usa uma determinização nova.
+
+    Devolve ({ação da raiz: [visitas, valor]}, iterações feitas).
+    """
+    rng = random.Random(seed)
+    root = _Node()
+    deadline = time.perf_counter() + time_budget
+    iterations = 0
+    while (max_iterations is None or iterations < max_iterations) and time.perf_counter() < deadline:
+        iterations += 1
+        game = model.determinize(state, me, rng)
+        node, path = root, [root]
+        # Seleção/expansão: só entre as ações legais nesta determinização
+        while not model.is_over(game):
+            legal = model.legal_actions(game)
+            if not legal:
+                break
+            untried = [a for a in legal if a not in node.children]
+            player = model.to_move(game)
+            if untried:
+                action = rng.choice(untried)
+                child = node.children[action] = _Node(player)
+                for a in legal:
+                    if a in node.children:
+                        node.children[a].avail += 1
+                model.apply(game, action)
+                path.append(child)
+                break
+            best, best_score = None, -1.0
+            for a in legal:
+                child = node.children[a]
+                child.avail += 1
+                score = child.value / child.visits + c * math.sqrt(math.log(child.avail) / child.visits)
+                if score > best_score:
+                    best, best_score = a, score
+            model.apply(game, best)
+            node = node.children[best]
+            path.append(node)
+        # Rollout com a política padrão do modelo
+        steps = 0
+        while not model.is_over(game) and steps < rollout_steps:
+            action = model.rollout_action(game, rng)
+            if action is None:
+                break
+            model.apply(game, action)
+            steps += 1
+        rewards = model.rewards(game)
+        for n in path:
+            n.visits += 1
+            if n.player >= 0:
+                n.value += rewards[n.player]
+    stats = {a: [n.visits, n.value] for a, n in root.children.items()}
+    return stats, iterations
+
+
+def _search_task(args) -> Tuple[Dict[Action, List[float]], int]:
+    return search(*args)
+
+
+class MCTSBot:
+    """Escolhe ações com ISMCTS; com `workers > 1` roda árvores independentes
+    em um pool de processos (paralelismo na raiz) e soma as visitas."""
+
+    def __init__(self, model: GameModel, time_budget: float = 1.0, workers: int = 1,
+                 max_iterations: Optional[int] = None, c: float = 0.7, seed: int = 0):
+        self.model = model
+        self.time_budget = time_budget
+        self.workers = workers
+        self.max_iterations = max_iterations
+        self.c = c
+        self.rng = random.Random(seed)
+        self._pool = None
+        # Última jogada: {"rollouts", "seconds", "rollouts_per_s"}
+        self.last_stats: Dict[str, float] = {}
+
+    def choose(self, game) -> Optional[Action]:
+        return self.choose_state(self.model.state(game), self.model.to_move(game))
+
+    def choose_state(self, state: Dict, me: int) -> Optional[Action]:
+        """Como `choose`, a partir de um estado já copiado (`model.state`):
+        a busca pode rodar longe do jogo, em outra thread ou processo."""
+        # As ações do bot só dependem do que ele vê: qualquer determinização serve
+        legal = self.model.legal_actions(self.model.determinize(state, me, self.rng))
+        if not legal:
+            return None
+        if len(legal) == 1:
+            return legal[0]
+        seeds = [self.rng.getrandbits(32) for _ in range(self.workers)]
+        tasks = [(self.model, state, me, self.time_budget, self.max_iterations, s, self.c) for s in seeds]
+        start = time.perf_counter()
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = Pool(self.workers)
+            results = self._pool.map(_search_task, tasks)
+        else:
+            results = [_search_task(tasks[0])]
+        elapsed = time.perf_counter() - start
+        totals: Dict[Action, List[float]] = {}
+        rollouts = 0
+        for stats, iterations in results:
+            rollouts += iterations
+            for a, (visits, value) in stats.items():
+                t = totals.setdefault(a, [0, 0.0])
+                t[0] += visits
+                t[1] += value
+        self.last_stats = {"rollouts": rollouts, "seconds": elapsed,
+                           "rollouts_per_s": rollouts / elapsed if elapsed else 0.0}
+        candidates = [a for a in legal if a in totals]
+        if not candidates:
+            return legal[0]
+        return max(candidates, key=lambda a: (totals[a][0], totals[a][1]))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
@@ -0,0 +1,131 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .hand import Hand
+
+Color = Hashable
+Payment = Dict[Color, int]
+
+
+class MoveGenerator:
+    """Rotas que cada jogador pode reivindicar, com as opções de pagamento.
+
+    Guarda, por jogador, as opções de cada rota e a mão com que foram
+    calculadas. Se a mão não mudou (`Hand.version`), usa o cache; senão marca
+    para recálculo só as rotas das cores que mudaram (curinga muda todas;
+    qualquer cor muda as rotas de `any_color`), e cada rota marcada é
+    recalculada quando for consultada -- rotas já ocupadas nunca são. Os dicts
+    de pagamento são montados uma vez e compartilhados entre rotas e
+    jogadores (não altere os devolvidos).
+    """
+
+    __slots__ = ("routes", "colors", "wildcard", "any_color", "_tracked", "_color_index", "_by_color", "_payments",
+                 "_cache")
+
+    def __init__(self, routes: Sequence[Tuple[Color, int]], colors: Sequence[Color], wildcard: Color,
+                 any_color: Color):
+        self.routes = list(routes)
+        self.colors = [c for c in colors if c != wildcard]
+        self.wildcard = wildcard
+        self.any_color = any_color
+        self._tracked = self.colors + [wildcard]
+        self._color_index = {c: i for i, c in enumerate(self.colors)}
+        self._by_color: Dict[Color, List[int]] = {}
+        for rid, (color, _) in enumerate(self.routes):
+            self._by_color.setdefault(color, []).append(rid)
+        # (índice da cor, comprimento) -> pagamento por quantidade da cor (0 = só curingas)
+        self._payments: Dict[Tuple[int, int], List[Payment]] = {}
+        for length in {length for _, length in self.routes}:
+            for i, c in enumerate(self.colors):
+                self._payments[i, length] = [{wildcard: length}] + [
+                    {c: own, wildcard: length - own} if own < length else {c: own}
+                    for own in range(1, length + 1)]
+        # jogador -> [mão, versão da mão, contagens, opções por rota (None = recalcular)]
+        self._cache: Dict[Hashable, list] = {}
+
+    def fresh(self) -> "MoveGenerator":
+        """Gerador novo, sem jogadores, que compartilha as tabelas (imutáveis) deste."""
+        g = MoveGenerator.__new__(MoveGenerator)
+        for name in MoveGenerator.__slots__:
+            setattr(g, name, getattr(self, name))
+        g._cache = {}
+        return g
+
+    def _entry(self, player: Hashable, hand: Hand) -> list:
+        entry = self._cache.get(player)
+        if entry is not None and entry[0] is hand and entry[1] == hand.version:
+            return entry
+        counts = hand.counts(self._tracked)
+        if entry is None:
+            entry = self._cache[player] = [hand, hand.version, counts, [None] * len(self.routes)]
+            return entry
+        old, options = entry[2], entry[3]
+        if counts[-1] != old[-1]:
+            options[:] = [None] * len(self.routes)
+        else:
+            changed = [c for c, new, prev in zip(self.colors, counts, old) if new != prev]
+            if changed:
+                for rid in self._by_color.get(self.any_color, ()):
+                    options[rid] = None
+            for c in changed:
+                for rid in self._by_color.get(c, ()):
+                    options[rid] = None
+        entry[:3] = hand, hand.version, counts
+        return entry
+
+    def _route_options(self, rid: int, counts: List[int]) -> List[Payment]:
+        color, length = self.routes[rid]
+        need = length - counts[-1]
+        if color == self.any_color:
+            options = [self._payments[i, length][n if n < length else length]
+                       for i, n in enumerate(counts[:-1]) if n and n >= need]
+        elif color in self._color_index:
+            i = self._color_index[color]
+            n = counts[i]
+            options = [self._payments[i, length][n if n < length else length]] if n and n >= need else []
+        else:
+            options = []
+        if need <= 0:
+            options.append(self._payments[0, length][0])
+        return options
+
+    def route_options(self, player: Hashable, hand: Hand, rid: int) -> List[Payment]:
+        """Opções de pagamento da rota `rid` (livre ou não) para a mão atual."""
+        entry = self._entry(player, hand)
+        options = entry[3]
+        if options[rid] is None:
+            options[rid] = self._route_options(rid, entry[2])
+        return options[rid]
+
+    def options(self, player: Hashable, hand: Hand) -> List[List[Payment]]:
+        """Opções de pagamento de todas as rotas (livres ou não) para a mão atual."""
+        return [self.route_options(player, hand, rid) for rid in range(len(self.routes))]
+
+    def claims(self, player: Hashable, hand: Hand, wagons: int, free: Iterable[int]) -> List[Tuple[int, List[Payment]]]:
+        """[(id da rota, opções de pagamento)] para as rotas livres que o jogador pode pegar agora."""
+        entry = self._entry(player, hand)
+        counts, options = entry[2], entry[3]
+        out = []
+        for rid in free:
+            if self.routes[rid][1] > wagons:
+                continue
+            found = options[rid]
+            if found is None:
+                found = options[rid] = self._route_options(rid, counts)
+            if found:
+                out.append((rid, found))
+        return out
+
+    def forget(self, player: Hashable):
+        self._cache.pop(player, None)
+
+
+def best_payment(options: Sequence[Payment], hand: Hand, wildcard: Color) -> Optional[Payment]:
+    # A opção da cor que o jogador tem em maior quantidade (empate: a primeira);
+    # "só curingas" apenas quando não há outra
+    best, best_have = None, -1
+    for pay in options:
+        color = next((c for c in pay if c != wildcard), None)
+        have = hand.count(color) if color is not None else 0
+        if have > best_have:
+            best, best_have = pay, have
+    return best
@@ -0,0 +1,142 @@
+import random
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # sem NumPy o mesmo cálculo roda em Python puro (bem mais lento)
+    np = None
+
+from .hand import Hand
+
+Color = Hashable
+
+DRAWS_PER_TURN = 2
+MAX_CACHED = 16  # tabelas guardadas (as mais antigas saem primeiro)
+
+
+class DrawOdds:
+    """Chance de juntar as cartas de uma rota em até k turnos de compra (Monte Carlo).
+
+    O modelo segue o que o jogador sabe: as cartas que ele não vê (monte e mãos
+    dos adversários) saem em ordem aleatória e, quando o monte acaba, vem o
+    descarte reembaralhado. A cada turno ele pega duas cartas e, para uma rota
+    de cor, prefere as abertas dessa cor às do monte (a reposição das abertas
+    sai do mesmo monte). Locomotivas completam qualquer cor; uma rota cinza usa,
+    em cada sorteio, a cor que mais rende.
+
+    Com NumPy, todas as sequências de compra são sorteadas de uma vez e as
+    contagens acumuladas por cor respondem a todas as cores, comprimentos e
+    turnos juntos. A tabela fica em cache pelas contagens de entrada, então
+    repetir a consulta sem mudança no jogo não sorteia de novo.
+    """
+
+    __slots__ = ("colors", "wildcard", "any_color", "kinds", "max_length", "turns", "samples", "_np_rng", "_rng",
+                 "_cache")
+
+    def __init__(self, colors: Sequence[Color], wildcard: Color, any_color: Color, max_length: int = 6,
+                 turns: int = 2, samples: int = 4096, seed: Optional[int] = None):
+        self.colors = [c for c in colors if c != wildcard]
+        self.wildcard = wildcard
+        self.any_color = any_color
+        self.kinds = self.colors + [wildcard]  # tipos de carta; a locomotiva é o último
+        self.max_length = max_length
+        self.turns = turns
+        self.samples = samples
+        # Geradores próprios: consultar as chances não mexe no sorteio do jogo
+        self._np_rng = np.random.default_rng(seed) if np is not None else None
+        self._rng = random.Random(seed)
+        self._cache: Dict[Tuple, Dict[Tuple[Color, int], Tuple[float, ...]]] = {}
+
+    def table(self, hand: Hand, unseen: Mapping[Color, int], deck_size: int, discard: Mapping[Color, int],
+              face_up: Sequence[Color], wagons: int) -> Dict[Tuple[Color, int], Tuple[float, ...]]:
+        """(cor da rota, comprimento) -> chances em até 1..turns turnos de compra.
+
+        `unseen` são as cartas que o jogador não vê (monte + mãos dos outros),
+        `deck_size` quantas delas estão no monte e `discard` o descarte.
+        Rotas maiores que `wagons` ficam com chance zero.
+        """
+        kinds = self.kinds
+        key = (tuple(hand.counts(kinds)), tuple(unseen.get(c, 0) for c in kinds), deck_size,
+               tuple(discard.get(c, 0) for c in kinds), tuple(face_up.count(c) for c in self.colors),
+               min(wagons, self.max_length))
+        found = self._cache.get(key)
+        if found is None:
+            if len(self._cache) >= MAX_CACHED:
+                del self._cache[next(iter(self._cache))]
+            compute = self._compute if np is not None else self._compute_python
+            found = self._cache[key] = self._finish(compute(*key[:5]), key[5])
+        return found
+
+    def _finish(self, hits: Sequence, wagons: int) -> Dict[Tuple[Color, int], Tuple[float, ...]]:
+        # hits[k][cor][comprimento - 1]: sorteios em que deu certo; a última "cor" é a rota cinza
+        rows = [c for c in self.colors if c != self.any_color] + [self.any_color]
+        index = [i for i, c in enumerate(self.colors) if c != self.any_color] + [len(self.colors)]
+        zero = (0.0,) * self.turns
+        return {(color, length): tuple(float(hits[k][i][length - 1]) / self.samples for k in range(self.turns))
+                if length <= wagons else zero
+                for color, i in zip(rows, index) for length in range(1, self.max_length + 1)}
+
+    # --- NumPy ---
+    def _compute(self, hand, unseen, deck_size, discard, face):
+        wild = len(self.kinds) - 1
+        lengths = np.arange(1, self.max_length + 1)
+        prefix = self._prefix_counts(unseen, deck_size, discard, DRAWS_PER_TURN * self.turns)
+        hand = np.asarray(hand)
+        face = np.asarray(face)
+        cols = np.arange(wild)
+        hits = np.zeros((self.turns, wild + 1, self.max_length), dtype=np.int64)
+        for k in range(1, self.turns + 1):
+            taken = np.minimum(face, DRAWS_PER_TURN * k)
+            seen = prefix[:, DRAWS_PER_TURN * k - taken]  # (amostras, cor, tipo): do monte, por cor de rota
+            have = hand[:wild] + hand[wild] + taken + seen[:, cols, cols] + seen[:, :, wild]
+            hits[k - 1, :wild] = (have[:, :, None] >= lengths).sum(0)
+            hits[k - 1, wild] = (have.max(1)[:, None] >= lengths).sum(0)
+        return hits
+
+    def _prefix_counts(self, unseen, deck_size, discard, draws):
+        # prefix[s, n, t]: cartas do tipo t nas n primeiras compras do sorteio s
+        # (tipo len(kinds) = nenhuma carta, quando monte e descarte acabam)
+        samples, kinds = self.samples, len(self.kinds)
+        left = np.tile(np.asarray(unseen, dtype=np.int32), (samples, 1))
+        drawn = np.empty((samples, draws), dtype=np.intp)
+        rows = np.arange(samples)
+        for step in range(draws):
+            if step == deck_size:
+                left = np.tile(np.asarray(discard, dtype=np.int32), (samples, 1))
+            cum = left.cumsum(1)
+            total = cum[:, -1]
+            pick = (cum <= (self._np_rng.random(samples) * total)[:, None]).sum(1)
+            empty = total == 0
+            pick[empty] = kinds
+            drawn[:, step] = pick
+            ok = ~empty
+            left[rows[ok], pick[ok]] -= 1
+        prefix = np.zeros((samples, draws + 1, kinds + 1), dtype=np.int16)
+        np.cumsum(np.eye(kinds + 1, dtype=np.int16)[drawn], axis=1, out=prefix[:, 1:])
+        return prefix
+
+    # --- Python puro (sem NumPy; também a referência dos benchmarks) ---
+    def _compute_python(self, hand, unseen, deck_size, discard, face):
+        wild = len(self.kinds) - 1
+        draws = DRAWS_PER_TURN * self.turns
+        pool = [t for t, n in enumerate(unseen) for _ in range(n)]
+        spare = [t for t, n in enumerate(discard) for _ in range(n)]
+        first = min(deck_size, draws, len(pool))
+        rest = min(draws - first, len(spare)) if first < draws else 0
+        hits: List[List[List[int]]] = [[[0] * self.max_length for _ in range(wild + 1)] for _ in range(self.turns)]
+        sample, max_length = self._rng.sample, self.max_length
+        for _ in range(self.samples):
+            seq = sample(pool, first) + sample(spare, rest)
+            for k in range(1, self.turns + 1):
+                row = hits[k - 1]
+                best = 0
+                for c in range(wild):
+                    taken = min(face[c], DRAWS_PER_TURN * k)
+                    got = seq[:DRAWS_PER_TURN * k - taken]
+                    have = hand[c] + hand[wild] + taken + got.count(c) + got.count(wild)
+                    best = max(best, have)
+                    for length in range(min(have, max_length)):
+                        row[c][length] += 1
+                for length in range(min(best, max_length)):
+                    row[wild][length] += 1
+        return hits
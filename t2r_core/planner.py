@@ -0,0 +1,239 @@
+import heapq
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .hand import Hand
+
+Color = Hashable
+
+# Custo de uma rota livre em meias-jogadas: cada carta que falta é meia jogada
+# de compra (duas cartas por turno) e reivindicar é uma jogada inteira. O
+# comprimento (vagões) só desempata, por isso a escala.
+CLAIM_COST = 2
+SCALE = 1000
+MAX_CACHED = 1024  # planos guardados por jogador (os mais antigos saem primeiro)
+
+
+class Plan(NamedTuple):
+    cities: Tuple[str, ...]          # de A até B
+    routes: Tuple[int, ...]          # ids das rotas do caminho, na mesma ordem
+    to_claim: Tuple[int, ...]        # as que o jogador ainda não tem
+    missing: Dict[Color, int]        # cartas que faltam por cor (any_color = qualquer cor)
+    wagons: int                      # vagões das rotas a reivindicar
+    version: int                     # versão do tabuleiro em que foi calculado
+
+
+class RoutePlanner:
+    """Caminho mais barato entre duas cidades para um jogador (Dijkstra).
+
+    Só usa rotas livres e as do próprio jogador (essas custam zero). O custo
+    de uma rota livre vem da mão: as cartas que faltam da cor (locomotivas
+    valem como qualquer cor; cinza usa a cor que o jogador mais tem) mais uma
+    jogada para reivindicar. O plano devolvido reparte a mão entre as rotas do
+    caminho e diz quantas cartas faltam de cada cor. Caminhos que passam do
+    número de vagões do jogador são trocados pelo de menos vagões, se couber.
+
+    Os planos ficam em cache por jogador até a mão ou os vagões mudarem; quem
+    reivindica uma rota perde o seu cache. Para os outros jogadores, a rota
+    só invalida os planos cujas buscas passaram por ela (o caminho escolhido
+    e, se ele caiu no de menos vagões, o mais barato que não coube): tirar
+    uma rota do grafo não barateia nenhum outro caminho, então os demais
+    continuam ótimos. As
+    tabelas do mapa são compartilhadas entre jogos (`fresh`); cada jogo
+    guarda só os donos e o cache.
+    """
+
+    __slots__ = ("topology", "colors", "wildcard", "any_color", "_tracked", "_route_color", "_lengths", "_adj",
+                 "_owner", "_cache", "_uses", "version", "hits", "misses")
+
+    def __init__(self, topology, routes: Sequence[Tuple[Color, int]], colors: Sequence[Color], wildcard: Color,
+                 any_color: Color):
+        if len(routes) != len(topology.routes):
+            raise ValueError("as rotas não correspondem à topologia")
+        self.topology = topology
+        self.colors = [c for c in colors if c != wildcard]
+        self.wildcard = wildcard
+        self.any_color = any_color
+        self._tracked = self.colors + [wildcard]
+        index = {c: i for i, c in enumerate(self.colors)}
+        # Por rota: índice da cor na contagem (-1 = qualquer cor, None = cor que nenhuma carta paga) e comprimento
+        self._route_color = [-1 if c == any_color else index.get(c) for c, _ in routes]
+        self._lengths = [length for _, length in routes]
+        # Por cidade (id): [(id da vizinha, id da rota)], rotas paralelas separadas
+        city_id = topology.city_id
+        self._adj: List[Tuple[Tuple[int, int], ...]] = [
+            tuple((city_id[other], rid) for other, rids in topology.adjacency[c].items() for rid in rids)
+            for c in topology.cities]
+        self._owner: Dict[int, Hashable] = {}
+        # jogador -> {(A, B): ((contagens, vagões), plano ou None, rotas de que a resposta depende)}
+        self._cache: Dict[Hashable, Dict[Tuple[str, str], Tuple]] = {}
+        self._uses: Dict[int, Set[Tuple]] = {}  # rota -> (jogador, A, B) dos planos que passam por ela
+        self.version = 0
+        self.hits = self.misses = 0
+
+    def fresh(self) -> "RoutePlanner":
+        """Planejador novo, sem donos nem cache, que compartilha as tabelas deste."""
+        p = RoutePlanner.__new__(RoutePlanner)
+        for name in RoutePlanner.__slots__:
+            setattr(p, name, getattr(self, name))
+        p._owner, p._cache, p._uses = {}, {}, {}
+        p.version = p.hits = p.misses = 0
+        return p
+
+    # --- Tabuleiro ---
+    def claimed(self, rid: int, owner: Hashable):
+        self._owner[rid] = owner
+        self.version += 1
+        # Para o dono a rota passa a custar zero: qualquer plano dele pode mudar
+        self.forget(owner)
+        for key in self._uses.pop(rid, ()):
+            self._drop(key)
+
+    def rename(self, old: Hashable, new: Hashable):
+        for rid, owner in self._owner.items():
+            if owner == old:
+                self._owner[rid] = new
+        self.forget(old)
+
+    def forget(self, player: Hashable):
+        for a, b in list(self._cache.get(player, ())):
+            self._drop((player, a, b))
+        self._cache.pop(player, None)
+
+    def _drop(self, key: Tuple):
+        player, a, b = key
+        entry = self._cache.get(player, {}).pop((a, b), None)
+        if entry is not None:
+            for rid in entry[2]:
+                uses = self._uses.get(rid)
+                if uses is not None:
+                    uses.discard(key)
+
+    # --- Consulta ---
+    def plan(self, player: Hashable, hand: Hand, wagons: int, a: str, b: str) -> Optional[Plan]:
+        """Plano mais barato de `a` até `b`, ou None se não houver caminho possível."""
+        city_id = self.topology.city_id
+        if a not in city_id or b not in city_id:
+            raise ValueError(f"cidade desconhecida: {a if a not in city_id else b}")
+        counts = hand.counts(self._tracked)
+        signature = (tuple(counts), wagons)
+        key = (player, a, b)
+        cache = self._cache.setdefault(player, {})
+        entry = cache.get((a, b))
+        if entry is not None and entry[0] == signature:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        if entry is not None:
+            self._drop(key)
+        found = self._search(player, counts, city_id[a], city_id[b], by_wagons=False)
+        # A resposta depende das rotas de todo caminho que a busca olhou: se o
+        # mais barato não coube nos vagões, perder uma rota dele pode fazer um
+        # caminho quase tão barato caber e o de menos vagões deixa de valer
+        depends = {rid for _, rid in found or ()}
+        if found is not None and self._wagons(player, found) > wagons:
+            found = self._search(player, counts, city_id[a], city_id[b], by_wagons=True)
+            depends.update(rid for _, rid in found or ())
+            if found is not None and self._wagons(player, found) > wagons:
+                found = None
+        plan = self._plan(player, counts, city_id[a], found) if found is not None else None
+        if len(cache) >= MAX_CACHED:
+            self._drop((player, *next(iter(cache))))
+        cache[a, b] = (signature, plan, tuple(depends))
+        for rid in depends:
+            self._uses.setdefault(rid, set()).add(key)
+        return plan
+
+    def _search(self, player, counts: List[int], source: int, target: int,
+                by_wagons: bool) -> Optional[List[Tuple[int, int]]]:
+        # Dijkstra bidirecional (o grafo e os custos são simétricos): as duas
+        # frentes crescem até a soma dos topos alcançar o melhor encontro, o
+        # que visita bem menos cidades que uma frente só em mapas grandes.
+        # Devolve [(cidade, rota usada para chegar)]
+        if source == target:
+            return []
+        wild = counts[-1]
+        best_color = max(counts[:-1], default=0)
+        owner, route_color, lengths, adj = self._owner, self._route_color, self._lengths, self._adj
+        route_cost: Dict[int, int] = {}
+        dists: Tuple[Dict[int, int], Dict[int, int]] = ({source: 0}, {target: 0})
+        cames: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})
+        heaps = ([(0, source)], [(0, target)])
+        best, meet = None, None
+        while heaps[0] and heaps[1]:
+            if best is not None and heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            dist, came, heap, other_dist = dists[side], cames[side], heaps[side], dists[1 - side]
+            d, city = heapq.heappop(heap)
+            if d > dist[city]:
+                continue
+            for other, rid in adj[city]:
+                cost = route_cost.get(rid)
+                if cost is None:
+                    who = owner.get(rid, None)
+                    if who is None:
+                        length = lengths[rid]
+                        if by_wagons:
+                            cost = length
+                        else:
+                            ci = route_color[rid]
+                            have = best_color if ci == -1 else counts[ci] if ci is not None else 0
+                            short = length - have - wild
+                            cost = ((short if short > 0 else 0) + CLAIM_COST) * SCALE + length
+                    elif who == player:
+                        cost = 0
+                    else:
+                        cost = -1  # de outro jogador
+                    route_cost[rid] = cost
+                if cost < 0:
+                    continue
+                nd = d + cost
+                if nd < dist.get(other, nd + 1):
+                    dist[other] = nd
+                    came[other] = (city, rid)
+                    heapq.heappush(heap, (nd, other))
+                    there = other_dist.get(other)
+                    if there is not None and (best is None or nd + there < best):
+                        best, meet = nd + there, other
+        if meet is None:
+            return None
+        path = []
+        city = meet
+        while city != source:
+            prev, rid = cames[0][city]
+            path.append((city, rid))
+            city = prev
+        path.reverse()
+        city = meet
+        while city != target:
+            nxt, rid = cames[1][city]
+            path.append((nxt, rid))
+            city = nxt
+        return path
+
+    def _wagons(self, player, path: List[Tuple[int, int]]) -> int:
+        return sum(self._lengths[rid] for _, rid in path if self._owner.get(rid) != player)
+
+    def _plan(self, player, counts: List[int], source: int, path: List[Tuple[int, int]]) -> Plan:
+        cities = self.topology.cities
+        to_claim = [rid for _, rid in path if self._owner.get(rid) != player]
+        # Reparte a mão: primeiro as rotas de cor fixa, depois as cinzas (com a cor que mais sobrou)
+        left = list(counts)
+        missing: Dict[Color, int] = {}
+        for rid in sorted(to_claim, key=lambda r: (self._route_color[r] == -1, -self._lengths[r])):
+            ci, need = self._route_color[rid], self._lengths[rid]
+            if ci == -1:
+                ci = max(range(len(self.colors)), key=lambda i: left[i], default=None)
+            color = self.colors[ci] if ci is not None and self._route_color[rid] != -1 else self.any_color
+            if ci is not None:
+                use = min(left[ci], need)
+                left[ci] -= use
+                need -= use
+            use = min(left[-1], need)
+            left[-1] -= use
+            need -= use
+            if need:
+                missing[color] = missing.get(color, 0) + need
+        return Plan(cities=(cities[source],) + tuple(cities[c] for c, _ in path),
+                    routes=tuple(rid for _, rid in path), to_claim=tuple(to_claim), missing=missing,
+                    wagons=sum(self._lengths[rid] for rid in to_claim), version=self.version)
@@ -0,0 +1,123 @@
+from typing import Callable, Dict, Generic, Iterable, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+R = TypeVar("R")
+
+
+def pair_key(a: str, b: str) -> Tuple[str, str]:
+    # Par não ordenado de cidades: (A, B) e (B, A) caem na mesma chave
+    return (a, b) if a <= b else (b, a)
+
+
+class RouteIndex(Generic[R]):
+    """Índice de adjacência por par de cidades, com suporte a rotas paralelas.
+
+    Funciona tanto com `Route` (CLI) quanto com `Rota` (web): basta informar
+    `ends`, que devolve os nomes das duas cidades de uma rota. Com `topology`
+    (ver topology.MapTopology) os índices por par e por cidade vêm prontos e
+    são compartilhados entre jogos; `routes` deve seguir a ordem do mapa.
+    """
+
+    __slots__ = ("_ends", "routes", "_pos", "_free", "_by_pair", "_adj", "_shared")
+
+    def __init__(self, routes: Iterable[R], ends: Callable[[R], Tuple[str, str]], topology=None):
+        self._ends = ends
+        self.routes: List[R] = []
+        self._pos: Dict[int, int] = {}
+        # Rotas livres em ordem de mapa (dict preserva a ordem de inserção)
+        self._free: Dict[int, R] = {}
+        if topology is not None:
+            self.routes = list(routes)
+            if len(self.routes) != len(topology.routes):
+                raise ValueError("as rotas não correspondem à topologia")
+            self._pos = {id(r): i for i, r in enumerate(self.routes)}
+            self._free = dict(enumerate(self.routes))
+            self._by_pair: Mapping[Tuple[str, str], Sequence[int]] = topology.by_pair
+            self._adj: Mapping[str, Mapping[str, Sequence[int]]] = topology.adjacency
+            self._shared = True
+            return
+        self._by_pair = {}
+        self._adj = {}
+        self._shared = False
+        for r in routes:
+            self.add(r)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def add(self, route: R, free: bool = True) -> int:
+        if self._shared:
+            raise TypeError("índice compartilhado com a topologia: não aceita rotas novas")
+        a, b = self._ends(route)
+        idx = len(self.routes)
+        self.routes.append(route)
+        self._pos[id(route)] = idx
+        self._by_pair.setdefault(pair_key(a, b), []).append(idx)
+        self._adj.setdefault(a, {}).setdefault(b, []).append(idx)
+        self._adj.setdefault(b, {}).setdefault(a, []).append(idx)
+        if free:
+            self._free[idx] = route
+        return idx
+
+    def route_id(self, route: R) -> int:
+        return self._pos[id(route)]
+
+    # --- Consultas por par ---
+    def between(self, a: str, b: str) -> List[R]:
+        routes = self.routes
+        return [routes[i] for i in self._by_pair.get(pair_key(a, b), ())]
+
+    def find_free(self, a: str, b: str) -> Optional[R]:
+        for i in self._by_pair.get(pair_key(a, b), ()):
+            if i in self._free:
+                return self.routes[i]
+        return None
+
+    def free_between(self, a: str, b: str) -> List[R]:
+        # Paralelas livres em ordem de mapa: quem reivindica escolhe a que o pagamento cobre
+        routes, free = self.routes, self._free
+        return [routes[i] for i in self._by_pair.get(pair_key(a, b), ()) if i in free]
+
+    def find(self, a: str, b: str) -> Optional[R]:
+        # Prefere uma rota livre; se todas as paralelas estiverem ocupadas, devolve a primeira.
+        # Não olha o pagamento: para reivindicar, use free_between ou o id da rota
+        parallel = self._by_pair.get(pair_key(a, b), ())
+        for i in parallel:
+            if i in self._free:
+                return self.routes[i]
+        return self.routes[parallel[0]] if parallel else None
+
+    # --- Consultas por cidade ---
+    def neighbors(self, city: str) -> List[str]:
+        return list(self._adj.get(city, {}))
+
+    def free_neighbors(self, city: str) -> List[str]:
+        return [other for other, ids in self._adj.get(city, {}).items()
+                if any(i in self._free for i in ids)]
+
+    def routes_from(self, city: str) -> List[R]:
+        routes = self.routes
+        return [routes[i] for ids in self._adj.get(city, {}).values() for i in ids]
+
+    # --- Rotas livres ---
+    def is_free(self, route: R) -> bool:
+        return self._pos[id(route)] in self._free
+
+    def free_routes(self) -> List[R]:
+        return list(self._free.values())
+
+    def free_count(self) -> int:
+        return len(self._free)
+
+    def free_ids(self) -> List[int]:
+        return list(self._free)
+
+    def mark_claimed(self, route: R):
+        self._free.pop(self._pos[id(route)], None)
+
+    def mark_free(self, route: R):
+        # Reinsere mantendo a ordem original do mapa
+        idx = self._pos[id(route)]
+        if idx in self._free:
+            return
+        self._free[idx] = route
+        self._free = dict(sorted(self._free.items()))
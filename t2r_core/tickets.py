@@ -0,0 +1,151 @@
+import random
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class UnionFind:
+    """Conjuntos disjuntos de cidades (union by size + path halving).
+
+    Cidades que ainda não apareceram em nenhuma união são conjuntos unitários
+    implícitos, então não é preciso conhecer o mapa de antemão.
+    """
+
+    __slots__ = ("_parent", "_size")
+
+    def __init__(self):
+        self._parent: Dict[Hashable, Hashable] = {}
+        self._size: Dict[Hashable, int] = {}
+
+    def find(self, x: Hashable) -> Hashable:
+        parent = self._parent
+        if x not in parent:
+            return x
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: Hashable, b: Hashable) -> bool:
+        """Junta os conjuntos de `a` e `b`; False se já eram o mesmo."""
+        for x in (a, b):
+            if x not in self._parent:
+                self._parent[x] = x
+                self._size[x] = 1
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size[rb]
+        return True
+
+    def connected(self, a: Hashable, b: Hashable) -> bool:
+        return a == b or self.find(a) == self.find(b)
+
+
+class TicketTracker(Generic[T]):
+    """Rede de rotas de cada jogador e o status dos seus bilhetes de destino.
+
+    Cada jogador tem um `UnionFind` das cidades ligadas pelas suas rotas. Uma
+    rota nova é uma união; só quando ela junta dois componentes os bilhetes
+    ainda incompletos do jogador são conferidos (uma consulta `find` cada),
+    então manter o status ao vivo custa quase O(1) por rota em qualquer mapa.
+    Funciona com os bilhetes da CLI e da web: `ends` devolve as duas cidades
+    de um bilhete e `points`, o seu valor.
+    """
+
+    __slots__ = ("_ends", "_points", "_networks", "_tickets", "_open")
+
+    def __init__(self, ends: Callable[[T], Tuple[Hashable, Hashable]], points: Callable[[T], int]):
+        self._ends = ends
+        self._points = points
+        self._networks: Dict[Hashable, UnionFind] = {}
+        self._tickets: Dict[Hashable, List[T]] = {}
+        self._open: Dict[Hashable, List[T]] = {}  # bilhetes ainda incompletos
+
+    def network(self, player: Hashable) -> UnionFind:
+        uf = self._networks.get(player)
+        if uf is None:
+            uf = self._networks[player] = UnionFind()
+        return uf
+
+    def add(self, player: Hashable, tickets: Iterable[T]) -> List[T]:
+        """Dá bilhetes ao jogador; devolve os que a rede dele já completa."""
+        uf = self.network(player)
+        owned = self._tickets.setdefault(player, [])
+        still_open = self._open.setdefault(player, [])
+        done = []
+        for ticket in tickets:
+            owned.append(ticket)
+            (done if uf.connected(*self._ends(ticket)) else still_open).append(ticket)
+        return done
+
+    def claim(self, player: Hashable, a: Hashable, b: Hashable) -> List[T]:
+        """Registra a rota a-b do jogador; devolve os bilhetes que ela completou."""
+        uf = self.network(player)
+        if not uf.union(a, b):
+            return []
+        still_open = self._open.get(player)
+        if not still_open:
+            return []
+        done = [t for t in still_open if uf.connected(*self._ends(t))]
+        if done:
+            self._open[player] = [t for t in still_open if t not in done]
+        return done
+
+    def tickets(self, player: Hashable) -> List[T]:
+        return self._tickets.get(player, [])
+
+    def is_complete(self, player: Hashable, ticket: T) -> bool:
+        return ticket not in self._open.get(player, ())
+
+    def status(self, player: Hashable) -> List[Tuple[T, bool]]:
+        still_open = self._open.get(player, ())
+        return [(t, t not in still_open) for t in self.tickets(player)]
+
+    def score(self, player: Hashable) -> int:
+        # Completos somam, incompletos descontam
+        still_open = self._open.get(player, ())
+        return sum(-self._points(t) if t in still_open else self._points(t) for t in self.tickets(player))
+
+    def rename(self, old: Hashable, new: Hashable):
+        for table in (self._networks, self._tickets, self._open):
+            if old in table:
+                table[new] = table.pop(old)
+
+    def forget(self, player: Hashable):
+        for table in (self._networks, self._tickets, self._open):
+            table.pop(player, None)
+
+
+class TicketDeck:
+    """Monte de bilhetes (ids 0..n-1): compra do topo, devolvidos vão para baixo.
+
+    Só é embaralhado na criação, então o estado é apenas a ordem do monte.
+    """
+
+    __slots__ = ("pile",)
+
+    def __init__(self, count: int, seed: Optional[int] = None):
+        self.pile = list(range(count))
+        random.Random(seed).shuffle(self.pile)
+
+    def __len__(self) -> int:
+        return len(self.pile)
+
+    def draw(self, n: int) -> List[int]:
+        taken = self.pile[-n:] if n > 0 else []
+        del self.pile[len(self.pile) - len(taken):]
+        taken.reverse()
+        return taken
+
+    def put_back(self, ids: Iterable[int]):
+        self.pile[:0] = list(ids)
+
+    def to_state(self) -> List[int]:
+        return list(self.pile)
+
+    def load_state(self, pile: Iterable[int]):
+        self.pile = list(pile)
@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Tuple
+
+from .route_index import pair_key
+
+# Cores aceitas nas rotas do arquivo de mapa (nomes de t2r_cli.TRAIN_COLORS)
+ROUTE_COLORS = ("RED", "BLUE", "GREEN", "YELLOW", "BLACK", "WHITE", "ORANGE", "PURPLE", "GRAY")
+MAX_ROUTE_LENGTH = 6
+
+
+class MapError(ValueError):
+    pass
+
+
+class RouteSpec(NamedTuple):
+    a: str
+    b: str
+    color: str
+    length: int
+
+
+class TicketSpec(NamedTuple):
+    a: str
+    b: str
+    points: int
+
+
+class MapTopology:
+    """Mapa lido e validado uma vez, compartilhado (sem cópias) por todos os jogos.
+
+    Cidades são strings internadas com um id inteiro; rotas e bilhetes são
+    tuplas. O índice por par de cidades e a adjacência guardam ids de rota e
+    são usados diretamente por `RouteIndex`. Cada jogo guarda só os donos das
+    rotas. Nada aqui muda depois de construído; `shared` memoiza estruturas
+    derivadas (também imutáveis) que cada motor monta a partir do mapa.
+    """
+
+    def __init__(self, data: Mapping[str, Any], source: str = "<dict>"):
+        self.source = source
+        cities, coords = [], []
+        for c in data.get("cities", ()):
+            name = c.get("name") if isinstance(c, dict) else None
+            if not isinstance(name, str) or not name:
+                raise MapError(f"{source}: cidade sem nome: {c!r}")
+            cities.append(sys.intern(name))
+            coords.append((c.get("x"), c.get("y")))
+        if len(set(cities)) != len(cities):
+            raise MapError(f"{source}: cidades repetidas")
+        self.cities: Tuple[str, ...] = tuple(cities)
+        self.coords: Tuple[Tuple[Any, Any], ...] = tuple(coords)
+        self.city_id: Dict[str, int] = {c: i for i, c in enumerate(cities)}
+
+        routes = []
+        for r in data.get("routes", ()):
+            a, b = self._city(r.get("a"), r), self._city(r.get("b"), r)
+            color, length = r.get("color"), r.get("length")
+            if a == b:
+                raise MapError(f"{source}: rota de uma cidade para ela mesma: {r!r}")
+            if color not in ROUTE_COLORS:
+                raise MapError(f"{source}: cor de rota inválida: {r!r}")
+            if not isinstance(length, int) or not 1 <= length <= MAX_ROUTE_LENGTH:
+                raise MapError(f"{source}: comprimento de rota inválido: {r!r}")
+            routes.append(RouteSpec(a, b, sys.intern(color), length))
+        self.routes: Tuple[RouteSpec, ...] = tuple(routes)
+
+        tickets = []
+        for t in data.get("tickets", ()):
+            a, b, points = self._city(t.get("a"), t), self._city(t.get("b"), t), t.get("points")
+            if a == b or not isinstance(points, int) or points <= 0:
+                raise MapError(f"{source}: bilhete inválido: {t!r}")
+            tickets.append(TicketSpec(a, b, points))
+        self.tickets: Tuple[TicketSpec, ...] = tuple(tickets)
+
+        # Índices prontos (ids de rota); RouteIndex os usa sem copiar (não altere)
+        by_pair: Dict[Tuple[str, str], List[int]] = {}
+        adj: Dict[str, Dict[str, List[int]]] = {c: {} for c in cities}
+        for rid, r in enumerate(routes):
+            by_pair.setdefault(pair_key(r.a, r.b), []).append(rid)
+            adj[r.a].setdefault(r.b, []).append(rid)
+            adj[r.b].setdefault(r.a, []).append(rid)
+        self.by_pair: Dict[Tuple[str, str], Tuple[int, ...]] = {k: tuple(v) for k, v in by_pair.items()}
+        self.adjacency: Dict[str, Dict[str, Tuple[int, ...]]] = {
+            c: {o: tuple(v) for o, v in nb.items()} for c, nb in adj.items()}
+
+        self._shared: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def to_data(self) -> Dict[str, Any]:
+        """O mapa no formato do arquivo."""
+        return {"cities": [{"name": c, "x": x, "y": y} for c, (x, y) in zip(self.cities, self.coords)],
+                "routes": [r._asdict() for r in self.routes],
+                "tickets": [t._asdict() for t in self.tickets]}
+
+    # Imutável: cópias são o próprio objeto; em pickle é remontado a partir dos dados
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return MapTopology, (self.to_data(), self.source)
+
+    def _city(self, name, where) -> str:
+        if name not in self.city_id:
+            raise MapError(f"{self.source}: cidade desconhecida {name!r} em {where!r}")
+        return self.cities[self.city_id[name]]
+
+    def shared(self, key: Any, build: Callable[["MapTopology"], Any]) -> Any:
+        """`build(self)` calculado uma vez por mapa (ex.: tabelas de um motor)."""
+        try:
+            return self._shared[key]
+        except KeyError:
+            with self._lock:
+                if key not in self._shared:
+                    self._shared[key] = build(self)
+                return self._shared[key]
+
+
+# caminho absoluto -> (mtime_ns, tamanho, topologia)
+_loaded: Dict[str, Tuple[int, int, MapTopology]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_map(path: str) -> MapTopology:
+    """Topologia do arquivo `path`, lida só quando o arquivo muda (mtime).
+
+    Jogos já criados continuam com a topologia antiga; só os novos veem o
+    mapa recarregado.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != st.st_mtime_ns or cached[1] != st.st_size:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = (st.st_mtime_ns, st.st_size, MapTopology(json.load(f), path))
+            _loaded[path] = cached
+        return cached[2]
@@ -1,9 +1,24 @@
 # app.py
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
-import random
+from flask import Flask, Response, abort, render_template, request
+from flask_socketio import SocketIO, emit, join_room
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import deque
 from enum import Enum
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from t2r_core import (CardDeck, DrawOdds, FaceUpMarket, Hand, Journal, MapTopology, MoveGenerator, RouteIndex,
+                      RoutePlanner, TicketDeck, TicketTracker, TrailTracker, load_map)
+import metricas
+from envios import FILA_MAX, TICK_PADRAO, AgendadorEnvios, Envio
+from bots import criar_bot, escolher_bilhetes_bot, novo_sid_bot
+from salas import (BOT_PENSAR, JOGADA_BOT, SALA_ATUALIZADA, SALA_REMOVIDA, DiretorioSalas, GerenciadorSalas,
+                   Pensador, RoteadorShards, Saida, Sala, TravasPorSala, id_valido, limpar_salas, novo_id_sala)
+
 # --- Implementação das Classes FIEL ao Diagrama UML ---
 
 class Cor(Enum):
@@ -20,12 +35,16 @@ class Cor(Enum):
 
 # Classe abstrata base
 class Carta:
+    __slots__ = ()
+
     def descrever(self):
         raise NotImplementedError
     def to_dict(self):
         raise NotImplementedError
 
 class CartaVagao(Carta):
+    __slots__ = ('cor',)
+
     def __init__(self, cor: Cor):
         self.cor = cor
     def descrever(self):
@@ -34,6 +53,8 @@ class CartaVagao(Carta):
         return {'tipo': 'vagao', 'cor': self.cor.value}
 
 class Cidade:
+    __slots__ = ('_nome',)
+
     def __init__(self, nome: str):
         self._nome = nome
     @property
@@ -45,6 +66,8 @@ class Cidade:
         return hash(self._nome)
 
 class CartaDestino(Carta):
+    __slots__ = ('origem', 'destino', 'pontos')
+
     def __init__(self, origem: Cidade, destino: Cidade, pontos: int):
         self.origem = origem
         self.destino = destino
@@ -54,93 +77,126 @@ class CartaDestino(Carta):
     def to_dict(self):
         return {'tipo': 'destino', 'origem': self.origem.nome, 'destino': self.destino.nome, 'pontos': self.pontos}
 
+# Uma instância de CartaVagao por cor, compartilhada por todos os jogos
+CARTAS_VAGAO = {cor: CartaVagao(cor) for cor in Cor}
+
 class Baralho:
-    def __init__(self, cartas: list[Carta]):
-        self._cartas = cartas
-        self._descarte = []
-        self.embaralhar()
+    __slots__ = ('motor',)
+
+    def __init__(self, composicao: list[tuple[Cor, int]], semente: int | None = None):
+        # Cartas guardadas como códigos inteiros (ver t2r_core.CardDeck)
+        self.motor = CardDeck(composicao, semente)
 
     def embaralhar(self):
-        random.shuffle(self._cartas)
+        self.motor.shuffle()
 
-    def comprar_carta(self) -> Carta | None:
-        if not self._cartas:
-            if not self._descarte:
-                return None
-            self._cartas = self._descarte
-            self._descarte = []
-            self.embaralhar()
-        return self._cartas.pop(0)
+    @metricas.medido('t2r_compra_baralho_segundos')
+    def comprar_carta(self) -> CartaVagao | None:
+        cor = self.motor.draw()
+        return CARTAS_VAGAO[cor] if cor is not None else None
 
-    def descartar(self, carta: Carta):
-        self._descarte.append(carta)
+    def descartar(self, carta: CartaVagao, quantidade: int = 1):
+        self.motor.discard_color(carta.cor, quantidade)
 
     def to_dict(self):
-        return {'tamanho_baralho': len(self._cartas), 'tamanho_descarte': len(self._descarte)}
+        return {'tamanho_baralho': len(self.motor.cards), 'tamanho_descarte': len(self.motor.discard)}
 
 class Jogador:
-    def __init__(self, sid: str, nome: str, cor: Cor):
+    __slots__ = ('sid', 'nome', 'cor', 'bot', 'pontos', 'pecas_vagao', 'cartas_vagao', 'cartas_destino',
+                 'oferta_destino', 'minimo_destino', 'maior_caminho', '_publico', 'conectado', 'token',
+                 'desconectado_em')
+
+    def __init__(self, sid: str, nome: str, cor: Cor, bot: bool = False):
         self.sid = sid
         self.nome = nome
         self.cor = cor
+        self.bot = bot
         self.pontos = 0
         self.pecas_vagao = 45
-        self.cartas_vagao: list[CartaVagao] = []
+        # Mão como contagem por cor (ver t2r_core.Hand)
+        self.cartas_vagao = Hand()
         self.cartas_destino: list[CartaDestino] = []
+        # Bilhetes sorteados aguardando a escolha (ids em Tabuleiro.destinos) e quantos manter
+        self.oferta_destino: list[int] = []
+        self.minimo_destino = 0
+        self.maior_caminho = 0  # comprimento do maior caminho contínuo, ao vivo
+        self._publico: dict | None = None  # cache de to_dict_publico (None = sujo)
+        self.conectado = True
+        # Sessão: quem tem o token retoma o assento depois de uma queda (bots não têm)
+        self.token: str | None = None
+        self.desconectado_em: float | None = None  # time.monotonic() da queda
 
     def comprar_carta_vagao(self, carta: CartaVagao):
-        self.cartas_vagao.append(carta)
+        self.cartas_vagao.add(carta.cor)
+        self._publico = None
 
     def comprar_carta_destino(self, cartas: list[CartaDestino]):
         self.cartas_destino.extend(cartas)
+        self._publico = None
     
     def atualizar_pontos(self, pontos: int):
         self.pontos += pontos
+        self._publico = None
 
-    def reivindicar_rota(self, rota: 'Rota', cartas_pagamento: list[CartaVagao]):
-        if len(cartas_pagamento) != rota.comprimento:
+    def pode_reivindicar(self, rota: 'Rota', pagamento: dict[Cor, int]) -> tuple[bool, str]:
+        if sum(pagamento.values()) != rota.comprimento:
             return False, "Número incorreto de cartas."
         if self.pecas_vagao < rota.comprimento:
             return False, "Você não tem peças de vagão suficientes."
+        if not self.cartas_vagao.can_pay(pagamento):
+            return False, "Você não possui as cartas selecionadas."
 
-        locomotivas = [c for c in cartas_pagamento if c.cor == Cor.LOCOMOTIVA]
-        cartas_normais = [c for c in cartas_pagamento if c.cor != Cor.LOCOMOTIVA]
-        
+        cores_normais = [cor for cor, qtd in pagamento.items() if qtd and cor != Cor.LOCOMOTIVA]
         cor_rota = rota.cor
 
         if cor_rota != Cor.CINZA:
-            for carta in cartas_normais:
-                if carta.cor != cor_rota:
-                    return False, f"Para esta rota, você só pode usar cartas da cor {cor_rota.name} ou Locomotivas."
-        
+            if any(cor != cor_rota for cor in cores_normais):
+                return False, f"Para esta rota, você só pode usar cartas da cor {cor_rota.name} ou Locomotivas."
+
         else: # Rota CINZA
-            if len(cartas_normais) > 1:
-                primeira_cor = cartas_normais[0].cor
-                for i in range(1, len(cartas_normais)):
-                    if cartas_normais[i].cor != primeira_cor:
-                        return False, "Para rotas cinzas, todas as cartas devem ser da mesma cor (além das Locomotivas)."
-
-        for carta_paga in cartas_pagamento:
-            self.cartas_vagao.remove(carta_paga)
-        
+            if len(cores_normais) > 1:
+                return False, "Para rotas cinzas, todas as cartas devem ser da mesma cor (além das Locomotivas)."
+        return True, ""
+
+    def reivindicar_rota(self, rota: 'Rota', pagamento: dict[Cor, int]):
+        sucesso, motivo = self.pode_reivindicar(rota, pagamento)
+        if not sucesso:
+            return False, motivo
+
+        self.cartas_vagao.pay(pagamento)
+        self._publico = None
+
         rota.set_dono(self)
         self.pecas_vagao -= rota.comprimento
         self.atualizar_pontos(rota.calcular_pontos())
         
         return True, "Rota reivindicada com sucesso!"
 
+    def to_dict_publico(self) -> dict:
+        if self._publico is None:
+            self._publico = {
+                'sid': self.sid, 'nome': self.nome, 'cor': self.cor.value, 'bot': self.bot,
+                'pontos': self.pontos, 'pecas_vagao': self.pecas_vagao,
+                'num_cartas_vagao': len(self.cartas_vagao),
+                'num_cartas_destino': len(self.cartas_destino),
+                'maior_caminho': self.maior_caminho, 'conectado': self.conectado
+            }
+        return self._publico
+
+    def estado_privado(self) -> dict:
+        return {'cartas_vagao': [{'tipo': 'vagao', 'cor': cor.value} for cor in self.cartas_vagao.colors()]}
+
     def to_dict(self, para_si_mesmo=False):
-        d = {
-            'sid': self.sid, 'nome': self.nome, 'cor': self.cor.value,
-            'pontos': self.pontos, 'pecas_vagao': self.pecas_vagao,
-            'num_cartas_vagao': len(self.cartas_vagao),
-            'num_cartas_destino': len(self.cartas_destino)
-        }
+        d = dict(self.to_dict_publico())
         if para_si_mesmo:
-            d['cartas_vagao'] = [c.to_dict() for c in self.cartas_vagao]
+            d.update(self.estado_privado())
         return d
 
 class Rota:
+    # Uma por rota do mapa em cada jogo: cidades e cor são os objetos
+    # compartilhados do mapa, o que é da partida é só o dono
+    __slots__ = ('cidadeA', 'cidadeB', 'comprimento', 'cor', '_dono')
+
     def __init__(self, cidadeA: Cidade, cidadeB: Cidade, comprimento: int, cor: Cor):
         self.cidadeA = cidadeA
         self.cidadeB = cidadeB
@@ -165,242 +221,1278 @@ class Rota:
             'dono_id': self._dono.sid if self._dono else None
         }
 
+CAMINHO_MAPA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'map_web.json')
+# Cores do arquivo de mapa (nomes em inglês, o mesmo formato da CLI)
+COR_DO_MAPA = {'RED': Cor.VERMELHO, 'BLUE': Cor.AZUL, 'GREEN': Cor.VERDE, 'YELLOW': Cor.AMARELO,
+               'BLACK': Cor.PRETO, 'WHITE': Cor.BRANCO, 'PURPLE': Cor.ROXO, 'ORANGE': Cor.LARANJA,
+               'GRAY': Cor.CINZA}
+
+def _pontas_da_rota(rota: Rota) -> tuple[str, str]:
+    return rota.cidadeA.nome, rota.cidadeB.nome
+
+def _mapa_compartilhado(topologia: MapTopology):
+    # Montado uma vez por mapa e usado por todos os jogos: cidades, bilhetes,
+    # dados das rotas e as tabelas do gerador de jogadas e do planejador
+    cidades = {nome: Cidade(nome) for nome in topologia.cities}
+    destinos = tuple(CartaDestino(cidades[t.a], cidades[t.b], t.points) for t in topologia.tickets)
+    rotas = tuple((cidades[r.a], cidades[r.b], r.length, COR_DO_MAPA[r.color]) for r in topologia.routes)
+    cores_rotas = [(cor, comprimento) for _, _, comprimento, cor in rotas]
+    cores = [c for c in Cor if c != Cor.CINZA]
+    movimentos = MoveGenerator(cores_rotas, cores, Cor.LOCOMOTIVA, Cor.CINZA)
+    planejador = RoutePlanner(topologia, cores_rotas, cores, Cor.LOCOMOTIVA, Cor.CINZA)
+    return tuple(cidades.values()), destinos, rotas, movimentos, planejador, {}
+
 class Tabuleiro:
-    def __init__(self):
-        self.cidades, self.rotas = self._criar_mapa()
+    __slots__ = ('topologia', 'cidades', 'destinos', 'rotas', 'indice', 'movimentos', 'planejador', '_pagamentos',
+                 '_dict')
+
+    def __init__(self, topologia: MapTopology | None = None):
+        # O arquivo é lido uma vez (e de novo só se mudar); cada jogo guarda só os donos das rotas
+        self.topologia = topologia or load_map(CAMINHO_MAPA)
+        self.cidades, self.destinos, rotas, movimentos, planejador, self._pagamentos = self.topologia.shared(
+            'web.tabuleiro', _mapa_compartilhado)
+        self.rotas = [Rota(*r) for r in rotas]
+        self.indice = RouteIndex(self.rotas, _pontas_da_rota, self.topologia)
+        # Rotas reivindicáveis e opções de pagamento de cada jogador (incremental)
+        self.movimentos = movimentos.fresh()
+        # Caminho mais barato entre duas cidades para cada jogador (por sid, com cache)
+        self.planejador = planejador.fresh()
+        self._dict: dict | None = None  # cache de to_dict
 
     def get_rota(self, nome_cidade_a: str, nome_cidade_b: str) -> Rota | None:
-        for rota in self.rotas:
-            if (rota.cidadeA.nome == nome_cidade_a and rota.cidadeB.nome == nome_cidade_b) or \
-               (rota.cidadeA.nome == nome_cidade_b and rota.cidadeB.nome == nome_cidade_a):
-                return rota
-        return None
+        return self.indice.find(nome_cidade_a, nome_cidade_b)
+
+    @metricas.medido('t2r_busca_rota_segundos')
+    def rotas_livres_entre(self, nome_cidade_a: str, nome_cidade_b: str, rota_id: int | None = None) -> list[Rota]:
+        # Paralelas livres em ordem de mapa; com `rota_id`, só essa (se ligar as duas cidades)
+        livres = self.indice.free_between(nome_cidade_a, nome_cidade_b)
+        if rota_id is None:
+            return livres
+        return [r for r in livres if self.indice.route_id(r) == rota_id]
+
+    def get_rotas(self, nome_cidade_a: str, nome_cidade_b: str) -> list[Rota]:
+        return self.indice.between(nome_cidade_a, nome_cidade_b)
+
+    def vizinhos(self, nome_cidade: str) -> list[str]:
+        return self.indice.neighbors(nome_cidade)
+
+    def rotas_livres(self) -> list[Rota]:
+        return self.indice.free_routes()
+
+    def pagamento_json(self, pagamento: dict[Cor, int]) -> dict[str, int]:
+        # Os pagamentos do gerador são compartilhados por mapa; a versão com as
+        # cores em texto também (uma por pagamento, não uma por patch)
+        achado = self._pagamentos.get(id(pagamento))
+        if achado is None or achado[0] is not pagamento:
+            achado = self._pagamentos[id(pagamento)] = (pagamento, {cor.value: n for cor, n in pagamento.items()})
+        return achado[1]
+
+    def marcar_reivindicada(self, rota: Rota):
+        self.indice.mark_claimed(rota)
+        self.planejador.claimed(self.indice.route_id(rota), rota.get_dono().sid)
+        if self._dict is not None:
+            # Só a rota reivindicada muda no cache
+            self._dict['rotas'][self.indice.route_id(rota)] = rota.to_dict()
 
-    def _criar_mapa(self):
-        ny = Cidade("Nova York")
-        chi = Cidade("Chicago")
-        la = Cidade("Los Angeles")
-        mia = Cidade("Miami")
-        cidades = [ny, chi, la, mia]
-        rotas = [
-            Rota(ny, chi, 3, Cor.AZUL), Rota(chi, la, 5, Cor.AMARELO),
-            Rota(la, mia, 6, Cor.VERDE), Rota(ny, mia, 4, Cor.VERMELHO),
-            Rota(chi, mia, 4, Cor.CINZA)
-        ]
-        return cidades, rotas
-    
     def to_dict(self):
-        return {
-            'cidades': [c.nome for c in self.cidades],
-            'rotas': [r.to_dict() for r in self.rotas]
-        }
+        if self._dict is None:
+            self._dict = {
+                'cidades': [c.nome for c in self.cidades],
+                'rotas': [r.to_dict() for r in self.rotas]
+            }
+        return self._dict
+
+def json_bytes(obj) -> bytes:
+    # Enviado como anexo binário pelo Socket.IO, sem ser codificado de novo
+    return json.dumps(obj, separators=(',', ':')).encode()
 
 # --- Classe Principal de Gerenciamento do Jogo ---
+HISTORICO_PATCHES = 64  # versões recentes guardadas por jogo
+BILHETES_SORTEADOS = 3   # bilhetes de destino oferecidos de cada vez
+MINIMO_BILHETES_INICIO = 2
+MINIMO_BILHETES = 1
+BONUS_MAIOR_CAMINHO = 10  # para quem tem o maior caminho contínuo (empates levam todos)
+TURNOS_CHANCES = 2  # turnos de compra nas chances de cada rota
+GRACA_RECONEXAO = 60  # segundos que o assento de quem caiu fica guardado
+
 class Jogo:
-    def __init__(self):
+    def __init__(self, semente: int | None = None):
         self.jogadores: dict[str, Jogador] = {}
         self.ordem_jogadores: list[str] = []
         self.jogador_da_vez_idx = 0
         self.tabuleiro = Tabuleiro()
-        self.baralho_vagao = self._criar_baralho_vagao()
-        self.cartas_visiveis: list[CartaVagao] = []
+        self.baralho_vagao = self._criar_baralho_vagao(semente)
+        self.baralho_destino = TicketDeck(len(self.tabuleiro.destinos), semente)
+        # Rede de rotas de cada jogador (union-find, por sid) e status dos bilhetes
+        self.redes = TicketTracker(lambda d: (d.origem.nome, d.destino.nome), lambda d: d.pontos)
+        self.caminhos = TrailTracker()  # maior caminho contínuo de cada jogador (por sid)
+        self.mercado: FaceUpMarket | None = None
         self.estado = "AGUARDANDO_JOGADORES"
         self.acao_do_turno = {'tipo': None, 'cartas_compradas': 0}
         self.vencedor = None
+        # Sincronização por versões: cada ação aceita gera um patch pequeno
+        self.versao = 0
+        self._ops: list[dict] = []
+        self._ops_privadas: dict[str, list[dict]] = {}
+        # (versão, parte pública codificada) dos patches recentes; as ops em si são descartadas após o envio
+        self.historico: deque[tuple[int, bytes]] = deque(maxlen=HISTORICO_PATCHES)
+        # Caches da parte pública do estado
+        self._cache_mercado: tuple[int, list[dict]] | None = None
+        self._cache_publico: tuple[int, bytes] | None = None
+        # Log de ações aceitas, para recuperar a partida se o servidor cair
+        self.diario: Journal | None = None
+        self.chances: DrawOdds | None = None  # criado no primeiro pedido de chances
+
+    def _registrar(self, *acao):
+        if self.diario is not None:
+            self.diario.record(list(acao), self.to_state)
 
-    def _criar_baralho_vagao(self):
-        cartas = []
+    def _criar_baralho_vagao(self, semente):
         cores_normais = [Cor.VERMELHO, Cor.AZUL, Cor.VERDE, Cor.AMARELO, Cor.PRETO, Cor.BRANCO, Cor.ROXO, Cor.LARANJA]
-        for cor in cores_normais:
-            cartas.extend([CartaVagao(cor) for _ in range(12)])
-        cartas.extend([CartaVagao(Cor.LOCOMOTIVA) for _ in range(14)])
-        return Baralho(cartas)
-    
-    def adicionar_jogador(self, sid, nome):
+        composicao = [(cor, 12) for cor in cores_normais] + [(Cor.LOCOMOTIVA, 14)]
+        return Baralho(composicao, semente)
+
+    @property
+    def cartas_visiveis(self) -> list[CartaVagao]:
+        if self.mercado is None:
+            return []
+        return [CARTAS_VAGAO[cor] for cor in self.mercado.colors()]
+
+    # --- Patches ---
+    def _op(self, op: str, **dados):
+        self._ops.append({'op': op, **dados})
+
+    def _op_privada(self, sid: str, op: str, **dados):
+        self._ops_privadas.setdefault(sid, []).append({'op': op, **dados})
+
+    def _op_jogador(self, jogador: Jogador):
+        self._op('jogador', sid=jogador.sid, pontos=jogador.pontos, pecas_vagao=jogador.pecas_vagao,
+                 num_cartas_vagao=len(jogador.cartas_vagao), num_cartas_destino=len(jogador.cartas_destino),
+                 maior_caminho=jogador.maior_caminho)
+
+    def _op_bilhetes(self, jogador: Jogador):
+        self._op_privada(jogador.sid, 'bilhetes', bilhetes=self.bilhetes(jogador),
+                         oferta=self.oferta_bilhetes(jogador))
+
+    def _op_mao(self, jogador: Jogador, delta: dict[Cor, int]):
+        self._op_privada(jogador.sid, 'mao', delta={cor.value: n for cor, n in delta.items()})
+        self._op_privada(jogador.sid, 'jogaveis', rotas=self.rotas_jogaveis(jogador))
+
+    def _cartas_visiveis_dict(self) -> list[dict]:
+        if self.mercado is None:
+            return []
+        if self._cache_mercado is None or self._cache_mercado[0] != self.mercado.changes:
+            self._cache_mercado = (self.mercado.changes, [c.to_dict() for c in self.cartas_visiveis])
+        return self._cache_mercado[1]
+
+    def _op_mercado(self):
+        self._op('mercado', cartas=self._cartas_visiveis_dict())
+
+    def _op_turno(self):
+        jogador_da_vez = self.get_jogador_da_vez()
+        self._op('turno', jogador_da_vez_sid=jogador_da_vez.sid if jogador_da_vez else None,
+                 acao_do_turno=dict(self.acao_do_turno))
+
+    def fechar_versao(self) -> dict | None:
+        """Fecha as mudanças pendentes em uma nova versão e devolve o patch."""
+        if not self._ops and not self._ops_privadas:
+            return None
+        self.versao += 1
+        patch = {'versao': self.versao, 'ops': self._ops, 'privadas': self._ops_privadas}
+        self.historico.append((self.versao, patch_bytes(patch)))
+        self._ops, self._ops_privadas = [], {}
+        return patch
+
+    def _mudanca_estrutural(self):
+        # Entrada/saída de jogadores e início do jogo: os clientes recebem o estado completo
+        self.versao += 1
+        self._ops, self._ops_privadas = [], {}
+        self.historico.clear()
+
+    # --- Jogadores e turnos ---
+    def adicionar_jogador(self, sid, nome, bot=False, token=None):
         if len(self.jogadores) >= 4: return None
         cores = [Cor.VERMELHO, Cor.AZUL, Cor.VERDE, Cor.AMARELO]
         cor_usada = [j.cor.value for j in self.jogadores.values()]
         cor_jogador = next(c for c in cores if c.value not in cor_usada)
-        novo_jogador = Jogador(sid, nome, cor_jogador)
+        novo_jogador = Jogador(sid, nome, cor_jogador, bot)
+        # O token vai para o diário: depois de uma queda do servidor a sessão continua valendo
+        novo_jogador.token = token or (None if bot else secrets.token_urlsafe(16))
         self.jogadores[sid] = novo_jogador
         self.ordem_jogadores.append(sid)
+        self._mudanca_estrutural()
+        self._registrar('entrar', sid, nome, bot, novo_jogador.token)
         return novo_jogador
 
-    def iniciar_jogo(self):
-        if len(self.jogadores) < 2 or self.estado != "AGUARDANDO_JOGADORES": return
+    def jogador_desconectado(self, nome) -> Jogador | None:
+        # Só assentos sem token (diários antigos); os outros se retomam pelo token
+        return next((j for j in self.jogadores.values() if not j.conectado and j.token is None and j.nome == nome),
+                    None)
+
+    def jogador_por_token(self, token) -> Jogador | None:
+        if not isinstance(token, str):
+            return None
+        return next((j for j in self.jogadores.values()
+                     if j.token is not None and secrets.compare_digest(j.token, token)), None)
+
+    def desconectar_jogador(self, sid):
+        # O assento (mão, vez, rotas) fica guardado; só a conexão caiu
+        jogador = self.jogadores[sid]
+        jogador.conectado = False
+        jogador.desconectado_em = time.monotonic()
+        jogador._publico = None
+        self._op('conexao', sid=sid, conectado=False)
+
+    def ausentes_expirados(self, graca: float = GRACA_RECONEXAO, agora: float | None = None) -> list[str]:
+        agora = time.monotonic() if agora is None else agora
+        return [sid for sid, j in self.jogadores.items()
+                if not j.conectado and not j.bot and agora - (j.desconectado_em or agora) >= graca]
+
+    def reassociar_jogador(self, sid_antigo, sid_novo):
+        # Devolve o assento (mão, pontos, rotas) a uma nova conexão. Os clientes
+        # trocam o sid no estado que já têm (op 'reassociar'), sem estado completo
+        jogador = self.jogadores[sid_antigo]
+        self.jogadores = {(sid_novo if sid == sid_antigo else sid): j for sid, j in self.jogadores.items()}
+        self.ordem_jogadores = [sid_novo if sid == sid_antigo else sid for sid in self.ordem_jogadores]
+        jogador.sid = sid_novo
+        self.tabuleiro.movimentos.forget(sid_antigo)
+        self.tabuleiro.planejador.rename(sid_antigo, sid_novo)
+        self.redes.rename(sid_antigo, sid_novo)
+        self.caminhos.rename(sid_antigo, sid_novo)
+        jogador.conectado = True
+        jogador.desconectado_em = None
+        jogador._publico = None
+        self.tabuleiro._dict = None  # dono_id das rotas usa o sid
+        if self.vencedor:
+            self.vencedor = [{**v, 'sid': sid_novo} if v['sid'] == sid_antigo else v for v in self.vencedor]
+        self._op('reassociar', de=sid_antigo, para=sid_novo)
+        self._op('conexao', sid=sid_novo, conectado=True)
+        self._registrar('reassociar', sid_antigo, sid_novo)
+
+    def remover_jogador(self, sid) -> bool:
+        if sid not in self.jogadores:
+            return False
+        jogador = self.jogadores.pop(sid)
+        self.tabuleiro.movimentos.forget(sid)
+        self.tabuleiro.planejador.forget(sid)
+        self.redes.forget(sid)
+        self.caminhos.forget(sid)
+        self.baralho_destino.put_back(jogador.oferta_destino)
+        if sid in self.ordem_jogadores:
+            idx = self.ordem_jogadores.index(sid)
+            self.ordem_jogadores.remove(sid)
+            if idx < self.jogador_da_vez_idx:
+                self.jogador_da_vez_idx -= 1
+            elif idx == self.jogador_da_vez_idx:
+                self.acao_do_turno = {'tipo': None, 'cartas_compradas': 0}
+            self.jogador_da_vez_idx = self.jogador_da_vez_idx % len(self.ordem_jogadores) if self.ordem_jogadores else 0
+        self._mudanca_estrutural()
+        self._registrar('sair', sid)
+        return True
+
+    def iniciar_jogo(self) -> bool:
+        if len(self.jogadores) < 2 or self.estado != "AGUARDANDO_JOGADORES": return False
         for sid in self.ordem_jogadores:
             jogador = self.jogadores[sid]
             for _ in range(4):
                 jogador.comprar_carta_vagao(self.baralho_vagao.comprar_carta())
-        self.cartas_visiveis = [self.baralho_vagao.comprar_carta() for _ in range(5)]
+            # Bilhetes iniciais: cada um escolhe quando quiser, mas só joga depois de escolher
+            jogador.oferta_destino = self.baralho_destino.draw(BILHETES_SORTEADOS)
+            jogador.minimo_destino = min(MINIMO_BILHETES_INICIO, len(jogador.oferta_destino))
+        # Esta versão não recicla as abertas por excesso de locomotivas
+        self.mercado = FaceUpMarket(self.baralho_vagao.motor, Cor.LOCOMOTIVA, max_locomotives=None)
         self.estado = "EM_ANDAMENTO"
+        self._mudanca_estrutural()
+        self._registrar('iniciar')
+        return True
 
     def proximo_turno(self):
         self.jogador_da_vez_idx = (self.jogador_da_vez_idx + 1) % len(self.ordem_jogadores)
         self.acao_do_turno = {'tipo': None, 'cartas_compradas': 0}
+        self._op_turno()
     
+    def rotas_jogaveis(self, jogador: Jogador) -> list[dict]:
+        """Rotas livres que o jogador pode reivindicar, com as opções de pagamento."""
+        jogadas = self.tabuleiro.movimentos.claims(jogador.sid, jogador.cartas_vagao, jogador.pecas_vagao,
+                                                   self.tabuleiro.indice.free_ids())
+        pagamento_json = self.tabuleiro.pagamento_json
+        return [{'i': i, 'pagamentos': [pagamento_json(pag) for pag in opcoes]} for i, opcoes in jogadas]
+
+    def planejar_rota(self, jogador: Jogador, origem: str, destino: str) -> dict:
+        """Caminho mais barato de origem a destino com a mão e os vagões do jogador."""
+        plano = self.tabuleiro.planejador.plan(jogador.sid, jogador.cartas_vagao, jogador.pecas_vagao, origem, destino)
+        if plano is None:
+            return {'origem': origem, 'destino': destino, 'possivel': False}
+        return {'origem': origem, 'destino': destino, 'possivel': True, 'cidades': list(plano.cities),
+                'rotas': list(plano.routes), 'a_reivindicar': list(plano.to_claim), 'vagoes': plano.wagons,
+                'faltam': {cor.value: n for cor, n in plano.missing.items()}, 'versao_tabuleiro': plano.version}
+
+    @metricas.medido('t2r_chances_segundos')
+    def chances_rotas(self, jogador: Jogador) -> dict:
+        """Chance (em %) de o jogador juntar as cartas de cada rota livre em até 1..TURNOS_CHANCES turnos de compra."""
+        motor = self.baralho_vagao.motor
+        # Para o jogador, as cartas escondidas são o monte e as mãos dos adversários
+        escondidas = motor.count_by_color()
+        for outro in self.jogadores.values():
+            if outro is not jogador:
+                for cor, n in outro.cartas_vagao.items():
+                    escondidas[cor] = escondidas.get(cor, 0) + n
+        if self.chances is None:
+            self.chances = DrawOdds([c for c in Cor if c != Cor.CINZA], Cor.LOCOMOTIVA, Cor.CINZA, turns=TURNOS_CHANCES)
+        tabela = self.chances.table(jogador.cartas_vagao, escondidas, len(motor.cards),
+                                    motor.count_by_color(discard=True), self.mercado.colors() if self.mercado else [],
+                                    jogador.pecas_vagao)
+        zero = (0.0,) * TURNOS_CHANCES
+        rotas = self.tabuleiro.rotas
+        return {'turnos': TURNOS_CHANCES,
+                'rotas': [[i, [round(p * 100) for p in tabela.get((rotas[i].cor, rotas[i].comprimento), zero)]]
+                          for i in self.tabuleiro.indice.free_ids()]}
+
+    def bilhetes(self, jogador: Jogador) -> list[dict]:
+        """Bilhetes do jogador com o status atual (a rede é mantida a cada rota)."""
+        return [{**d.to_dict(), 'completo': completo} for d, completo in self.redes.status(jogador.sid)]
+
+    def oferta_bilhetes(self, jogador: Jogador) -> dict | None:
+        if not jogador.oferta_destino:
+            return None
+        return {'bilhetes': [self.tabuleiro.destinos[i].to_dict() for i in jogador.oferta_destino],
+                'minimo': jogador.minimo_destino}
+
     def get_jogador_da_vez(self) -> Jogador | None:
         if not self.ordem_jogadores or self.estado != "EM_ANDAMENTO":
             return None
         sid_da_vez = self.ordem_jogadores[self.jogador_da_vez_idx]
         return self.jogadores[sid_da_vez]
-    
+
+    # --- Ações ---
+    def comprar_carta(self, sid: str, index_carta: int) -> tuple[bool, str]:
+        jogador = self.get_jogador_da_vez()
+        if not jogador or jogador.sid != sid:
+            return False, 'Não é sua vez.'
+        if jogador.oferta_destino:
+            return False, 'Escolha primeiro seus bilhetes de destino.'
+
+        if self.acao_do_turno['cartas_compradas'] == 1 and 0 <= index_carta < len(self.mercado):
+            if self.mercado.color_at(index_carta) == Cor.LOCOMOTIVA:
+                return False, 'Você não pode pegar uma Locomotiva como segunda carta.'
+
+        if self.acao_do_turno['tipo'] is None:
+            self.acao_do_turno['tipo'] = 'COMPRANDO_CARTAS'
+        elif self.acao_do_turno['tipo'] != 'COMPRANDO_CARTAS':
+            return False, 'Você não pode comprar cartas depois de outra ação.'
+
+        carta_comprada = None
+        era_locomotiva_visivel = False
+        if index_carta == -1:
+            carta_comprada = self.baralho_vagao.comprar_carta()
+        elif 0 <= index_carta < len(self.mercado):
+            carta_comprada = CARTAS_VAGAO[self.mercado.take(index_carta)]
+            self._op_mercado()
+            if carta_comprada.cor == Cor.LOCOMOTIVA:
+                era_locomotiva_visivel = True
+        
+        if not carta_comprada:
+            if self.acao_do_turno['cartas_compradas'] == 0:
+                self.acao_do_turno['tipo'] = None
+            return False, 'Carta inválida ou baralho vazio.'
+
+        jogador.comprar_carta_vagao(carta_comprada)
+        self._op_mao(jogador, {carta_comprada.cor: 1})
+        self._op_jogador(jogador)
+        self.acao_do_turno['cartas_compradas'] += 1
+
+        terminou_o_turno = False
+        if self.acao_do_turno['cartas_compradas'] >= 2:
+            terminou_o_turno = True
+        if era_locomotiva_visivel and self.acao_do_turno['cartas_compradas'] == 1:
+            terminou_o_turno = True
+        
+        if terminou_o_turno:
+            self.proximo_turno()
+        else:
+            self._op_turno()
+        self._registrar('comprar', sid, index_carta)
+        return True, ''
+
+    def reivindicar_rota(self, sid: str, cidade_a: str, cidade_b: str, pagamento: dict[Cor, int],
+                         rota_id: int | None = None) -> tuple[bool, str]:
+        if self.acao_do_turno['tipo'] is not None:
+            return False, 'Você não pode reivindicar uma rota agora.'
+        jogador = self.get_jogador_da_vez()
+        if not jogador or jogador.sid != sid:
+            return False, 'Não é sua vez.'
+        if jogador.oferta_destino:
+            return False, 'Escolha primeiro seus bilhetes de destino.'
+
+        livres = self.tabuleiro.rotas_livres_entre(cidade_a, cidade_b, rota_id)
+        if not livres:
+            return False, 'Rota inválida ou já reivindicada.'
+        # Entre as paralelas, a primeira que o pagamento cobre (sem nenhuma, o motivo da primeira)
+        motivos = []
+        for rota in livres:
+            sucesso, motivo = jogador.pode_reivindicar(rota, pagamento)
+            if sucesso:
+                break
+            motivos.append(motivo)
+        else:
+            return False, motivos[0]
+        jogador.reivindicar_rota(rota, pagamento)
+        rota_id = self.tabuleiro.indice.route_id(rota)
+
+        self.tabuleiro.marcar_reivindicada(rota)
+        for cor, qtd in pagamento.items():
+            self.baralho_vagao.descartar(CARTAS_VAGAO[cor], qtd)
+        jogador.maior_caminho = self.caminhos.add(jogador.sid, rota.cidadeA.nome, rota.cidadeB.nome, rota.comprimento)
+        self._op('rota', i=rota_id, dono_id=jogador.sid)
+        self._op_mao(jogador, {cor: -qtd for cor, qtd in pagamento.items() if qtd})
+        self._op_jogador(jogador)
+        if self.redes.claim(jogador.sid, rota.cidadeA.nome, rota.cidadeB.nome):
+            self._op_bilhetes(jogador)  # algum bilhete foi completado
+
+        if not self._verificar_fim_de_jogo():
+            self.proximo_turno()
+        # Com o id da rota: o replay não escolhe de novo entre as paralelas
+        self._registrar('reivindicar', sid, cidade_a, cidade_b, {cor.value: qtd for cor, qtd in pagamento.items()},
+                        rota_id)
+        return True, 'Rota reivindicada com sucesso!'
+
+    def comprar_bilhetes(self, sid: str) -> tuple[bool, str]:
+        if self.acao_do_turno['tipo'] is not None:
+            return False, 'Você não pode comprar bilhetes agora.'
+        jogador = self.get_jogador_da_vez()
+        if not jogador or jogador.sid != sid:
+            return False, 'Não é sua vez.'
+        if jogador.oferta_destino:
+            return False, 'Escolha primeiro seus bilhetes de destino.'
+        if not len(self.baralho_destino):
+            return False, 'Não há mais bilhetes de destino.'
+        jogador.oferta_destino = self.baralho_destino.draw(BILHETES_SORTEADOS)
+        jogador.minimo_destino = min(MINIMO_BILHETES, len(jogador.oferta_destino))
+        self.acao_do_turno['tipo'] = 'ESCOLHENDO_BILHETES'
+        self._op_bilhetes(jogador)
+        self._op_turno()
+        self._registrar('comprar_bilhetes', sid)
+        return True, ''
+
+    def escolher_bilhetes(self, sid: str, manter: list[int]) -> tuple[bool, str]:
+        jogador = self.jogadores.get(sid)
+        if not jogador or not jogador.oferta_destino:
+            return False, 'Não há bilhetes para escolher.'
+        try:
+            manter = sorted({int(i) for i in manter})
+        except (TypeError, ValueError):
+            return False, 'Bilhete inválido.'
+        oferta = jogador.oferta_destino
+        if any(i < 0 or i >= len(oferta) for i in manter):
+            return False, 'Bilhete inválido.'
+        if len(manter) < jogador.minimo_destino:
+            return False, f'Fique com pelo menos {jogador.minimo_destino} bilhete(s).'
+        cartas = [self.tabuleiro.destinos[oferta[i]] for i in manter]
+        self.baralho_destino.put_back(b for i, b in enumerate(oferta) if i not in manter)
+        jogador.oferta_destino, jogador.minimo_destino = [], 0
+        jogador.comprar_carta_destino(cartas)
+        self.redes.add(sid, cartas)
+        self._op_bilhetes(jogador)
+        self._op_jogador(jogador)
+        if self.acao_do_turno['tipo'] == 'ESCOLHENDO_BILHETES' and self.get_jogador_da_vez() is jogador:
+            self.proximo_turno()
+        self._registrar('escolher_bilhetes', sid, manter)
+        return True, ''
+
+    def _pontuar_bilhetes(self):
+        # Fim de jogo: bilhetes completos somam, incompletos descontam
+        for jogador in self.jogadores.values():
+            if jogador.cartas_destino:
+                jogador.atualizar_pontos(self.redes.score(jogador.sid))
+                self._op_jogador(jogador)
+
+    def bonus_maior_caminho(self, exato: bool = False) -> dict[str, int]:
+        _, lideres = self.caminhos.leaders(self.jogadores, exact=exato)
+        return {sid: BONUS_MAIOR_CAMINHO for sid in lideres}
+
+    def _pontuar_maior_caminho(self):
+        # Ao vivo o comprimento pode ser uma estimativa por baixo; o bônus usa o exato
+        bonus = self.bonus_maior_caminho(exato=True)
+        for jogador in self.jogadores.values():
+            jogador.maior_caminho = self.caminhos.length(jogador.sid)
+            jogador.atualizar_pontos(bonus.get(jogador.sid, 0))
+            self._op_jogador(jogador)
+
     def _verificar_fim_de_jogo(self):
-        todas_reivindicadas = all(rota.get_dono() is not None for rota in self.tabuleiro.rotas)
-        if todas_reivindicadas:
+        if self.tabuleiro.indice.free_count() == 0:
             self.estado = "FINALIZADO"
+            self._pontuar_bilhetes()
+            self._pontuar_maior_caminho()
             self._calcular_vencedor()
+            self._op('fim', estado=self.estado, vencedor=self.vencedor)
+            self._op_turno()  # acabou: não há mais jogador da vez
             return True
         return False
 
     def _calcular_vencedor(self):
         if not self.jogadores:
             return
-        maior_pontuacao = -1
-        for jogador in self.jogadores.values():
-            if jogador.pontos > maior_pontuacao:
-                maior_pontuacao = jogador.pontos
+        # Bilhetes incompletos descontam: a maior pontuação pode ser negativa
+        maior_pontuacao = max(j.pontos for j in self.jogadores.values())
         vencedores = [j for j in self.jogadores.values() if j.pontos == maior_pontuacao]
         self.vencedor = [v.to_dict() for v in vencedores]
 
-    def get_estado_para_frontend(self, para_sid=None):
+    # --- Persistência ---
+    def to_state(self) -> dict:
+        donos = [r.get_dono() for r in self.tabuleiro.rotas]
+        return {
+            'jogadores': [{'sid': j.sid, 'nome': j.nome, 'cor': j.cor.value, 'bot': j.bot, 'pontos': j.pontos,
+                           'pecas_vagao': j.pecas_vagao,
+                           'cartas_vagao': {cor.value: n for cor, n in j.cartas_vagao.items()},
+                           'destinos': [self.tabuleiro.destinos.index(d) for d in j.cartas_destino],
+                           'oferta_destino': j.oferta_destino, 'minimo_destino': j.minimo_destino,
+                           'token': j.token}
+                          for j in self.jogadores.values()],
+            'ordem_jogadores': self.ordem_jogadores,
+            'jogador_da_vez_idx': self.jogador_da_vez_idx,
+            'estado': self.estado,
+            'acao_do_turno': self.acao_do_turno,
+            'vencedor': self.vencedor,
+            'versao': self.versao,
+            'donos': [d.sid if d else None for d in donos],
+            # As rotas de quem saiu continuam dele: o snapshot guarda esses donos fora da mesa
+            'saidos': [{'sid': j.sid, 'nome': j.nome, 'cor': j.cor.value, 'bot': j.bot}
+                       for j in {d.sid: d for d in donos if d and d.sid not in self.jogadores}.values()],
+            'baralho': self.baralho_vagao.motor.to_state(),
+            'mercado': self.mercado.to_state() if self.mercado else None,
+            'bilhetes': self.baralho_destino.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, estado: dict) -> 'Jogo':
+        jogo = cls()
+        for dados in estado['jogadores']:
+            jogador = Jogador(dados['sid'], dados['nome'], Cor(dados['cor']), dados.get('bot', False))
+            jogador.pontos, jogador.pecas_vagao = dados['pontos'], dados['pecas_vagao']
+            jogador.cartas_vagao = Hand.from_counts({Cor(c): n for c, n in dados['cartas_vagao'].items()})
+            jogador.cartas_destino = [jogo.tabuleiro.destinos[i] for i in dados.get('destinos', [])]
+            jogador.oferta_destino = list(dados.get('oferta_destino', []))
+            jogador.minimo_destino = dados.get('minimo_destino', 0)
+            jogador.token = dados.get('token')
+            jogo.redes.add(jogador.sid, jogador.cartas_destino)
+            jogo.jogadores[jogador.sid] = jogador
+        jogo.ordem_jogadores = list(estado['ordem_jogadores'])
+        jogo.jogador_da_vez_idx = estado['jogador_da_vez_idx']
+        jogo.estado = estado['estado']
+        jogo.acao_do_turno = dict(estado['acao_do_turno'])
+        jogo.vencedor = estado['vencedor']
+        jogo.versao = estado['versao']
+        saidos = {dados['sid']: Jogador(dados['sid'], dados['nome'], Cor(dados['cor']), dados.get('bot', False))
+                  for dados in estado['saidos']}
+        for rota, dono in zip(jogo.tabuleiro.rotas, estado['donos']):
+            if dono is None:
+                continue
+            if dono not in jogo.jogadores:
+                # Quem saiu continua dono das rotas que reivindicou
+                rota.set_dono(saidos[dono])
+                jogo.tabuleiro.marcar_reivindicada(rota)
+                continue
+            rota.set_dono(jogo.jogadores[dono])
+            jogo.tabuleiro.marcar_reivindicada(rota)
+            jogo.redes.claim(dono, rota.cidadeA.nome, rota.cidadeB.nome)
+            jogo.jogadores[dono].maior_caminho = jogo.caminhos.add(dono, rota.cidadeA.nome, rota.cidadeB.nome,
+                                                                   rota.comprimento)
+        jogo.baralho_vagao.motor.load_state(estado['baralho'])
+        if estado['mercado'] is not None:
+            jogo.mercado = FaceUpMarket(jogo.baralho_vagao.motor, Cor.LOCOMOTIVA, max_locomotives=None, fill=False)
+            jogo.mercado.load_state(estado['mercado'])
+        if 'bilhetes' in estado:
+            jogo.baralho_destino.load_state(estado['bilhetes'])
+        return jogo
+
+    def aplicar(self, acao: list):
+        # Reaplica uma ação registrada no diário
+        tipo, *args = acao
+        if tipo == 'entrar':
+            self.adicionar_jogador(*args)
+        elif tipo == 'sair':
+            self.remover_jogador(*args)
+        elif tipo == 'reassociar':
+            self.reassociar_jogador(*args)
+        elif tipo == 'iniciar':
+            self.iniciar_jogo()
+        elif tipo == 'comprar':
+            self.comprar_carta(*args)
+        elif tipo == 'reivindicar':
+            sid, cidade_a, cidade_b, pagamento, rota_id = args
+            self.reivindicar_rota(sid, cidade_a, cidade_b, {Cor(c): n for c, n in pagamento.items()}, rota_id)
+        elif tipo == 'comprar_bilhetes':
+            self.comprar_bilhetes(*args)
+        elif tipo == 'escolher_bilhetes':
+            self.escolher_bilhetes(*args)
+
+    @classmethod
+    def restaurar(cls, diario: Journal) -> 'Jogo':
+        """Snapshot mais recente + ações registradas depois dele."""
+        estado, acoes = diario.load()
+        jogo = cls.from_state(estado)
+        for acao in acoes:
+            jogo.aplicar(acao)
+            jogo.fechar_versao()    # uma versão por ação, como no servidor ao vivo
+        jogo.historico.clear()
+        # Ninguém está conectado a um servidor que acabou de subir (só os bots):
+        # a graça para retomar os assentos conta a partir daqui
+        agora = time.monotonic()
+        for jogador in jogo.jogadores.values():
+            jogador.conectado = jogador.bot
+            jogador.desconectado_em = None if jogador.bot else agora
+        jogo.diario = diario
+        return jogo
+
+    # --- Estado para o frontend ---
+    # Parte pública (igual para todos, serializada uma vez por versão) + parte
+    # privada pequena (a mão de cada jogador).
+    def estado_publico(self) -> dict:
         jogador_da_vez = self.get_jogador_da_vez()
         return {
+            'versao': self.versao,
             'estado': self.estado,
-            'jogadores': [j.to_dict(para_si_mesmo=(j.sid == para_sid)) for j in self.jogadores.values()],
+            'jogadores': [j.to_dict_publico() for j in self.jogadores.values()],
             'tabuleiro': self.tabuleiro.to_dict(),
-            'cartas_visiveis': [c.to_dict() for c in self.cartas_visiveis if c],
+            'cartas_visiveis': self._cartas_visiveis_dict(),
             'jogador_da_vez_sid': jogador_da_vez.sid if jogador_da_vez else None,
             'acao_do_turno': self.acao_do_turno,
             'vencedor': self.vencedor
         }
 
+    def estado_publico_bytes(self) -> bytes:
+        if self._cache_publico is None or self._cache_publico[0] != self.versao:
+            with metricas.cronometro('t2r_serializacao_segundos', 'tipo="estado"'):
+                self._cache_publico = (self.versao, json_bytes(self.estado_publico()))
+        return self._cache_publico[1]
+
+    def estado_privado(self, sid) -> dict:
+        jogador = self.jogadores.get(sid)
+        if not jogador:
+            return {}
+        return {**jogador.estado_privado(), 'rotas_jogaveis': self.rotas_jogaveis(jogador),
+                'bilhetes': self.bilhetes(jogador), 'oferta_bilhetes': self.oferta_bilhetes(jogador)}
+
+    def get_estado_para_frontend(self, para_sid=None):
+        estado = self.estado_publico()
+        estado['jogadores'] = [j.to_dict(para_si_mesmo=(j.sid == para_sid)) for j in self.jogadores.values()]
+        return estado
+
+# --- Eventos do jogo (independentes do Socket.IO) ---
+# Cada evento recebe o gerenciador de salas e devolve a lista de mensagens a
+# enviar, (evento, dados, destino). Assim o mesmo código roda no processo do
+# Flask ou em um processo de shard (ver salas.py).
+
+# Estado e patches: a parte pública é codificada uma vez por versão e vai em
+# um único envio para a sala do Socket.IO (jogadores e espectadores); a parte
+# privada (mão, bilhetes, rotas jogáveis) vai só para o sid do dono, antes da
+# pública da mesma versão, e o cliente a aplica quando a pública chega. O custo
+# por ação não cresce com o número de espectadores.
+
+def _privadas(jogo: Jogo, evento: str, dados_por_sid: dict[str, dict]) -> list[Saida]:
+    return [(evento, {'versao': jogo.versao, **dados}, sid) for sid, dados in dados_por_sid.items()
+            if sid in jogo.jogadores and not jogo.jogadores[sid].bot]
+
+def mensagem_estado(jogo: Jogo, sid) -> list[Saida]:
+    # Estado completo só para um cliente (entrada de espectador, pedido de snapshot)
+    return _privadas(jogo, 'estado_privado', {sid: jogo.estado_privado(sid)}) + \
+        [('game_state_update', jogo.estado_publico_bytes(), sid)]
+
+def patches_desde(jogo: Jogo, sid, versao) -> list[Saida] | None:
+    """Patches públicos depois de `versao` (a última que o cliente aplicou), só
+    para ele, já codificados no histórico; None se o histórico não cobre."""
+    historico = jogo.historico
+    if not isinstance(versao, int) or versao > jogo.versao:
+        return None
+    if versao == jogo.versao and not historico:
+        return None  # sem histórico não dá para saber se é a mesma versão (ex.: servidor restaurado)
+    if historico and (historico[0][0] > versao + 1 or historico[-1][0] != jogo.versao):
+        return None
+    return [('game_patch', publico, sid) for v, publico in historico if v > versao]
+
+def atualizar_cliente(jogo: Jogo, sid, versao) -> list[Saida]:
+    # Reconexão: só o que mudou desde a versão do cliente, ou o estado completo
+    patches = patches_desde(jogo, sid, versao)
+    if patches is None:
+        metricas.contar('t2r_retomadas_total', rotulos='tipo="estado"')
+        return mensagem_estado(jogo, sid)
+    metricas.contar('t2r_retomadas_total', rotulos='tipo="patches"')
+    return patches
+
+@metricas.medido('t2r_broadcast_estado_segundos')
+def broadcast_game_state(sala: Sala) -> list[Saida]:
+    jogo = sala.jogo
+    privados = {sid: jogo.estado_privado(sid) for sid in jogo.jogadores}
+    return _privadas(jogo, 'estado_privado', privados) + [('game_state_update', jogo.estado_publico_bytes(), sala.id)]
+
+def patch_bytes(patch: dict) -> bytes:
+    if 'bytes' not in patch:
+        with metricas.cronometro('t2r_serializacao_segundos', 'tipo="patch"'):
+            patch['bytes'] = json_bytes({'versao': patch['versao'], 'base': patch['versao'] - 1, 'ops': patch['ops']})
+    return patch['bytes']
+
+def broadcast_patch(sala: Sala) -> list[Saida]:
+    jogo = sala.jogo
+    patch = jogo.fechar_versao()
+    if patch is None:
+        return []
+    privadas = {sid: {'ops': ops} for sid, ops in patch['privadas'].items()}
+    return _privadas(jogo, 'patch_privado', privadas) + [('game_patch', patch_bytes(patch), sala.id)]
+
+# Resposta a um 'retomar' sem assento: o servidor também tira o sid da sala do Socket.IO
+SESSAO_EXPIRADA = 'sessao_expirada'
+
+def _erro(sid, motivo) -> list[Saida]:
+    return [('erro_acao', {'motivo': motivo}, sid)]
+
+def _inteiro(valor) -> bool:
+    # Dados do cliente: bool também é int em Python
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+def _resumo(sala: Sala) -> list[Saida]:
+    return [(SALA_ATUALIZADA, sala.resumo(), None)]
+
+# Um bot por processo: a busca não guarda estado entre jogadas
+BOT = criar_bot(Jogo, Cor)
+
+def agendar_bots(sala: Sala) -> list[Saida]:
+    """Bilhetes pendentes dos bots saem na hora; se a vez é de um bot, pede a
+    busca dele (BOT_PENSAR) em vez de rodá-la aqui, no caminho do evento."""
+    jogo = sala.jogo
+    saidas = []
+    # Bilhetes pendentes dos bots (os iniciais são escolhidos fora da vez)
+    for bot in [j for j in jogo.jogadores.values() if j.bot and j.oferta_destino]:
+        jogo.escolher_bilhetes(bot.sid, escolher_bilhetes_bot(jogo, bot))
+        saidas += broadcast_patch(sala)
+    if saidas:
+        saidas += _resumo(sala)
+    jogador = jogo.get_jogador_da_vez()
+    if jogador is None or not jogador.bot or sala.bot_pensando:
+        return saidas
+    if not any(j.conectado and not j.bot for j in jogo.jogadores.values()):
+        return saidas  # sem pessoas na sala, espera alguém voltar
+    sala.bot_pensando = True
+    pedido = {'sala_id': sala.id, 'versao': jogo.versao, 'estado': BOT.model.state(jogo),
+              'vez': jogo.jogador_da_vez_idx}
+    return saidas + [(BOT_PENSAR, pedido, None)]
+
+def pensar_bot(pedido: dict) -> dict:
+    """Busca do bot sobre o estado copiado da sala; roda no Pensador."""
+    return {'sala_id': pedido['sala_id'], 'versao': pedido['versao'],
+            'acao': BOT.choose_state(pedido['estado'], pedido['vez'])}
+
+def evento_jogada_bot(salas: GerenciadorSalas, sid, data):
+    # Interno (sid None): a jogada que o Pensador escolheu para o bot da vez
+    sala = salas.get(data.get('sala_id'))
+    if sid is not None or not sala:
+        return []
+    jogo = sala.jogo
+    sala.bot_pensando = False
+    if data.get('versao') != jogo.versao:
+        return agendar_bots(sala)  # o jogo mudou enquanto o bot pensava: pensa de novo
+    if data.get('acao') is None:
+        return []
+    BOT.model.apply(jogo, data['acao'])
+    patch = broadcast_patch(sala)
+    if not patch:
+        return []  # ação recusada: não pede outra busca para o mesmo estado
+    sala.tocar()
+    return patch + _resumo(sala) + agendar_bots(sala)
+
+def evento_criar_sala(salas: GerenciadorSalas, sid, data):
+    sala_id = data.get('sala_id')
+    if sala_id is not None and not id_valido(sala_id):
+        return _erro(sid, 'ID de sala inválido.')
+    sala = salas.criar_sala(sala_id, data.get('nome'))
+    return [('sala_criada', {'sala_id': sala.id}, sid)] + _resumo(sala)
+
+def evento_entrar(salas: GerenciadorSalas, sid, data):
+    sala_id = data.get('sala_id')
+    if not id_valido(sala_id):
+        return _erro(sid, 'ID de sala inválido.')
+    sala = salas.get(sala_id) or salas.criar_sala(sala_id)
+    nome_jogador = data.get('nome', 'Anônimo')
+    assistia = salas.deixar_de_assistir(sid)
+    # Assentos sem token (diários antigos) voltam pelo nome depois de uma queda do servidor
+    assento = sala.jogo.jogador_desconectado(nome_jogador)
+    if assento:
+        return _retomar_assento(salas, sala, assento, sid, None)
+    jogador = sala.jogo.adicionar_jogador(sid, nome_jogador)
+    if not jogador:
+        if assistia:
+            salas.assistir(sid, assistia)
+        return _erro(sid, 'A sala está cheia.')
+    salas.associar(sid, sala.id)
+    sala.tocar()
+    return [('sala_atual', {'sala_id': sala.id, 'token': jogador.token}, sid)] + broadcast_game_state(sala) + \
+        _resumo(sala) + agendar_bots(sala)
+
+def _retomar_assento(salas: GerenciadorSalas, sala: Sala, jogador: Jogador, sid, versao) -> list[Saida]:
+    jogo = sala.jogo
+    salas.deixar_de_assistir(sid)
+    saidas = [('sala_atual', {'sala_id': sala.id, 'token': jogador.token}, sid)]
+    if jogador.sid == sid:
+        return saidas + atualizar_cliente(jogo, sid, versao)
+    # A conexão antiga (talvez ainda não dada como caída) deixa de valer
+    salas.desassociar(jogador.sid)
+    salas.associar(sid, sala.id)
+    # O cliente recebe o que perdeu antes do patch da troca de sid, que vai para a sala toda
+    patches = patches_desde(jogo, sid, versao)
+    jogo.reassociar_jogador(jogador.sid, sid)
+    sala.tocar()
+    troca = broadcast_patch(sala)
+    if patches is None:
+        # Estado completo, já na versão da troca (a sala recebe o patch antes)
+        metricas.contar('t2r_retomadas_total', rotulos='tipo="estado"')
+        return saidas + troca + mensagem_estado(jogo, sid) + _resumo(sala) + agendar_bots(sala)
+    # A parte privada inteira vai junto do patch da troca (a mão pode ter mudado)
+    metricas.contar('t2r_retomadas_total', rotulos='tipo="patches"')
+    privado = [('estado_privado', {'versao': jogo.versao, **jogo.estado_privado(sid)}, sid)]
+    return saidas + patches + privado + troca + _resumo(sala) + agendar_bots(sala)
+
+def evento_retomar(salas: GerenciadorSalas, sid, data):
+    # Depois de uma queda da conexão (ou do servidor): volta ao assento pelo token da sessão
+    sala = salas.get(data.get('sala_id'))
+    jogador = sala.jogo.jogador_por_token(data.get('token')) if sala else None
+    if not jogador:
+        return [(SESSAO_EXPIRADA, {'sala_id': data.get('sala_id')}, sid)]
+    return _retomar_assento(salas, sala, jogador, sid, data.get('versao'))
+
+def evento_assistir(salas: GerenciadorSalas, sid, data):
+    # Espectador: recebe os envios públicos da sala, nunca a mão de ninguém
+    sala = salas.get(data.get('sala_id'))
+    if not sala:
+        return _erro(sid, 'Sala não encontrada.')
+    if sid in sala.jogo.jogadores:
+        return _erro(sid, 'Você já está jogando nesta sala.')
+    salas.assistir(sid, sala)
+    # Um espectador que reconecta manda a versão que tinha e recebe só o que perdeu
+    atualizacao = atualizar_cliente(sala.jogo, sid, data['versao']) if 'versao' in data else \
+        mensagem_estado(sala.jogo, sid)
+    return [('sala_atual', {'sala_id': sala.id, 'espectador': True}, sid)] + atualizacao + _resumo(sala)
+
+def evento_sair(salas: GerenciadorSalas, sid, data):
+    assistida = salas.deixar_de_assistir(sid)
+    if assistida:
+        return _resumo(assistida)
+    sala = salas.desassociar(sid)
+    if not sala or sid not in sala.jogo.jogadores:
+        return []
+    # A conexão caiu: o assento fica guardado por GRACA_RECONEXAO (ver evento_expirar_assentos)
+    sala.jogo.desconectar_jogador(sid)
+    return broadcast_patch(sala) + _resumo(sala)
+
+def evento_expirar_assentos(salas: GerenciadorSalas, sid, data):
+    # Periódico, por sala: quem caiu e não voltou dentro da graça perde o assento
+    sala = salas.get(data.get('sala_id'))
+    if not sala:
+        return []
+    expirados = sala.jogo.ausentes_expirados(data.get('graca', GRACA_RECONEXAO))
+    for sid_ausente in expirados:
+        sala.jogo.remover_jogador(sid_ausente)
+    if not expirados:
+        return []
+    sala.tocar()
+    return broadcast_game_state(sala) + _resumo(sala) + agendar_bots(sala)
+
+def evento_adicionar_bot(salas: GerenciadorSalas, sid, data):
+    sala = salas.sala_do_sid(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    jogo = sala.jogo
+    if jogo.estado != "AGUARDANDO_JOGADORES":
+        return _erro(sid, 'O jogo já começou.')
+    numero = sum(1 for j in jogo.jogadores.values() if j.bot) + 1
+    if not jogo.adicionar_jogador(novo_sid_bot(), f'Bot {numero}', bot=True):
+        return _erro(sid, 'A sala está cheia.')
+    sala.tocar()
+    return broadcast_game_state(sala) + _resumo(sala)
+
+def evento_iniciar(salas: GerenciadorSalas, sid, data):
+    sala = salas.sala_do_sid(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    jogo = sala.jogo
+    if not jogo.ordem_jogadores or sid != jogo.ordem_jogadores[0]:
+        return []
+    jogo.iniciar_jogo()
+    sala.tocar()
+    return broadcast_game_state(sala) + _resumo(sala) + agendar_bots(sala)
+
+def evento_pedir_snapshot(salas: GerenciadorSalas, sid, data):
+    # O cliente percebeu um buraco nas versões: reenvia o estado completo só para ele
+    sala = salas.sala_do_sid(sid) or salas.sala_do_espectador(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    return mensagem_estado(sala.jogo, sid)
+
+def evento_planejar_rota(salas: GerenciadorSalas, sid, data):
+    # Consulta: não muda o jogo nem gera versão
+    sala = salas.sala_do_sid(sid)
+    if not sala or sid not in sala.jogo.jogadores:
+        return _erro(sid, 'Você não está em uma sala.')
+    origem, destino = data.get('origem'), data.get('destino')
+    if not isinstance(origem, str) or not isinstance(destino, str):
+        return _erro(sid, 'Cidade inválida.')
+    try:
+        plano = sala.jogo.planejar_rota(sala.jogo.jogadores[sid], origem, destino)
+    except ValueError as erro:
+        return _erro(sid, str(erro))
+    return [('plano_rota', plano, sid)]
+
+def evento_pedir_chances(salas: GerenciadorSalas, sid, data):
+    # Consulta: não muda o jogo nem gera versão
+    sala = salas.sala_do_sid(sid)
+    if not sala or sid not in sala.jogo.jogadores:
+        return _erro(sid, 'Você não está em uma sala.')
+    jogo = sala.jogo
+    return [('chances_rotas', {'versao': jogo.versao, **jogo.chances_rotas(jogo.jogadores[sid])}, sid)]
+
+def evento_comprar_carta(salas: GerenciadorSalas, sid, data):
+    sala = salas.sala_do_sid(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    indice = data.get('index')
+    if not _inteiro(indice):
+        return _erro(sid, 'Carta inválida.')
+    sucesso, motivo = sala.jogo.comprar_carta(sid, indice)
+    if not sucesso:
+        return _erro(sid, motivo)
+    sala.tocar()
+    return broadcast_patch(sala) + agendar_bots(sala)
+
+def evento_reivindicar_rota(salas: GerenciadorSalas, sid, data):
+    sala = salas.sala_do_sid(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    cartas, rota_info = data.get('cartas'), data.get('rota')
+    if not isinstance(cartas, dict) or not all(_inteiro(qtd) and qtd >= 0 for qtd in cartas.values()):
+        return _erro(sid, 'Você não possui as cartas selecionadas.')
+    try:
+        pagamento = {Cor(cor_val): qtd for cor_val, qtd in cartas.items()}
+    except ValueError:
+        return _erro(sid, 'Você não possui as cartas selecionadas.')
+    if not isinstance(rota_info, dict) or not all(isinstance(rota_info.get(c), str) for c in ('cidadeA', 'cidadeB')):
+        return _erro(sid, 'Rota inválida ou já reivindicada.')
+    # 'i' (opcional) é o índice da rota no tabuleiro: escolhe entre as paralelas
+    rota_id = rota_info.get('i')
+    if rota_id is not None and not _inteiro(rota_id):
+        return _erro(sid, 'Rota inválida ou já reivindicada.')
+
+    sucesso, motivo = sala.jogo.reivindicar_rota(sid, rota_info['cidadeA'], rota_info['cidadeB'], pagamento, rota_id)
+    if not sucesso:
+        return _erro(sid, motivo)
+    sala.tocar()
+    return broadcast_patch(sala) + _resumo(sala) + agendar_bots(sala)
+
+def evento_comprar_bilhetes(salas: GerenciadorSalas, sid, data):
+    sala = salas.sala_do_sid(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    sucesso, motivo = sala.jogo.comprar_bilhetes(sid)
+    if not sucesso:
+        return _erro(sid, motivo)
+    sala.tocar()
+    return broadcast_patch(sala)
+
+def evento_escolher_bilhetes(salas: GerenciadorSalas, sid, data):
+    sala = salas.sala_do_sid(sid)
+    if not sala:
+        return _erro(sid, 'Você não está em uma sala.')
+    sucesso, motivo = sala.jogo.escolher_bilhetes(sid, data.get('manter', []))
+    if not sucesso:
+        return _erro(sid, motivo)
+    sala.tocar()
+    return broadcast_patch(sala) + agendar_bots(sala)
+
+EVENTOS = {
+    'criar_sala': evento_criar_sala,
+    'entrar_no_jogo': evento_entrar,
+    'assistir': evento_assistir,
+    'retomar': evento_retomar,
+    'disconnect': evento_sair,
+    'expirar_assentos': evento_expirar_assentos,
+    'adicionar_bot': evento_adicionar_bot,
+    'iniciar_jogo': evento_iniciar,
+    'pedir_snapshot': evento_pedir_snapshot,
+    'planejar_rota': evento_planejar_rota,
+    'pedir_chances': evento_pedir_chances,
+    'comprar_carta': evento_comprar_carta,
+    'reivindicar_rota': evento_reivindicar_rota,
+    'comprar_bilhetes': evento_comprar_bilhetes,
+    'escolher_bilhetes': evento_escolher_bilhetes,
+    JOGADA_BOT: evento_jogada_bot,
+}
+
+def processar_evento(salas: GerenciadorSalas, evento: str, sid: str, data: dict) -> list[Saida]:
+    data = data if isinstance(data, dict) else {}  # o cliente pode mandar qualquer JSON
+    if not metricas.ATIVO:
+        return EVENTOS[evento](salas, sid, data)
+    rotulos = f'evento="{evento}"'
+    with metricas.cronometro('t2r_evento_segundos', rotulos):
+        saidas = EVENTOS[evento](salas, sid, data)
+    metricas.contar('t2r_eventos_total', rotulos=rotulos)
+    if any(nome == 'erro_acao' for nome, _, _ in saidas):
+        metricas.contar('t2r_erros_acao_total', rotulos=rotulos)
+    return saidas
+
 # --- Configuração do Servidor Flask e SocketIO ---
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'super-secret-key!'
 socketio = SocketIO(app)
-jogo = Jogo()
+salas = GerenciadorSalas(Jogo)       # usado quando não há shards
+diretorio = DiretorioSalas()         # resumo das salas para listagem e entrada automática
+sala_por_sid: dict[str, str] = {}
+roteador: RoteadorShards | None = None
+# Os handlers rodam em threads: sem shards, cada sala aplica uma ação por vez
+travas = TravasPorSala()
+amostrador = metricas.Amostrador()   # ligado com --perfil
+# Sem shards, a busca dos bots roda aqui e a jogada volta pela trava da sala
+pensador = Pensador(pensar_bot, lambda sala_id, jogada: despachar(JOGADA_BOT, None, jogada, sala_id=sala_id))
+# Junta os patches de cada sala por tick e segura clientes atrasados (ver envios.py)
+agendador = AgendadorEnvios()
+trava_envios = threading.Lock()
+for _nome, _chave, _tipo in (('t2r_patches_gerados_total', 'patches_recebidos', 'counter'),
+                             ('t2r_atualizacoes_enviadas_total', 'atualizacoes_enviadas', 'counter'),
+                             ('t2r_envios_razao_juncao', 'razao_juncao', 'gauge'),
+                             ('t2r_patches_descartados_total', 'descartados', 'counter'),
+                             ('t2r_clientes_atrasados', 'atrasados', 'gauge')):
+    metricas.medidor(_nome, lambda chave=_chave: agendador.estatisticas()[chave], _tipo)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-def broadcast_game_state():
-    for sid in jogo.jogadores:
-        emit('game_state_update', jogo.get_estado_para_frontend(para_sid=sid), room=sid)
+@app.route('/metrics')
+def rota_metricas():
+    return Response(metricas.texto_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/perfil')
+def rota_perfil():
+    # Pilhas amostradas até agora, no formato folded (flamegraph.pl, speedscope)
+    if not amostrador.rodando:
+        abort(404)
+    return Response(amostrador.folded(), mimetype='text/plain')
+
+def _emitir(envios: list[Envio]):
+    for evento, dados, destino, pular in envios:
+        metricas.contar('t2r_mensagens_enviadas_total')
+        socketio.emit(evento, dados, to=destino, skip_sid=pular)
+
+def enviar(saidas: list[Saida]):
+    para_clientes = []
+    for evento, dados, destino in saidas:
+        if evento == BOT_PENSAR:
+            pensador.pedir(dados)
+            continue
+        if evento == SALA_REMOVIDA:
+            travas.descartar(dados['sala_id'])
+        if evento == metricas.METRICAS:
+            metricas.guardar_remoto(dados['origem'], dados['dados'])
+            continue
+        if diretorio.aplicar(evento, dados):
+            continue
+        if evento == SESSAO_EXPIRADA:
+            _sair_da_sala(destino, dados['sala_id'])
+        para_clientes.append((evento, dados, destino))
+    # Uma trava para todas as salas: o agendador é compartilhado e a ordem de cada sala se mantém
+    with trava_envios:
+        _emitir(agendador.receber(para_clientes))
+
+def _sair_da_sala(sid: str, sala_id: str):
+    # O handler de 'retomar' entra na sala antes de saber se o token vale
+    if sala_por_sid.get(sid) == sala_id:
+        del sala_por_sid[sid]
+    socketio.server.leave_room(sid, sala_id, namespace='/')
+    with trava_envios:
+        agendador.sair(sid)
+
+def _drenar_envios_periodicamente():
+    while True:
+        socketio.sleep(agendador.tick)
+        with trava_envios:
+            _emitir(agendador.drenar())
+
+def despachar(evento: str, sid: str, data: dict, sala_id: str | None = None):
+    sala_id = sala_id or sala_por_sid.get(sid)
+    if roteador is None:
+        # O envio fica dentro da trava para os patches da sala saírem em ordem
+        with travas(sala_id):
+            enviar(processar_evento(salas, evento, sid, data))
+    elif sala_id:
+        roteador.enviar(sala_id, evento, sid, data or {})
+    else:
+        emit('erro_acao', {'motivo': 'Você não está em uma sala.'})
+
+def _repassar_saidas_dos_shards():
+    while True:
+        enviar(roteador.receber_saidas(timeout=0.1))
+        socketio.sleep(0)
+
+def _limpar_salas_periodicamente(intervalo=30):
+    while True:
+        socketio.sleep(intervalo)
+        enviar(limpar_salas(salas))
+
+def _expirar_assentos_periodicamente(graca: float, intervalo=10):
+    # Só as salas com alguém fora (o resumo diz quantos), no processo dono da sala
+    while True:
+        socketio.sleep(intervalo)
+        for resumo in diretorio.listar():
+            if resumo.get('ausentes'):
+                despachar('expirar_assentos', None, {'graca': graca}, sala_id=resumo['sala_id'])
 
 @socketio.on('connect')
 def handle_connect():
-    emit('game_state_update', jogo.get_estado_para_frontend(para_sid=request.sid))
+    emit('lista_salas', {'salas': diretorio.listar()})
+
+@socketio.on('listar_salas')
+def handle_list_rooms(data=None):
+    emit('lista_salas', {'salas': diretorio.listar()})
+
+@socketio.on('criar_sala')
+def handle_create_room(data=None):
+    data = dict(data or {})
+    data['sala_id'] = data.get('sala_id') or novo_id_sala()
+    despachar('criar_sala', request.sid, data, sala_id=data['sala_id'])
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    if request.sid in jogo.jogadores:
-        del jogo.jogadores[request.sid]
-        if request.sid in jogo.ordem_jogadores:
-            jogo.ordem_jogadores.remove(request.sid)
-        broadcast_game_state()
+    with trava_envios:
+        agendador.sair(request.sid)
+    sala_id = sala_por_sid.pop(request.sid, None)
+    if sala_id:
+        despachar('disconnect', request.sid, {}, sala_id=sala_id)
 
 @socketio.on('entrar_no_jogo')
 def handle_join_game(data):
-    nome_jogador = data.get('nome', 'Anônimo')
-    if jogo.adicionar_jogador(request.sid, nome_jogador):
-        broadcast_game_state()
+    data = dict(data or {})
+    # Sem sala escolhida: entra em uma mesa aguardando jogadores ou abre uma nova
+    sala_id = data.get('sala_id') or diretorio.sala_disponivel() or novo_id_sala()
+    if not id_valido(sala_id):
+        return emit('erro_acao', {'motivo': 'ID de sala inválido.'})
+    data['sala_id'] = sala_id
+    sala_por_sid[request.sid] = sala_id
+    join_room(sala_id)
+    with trava_envios:
+        agendador.entrar(request.sid, sala_id)
+    despachar('entrar_no_jogo', request.sid, data, sala_id=sala_id)
+
+@socketio.on('assistir')
+def handle_watch_game(data):
+    data = dict(data or {})
+    sala_id = data.get('sala_id')
+    if not id_valido(sala_id):
+        return emit('erro_acao', {'motivo': 'ID de sala inválido.'})
+    if sala_por_sid.get(request.sid, sala_id) != sala_id:
+        return emit('erro_acao', {'motivo': 'Saia da sala atual antes de assistir outra.'})
+    sala_por_sid[request.sid] = sala_id
+    join_room(sala_id)
+    with trava_envios:
+        agendador.entrar(request.sid, sala_id)
+    despachar('assistir', request.sid, data, sala_id=sala_id)
+
+@socketio.on('retomar')
+def handle_resume(data):
+    # Reconexão: volta ao assento pelo token da sessão, recebendo só o que perdeu
+    data = dict(data or {})
+    sala_id = data.get('sala_id')
+    if not id_valido(sala_id):
+        return emit(SESSAO_EXPIRADA, {'sala_id': sala_id})
+    if sala_por_sid.get(request.sid, sala_id) != sala_id:
+        return emit('erro_acao', {'motivo': 'Saia da sala atual antes de voltar a outra.'})
+    sala_por_sid[request.sid] = sala_id
+    join_room(sala_id)
+    with trava_envios:
+        agendador.entrar(request.sid, sala_id)
+    despachar('retomar', request.sid, data, sala_id=sala_id)
 
 @socketio.on('iniciar_jogo')
-def handle_start_game():
-    if request.sid == jogo.ordem_jogadores[0]:
-        jogo.iniciar_jogo()
-        broadcast_game_state()
+def handle_start_game(data=None):
+    despachar('iniciar_jogo', request.sid, data)
 
-@socketio.on('comprar_carta')
-def handle_buy_card(data):
-    jogador = jogo.get_jogador_da_vez()
-    if not jogador or jogador.sid != request.sid:
-        return emit('erro_acao', {'motivo': 'Não é sua vez.'})
-
-    index_carta = data['index']
-    if jogo.acao_do_turno['cartas_compradas'] == 1 and index_carta != -1:
-        carta_alvo = jogo.cartas_visiveis[index_carta]
-        if carta_alvo and carta_alvo.cor == Cor.LOCOMOTIVA:
-            return emit('erro_acao', {'motivo': 'Você não pode pegar uma Locomotiva como segunda carta.'})
-
-    if jogo.acao_do_turno['tipo'] is None:
-        jogo.acao_do_turno['tipo'] = 'COMPRANDO_CARTAS'
-    elif jogo.acao_do_turno['tipo'] != 'COMPRANDO_CARTAS':
-        return emit('erro_acao', {'motivo': 'Você não pode comprar cartas depois de outra ação.'})
-
-    carta_comprada = None
-    era_locomotiva_visivel = False
-    if index_carta == -1:
-        carta_comprada = jogo.baralho_vagao.comprar_carta()
-    elif 0 <= index_carta < len(jogo.cartas_visiveis):
-        carta_comprada = jogo.cartas_visiveis[index_carta]
-        if carta_comprada.cor == Cor.LOCOMOTIVA:
-            era_locomotiva_visivel = True
-        jogo.cartas_visiveis[index_carta] = jogo.baralho_vagao.comprar_carta()
-    
-    if not carta_comprada:
-        return emit('erro_acao', {'motivo': 'Carta inválida ou baralho vazio.'})
+@socketio.on('adicionar_bot')
+def handle_add_bot(data=None):
+    despachar('adicionar_bot', request.sid, data)
 
-    jogador.comprar_carta_vagao(carta_comprada)
-    jogo.acao_do_turno['cartas_compradas'] += 1
+@socketio.on('pedir_snapshot')
+def handle_snapshot_request(data=None):
+    despachar('pedir_snapshot', request.sid, data)
 
-    terminou_o_turno = False
-    if jogo.acao_do_turno['cartas_compradas'] >= 2:
-        terminou_o_turno = True
-    if era_locomotiva_visivel and jogo.acao_do_turno['cartas_compradas'] == 1:
-        terminou_o_turno = True
-    
-    if terminou_o_turno:
-        jogo.proximo_turno()
-    
-    broadcast_game_state()
+@socketio.on('confirmar_versao')
+def handle_confirm_version(data):
+    # Versão aplicada pela página; quem estava para trás recebe só o estado atual
+    versao = (data or {}).get('versao')
+    if not isinstance(versao, int):
+        return
+    with trava_envios:
+        recuperar = agendador.confirmar(request.sid, versao)
+    if recuperar:
+        despachar('pedir_snapshot', request.sid, {})
+
+@socketio.on('planejar_rota')
+def handle_plan_route(data):
+    despachar('planejar_rota', request.sid, data)
+
+@socketio.on('pedir_chances')
+def handle_odds_request(data=None):
+    despachar('pedir_chances', request.sid, data)
+
+@socketio.on('comprar_carta')
+@metricas.medido('t2r_handler_segundos', 'handler="comprar_carta"')
+def handle_buy_card(data):
+    despachar('comprar_carta', request.sid, data)
 
 @socketio.on('reivindicar_rota')
+@metricas.medido('t2r_handler_segundos', 'handler="reivindicar_rota"')
 def handle_claim_route(data):
-    if jogo.acao_do_turno['tipo'] is not None:
-        return emit('erro_acao', {'motivo': 'Você não pode reivindicar uma rota agora.'})
-        
-    jogador = jogo.get_jogador_da_vez()
-    if not jogador or jogador.sid != request.sid:
-        return emit('erro_acao', {'motivo': 'Não é sua vez.'})
-    
-    rota_info = data['rota']
-    rota = jogo.tabuleiro.get_rota(rota_info['cidadeA'], rota_info['cidadeB'])
-    if not rota or rota.get_dono():
-        return emit('erro_acao', {'motivo': 'Rota inválida ou já reivindicada.'})
-    
-    cartas_pagamento_dict = data['cartas']
-    cartas_pagamento_obj = []
-    copia_mao = list(jogador.cartas_vagao)
-    valido = True
-    for cor_val, qtd in cartas_pagamento_dict.items():
-        for _ in range(qtd):
-            cor_enum = Cor(cor_val)
-            carta_encontrada = next((c for c in copia_mao if c.cor == cor_enum), None)
-            if carta_encontrada:
-                cartas_pagamento_obj.append(carta_encontrada)
-                copia_mao.remove(carta_encontrada)
-            else:
-                valido = False; break
-        if not valido: break
-
-    if not valido:
-        return emit('erro_acao', {'motivo': 'Você não possui as cartas selecionadas.'})
-
-    sucesso, motivo = jogador.reivindicar_rota(rota, cartas_pagamento_obj)
-    
-    if sucesso:
-        for carta in cartas_pagamento_obj:
-            jogo.baralho_vagao.descartar(carta)
-        
-        if not jogo._verificar_fim_de_jogo():
-            jogo.proximo_turno()
-        
-        broadcast_game_state()
-    else:
-        emit('erro_acao', {'motivo': motivo})
+    despachar('reivindicar_rota', request.sid, data)
+
+@socketio.on('comprar_bilhetes')
+def handle_draw_tickets(data=None):
+    despachar('comprar_bilhetes', request.sid, data)
+
+@socketio.on('escolher_bilhetes')
+def handle_choose_tickets(data):
+    despachar('escolher_bilhetes', request.sid, data)
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', debug=True)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Servidor Ticket to Ride")
+    parser.add_argument('--shards', type=int, default=0,
+                        help="número de processos donos de salas (0 = tudo neste processo)")
+    parser.add_argument('--dados', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'partidas'),
+                        help="diretório dos diários das partidas ('' desliga a recuperação)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--porta', type=int, default=5000)
+    parser.add_argument('--metricas', action='store_true',
+                        help="liga histogramas e contadores (expostos em /metrics)")
+    parser.add_argument('--perfil', metavar='ARQUIVO',
+                        help="liga o amostrador de pilhas (/perfil) e salva as pilhas no ARQUIVO ao sair")
+    parser.add_argument('--tick-ms', type=float, default=TICK_PADRAO * 1000,
+                        help="janela em que os patches de uma sala são juntados (0 = só os de um mesmo evento)")
+    parser.add_argument('--fila-max', type=int, default=FILA_MAX,
+                        help="atualizações sem confirmação antes de um cliente ficar para trás")
+    parser.add_argument('--graca', type=float, default=GRACA_RECONEXAO,
+                        help="segundos que o assento de quem caiu fica guardado")
+    args = parser.parse_args()
+    dir_dados = args.dados or None
+    agendador.tick, agendador.fila_max = args.tick_ms / 1000, args.fila_max
+    if args.metricas:
+        metricas.ativar()
+    if args.perfil:
+        import atexit
+        amostrador.iniciar()
+        atexit.register(amostrador.salvar, args.perfil)
+    if args.shards > 0:
+        roteador = RoteadorShards(args.shards, processar_evento, Jogo, dir_dados, pensar=pensar_bot)
+        socketio.start_background_task(_repassar_saidas_dos_shards)
+    else:
+        salas = GerenciadorSalas(Jogo, dir_dados)
+        enviar([(SALA_ATUALIZADA, sala.resumo(), None) for sala in salas.recuperar()])
+        socketio.start_background_task(_limpar_salas_periodicamente)
+    if agendador.tick > 0:
+        socketio.start_background_task(_drenar_envios_periodicamente)
+    socketio.start_background_task(_expirar_assentos_periodicamente, args.graca)
+    # O reloader do modo debug criaria os shards duas vezes
+    socketio.run(app, host=args.host, port=args.porta, debug=True, use_reloader=False)
@@ -0,0 +1,156 @@
+# bots.py
+# Bots com MCTS (t2r_core.mcts) para ocupar assentos vazios nas salas.
+# Não importa app.py: recebe a classe do jogo e o enum de cores.
+import random
+import uuid
+from array import array
+from itertools import combinations
+
+from t2r_core import GameModel, Hand, MCTSBot, best_payment
+
+TEMPO_BOT = 0.3  # segundos por jogada (a busca roda no Pensador do processo dono da sala)
+PREFIXO_SID_BOT = 'bot-'
+
+
+def novo_sid_bot() -> str:
+    return PREFIXO_SID_BOT + uuid.uuid4().hex[:8]
+
+
+def escolher_bilhetes_bot(jogo, jogador) -> list[int]:
+    # Os bilhetes que a rede já completa e, se faltar, os de menor valor
+    rede = jogo.redes.network(jogador.sid)
+    destinos = [jogo.tabuleiro.destinos[i] for i in jogador.oferta_destino]
+    prontos = [i for i, d in enumerate(destinos) if rede.connected(d.origem.nome, d.destino.nome)]
+    ordem = prontos + sorted((i for i in range(len(destinos)) if i not in prontos), key=lambda i: destinos[i].pontos)
+    return sorted(ordem[:max(jogador.minimo_destino, len(prontos))])
+
+
+class ModeloJogo(GameModel):
+    """Adapta `Jogo` à busca. Ações: ('comprar', idx),
+    ('reivindicar', cidadeA, cidadeB, ((cor, qtd), ...), id da rota), ('comprar_bilhetes',)
+    e ('escolher_bilhetes', (posições, ...))."""
+
+    def __init__(self, classe_jogo, cores):
+        self.classe_jogo = classe_jogo
+        self.locomotiva = cores.LOCOMOTIVA
+        self.cores = cores
+
+    def state(self, jogo) -> dict:
+        return jogo.to_state()
+
+    def determinize(self, estado: dict, eu: int, rng: random.Random):
+        # Mãos dos outros + monte são embaralhados e redistribuídos; o bot só
+        # conhece a própria mão, as abertas, o descarte e o tamanho das mãos
+        jogo = self.classe_jogo.from_state(estado)
+        motor = jogo.baralho_vagao.motor
+        outros = [jogo.jogadores[sid] for i, sid in enumerate(jogo.ordem_jogadores) if i != eu]
+        ocultas = list(motor.cards)
+        for j in outros:
+            ocultas += [motor.codes[c] for c in j.cartas_vagao.colors()]
+        rng.shuffle(ocultas)
+        for j in outros:
+            n = len(j.cartas_vagao)
+            j.cartas_vagao = Hand(motor.palette[c] for c in ocultas[:n])
+            del ocultas[:n]
+        motor.cards = array('B', ocultas)
+        motor.rng.seed(rng.getrandbits(64))
+        # Bilhetes dos outros e o monte de bilhetes também são desconhecidos
+        destinos = jogo.tabuleiro.destinos
+        bilhetes = list(jogo.baralho_destino.pile)
+        for j in outros:
+            bilhetes += [destinos.index(d) for d in j.cartas_destino] + j.oferta_destino
+        if bilhetes:
+            rng.shuffle(bilhetes)
+            for j in outros:
+                mantidos, oferta = len(j.cartas_destino), len(j.oferta_destino)
+                jogo.redes.forget(j.sid)
+                j.cartas_destino = [destinos[i] for i in bilhetes[:mantidos]]
+                j.oferta_destino = bilhetes[mantidos:mantidos + oferta]
+                del bilhetes[:mantidos + oferta]
+                jogo.redes.add(j.sid, j.cartas_destino)
+                for rota in jogo.tabuleiro.rotas:
+                    if rota.get_dono() is j:
+                        jogo.redes.claim(j.sid, rota.cidadeA.nome, rota.cidadeB.nome)
+            jogo.baralho_destino.pile = bilhetes
+        return jogo
+
+    def to_move(self, jogo) -> int:
+        return jogo.jogador_da_vez_idx
+
+    def legal_actions(self, jogo) -> list[tuple]:
+        jogador = jogo.get_jogador_da_vez()
+        if jogador is None:
+            return []
+        if jogador.oferta_destino:
+            n = len(jogador.oferta_destino)
+            return [('escolher_bilhetes', manter) for k in range(jogador.minimo_destino, n + 1)
+                    for manter in combinations(range(n), k)]
+        acoes = []
+        if jogo.acao_do_turno['tipo'] is None:
+            tabuleiro = jogo.tabuleiro
+            jogadas = tabuleiro.movimentos.claims(jogador.sid, jogador.cartas_vagao, jogador.pecas_vagao,
+                                                  tabuleiro.indice.free_ids())
+            for i, opcoes in jogadas:
+                # Uma opção por rota: a da cor que o bot mais tem (menos ramificação na busca)
+                pagamento = best_payment(opcoes, jogador.cartas_vagao, self.locomotiva)
+                rota = tabuleiro.rotas[i]
+                acoes.append(('reivindicar', rota.cidadeA.nome, rota.cidadeB.nome,
+                              tuple((c.value, n) for c, n in pagamento.items()), i))
+            if len(jogo.baralho_destino):
+                acoes.append(('comprar_bilhetes',))
+        motor = jogo.baralho_vagao.motor
+        if len(motor.cards) or len(motor.discard):
+            acoes.append(('comprar', -1))
+        vistas = set()
+        segunda = jogo.acao_do_turno['cartas_compradas'] == 1
+        for i, cor in enumerate(jogo.mercado.colors()):
+            if cor in vistas or (segunda and cor == self.locomotiva):
+                continue
+            vistas.add(cor)
+            acoes.append(('comprar', i))
+        return acoes
+
+    def apply(self, jogo, acao: tuple):
+        sid = jogo.ordem_jogadores[jogo.jogador_da_vez_idx]
+        if acao[0] == 'comprar':
+            jogo.comprar_carta(sid, acao[1])
+        elif acao[0] == 'comprar_bilhetes':
+            jogo.comprar_bilhetes(sid)
+        elif acao[0] == 'escolher_bilhetes':
+            jogo.escolher_bilhetes(sid, list(acao[1]))
+        else:
+            _, cidade_a, cidade_b, pagamento, rota_id = acao
+            jogo.reivindicar_rota(sid, cidade_a, cidade_b, {self.cores(c): n for c, n in pagamento}, rota_id)
+
+    def is_over(self, jogo) -> bool:
+        return jogo.estado != "EM_ANDAMENTO"
+
+    def rewards(self, jogo) -> list[float]:
+        # Antes do fim, conta os bilhetes e o maior caminho como se o jogo acabasse agora
+        fim = jogo.estado == "FINALIZADO"
+        bonus = {} if fim else jogo.bonus_maior_caminho()
+        pontos = [jogo.jogadores[sid].pontos + (0 if fim else jogo.redes.score(sid) + bonus.get(sid, 0))
+                  for sid in jogo.ordem_jogadores]
+        melhor = max(pontos)
+        vencedores = pontos.count(melhor)
+        return [1.0 / vencedores if p == melhor else 0.0 for p in pontos]
+
+    def rollout_action(self, jogo, rng: random.Random) -> tuple | None:
+        # Guloso: a rota que mais pontua; senão a carta aberta da cor que mais tem
+        jogador = jogo.get_jogador_da_vez()
+        if jogador is not None and jogador.oferta_destino:
+            return ('escolher_bilhetes', tuple(escolher_bilhetes_bot(jogo, jogador)))
+        acoes = self.legal_actions(jogo)
+        if not acoes:
+            return None
+        rotas = [a for a in acoes if a[0] == 'reivindicar']
+        if rotas:
+            return max(rotas, key=lambda a: sum(n for _, n in a[3]))
+        compras = [a for a in acoes if a[0] == 'comprar' and a[1] >= 0 and jogo.mercado.color_at(a[1]) != self.locomotiva]
+        if compras:
+            return max(compras, key=lambda a: jogador.cartas_vagao.count(jogo.mercado.color_at(a[1])))
+        return rng.choice(acoes)
+
+
+def criar_bot(classe_jogo, cores, tempo: float = TEMPO_BOT) -> MCTSBot:
+    return MCTSBot(ModeloJogo(classe_jogo, cores), tempo)
@@ -0,0 +1,243 @@
+# envios.py
+# Agendador de envios: fica entre os eventos (que geram um patch por ação) e
+# o Socket.IO. Os patches de uma sala que chegam dentro do mesmo tick viram
+# uma só atualização por cliente: as ops são concatenadas e as que substituem
+# uma anterior (mercado, turno, dono de uma rota, ...) ficam só na última.
+# Qualquer outra mensagem para a sala, ou para alguém nela, esvazia antes o
+# que estava juntado, então a ordem das mensagens não muda (o estado ou os
+# patches mandados só para um cliente já incluem o juntado, que ele pula).
+#
+# Contrapressão: a página confirma de tempos em tempos a última versão que
+# aplicou ('confirmar_versao'). Quem passa de `fila_max` atualizações sem
+# confirmar deixa de receber os patches da sala (a fila dele no servidor para
+# de crescer); quando confirma tudo o que recebeu, o servidor manda só o
+# estado mais recente (via 'pedir_snapshot'), sem os intermediários. Clientes
+# que nunca confirmaram (páginas antigas, clientes de carga) ficam fora dessa
+# conta. Nada aqui faz E/S: o servidor emite o que os métodos devolvem.
+import json
+from bisect import bisect_right
+from collections import deque
+
+from salas import Saida
+
+TICK_PADRAO = 0.02  # segundos; 0 junta só as saídas de um mesmo evento
+FILA_MAX = 32       # atualizações sem confirmação antes de o cliente ficar para trás
+
+# (evento, dados, destino, sids a pular no envio para a sala)
+Envio = tuple[str, object, str | None, list[str] | None]
+
+EM_DIA, ATRASADO, RECUPERANDO = 0, 1, 2
+
+# Ops que substituem a anterior com a mesma chave (campo que identifica o alvo, ou None)
+_SUBSTITUI = {'rota': 'i', 'jogador': 'sid', 'mercado': None, 'turno': None, 'fim': None, 'jogaveis': None,
+              'bilhetes': None, 'conexao': 'sid'}
+# Mensagens com estado para um só cliente (snapshot, patches de uma reconexão):
+# trazem tudo o que estava juntado para a sala, então ele não recebe o juntado
+_ESTADO_DIRETO = ('estado_privado', 'game_state_update', 'game_patch')
+
+
+def versao_de(publico: bytes) -> int:
+    # Estado e patch públicos começam por {"versao":N, (ver app.estado_publico e app.patch_bytes)
+    return int(publico[len(b'{"versao":'):publico.index(b',')])
+
+
+def compactar(ops: list[dict]) -> list[dict]:
+    """Ops de várias versões seguidas com o mesmo efeito no cliente: só a última
+    de cada alvo e os deltas da mão somados."""
+    ultima = {}
+    mao: dict[str, int] = {}
+    for i, op in enumerate(ops):
+        tipo = op['op']
+        if tipo in _SUBSTITUI:
+            campo = _SUBSTITUI[tipo]
+            ultima[tipo, op[campo] if campo else None] = i
+        elif tipo == 'mao':
+            ultima['mao', None] = i
+            for cor, n in op['delta'].items():
+                mao[cor] = mao.get(cor, 0) + n
+    saida = []
+    for i, op in enumerate(ops):
+        tipo = op['op']
+        if tipo == 'mao':
+            if ultima['mao', None] == i:
+                saida.append({'op': 'mao', 'delta': {cor: n for cor, n in mao.items() if n}})
+        elif tipo not in _SUBSTITUI or ultima[tipo, op[_SUBSTITUI[tipo]] if _SUBSTITUI[tipo] else None] == i:
+            saida.append(op)
+    return saida
+
+
+class _Cliente:
+    __slots__ = ('sala', 'confirmada', 'ultima', 'estado')
+
+    def __init__(self, sala: str):
+        self.sala = sala
+        self.confirmada: int | None = None  # última versão confirmada (None = não confirma)
+        self.ultima = 0                     # última versão recebida antes de ficar para trás
+        self.estado = EM_DIA
+
+
+class _Sala:
+    __slots__ = ('membros', 'publicos', 'privados', 'versoes')
+
+    def __init__(self, fila_max: int):
+        self.membros: set[str] = set()
+        self.publicos: list[bytes] = []              # patches públicos juntados neste tick
+        self.privados: dict[str, list[dict]] = {}   # sid -> patches privados juntados
+        self.versoes: deque[int] = deque(maxlen=fila_max + 1)  # versões das últimas atualizações enviadas
+
+
+class AgendadorEnvios:
+    """Junta os patches de cada sala por tick e segura os clientes atrasados.
+
+    `receber` devolve o que sai já; `drenar`, chamado a cada `tick`, devolve
+    as atualizações juntadas. Não é thread-safe: o servidor chama tudo sob a
+    mesma trava (ou no laço do asyncio).
+    """
+
+    def __init__(self, tick: float = TICK_PADRAO, fila_max: int = FILA_MAX):
+        self.tick = tick
+        self.fila_max = fila_max
+        self._clientes: dict[str, _Cliente] = {}
+        self._salas: dict[str, _Sala] = {}
+        self.recebidos = 0    # patches públicos gerados pelos eventos
+        self.enviados = 0     # atualizações enviadas depois de juntar
+        self.descartados = 0  # patches que um cliente atrasado deixou de receber
+        self.recuperacoes = 0
+
+    # --- Clientes ---
+    def entrar(self, sid: str, sala_id: str):
+        self.sair(sid)
+        self._clientes[sid] = _Cliente(sala_id)
+        sala = self._salas.get(sala_id)
+        if sala is None:
+            sala = self._salas[sala_id] = _Sala(self.fila_max)
+        sala.membros.add(sid)
+
+    def sair(self, sid: str):
+        cliente = self._clientes.pop(sid, None)
+        if cliente is None:
+            return
+        sala = self._salas[cliente.sala]
+        sala.membros.discard(sid)
+        sala.privados.pop(sid, None)
+        if not sala.membros:
+            del self._salas[cliente.sala]
+
+    def confirmar(self, sid: str, versao: int) -> bool:
+        """Registra a versão aplicada pelo cliente; True se ele estava para trás
+        e já recebeu tudo o que foi enviado (hora de mandar o estado atual)."""
+        cliente = self._clientes.get(sid)
+        if cliente is None:
+            return False
+        if cliente.confirmada is None or versao > cliente.confirmada:
+            cliente.confirmada = versao
+        if cliente.estado == ATRASADO and versao >= cliente.ultima:
+            cliente.estado = RECUPERANDO
+            self.recuperacoes += 1
+            return True
+        return False
+
+    # --- Envio ---
+    def receber(self, saidas: list[Saida]) -> list[Envio]:
+        envios: list[Envio] = []
+        tocadas: list[str] = []
+        for evento, dados, destino in saidas:
+            if evento == 'game_patch' and destino in self._salas:
+                self._salas[destino].publicos.append(dados)
+                self.recebidos += 1
+                if destino not in tocadas:
+                    tocadas.append(destino)
+            elif evento == 'patch_privado' and destino in self._clientes:
+                self._salas[self._clientes[destino].sala].privados.setdefault(destino, []).append(dados)
+            else:
+                cliente = self._clientes.get(destino)
+                sala_id = cliente.sala if cliente is not None else destino
+                if sala_id in self._salas:
+                    envios += self._esvaziar(sala_id, destino if cliente is not None and evento in _ESTADO_DIRETO
+                                             else None)
+                envios += self._direto(evento, dados, destino)
+        if self.tick <= 0:
+            for sala_id in tocadas:
+                envios += self._esvaziar(sala_id)
+        return envios
+
+    def drenar(self) -> list[Envio]:
+        envios: list[Envio] = []
+        for sala_id in [s for s, sala in self._salas.items() if sala.publicos]:
+            envios += self._esvaziar(sala_id)
+        return envios
+
+    def _atrasados(self, sala: _Sala) -> list[str]:
+        # Quem confirma e passou de fila_max atualizações sem confirmar fica para trás
+        versoes = sala.versoes
+        pular = []
+        for sid in sala.membros:
+            cliente = self._clientes[sid]
+            if cliente.estado == EM_DIA and cliente.confirmada is not None and versoes and \
+                    len(versoes) - bisect_right(versoes, cliente.confirmada) >= self.fila_max:
+                cliente.estado = ATRASADO
+                cliente.ultima = versoes[-1]
+            if cliente.estado != EM_DIA:
+                pular.append(sid)
+        return pular
+
+    def _direto(self, evento: str, dados, destino) -> list[Envio]:
+        sala = self._salas.get(destino)
+        if sala is not None:
+            # Para a sala inteira (ex.: estado completo depois de alguém entrar)
+            pular = self._atrasados(sala)
+            if evento == 'game_state_update':
+                sala.versoes.append(versao_de(dados))
+                self.descartados += len(pular)
+            return [(evento, dados, destino, pular or None)]
+        cliente = self._clientes.get(destino)
+        if cliente is not None and cliente.estado != EM_DIA:
+            if evento == 'patch_privado' or (evento == 'estado_privado' and cliente.estado == ATRASADO):
+                self.descartados += 1
+                return []
+            if evento == 'game_state_update':
+                # Estado completo só para ele: está em dia de novo
+                cliente.estado = EM_DIA
+                cliente.confirmada = versao_de(dados)
+        return [(evento, dados, destino, None)]
+
+    def _esvaziar(self, sala_id: str, sem: str | None = None) -> list[Envio]:
+        sala = self._salas[sala_id]
+        publicos, privados = sala.publicos, sala.privados
+        if not publicos:
+            return []
+        sala.publicos, sala.privados = [], {}
+        pular = self._atrasados(sala)
+        self.descartados += len(publicos) * len(pular)
+        if sem is not None and sem not in pular:
+            pular.append(sem)
+            privados.pop(sem, None)
+        if len(publicos) == 1:
+            publico, versao = publicos[0], versao_de(publicos[0])
+        else:
+            patches = [json.loads(p) for p in publicos]
+            versao = patches[-1]['versao']
+            publico = json.dumps({'versao': versao, 'base': patches[0]['base'],
+                                  'ops': compactar([op for p in patches for op in p['ops']])},
+                                 separators=(',', ':')).encode()
+        envios: list[Envio] = []
+        for sid, lista in privados.items():
+            if sid in pular:
+                self.descartados += len(lista)
+                continue
+            if len(lista) == 1 and len(publicos) == 1:
+                envios.append(('patch_privado', lista[0], sid, None))
+            else:
+                # A versão é a do patch público juntado, que o cliente usa para casar as duas partes
+                ops = compactar([op for d in lista for op in d['ops']])
+                envios.append(('patch_privado', {'versao': versao, 'ops': ops}, sid, None))
+        envios.append(('game_patch', publico, sala_id, pular or None))
+        sala.versoes.append(versao)
+        self.enviados += 1
+        return envios
+
+    def estatisticas(self) -> dict:
+        return {'patches_recebidos': self.recebidos, 'atualizacoes_enviadas': self.enviados,
+                'razao_juncao': self.recebidos / self.enviados if self.enviados else 1.0,
+                'descartados': self.descartados, 'recuperacoes': self.recuperacoes,
+                'atrasados': sum(1 for c in self._clientes.values() if c.estado != EM_DIA)}
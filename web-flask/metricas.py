@@ -0,0 +1,197 @@
+# metricas.py
+# Instrumentação de baixo custo: histogramas de latência e contadores,
+# exportados no formato texto do Prometheus (rota /metrics), e um amostrador
+# de pilhas opcional que gera o formato "folded" dos flame graphs
+# (flamegraph.pl, speedscope).
+#
+# Desligada (o padrão), cada ponto medido custa só a checagem de ATIVO. Liga
+# com `--metricas` no servidor ou T2R_METRICAS=1 no ambiente (que também vale
+# para os processos de shard).
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+
+ATIVO = os.environ.get('T2R_METRICAS') == '1'
+
+# Mensagem de controle com o retrato das métricas de um shard (ver salas.py)
+METRICAS = '__metricas__'
+INTERVALO_ENVIO = 5.0  # segundos entre retratos enviados pelos shards
+
+# Limites superiores dos baldes, em segundos (10 µs a 1 s)
+LIMITES = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 1.0)
+
+
+def ativar(ligar: bool = True):
+    global ATIVO
+    ATIVO = ligar
+    # Processos filhos (shards) herdam pelo ambiente
+    os.environ['T2R_METRICAS'] = '1' if ligar else '0'
+
+
+class Histograma:
+    __slots__ = ('baldes', 'soma', 'total')
+
+    def __init__(self):
+        self.baldes = [0] * (len(LIMITES) + 1)  # o último é +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        # Sem trava: um incremento perdido entre threads não muda o retrato
+        self.baldes[bisect_left(LIMITES, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+# Chave das séries: (nome, rótulos já formatados, ex. 'evento="comprar_carta"')
+_histogramas: dict[tuple[str, str], Histograma] = {}
+_contadores: dict[tuple[str, str], int] = {}
+# Retratos recebidos de outros processos, por origem (ex. 'shard-0')
+_remotos: dict[str, dict] = {}
+# Séries calculadas na hora da coleta: nome -> (tipo, função sem argumentos)
+_medidores: dict[str, tuple[str, object]] = {}
+
+
+def observar(nome: str, segundos: float, rotulos: str = ''):
+    h = _histogramas.get((nome, rotulos))
+    if h is None:
+        h = _histogramas.setdefault((nome, rotulos), Histograma())
+    h.observar(segundos)
+
+
+def contar(nome: str, n: int = 1, rotulos: str = ''):
+    if ATIVO:
+        chave = (nome, rotulos)
+        _contadores[chave] = _contadores.get(chave, 0) + n
+
+
+def medidor(nome: str, funcao, tipo: str = 'gauge'):
+    """Série lida só quando /metrics é coletado (ex.: contagens que o dono já mantém)."""
+    _medidores[nome] = (tipo, funcao)
+
+
+def medido(nome: str, rotulos: str = ''):
+    """Decorador: latência de cada chamada em `nome` (histograma) quando ATIVO."""
+    def decorador(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            if not ATIVO:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                observar(nome, time.perf_counter() - inicio, rotulos)
+        return medida
+    return decorador
+
+
+class cronometro:
+    """Mede um bloco: `with cronometro('t2r_x_segundos', 'evento="y"'): ...`."""
+    __slots__ = ('nome', 'rotulos', 'inicio')
+
+    def __init__(self, nome: str, rotulos: str = ''):
+        self.nome, self.rotulos = nome, rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter() if ATIVO else None
+
+    def __exit__(self, *exc):
+        if self.inicio is not None:
+            observar(self.nome, time.perf_counter() - self.inicio, self.rotulos)
+
+
+def retrato() -> dict:
+    """Cópia serializável (pickle) das métricas deste processo."""
+    return {'histogramas': {chave: (list(h.baldes), h.soma, h.total) for chave, h in list(_histogramas.items())},
+            'contadores': dict(_contadores)}
+
+
+def guardar_remoto(origem: str, dados: dict):
+    _remotos[origem] = dados
+
+
+def _rotulos(*partes: str) -> str:
+    partes = [p for p in partes if p]
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def texto_prometheus() -> str:
+    """Todas as séries (deste processo e dos shards) no formato texto do Prometheus."""
+    origens = [('', retrato())] + [(f'origem="{o}"', d) for o, d in sorted(_remotos.items())]
+    series: dict[str, list[str]] = {}
+    tipos: dict[str, str] = {}
+    for origem, dados in origens:
+        for (nome, rotulos), valor in sorted(dados['contadores'].items()):
+            tipos[nome] = 'counter'
+            series.setdefault(nome, []).append(f'{nome}{_rotulos(rotulos, origem)} {valor}')
+        for (nome, rotulos), (baldes, soma, total) in sorted(dados['histogramas'].items()):
+            tipos[nome] = 'histogram'
+            linhas = series.setdefault(nome, [])
+            acumulado = 0
+            for limite, n in zip(LIMITES + (None,), baldes):
+                acumulado += n
+                le = 'le="+Inf"' if limite is None else f'le="{limite!r}"'
+                linhas.append(f'{nome}_bucket{_rotulos(rotulos, origem, le)} {acumulado}')
+            linhas.append(f'{nome}_sum{_rotulos(rotulos, origem)} {soma}')
+            linhas.append(f'{nome}_count{_rotulos(rotulos, origem)} {total}')
+    saida = ['# HELP t2r_metricas_ativas 1 se a instrumentação está ligada',
+             '# TYPE t2r_metricas_ativas gauge', f't2r_metricas_ativas {int(ATIVO)}']
+    for nome in sorted(series):
+        saida.append(f'# TYPE {nome} {tipos[nome]}')
+        saida.extend(series[nome])
+    for nome, (tipo, funcao) in sorted(_medidores.items()):
+        saida.append(f'# TYPE {nome} {tipo}')
+        saida.append(f'{nome} {funcao()}')
+    return '\n'.join(saida) + '\n'
+
+
+class Amostrador:
+    """Amostrador de pilhas em uma thread: a cada `intervalo` guarda a pilha de
+    todas as outras threads. `folded()` devolve 'f1;f2;f3 N' por linha."""
+
+    def __init__(self, intervalo: float = 0.005):
+        self.intervalo = intervalo
+        self.pilhas: Counter = Counter()
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def rodando(self) -> bool:
+        return self._thread is not None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name='amostrador', daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        if self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+
+    def _laco(self):
+        eu = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            for ident, quadro in sys._current_frames().items():
+                if ident == eu:
+                    continue
+                pilha = []
+                while quadro is not None:
+                    codigo = quadro.f_code
+                    pilha.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}')
+                    quadro = quadro.f_back
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def folded(self) -> str:
+        return ''.join(f'{pilha} {n}\n' for pilha, n in self.pilhas.most_common())
+
+    def salvar(self, caminho: str):
+        with open(caminho, 'w') as f:
+            f.write(self.folded())
@@ -0,0 +1,421 @@
+# salas.py
+# Várias mesas por servidor: cada sala tem o seu Jogo. Opcionalmente as salas
+# são divididas (shards) entre processos; o processo do Flask só roteia.
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+from t2r_core import Journal
+
+import metricas
+
+# Mensagem de saída de um evento: (evento, dados, destino). O destino é um sid
+# ou o nome de uma sala do Socket.IO (jogadores e espectadores da mesa). Eventos que começam com "__" são de
+# controle e não vão para os clientes.
+Saida = tuple[str, dict, str | None]
+
+log = logging.getLogger(__name__)
+
+SALA_ATUALIZADA = '__sala__'
+SALA_REMOVIDA = '__sala_removida__'
+# Um bot da sala precisa jogar: o pedido (com o estado copiado) vai para o
+# Pensador do processo dono da sala e a jogada volta como o evento JOGADA_BOT
+BOT_PENSAR = '__bot__'
+JOGADA_BOT = 'jogada_bot'
+
+TTL_FINALIZADA = 5 * 60    # segundos até remover uma sala com jogo finalizado
+TTL_OCIOSA = 30 * 60       # segundos sem nenhuma ação até remover a sala
+MAX_JOGADORES = 4
+
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+
+def novo_id_sala() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+def id_valido(sala_id) -> bool:
+    return isinstance(sala_id, str) and bool(_ID_VALIDO.match(sala_id))
+
+
+def shard_da_sala(sala_id: str, num_shards: int) -> int:
+    # crc32 é estável entre processos (hash() de str não é)
+    return zlib.crc32(sala_id.encode()) % num_shards
+
+
+class Sala:
+    def __init__(self, sala_id: str, jogo, nome: str | None = None):
+        self.id = sala_id
+        self.nome = nome or sala_id
+        self.jogo = jogo
+        self.espectadores: set[str] = set()
+        self.bot_pensando = False  # uma busca de bot por sala, no máximo
+        self.criada_em = time.monotonic()
+        self.ultima_atividade = self.criada_em
+
+    def tocar(self):
+        self.ultima_atividade = time.monotonic()
+
+    def resumo(self) -> dict:
+        return {
+            'sala_id': self.id, 'nome': self.nome, 'estado': self.jogo.estado,
+            'jogadores': [j.nome for j in self.jogo.jogadores.values()],
+            'espectadores': len(self.espectadores),
+            # Jogadores com a conexão caída (o servidor expira os assentos deles depois da graça)
+            'ausentes': sum(1 for j in self.jogo.jogadores.values() if not j.conectado),
+        }
+
+
+class GerenciadorSalas:
+    """Salas de um processo. Com `dir_dados`, cada jogo grava um diário
+    (snapshot + log de ações) e pode ser recuperado depois de uma queda."""
+
+    def __init__(self, fabrica_jogo: Callable, dir_dados: str | None = None):
+        self._fabrica_jogo = fabrica_jogo
+        self.dir_dados = dir_dados
+        self.salas: dict[str, Sala] = {}
+        self._sala_do_sid: dict[str, str] = {}
+        self._sala_do_espectador: dict[str, str] = {}
+        if dir_dados:
+            os.makedirs(dir_dados, exist_ok=True)
+
+    def _diario(self, sala_id: str) -> Journal:
+        base = os.path.join(self.dir_dados, sala_id)
+        return Journal(base + '.jsonl', base + '.snap.json')
+
+    def criar_sala(self, sala_id: str | None = None, nome: str | None = None) -> Sala:
+        sala_id = sala_id or novo_id_sala()
+        if sala_id in self.salas:
+            return self.salas[sala_id]
+        jogo = self._fabrica_jogo()
+        if self.dir_dados:
+            jogo.diario = self._diario(sala_id)
+            jogo.diario.start(jogo.to_state())
+        sala = Sala(sala_id, jogo, nome)
+        self.salas[sala_id] = sala
+        return sala
+
+    def recuperar(self, filtro: Callable[[str], bool] | None = None) -> list[Sala]:
+        """Restaura as salas gravadas em `dir_dados` (só as aceitas por `filtro`)."""
+        if not self.dir_dados:
+            return []
+        recuperadas = []
+        for arquivo in sorted(os.listdir(self.dir_dados)):
+            if not arquivo.endswith('.snap.json'):
+                continue
+            sala_id = arquivo[:-len('.snap.json')]
+            if sala_id in self.salas or (filtro and not filtro(sala_id)):
+                continue
+            sala = Sala(sala_id, self._fabrica_jogo.restaurar(self._diario(sala_id)))
+            self.salas[sala_id] = sala
+            recuperadas.append(sala)
+        return recuperadas
+
+    def get(self, sala_id: str | None) -> Sala | None:
+        return self.salas.get(sala_id) if sala_id else None
+
+    def listar(self) -> list[dict]:
+        return [s.resumo() for s in self.salas.values()]
+
+    def associar(self, sid: str, sala_id: str):
+        self._sala_do_sid[sid] = sala_id
+
+    def sala_do_sid(self, sid: str) -> Sala | None:
+        return self.get(self._sala_do_sid.get(sid))
+
+    def desassociar(self, sid: str) -> Sala | None:
+        return self.get(self._sala_do_sid.pop(sid, None))
+
+    # Espectadores ficam fora de `sala_do_sid`: os eventos de jogo não os encontram
+    def assistir(self, sid: str, sala: Sala):
+        self.deixar_de_assistir(sid)
+        sala.espectadores.add(sid)
+        self._sala_do_espectador[sid] = sala.id
+
+    def sala_do_espectador(self, sid: str) -> Sala | None:
+        return self.get(self._sala_do_espectador.get(sid))
+
+    def deixar_de_assistir(self, sid: str) -> Sala | None:
+        sala = self.get(self._sala_do_espectador.pop(sid, None))
+        if sala:
+            sala.espectadores.discard(sid)
+        return sala
+
+    def remover_inativas(self, agora: float | None = None) -> list[str]:
+        agora = time.monotonic() if agora is None else agora
+        removidas = []
+        for sala_id, sala in list(self.salas.items()):
+            ocioso = agora - sala.ultima_atividade
+            if (sala.jogo.estado == "FINALIZADO" and ocioso > TTL_FINALIZADA) or ocioso > TTL_OCIOSA:
+                del self.salas[sala_id]
+                if sala.jogo.diario is not None:
+                    sala.jogo.diario.remove()
+                for sid in sala.jogo.jogadores:
+                    self._sala_do_sid.pop(sid, None)
+                for sid in sala.espectadores:
+                    self._sala_do_espectador.pop(sid, None)
+                removidas.append(sala_id)
+        return removidas
+
+
+class DiretorioSalas:
+    """Visão das salas no processo do Flask, mantida a partir das mensagens de controle."""
+
+    def __init__(self):
+        self._salas: dict[str, dict] = {}
+
+    def aplicar(self, evento: str, dados: dict) -> bool:
+        if evento == SALA_ATUALIZADA:
+            self._salas[dados['sala_id']] = dados
+        elif evento == SALA_REMOVIDA:
+            self._salas.pop(dados['sala_id'], None)
+        else:
+            return False
+        return True
+
+    def listar(self) -> list[dict]:
+        return list(self._salas.values())
+
+    def sala_disponivel(self) -> str | None:
+        for resumo in self._salas.values():
+            if resumo['estado'] == "AGUARDANDO_JOGADORES" and len(resumo['jogadores']) < MAX_JOGADORES:
+                return resumo['sala_id']
+        return None
+
+
+class TravasPorSala:
+    """Uma trava por sala para o servidor com threads: as ações de uma partida
+    são aplicadas (e enviadas) uma de cada vez, salas diferentes não se esperam."""
+
+    def __init__(self):
+        self._travas: dict[str | None, threading.Lock] = {}
+        self._criacao = threading.Lock()
+
+    def __call__(self, sala_id: str | None) -> threading.Lock:
+        trava = self._travas.get(sala_id)
+        if trava is None:
+            with self._criacao:
+                trava = self._travas.setdefault(sala_id, threading.Lock())
+        return trava
+
+    def descartar(self, sala_id: str):
+        # Só para salas removidas por inatividade: ninguém mais segura a trava
+        self._travas.pop(sala_id, None)
+
+
+class FilasPorSala:
+    """Escritor único por sala para o servidor asyncio.
+
+    Cada sala tem uma fila e uma tarefa que a esvazia em ordem: `processar`
+    roda num pool de threads (o diário não trava o loop) e as saídas
+    são entregues antes da próxima ação da mesma sala, então os patches saem
+    na ordem das versões. Salas diferentes andam ao mesmo tempo. A tarefa de
+    uma sala ociosa termina sozinha e é recriada na próxima ação.
+    """
+
+    def __init__(self, salas: GerenciadorSalas, processar: Callable,
+                 entregar: Callable[[list[Saida]], Awaitable], executor: Executor | None = None,
+                 ocioso: float = 60.0):
+        self.salas = salas
+        self._processar = processar
+        self._entregar = entregar
+        self._executor = executor or ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4))
+        self._ocioso = ocioso
+        self._filas: dict[str, asyncio.Queue] = {}
+        self._tarefas: set[asyncio.Task] = set()  # referências, senão o GC pode levar a tarefa
+
+    def enviar(self, sala_id: str, evento: str, sid: str, dados: dict) -> asyncio.Future:
+        """Enfileira a ação; o futuro recebe as saídas depois de entregues."""
+        futuro = asyncio.get_running_loop().create_future()
+        fila = self._filas.get(sala_id)
+        if fila is None:
+            fila = self._filas[sala_id] = asyncio.Queue()
+            tarefa = asyncio.create_task(self._escritor(sala_id, fila))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+        fila.put_nowait((evento, sid, dados, futuro))
+        return futuro
+
+    async def _escritor(self, sala_id: str, fila: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                evento, sid, dados, futuro = await asyncio.wait_for(fila.get(), self._ocioso)
+            except asyncio.TimeoutError:
+                if fila.empty():  # sem await entre o teste e a remoção: nada se perde
+                    del self._filas[sala_id]
+                    return
+                continue
+            try:
+                saidas = await loop.run_in_executor(self._executor, self._processar, self.salas, evento, sid, dados)
+                await self._entregar(saidas)
+            except Exception as erro:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(saidas)
+
+    async def limpar(self) -> list[Saida]:
+        # Também no pool, para não correr junto com uma ação escrevendo no mesmo dicionário
+        return await asyncio.get_running_loop().run_in_executor(self._executor, limpar_salas, self.salas)
+
+    def fechar(self):
+        self._executor.shutdown(wait=False)
+
+
+class Pensador:
+    """Roda a busca dos bots fora do caminho dos eventos das salas.
+
+    `pensar(pedido)` roda numa thread própria (uma busca por vez: é CPU e
+    várias só dividiriam o GIL) e `devolver(sala_id, jogada)` manda o
+    resultado de volta para a sala como o evento JOGADA_BOT, pela mesma fila
+    ou trava das ações. Enquanto o bot pensa, a sala e as outras salas do
+    processo seguem recebendo eventos.
+    """
+
+    def __init__(self, pensar: Callable[[dict], dict], devolver: Callable[[str, dict], None],
+                 executor: Executor | None = None):
+        self._pensar = pensar
+        self._devolver = devolver
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='pensador')
+
+    def pedir(self, pedido: dict):
+        self._executor.submit(self._rodar, pedido)
+
+    def _rodar(self, pedido: dict):
+        try:
+            jogada = self._pensar(pedido)
+        except Exception:
+            # A sala precisa da resposta para liberar o próximo pedido
+            log.exception('erro na busca do bot da sala %s', pedido['sala_id'])
+            jogada = {'sala_id': pedido['sala_id'], 'versao': pedido['versao'], 'acao': None}
+        self._devolver(pedido['sala_id'], jogada)
+
+    def fechar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BrokerLocal:
+    """Substituto local de um barramento de mensagens: um tópico é uma fila.
+
+    Trocar por Redis/NATS só exige a mesma interface (publicar/receber).
+    """
+
+    def __init__(self, topicos: list[str], ctx=multiprocessing):
+        self._filas = {t: ctx.Queue() for t in topicos}
+
+    def publicar(self, topico: str, mensagem):
+        self._filas[topico].put(mensagem)
+
+    def receber(self, topico: str, timeout: float | None = None):
+        # Levanta queue.Empty se o timeout estourar
+        return self._filas[topico].get(timeout=timeout)
+
+
+TOPICO_GATEWAY = 'gateway'
+PARAR = '__parar__'
+
+
+def topico_shard(indice: int) -> str:
+    return f'shard.{indice}'
+
+
+def limpar_salas(salas: GerenciadorSalas) -> list[Saida]:
+    return [(SALA_REMOVIDA, {'sala_id': sala_id}, None) for sala_id in salas.remover_inativas()]
+
+
+def _loop_shard(indice: int, num_shards: int, broker: BrokerLocal, processar: Callable,
+                fabrica_jogo: Callable, dir_dados: str | None, intervalo_limpeza: float,
+                pensar: Callable[[dict], dict] | None = None):
+    salas = GerenciadorSalas(fabrica_jogo, dir_dados)
+    # A jogada pronta entra na fila do próprio shard, como qualquer evento
+    pensador = Pensador(pensar, lambda sala_id, jogada: broker.publicar(topico_shard(indice),
+                                                                        (JOGADA_BOT, None, jogada))) \
+        if pensar else None
+    # Cada shard recupera só as salas que são dele
+    recuperadas = salas.recuperar(lambda sala_id: shard_da_sala(sala_id, num_shards) == indice)
+    if recuperadas:
+        broker.publicar(TOPICO_GATEWAY, [(SALA_ATUALIZADA, s.resumo(), None) for s in recuperadas])
+    proxima_limpeza = time.monotonic() + intervalo_limpeza
+    proximo_retrato = time.monotonic() + metricas.INTERVALO_ENVIO
+    espera = min(intervalo_limpeza, metricas.INTERVALO_ENVIO) if metricas.ATIVO else intervalo_limpeza
+    while True:
+        try:
+            mensagem = broker.receber(topico_shard(indice), timeout=espera)
+        except queue.Empty:
+            mensagem = None
+        if mensagem == PARAR:
+            if pensador:
+                pensador.fechar()
+            break
+        saidas = []
+        if mensagem is not None:
+            evento, sid, dados = mensagem
+            try:
+                saidas = processar(salas, evento, sid, dados)
+            except Exception:
+                # Um evento com defeito não derruba o shard nem as outras salas dele
+                log.exception('shard %d: erro no evento %r de %s', indice, evento, sid)
+                metricas.contar('t2r_erros_internos_total', rotulos=f'evento="{evento}"')
+                if sid:
+                    saidas = [('erro_acao', {'motivo': 'Erro interno ao processar a ação.'}, sid)]
+        if time.monotonic() >= proxima_limpeza:
+            saidas += limpar_salas(salas)
+            proxima_limpeza = time.monotonic() + intervalo_limpeza
+        pedidos = [dados for nome, dados, _ in saidas if nome == BOT_PENSAR]
+        if pedidos:
+            # Ficam no shard: o estado copiado não precisa ir até o gateway
+            saidas = [saida for saida in saidas if saida[0] != BOT_PENSAR]
+            for pedido in pedidos:
+                if pensador:
+                    pensador.pedir(pedido)
+        if metricas.ATIVO and time.monotonic() >= proximo_retrato:
+            # As métricas do shard vão para o /metrics do processo do Flask
+            saidas.append((metricas.METRICAS, {'origem': f'shard-{indice}', 'dados': metricas.retrato()}, None))
+            proximo_retrato = time.monotonic() + metricas.INTERVALO_ENVIO
+        if saidas:
+            broker.publicar(TOPICO_GATEWAY, saidas)
+
+
+class RoteadorShards:
+    """Dono dos processos de shard; cada sala vive sempre no mesmo processo.
+
+    Com `pensar`, cada shard tem um Pensador para a busca dos bots das suas salas.
+    """
+
+    def __init__(self, num_shards: int, processar: Callable, fabrica_jogo: Callable,
+                 dir_dados: str | None = None, intervalo_limpeza: float = 30.0,
+                 pensar: Callable[[dict], dict] | None = None):
+        self.num_shards = num_shards
+        self.broker = BrokerLocal([TOPICO_GATEWAY] + [topico_shard(i) for i in range(num_shards)])
+        self.processos = [
+            multiprocessing.Process(target=_loop_shard, daemon=True,
+                                    args=(i, num_shards, self.broker, processar, fabrica_jogo,
+                                          dir_dados, intervalo_limpeza, pensar))
+            for i in range(num_shards)
+        ]
+        for p in self.processos:
+            p.start()
+
+    def enviar(self, sala_id: str, evento: str, sid: str, dados: dict):
+        self.broker.publicar(topico_shard(shard_da_sala(sala_id, self.num_shards)), (evento, sid, dados))
+
+    def receber_saidas(self, timeout: float) -> list[Saida]:
+        try:
+            return self.broker.receber(TOPICO_GATEWAY, timeout=timeout)
+        except queue.Empty:
+            return []
+
+    def parar(self):
+        for i in range(self.num_shards):
+            self.broker.publicar(topico_shard(i), PARAR)
+        for p in self.processos:
+            p.join(timeout=5)
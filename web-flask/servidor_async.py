@@ -0,0 +1,261 @@
+# servidor_async.py
+# Modo asyncio do servidor: python-socketio (ASGI) servido pelo uvicorn.
+# As regras e os eventos são os mesmos de app.py (processar_evento); muda só
+# o transporte. Cada sala tem um escritor único (salas.FilasPorSala): as ações
+# de uma partida são aplicadas em ordem e salas diferentes andam juntas.
+#
+#   pip install uvicorn
+#   python servidor_async.py --porta 5000
+import argparse
+import asyncio
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+import uvicorn
+from flask import render_template
+
+import app as servidor
+import metricas
+from envios import FILA_MAX, TICK_PADRAO
+from salas import (BOT_PENSAR, JOGADA_BOT, SALA_ATUALIZADA, DiretorioSalas, FilasPorSala, GerenciadorSalas, Pensador,
+                   Saida, id_valido, novo_id_sala)
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+sio = socketio.AsyncServer(async_mode='asgi')
+diretorio = DiretorioSalas()
+sala_por_sid: dict[str, str] = {}
+filas: FilasPorSala | None = None
+pensador: Pensador | None = None  # busca dos bots; a jogada volta pela fila da sala
+# O mesmo agendador do app.py (patches juntados por tick, clientes atrasados);
+# a trava mantém a ordem de cada sala entre os awaits dos envios
+agendador = servidor.agendador
+trava_envios = asyncio.Lock()
+
+
+async def _emitir(envios):
+    for evento, dados, destino, pular in envios:
+        await sio.emit(evento, dados, to=destino, skip_sid=pular)
+
+
+async def entregar(saidas: list[Saida]):
+    para_clientes = []
+    for evento, dados, destino in saidas:
+        if evento == BOT_PENSAR:
+            pensador.pedir(dados)
+            continue
+        if diretorio.aplicar(evento, dados):
+            continue
+        if evento == servidor.SESSAO_EXPIRADA:
+            await _sair_da_sala(destino, dados['sala_id'])
+        para_clientes.append((evento, dados, destino))
+    async with trava_envios:
+        await _emitir(agendador.receber(para_clientes))
+
+
+async def _sair_da_sala(sid: str, sala_id: str):
+    # O handler de 'retomar' entra na sala antes de saber se o token vale
+    if sala_por_sid.get(sid) == sala_id:
+        del sala_por_sid[sid]
+    saida = sio.leave_room(sid, sala_id)
+    if inspect.isawaitable(saida):
+        await saida
+    agendador.sair(sid)
+
+
+async def _drenar_envios_periodicamente():
+    while True:
+        await asyncio.sleep(agendador.tick)
+        async with trava_envios:
+            await _emitir(agendador.drenar())
+
+
+async def despachar(evento: str, sid: str, data: dict | None, sala_id: str | None = None):
+    sala_id = sala_id or sala_por_sid.get(sid)
+    if not sala_id:
+        await sio.emit('erro_acao', {'motivo': 'Você não está em uma sala.'}, to=sid)
+        return
+    # Não espera o resultado: a ordem já é garantida pela fila da sala
+    filas.enviar(sala_id, evento, sid, data or {})
+
+
+@sio.on('connect')
+async def handle_connect(sid, environ, auth=None):
+    await sio.emit('lista_salas', {'salas': diretorio.listar()}, to=sid)
+
+
+@sio.on('listar_salas')
+async def handle_list_rooms(sid, data=None):
+    await sio.emit('lista_salas', {'salas': diretorio.listar()}, to=sid)
+
+
+@sio.on('criar_sala')
+async def handle_create_room(sid, data=None):
+    data = dict(data or {})
+    data['sala_id'] = data.get('sala_id') or novo_id_sala()
+    await despachar('criar_sala', sid, data, sala_id=data['sala_id'])
+
+
+@sio.on('disconnect')
+async def handle_disconnect(sid):
+    agendador.sair(sid)
+    sala_id = sala_por_sid.pop(sid, None)
+    if sala_id:
+        await despachar('disconnect', sid, {}, sala_id=sala_id)
+
+
+@sio.on('entrar_no_jogo')
+async def handle_join_game(sid, data):
+    data = dict(data or {})
+    sala_id = data.get('sala_id') or diretorio.sala_disponivel() or novo_id_sala()
+    if not id_valido(sala_id):
+        await sio.emit('erro_acao', {'motivo': 'ID de sala inválido.'}, to=sid)
+        return
+    data['sala_id'] = sala_id
+    sala_por_sid[sid] = sala_id
+    entrada = sio.enter_room(sid, sala_id)
+    if inspect.isawaitable(entrada):  # virou corrotina em versões recentes do python-socketio
+        await entrada
+    agendador.entrar(sid, sala_id)
+    await despachar('entrar_no_jogo', sid, data, sala_id=sala_id)
+
+
+@sio.on('assistir')
+async def handle_watch_game(sid, data):
+    data = dict(data or {})
+    sala_id = data.get('sala_id')
+    if not id_valido(sala_id):
+        await sio.emit('erro_acao', {'motivo': 'ID de sala inválido.'}, to=sid)
+        return
+    if sala_por_sid.get(sid, sala_id) != sala_id:
+        await sio.emit('erro_acao', {'motivo': 'Saia da sala atual antes de assistir outra.'}, to=sid)
+        return
+    sala_por_sid[sid] = sala_id
+    entrada = sio.enter_room(sid, sala_id)
+    if inspect.isawaitable(entrada):
+        await entrada
+    agendador.entrar(sid, sala_id)
+    await despachar('assistir', sid, data, sala_id=sala_id)
+
+
+@sio.on('retomar')
+async def handle_resume(sid, data):
+    data = dict(data or {})
+    sala_id = data.get('sala_id')
+    if not id_valido(sala_id):
+        await sio.emit(servidor.SESSAO_EXPIRADA, {'sala_id': sala_id}, to=sid)
+        return
+    if sala_por_sid.get(sid, sala_id) != sala_id:
+        await sio.emit('erro_acao', {'motivo': 'Saia da sala atual antes de voltar a outra.'}, to=sid)
+        return
+    sala_por_sid[sid] = sala_id
+    entrada = sio.enter_room(sid, sala_id)
+    if inspect.isawaitable(entrada):
+        await entrada
+    agendador.entrar(sid, sala_id)
+    await despachar('retomar', sid, data, sala_id=sala_id)
+
+
+@sio.on('confirmar_versao')
+async def handle_confirm_version(sid, data):
+    versao = (data or {}).get('versao')
+    if isinstance(versao, int) and agendador.confirmar(sid, versao):
+        await despachar('pedir_snapshot', sid, {})
+
+
+def _repassar(evento: str):
+    async def handler(sid, data=None):
+        await despachar(evento, sid, data)
+    return handler
+
+
+# Eventos de jogo: só precisam da sala de quem enviou
+for _evento in ('iniciar_jogo', 'adicionar_bot', 'pedir_snapshot', 'planejar_rota', 'pedir_chances', 'comprar_carta',
+                'reivindicar_rota', 'comprar_bilhetes', 'escolher_bilhetes'):
+    sio.on(_evento, _repassar(_evento))
+
+
+def pagina_inicial():
+    # index.html usa url_for: renderiza uma vez com o app Flask e serve como ASGI
+    with servidor.app.test_request_context('/'):
+        html = render_template('index.html').encode()
+
+    async def pagina(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        tipo = b'text/html; charset=utf-8'
+        if scope['path'] == '/':
+            status, corpo = 200, html
+        elif scope['path'] == '/metrics':
+            status, corpo, tipo = 200, metricas.texto_prometheus().encode(), b'text/plain; version=0.0.4'
+        else:
+            status, corpo = 404, b''
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', tipo)]})
+        await send({'type': 'http.response.body', 'body': corpo})
+    return pagina
+
+
+async def _limpar_salas_periodicamente(intervalo=30):
+    while True:
+        await asyncio.sleep(intervalo)
+        await entregar(await filas.limpar())
+
+
+async def _expirar_assentos_periodicamente(graca: float, intervalo=10):
+    # Só as salas com alguém fora; vai pela fila da sala, como as ações
+    while True:
+        await asyncio.sleep(intervalo)
+        for resumo in diretorio.listar():
+            if resumo.get('ausentes'):
+                await despachar('expirar_assentos', None, {'graca': graca}, sala_id=resumo['sala_id'])
+
+
+async def principal(host: str, porta: int, dir_dados: str | None, workers: int | None,
+                    graca: float = servidor.GRACA_RECONEXAO):
+    global filas, pensador
+    salas = GerenciadorSalas(servidor.Jogo, dir_dados)
+    loop = asyncio.get_running_loop()
+    pensador = Pensador(servidor.pensar_bot, lambda sala_id, jogada: loop.call_soon_threadsafe(
+        filas.enviar, sala_id, JOGADA_BOT, None, jogada))
+    filas = FilasPorSala(salas, servidor.processar_evento, entregar,
+                         ThreadPoolExecutor(max_workers=workers) if workers else None)
+    await entregar([(SALA_ATUALIZADA, sala.resumo(), None) for sala in salas.recuperar()])
+    asgi = socketio.ASGIApp(sio, other_asgi_app=pagina_inicial(),
+                            static_files={'/static': os.path.join(AQUI, 'static')})
+    tarefas = [asyncio.create_task(_limpar_salas_periodicamente()),
+               asyncio.create_task(_expirar_assentos_periodicamente(graca))]
+    if agendador.tick > 0:
+        tarefas.append(asyncio.create_task(_drenar_envios_periodicamente()))
+    try:
+        await uvicorn.Server(uvicorn.Config(asgi, host=host, port=porta, lifespan='off')).serve()
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        pensador.fechar()
+        filas.fechar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor Ticket to Ride (asyncio)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--porta', type=int, default=5000)
+    parser.add_argument('--dados', default=os.path.join(AQUI, 'partidas'),
+                        help="diretório dos diários das partidas ('' desliga a recuperação)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="threads que aplicam as ações (0 = padrão do Python)")
+    parser.add_argument('--metricas', action='store_true',
+                        help="liga histogramas e contadores (expostos em /metrics)")
+    parser.add_argument('--tick-ms', type=float, default=TICK_PADRAO * 1000,
+                        help="janela em que os patches de uma sala são juntados (0 = só os de um mesmo evento)")
+    parser.add_argument('--fila-max', type=int, default=FILA_MAX,
+                        help="atualizações sem confirmação antes de um cliente ficar para trás")
+    parser.add_argument('--graca', type=float, default=servidor.GRACA_RECONEXAO,
+                        help="segundos que o assento de quem caiu fica guardado")
+    args = parser.parse_args()
+    agendador.tick, agendador.fila_max = args.tick_ms / 1000, args.fila_max
+    if args.metricas:
+        metricas.ativar()
+    asyncio.run(principal(args.host, args.porta, args.dados or None, args.workers or None, args.graca))
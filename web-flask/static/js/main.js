@@ -7,7 +7,13 @@ document.addEventListener("DOMContentLoaded", () => {
   const gameArea = document.getElementById("game-info")
   const joinButton = document.getElementById("join-game-btn")
   const nameInput = document.getElementById("player-name")
+  const roomInput = document.getElementById("room-id")
+  const createRoomButton = document.getElementById("create-room-btn")
+  const watchButton = document.getElementById("watch-game-btn")
+  const roomList = document.getElementById("room-list")
+  const roomInfo = document.getElementById("room-info")
   const startButton = document.getElementById("start-game-btn")
+  const addBotButton = document.getElementById("add-bot-btn")
   const gameStatus = document.getElementById("game-status")
   const turnInfo = document.getElementById("turn-info")
   const playerList = document.getElementById("player-list")
@@ -16,8 +22,38 @@ document.addEventListener("DOMContentLoaded", () => {
   const deckBaralho = document.getElementById("deck-baralho")
   const boardContainer = document.getElementById("board-container")
   const errorMessage = document.getElementById("error-message")
+  const ticketList = document.getElementById("ticket-list")
+  const ticketOffer = document.getElementById("ticket-offer")
+  const ticketOfferInfo = document.getElementById("ticket-offer-info")
+  const ticketOfferList = document.getElementById("ticket-offer-list")
+  const keepTicketsButton = document.getElementById("keep-tickets-btn")
+  const drawTicketsButton = document.getElementById("draw-tickets-btn")
+  const planFrom = document.getElementById("plan-from")
+  const planTo = document.getElementById("plan-to")
+  const planButton = document.getElementById("plan-btn")
+  const planResult = document.getElementById("plan-result")
+  const showOdds = document.getElementById("show-odds")
 
   let mySessionId = null
+  let currentState = null
+  let watching = false
+  // Parte privada (só nossa) chega antes da pública da mesma versão
+  let pendingPrivate = null
+  // Chances de compra por rota livre (calculadas no servidor com a nossa mão)
+  let odds = null
+  let oddsRequested = null
+  const decoder = new TextDecoder()
+
+  // A parte pública chega como JSON já codificado (anexo binário)
+  function decodePublic(raw) {
+    return typeof raw === "string" ? JSON.parse(raw) : JSON.parse(decoder.decode(raw))
+  }
+
+  function mergePrivate(state, privado) {
+    const eu = state.jogadores.find((j) => j.sid === mySessionId)
+    if (eu && privado) Object.assign(eu, privado)
+    return state
+  }
   let selectedHandCards = new Set()
 
   const cityPositions = {
@@ -27,14 +63,152 @@ document.addEventListener("DOMContentLoaded", () => {
     Miami: { x: 750, y: 550 },
   }
 
+  // Sessão desta aba (sobrevive a recarregar a página): sala e token do assento
+  const SESSAO = "t2r_sessao"
+  function loadSession() {
+    try {
+      return JSON.parse(sessionStorage.getItem(SESSAO))
+    } catch (e) {
+      return null
+    }
+  }
+
   // --- Tratamento de Conexão e Eventos do Servidor ---
   socket.on("connect", () => {
     mySessionId = socket.id
+    // Reconexão: volta ao assento (ou à sala assistida) e recebe só o que perdeu
+    const sessao = loadSession()
+    if (!sessao) return
+    const versao = currentState ? currentState.versao : null
+    if (sessao.espectador) socket.emit("assistir", { sala_id: sessao.sala_id, versao })
+    else socket.emit("retomar", { sala_id: sessao.sala_id, token: sessao.token, versao })
+    loginArea.style.display = "none"
+    gameArea.style.display = "block"
+  })
+
+  socket.on("sessao_expirada", () => {
+    sessionStorage.removeItem(SESSAO)
+    currentState = null
+    loginArea.style.display = "block"
+    gameArea.style.display = "none"
+    errorMessage.textContent = "O seu assento não foi guardado: entre de novo."
+    setTimeout(() => (errorMessage.textContent = ""), 3000)
   })
 
-  socket.on("game_state_update", (state) => {
+  // Confirma a última versão aplicada de tempos em tempos (e a cada
+  // CONFIRMAR_A_CADA atualizações, metade da fila do servidor): se ficarmos
+  // para trás, o servidor para de mandar patches e depois manda só o estado atual
+  const CONFIRMAR_MS = 250
+  const CONFIRMAR_A_CADA = 16
+  let confirmacao = null
+  let semConfirmar = 0
+  function sendConfirm() {
+    clearTimeout(confirmacao)
+    confirmacao = null
+    semConfirmar = 0
+    if (currentState) socket.emit("confirmar_versao", { versao: currentState.versao })
+  }
+  function confirmVersion(agora) {
+    // Estado completo (entrada ou recuperação): confirma já, para o servidor contar daqui
+    if (agora || ++semConfirmar >= CONFIRMAR_A_CADA) return sendConfirm()
+    if (!confirmacao) confirmacao = setTimeout(sendConfirm, CONFIRMAR_MS)
+  }
+
+  function takePrivate(versao) {
+    const privado = pendingPrivate && pendingPrivate.versao === versao ? pendingPrivate : null
+    pendingPrivate = null
+    return privado
+  }
+
+  socket.on("estado_privado", (privado) => (pendingPrivate = privado))
+  socket.on("patch_privado", (privado) => (pendingPrivate = privado))
+
+  socket.on("game_state_update", (publico) => {
+    const state = decodePublic(publico)
+    const privado = takePrivate(state.versao)
+    if (privado) {
+      const { versao, ...dados } = privado
+      mergePrivate(state, dados)
+    }
     console.log("Novo estado:", state)
+    currentState = state
     updateUI(state)
+    confirmVersion(true)
+  })
+
+  // Patches versionados: só o que mudou desde a versão anterior
+  socket.on("game_patch", (publico) => {
+    const patch = decodePublic(publico)
+    const privado = takePrivate(patch.versao)
+    if (!currentState || patch.base !== currentState.versao) {
+      // Perdemos alguma versão: pede o estado completo
+      socket.emit("pedir_snapshot")
+      return
+    }
+    applyPatch(currentState, patch.ops.concat(privado && privado.ops ? privado.ops : []))
+    if (privado && !privado.ops) {
+      // Parte privada inteira (depois de uma reconexão), aplicada já com o nosso sid novo
+      const { versao, ...dados } = privado
+      mergePrivate(currentState, dados)
+    }
+    currentState.versao = patch.versao
+    updateUI(currentState)
+    confirmVersion()
+  })
+
+  socket.on("lista_salas", (data) => renderRooms(data.salas))
+
+  socket.on("sala_criada", (data) => {
+    roomInput.value = data.sala_id
+    socket.emit("listar_salas")
+  })
+
+  socket.on("sala_atual", (data) => {
+    watching = !!data.espectador
+    const sessao = watching ? { sala_id: data.sala_id, espectador: true } : { sala_id: data.sala_id, token: data.token }
+    sessionStorage.setItem(SESSAO, JSON.stringify(sessao))
+    roomInfo.textContent = `Sala: ${data.sala_id}${watching ? " (assistindo)" : ""}`
+  })
+
+  // Caminho mais barato calculado no servidor com a nossa mão
+  socket.on("plano_rota", (plano) => {
+    if (!plano.possivel) {
+      planResult.textContent = `Sem caminho livre de ${plano.origem} até ${plano.destino}.`
+      return
+    }
+    const faltam = Object.entries(plano.faltam)
+      .map(([cor, n]) => `${n} ${cor === "grey" ? "de qualquer cor" : cor}`)
+      .join(", ")
+    planResult.textContent =
+      `${plano.cidades.join(" → ")} | rotas a reivindicar: ${plano.a_reivindicar.length}, ` +
+      `vagões: ${plano.vagoes}` + (faltam ? ` | faltam: ${faltam}` : " | cartas suficientes")
+  })
+
+  function requestPlan(origem, destino) {
+    planFrom.value = origem
+    planTo.value = destino
+    socket.emit("planejar_rota", { origem, destino })
+  }
+
+  socket.on("chances_rotas", (data) => {
+    odds = { versao: data.versao, turnos: data.turnos, rotas: new Map(data.rotas) }
+    if (currentState) updateUI(currentState)
+  })
+
+  // Pede as chances de novo a cada versão do jogo, só com a opção ligada
+  function requestOdds(state) {
+    if (!showOdds.checked || watching || state.estado !== "EM_ANDAMENTO") return
+    if (oddsRequested === state.versao) return
+    oddsRequested = state.versao
+    socket.emit("pedir_chances")
+  }
+
+  showOdds.addEventListener("change", () => {
+    oddsRequested = null
+    if (currentState) {
+      requestOdds(currentState)
+      updateUI(currentState)
+    }
   })
 
   socket.on("erro_acao", (data) => {
@@ -45,18 +219,127 @@ document.addEventListener("DOMContentLoaded", () => {
   // --- Lógica de Eventos da UI ---
   joinButton.addEventListener("click", () => {
     const playerName = nameInput.value || "Anônimo"
-    socket.emit("entrar_no_jogo", { nome: playerName })
+    const salaId = roomInput.value.trim()
+    socket.emit("entrar_no_jogo", { nome: playerName, sala_id: salaId || null })
+    loginArea.style.display = "none"
+    gameArea.style.display = "block"
+  })
+
+  createRoomButton.addEventListener("click", () => socket.emit("criar_sala", {}))
+
+  watchButton.addEventListener("click", () => {
+    const salaId = roomInput.value.trim()
+    if (!salaId) {
+      alert("Escolha uma sala para assistir.")
+      return
+    }
+    socket.emit("assistir", { sala_id: salaId })
     loginArea.style.display = "none"
     gameArea.style.display = "block"
   })
 
   startButton.addEventListener("click", () => socket.emit("iniciar_jogo"))
+  addBotButton.addEventListener("click", () => socket.emit("adicionar_bot"))
 
   deckBaralho.addEventListener("click", () => {
     socket.emit("comprar_carta", { index: -1 })
   })
 
+  drawTicketsButton.addEventListener("click", () => socket.emit("comprar_bilhetes"))
+
+  planButton.addEventListener("click", () => requestPlan(planFrom.value.trim(), planTo.value.trim()))
+
+  keepTicketsButton.addEventListener("click", () => {
+    const manter = [...ticketOfferList.querySelectorAll("input:checked")].map((c) => Number(c.value))
+    socket.emit("escolher_bilhetes", { manter })
+  })
+
   // --- Funções de Renderização e Lógica ---
+  function applyPatch(state, ops) {
+    ops.forEach((op) => {
+      switch (op.op) {
+        case "rota":
+          state.tabuleiro.rotas[op.i].dono_id = op.dono_id
+          break
+        case "jogador": {
+          const jogador = state.jogadores.find((j) => j.sid === op.sid)
+          if (jogador) {
+            jogador.pontos = op.pontos
+            jogador.pecas_vagao = op.pecas_vagao
+            jogador.num_cartas_vagao = op.num_cartas_vagao
+            jogador.num_cartas_destino = op.num_cartas_destino
+            jogador.maior_caminho = op.maior_caminho
+          }
+          break
+        }
+        case "mercado":
+          state.cartas_visiveis = op.cartas
+          break
+        case "turno":
+          state.jogador_da_vez_sid = op.jogador_da_vez_sid
+          state.acao_do_turno = op.acao_do_turno
+          break
+        case "fim":
+          state.estado = op.estado
+          state.vencedor = op.vencedor
+          break
+        case "reassociar": {
+          // O jogador voltou com outra conexão: o sid muda em todo o estado
+          const troca = (sid) => (sid === op.de ? op.para : sid)
+          state.jogadores.forEach((j) => (j.sid = troca(j.sid)))
+          state.tabuleiro.rotas.forEach((r) => (r.dono_id = troca(r.dono_id)))
+          state.jogador_da_vez_sid = troca(state.jogador_da_vez_sid)
+          if (state.vencedor) state.vencedor.forEach((v) => (v.sid = troca(v.sid)))
+          break
+        }
+        case "conexao": {
+          const jogador = state.jogadores.find((j) => j.sid === op.sid)
+          if (jogador) jogador.conectado = op.conectado
+          break
+        }
+        case "mao": {
+          const eu = state.jogadores.find((j) => j.sid === mySessionId)
+          if (!eu) break
+          const mao = eu.cartas_vagao || []
+          Object.entries(op.delta).forEach(([cor, n]) => {
+            for (let i = 0; i < n; i++) mao.push({ tipo: "vagao", cor })
+            for (let i = 0; i > n; i--) {
+              const idx = mao.findIndex((c) => c.cor === cor)
+              if (idx >= 0) mao.splice(idx, 1)
+            }
+          })
+          eu.cartas_vagao = mao
+          break
+        }
+        case "jogaveis": {
+          const eu = state.jogadores.find((j) => j.sid === mySessionId)
+          if (eu) eu.rotas_jogaveis = op.rotas
+          break
+        }
+        case "bilhetes": {
+          const eu = state.jogadores.find((j) => j.sid === mySessionId)
+          if (eu) {
+            eu.bilhetes = op.bilhetes
+            eu.oferta_bilhetes = op.oferta
+          }
+          break
+        }
+      }
+    })
+  }
+
+  function renderRooms(salas) {
+    roomList.innerHTML = ""
+    salas.forEach((sala) => {
+      const li = document.createElement("li")
+      const espectadores = sala.espectadores ? ` - ${sala.espectadores} assistindo` : ""
+      li.textContent = `${sala.nome} (${sala.jogadores.length}/4) - ${sala.estado.replace("_", " ")}${espectadores}`
+      li.style.cursor = "pointer"
+      li.onclick = () => (roomInput.value = sala.sala_id)
+      roomList.appendChild(li)
+    })
+  }
+
   function updateUI(state) {
     const myTurn = state.jogador_da_vez_sid === mySessionId
     const acao = state.acao_do_turno
@@ -78,8 +361,17 @@ document.addEventListener("DOMContentLoaded", () => {
       winnerBanner.classList.add("hidden")
     }
 
+    const myPlayerData = state.jogadores.find((p) => p.sid === mySessionId)
+    const oferta = myPlayerData && myPlayerData.oferta_bilhetes
+
     turnInfo.style.fontWeight = "bold"
-    if (myTurn) {
+    if (watching) {
+      turnInfo.textContent = "Assistindo à partida."
+      turnInfo.style.color = "black"
+    } else if (oferta) {
+      turnInfo.textContent = "Escolha seus bilhetes de destino."
+      turnInfo.style.color = "purple"
+    } else if (myTurn) {
       if (acao.tipo === "COMPRANDO_CARTAS" && acao.cartas_compradas === 1) {
         turnInfo.textContent = "É a sua vez! Compre sua segunda carta."
         turnInfo.style.color = "blue"
@@ -93,19 +385,24 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     gameStatus.textContent = `Estado: ${state.estado.replace("_", " ")}`
+    document.getElementById("route-planner").style.display = watching ? "none" : "block"
     const souPrimeiroJogador =
       state.jogadores.length > 0 && state.jogadores[0].sid === mySessionId
     startButton.style.display =
       state.estado === "AGUARDANDO_JOGADORES" && souPrimeiroJogador
         ? "block"
         : "none"
+    addBotButton.style.display =
+      !watching && state.estado === "AGUARDANDO_JOGADORES" && state.jogadores.length < 4
+        ? "block"
+        : "none"
 
     playerList.innerHTML = ""
     state.jogadores.forEach((p) => {
       const li = document.createElement("li")
       li.style.backgroundColor = p.cor
       li.style.color = "white"
-      li.textContent = `[${p.nome}] Pts: ${p.pontos} / Vagões: ${p.pecas_vagao}`
+      li.textContent = `[${p.nome}${p.bot ? " 🤖" : ""}${p.conectado === false ? " (desconectado)" : ""}] Pts: ${p.pontos} / Vagões: ${p.pecas_vagao} / Bilhetes: ${p.num_cartas_destino} / Maior caminho: ${p.maior_caminho || 0}`
       if (
         p.sid === state.jogador_da_vez_sid &&
         state.estado === "EM_ANDAMENTO"
@@ -115,13 +412,14 @@ document.addEventListener("DOMContentLoaded", () => {
       playerList.appendChild(li)
     })
 
-    const myPlayerData = state.jogadores.find((p) => p.sid === mySessionId)
     if (myPlayerData && myPlayerData.cartas_vagao) {
       renderHand(myPlayerData.cartas_vagao)
     }
+    renderTickets(myPlayerData, myTurn, acao, state.estado)
 
     renderVisibleCards(state.cartas_visiveis, myTurn, acao, state.estado)
     renderBoard(state.tabuleiro, state.jogadores, myTurn, acao, state.estado)
+    requestOdds(state)
   }
 
   function renderCard(cardData, isHandCard = false) {
@@ -152,6 +450,50 @@ document.addEventListener("DOMContentLoaded", () => {
     })
   }
 
+  function renderTickets(eu, myTurn, acao, estadoJogo) {
+    ticketList.innerHTML = ""
+    const bilhetes = (eu && eu.bilhetes) || []
+    bilhetes.forEach((b) => {
+      const li = document.createElement("li")
+      li.textContent = `${b.completo ? "✔" : "✘"} ${b.origem} → ${b.destino} (${b.pontos} pts)`
+      li.classList.add(b.completo ? "ticket-done" : "ticket-open")
+      if (!b.completo) {
+        li.style.cursor = "pointer"
+        li.title = "Planejar o caminho deste bilhete"
+        li.onclick = () => requestPlan(b.origem, b.destino)
+      }
+      ticketList.appendChild(li)
+    })
+
+    const oferta = eu && eu.oferta_bilhetes
+    ticketOffer.style.display = oferta ? "block" : "none"
+    if (oferta && ticketOfferList.dataset.oferta !== JSON.stringify(oferta)) {
+      // Só redesenha quando a oferta muda, para não perder as marcações
+      ticketOfferList.dataset.oferta = JSON.stringify(oferta)
+      ticketOfferInfo.textContent = `Fique com pelo menos ${oferta.minimo}:`
+      ticketOfferList.innerHTML = ""
+      oferta.bilhetes.forEach((b, i) => {
+        const li = document.createElement("li")
+        const label = document.createElement("label")
+        const check = document.createElement("input")
+        check.type = "checkbox"
+        check.value = i
+        check.checked = true
+        label.appendChild(check)
+        label.append(` ${b.origem} → ${b.destino} (${b.pontos} pts)`)
+        li.appendChild(label)
+        ticketOfferList.appendChild(li)
+      })
+    } else if (!oferta) {
+      delete ticketOfferList.dataset.oferta
+    }
+
+    drawTicketsButton.style.display =
+      myTurn && !oferta && acao.tipo === null && estadoJogo === "EM_ANDAMENTO"
+        ? "block"
+        : "none"
+  }
+
   function renderVisibleCards(cards, myTurn, acao, estadoJogo) {
     visibleCardsDiv.innerHTML = ""
     cards.forEach((card, index) => {
@@ -182,7 +524,13 @@ document.addEventListener("DOMContentLoaded", () => {
 
   function renderBoard(tabuleiro, jogadores, myTurn, acao, estadoJogo) {
     boardContainer.innerHTML = ""
-    tabuleiro.rotas.forEach((r) => {
+    // Rotas que posso reivindicar agora, com as opções de pagamento (calculadas no servidor)
+    const eu = jogadores.find((j) => j.sid === mySessionId)
+    const jogaveis = new Map(
+      ((eu && eu.rotas_jogaveis) || []).map((r) => [r.i, r.pagamentos])
+    )
+    const chances = showOdds.checked && odds ? odds : null
+    tabuleiro.rotas.forEach((r, i) => {
       const posA = cityPositions[r.cidadeA]
       const posB = cityPositions[r.cidadeB]
 
@@ -211,11 +559,27 @@ document.addEventListener("DOMContentLoaded", () => {
         routeDiv.style.opacity = "1"
       } else {
         routeDiv.style.opacity = "0.7"
+        const chance = chances && chances.rotas.get(i)
+        if (chance) {
+          const turnos = chance.map((_, t) => t + 1).join("/")
+          routeDiv.title = `Chance em ${turnos} turnos de compra: ${chance.map((p) => `${p}%`).join(" / ")}`
+        }
         const podeReivindicar =
           myTurn && acao.tipo === null && estadoJogo === "EM_ANDAMENTO"
         if (podeReivindicar) {
           routeDiv.style.cursor = "pointer"
-          routeDiv.onclick = () => tryClaimRoute(r)
+          const pagamentos = jogaveis.get(i)
+          if (pagamentos) {
+            routeDiv.classList.add("route-claimable")
+            routeDiv.title = pagamentos
+              .map((p) =>
+                Object.entries(p)
+                  .map(([cor, n]) => `${n} ${cor}`)
+                  .join(" + ")
+              )
+              .join(" | ")
+          }
+          routeDiv.onclick = () => tryClaimRoute(r, i, pagamentos)
         } else {
           routeDiv.style.cursor = "not-allowed"
         }
@@ -249,8 +613,15 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
-  function tryClaimRoute(rota) {
+  function tryClaimRoute(r, i, pagamentos) {
+    // O índice escolhe entre rotas paralelas (mesmo par de cidades)
+    const rota = { cidadeA: r.cidadeA, cidadeB: r.cidadeB, i }
     if (selectedHandCards.size === 0) {
+      if (pagamentos && pagamentos.length) {
+        // Sem cartas selecionadas: usa a primeira opção sugerida pelo servidor
+        socket.emit("reivindicar_rota", { rota, cartas: pagamentos[0] })
+        return
+      }
       alert("Selecione cartas da sua mão para reivindicar uma rota.")
       return
     }